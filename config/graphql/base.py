@@ -2,16 +2,30 @@ import inspect
 import logging
 import traceback
 from abc import ABC
+from functools import partial
 
 import django.db.models
 import graphene
+from django.db.models import QuerySet
 from graphene.relay import Node
+from graphene.relay.connection import connection_adapter, page_info_adapter
 from graphene_django import DjangoObjectType
+from graphene_django.fields import DjangoConnectionField
+from graphene_django.filter import DjangoFilterConnectionField
+from graphene_django.utils import maybe_queryset
 from graphql_jwt.decorators import login_required
-from graphql_relay import from_global_id, to_global_id
+from graphql_relay import (
+    connection_from_array_slice,
+    cursor_to_offset,
+    from_global_id,
+    get_offset_with_default,
+    offset_to_cursor,
+    to_global_id,
+)
 
 from opencontractserver.shared.resolvers import resolve_single_oc_model_from_id
 from opencontractserver.types.enums import PermissionTypes
+from opencontractserver.utils.counting import count_queryset
 from opencontractserver.utils.permissioning import (
     set_permissions_for_obj_to_user,
     user_has_permission_for_obj,
@@ -64,7 +78,73 @@ class CountableConnection(graphene.relay.Connection):
     total_count = graphene.Int()
 
     def resolve_total_count(root, info):
-        return len(root.iterable)  # And no, root.iterable.count() did not work for me.
+        # Connections that had to count their queryset to paginate it (see CountQuerySetConnectionMixin) already
+        # know the exact total
+        if getattr(root, "length", None) is not None:
+            return root.length
+        if isinstance(root.iterable, QuerySet):
+            return count_queryset(root.iterable)
+        return len(root.iterable)
+
+
+class CountQuerySetConnectionMixin:
+    """
+    Paginate forward (first / after) through a queryset without counting it: one extra row is fetched to tell
+    whether there's a next page. The connection's length is left unset, so total_count is only counted when it's
+    asked for, through count_queryset (and so its cache and the planner's estimate). Backward pagination (last /
+    before) needs the exact length, so it goes through graphene-django's COUNT(*) as before.
+    """
+
+    @classmethod
+    def resolve_connection(cls, connection, args, iterable, max_limit=None):
+
+        iterable = maybe_queryset(iterable)
+        first = args.get("first")
+        if first is None and args.get("last") is None:
+            first = max_limit
+
+        if (
+            not isinstance(iterable, QuerySet)
+            or first is None
+            or args.get("last") is not None
+            or args.get("before")
+        ):
+            return super().resolve_connection(connection, args, iterable, max_limit)
+
+        # graphene-django's offset argument is an alternative to (or shift of) the after cursor
+        offset = args.pop("offset", None)
+        after = args.get("after")
+        if offset:
+            if after:
+                offset += cursor_to_offset(after) + 1
+            args["after"] = offset_to_cursor(offset - 1)
+
+        slice_start = get_offset_with_default(args.get("after"), -1) + 1
+        rows = list(iterable[slice_start : slice_start + first + 1])
+
+        connection = connection_from_array_slice(
+            rows,
+            {**args, "first": first},
+            slice_start=slice_start,
+            # Past the last row on this page when there's another row after it, so hasNextPage is set
+            array_length=slice_start + len(rows),
+            connection_type=partial(connection_adapter, connection),
+            edge_type=connection.Edge,
+            page_info_type=page_info_adapter,
+        )
+        connection.iterable = iterable
+        connection.length = None
+        return connection
+
+
+class CountingConnectionField(CountQuerySetConnectionMixin, DjangoConnectionField):
+    pass
+
+
+class CountingFilterConnectionField(
+    CountQuerySetConnectionMixin, DjangoFilterConnectionField
+):
+    pass
 
 
 class DRFDeletion(graphene.Mutation):
@@ -0,0 +1,86 @@
+"""
+Batched loading of related objects for GraphQL resolvers, so a relation costs one query per level of the response
+rather than one per parent object.
+
+Our schema executes synchronously, so rather than queueing keys for an async DataLoader, the loaders lean on
+PermissionAnnotatingMiddleware having already registered every model instance the resolvers returned (see
+RequestPermissionCache.register). The first time a relation is asked for on one of those instances, it's loaded for
+all of its registered siblings at once with Django's prefetch_related_objects, and later siblings find theirs
+already in place.
+
+Fields resolve depth first, so the first sibling's children have their own relations resolved before the other
+siblings' children are ever returned. The loaders therefore register everything they load for every sibling
+straight away, which lets the next level down batch across all of it too.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+import django.db.models
+from django.db.models import Prefetch, prefetch_related_objects
+
+from config.graphql.permissioning.permission_annotator.permission_cache import (
+    get_request_permission_cache,
+)
+
+
+def _unloaded_siblings(info, instance: django.db.models.Model, is_loaded) -> list:
+    siblings = [
+        sibling
+        for sibling in get_request_permission_cache(info).registered_instances(
+            type(instance)
+        )
+        if sibling is not instance and not is_loaded(sibling)
+    ]
+    return [instance, *siblings]
+
+
+def _register_loaded(info, siblings: list, attr: str):
+    permission_cache = get_request_permission_cache(info)
+    for sibling in siblings:
+        permission_cache.register(getattr(sibling, attr))
+
+
+def load_related_object(
+    info, instance: django.db.models.Model, field_name: str
+) -> Optional[django.db.models.Model]:
+    """
+    The object instance's foreign key field_name points at, loaded for instance's siblings in the same query
+    """
+
+    field = instance._meta.get_field(field_name)
+
+    if not field.is_cached(instance):
+        siblings = _unloaded_siblings(info, instance, field.is_cached)
+        prefetch_related_objects(siblings, field_name)
+        _register_loaded(info, siblings, field_name)
+
+    return getattr(instance, field_name)
+
+
+def load_related_list(
+    info,
+    instance: django.db.models.Model,
+    relation: str,
+    queryset: Optional[django.db.models.QuerySet] = None,
+    key: str = "",
+) -> list:
+    """
+    The objects in instance's to-many relation (reverse foreign key or many to many), optionally narrowed by
+    queryset, loaded for instance's siblings in the same query. Pass a key that identifies the queryset's filters
+    when the same relation is loaded with different filters in one operation.
+    """
+
+    to_attr = f"_loaded_{relation}_{key}" if key else f"_loaded_{relation}"
+
+    if not hasattr(instance, to_attr):
+        siblings = _unloaded_siblings(
+            info, instance, lambda sibling: hasattr(sibling, to_attr)
+        )
+        prefetch_related_objects(
+            siblings, Prefetch(relation, queryset=queryset, to_attr=to_attr)
+        )
+        _register_loaded(info, siblings, to_attr)
+
+    return getattr(instance, to_attr)
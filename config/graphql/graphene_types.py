@@ -6,10 +6,10 @@ from django.db.models import QuerySet
 from graphene import relay
 from graphene.types.generic import GenericScalar
 from graphene_django import DjangoObjectType
-from graphene_django.filter import DjangoFilterConnectionField
 from graphql_relay import from_global_id
 
-from config.graphql.base import CountableConnection
+from config.graphql.base import CountableConnection, CountingFilterConnectionField
+from config.graphql.dataloaders import load_related_list, load_related_object
 from config.graphql.filters import AnnotationFilter, LabelFilter
 from config.graphql.permissioning.permission_annotator.mixins import (
     AnnotatePermissionsForReadMixin,
@@ -26,6 +26,7 @@ from opencontractserver.documents.models import Document, DocumentAnalysisRow
 from opencontractserver.extracts.models import Column, Datacell, Extract, Fieldset
 from opencontractserver.feedback.models import UserFeedback
 from opencontractserver.users.models import Assignment, UserExport, UserImport
+from opencontractserver.utils.pawls import load_pawls_pages
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -73,15 +74,21 @@ class AnnotationInputType(AnnotatePermissionsForReadMixin, graphene.InputObjectT
 class AnnotationType(AnnotatePermissionsForReadMixin, DjangoObjectType):
     json = GenericScalar()
 
+    # Related objects are loaded for every annotation in the response at once (see config.graphql.dataloaders)
+    annotation_label = graphene.Field(lambda: AnnotationLabelType)
+
+    def resolve_annotation_label(self, info):
+        return load_related_object(info, self, "annotation_label")
+
     all_source_node_in_relationship = graphene.List(lambda: RelationshipType)
 
     def resolve_all_source_node_in_relationship(self, info):
-        return self.source_node_in_relationships.all()
+        return load_related_list(info, self, "source_node_in_relationships")
 
     all_target_node_in_relationship = graphene.List(lambda: RelationshipType)
 
     def resolve_all_target_node_in_relationship(self, info):
-        return self.target_node_in_relationships.all()
+        return load_related_list(info, self, "target_node_in_relationships")
 
     class Meta:
         model = Annotation
@@ -142,7 +149,7 @@ class AnnotationLabelType(AnnotatePermissionsForReadMixin, DjangoObjectType):
 
 
 class LabelSetType(AnnotatePermissionsForReadMixin, DjangoObjectType):
-    annotation_labels = DjangoFilterConnectionField(
+    annotation_labels = CountingFilterConnectionField(
         AnnotationLabelType, filterset_class=LabelFilter
     )
 
@@ -150,7 +157,7 @@ class LabelSetType(AnnotatePermissionsForReadMixin, DjangoObjectType):
     all_annotation_labels = graphene.Field(graphene.List(AnnotationLabelType))
 
     def resolve_all_annotation_labels(self, info):
-        return self.annotation_labels.all()
+        return load_related_list(info, self, "annotation_labels")
 
     # Custom resolver for icon field
     def resolve_icon(self, info):
@@ -187,10 +194,26 @@ class DocumentType(AnnotatePermissionsForReadMixin, DjangoObjectType):
             else info.context.build_absolute_uri(self.pawls_parse_file.url)
         )
 
+    pawls_page = GenericScalar(page=graphene.Int(required=True))
+
+    def resolve_pawls_page(self, info, page):
+        # One page of the PAWLS layer as JSON, read on its own from the binary copy when there is one
+        if not (self.pawls_binary_file or self.pawls_parse_file):
+            return None
+        if not 0 <= page < self.page_count:
+            return None
+        return load_pawls_pages(self, [page])[0]
+
     all_structural_annotations = graphene.List(AnnotationType)
 
     def resolve_all_structural_annotations(self, info):
-        return self.doc_annotations.filter(structural=True).distinct()
+        return load_related_list(
+            info,
+            self,
+            "doc_annotations",
+            queryset=Annotation.objects.filter(structural=True),
+            key="structural",
+        )
 
     # Updated field and resolver for all annotations with enhanced filtering
     all_annotations = graphene.List(
@@ -205,7 +228,7 @@ class DocumentType(AnnotatePermissionsForReadMixin, DjangoObjectType):
     ):
         try:
             corpus_pk = from_global_id(corpus_id)[1]
-            annotations = self.doc_annotations.filter(corpus_id=corpus_pk)
+            annotations = Annotation.objects.filter(corpus_id=corpus_pk)
 
             if analysis_id is not None:
                 if analysis_id == "__none__":
@@ -217,7 +240,14 @@ class DocumentType(AnnotatePermissionsForReadMixin, DjangoObjectType):
             if is_structural is not None:
                 annotations = annotations.filter(structural=is_structural)
 
-            return annotations.distinct()
+            # Loaded for every document in the response at once, so the filters need to be part of the key
+            return load_related_list(
+                info,
+                self,
+                "doc_annotations",
+                queryset=annotations,
+                key=f"{corpus_pk}_{analysis_id}_{is_structural}",
+            )
         except Exception as e:
             logger.warning(
                 f"Failed resolving query for document {self.id} with input: corpus_id={corpus_id}, "
@@ -235,7 +265,7 @@ class DocumentType(AnnotatePermissionsForReadMixin, DjangoObjectType):
     def resolve_all_relationships(self, info, corpus_id, analysis_id=None):
         try:
             corpus_pk = from_global_id(corpus_id)[1]
-            relationships = self.relationships.filter(corpus_id=corpus_pk)
+            relationships = Relationship.objects.filter(corpus_id=corpus_pk)
 
             if analysis_id == "__none__":
                 relationships = relationships.filter(analysis__isnull=True)
@@ -243,7 +273,13 @@ class DocumentType(AnnotatePermissionsForReadMixin, DjangoObjectType):
                 analysis_pk = from_global_id(analysis_id)[1]
                 relationships = relationships.filter(analysis_id=analysis_pk)
 
-            return relationships.distinct()
+            return load_related_list(
+                info,
+                self,
+                "relationship_set",
+                queryset=relationships,
+                key=f"{corpus_pk}_{analysis_id}",
+            )
         except Exception as e:
             logger.warning(
                 f"Failed resolving relationships query for document {self.id} with input: corpus_id={corpus_id}, "
@@ -305,9 +341,14 @@ class CorpusType(AnnotatePermissionsForReadMixin, DjangoObjectType):
     applied_analyzer_ids = graphene.List(graphene.String)
 
     def resolve_applied_analyzer_ids(self, info):
-        return list(
-            self.analyses.all().values_list("analyzer_id", flat=True).distinct()
+        analyses = load_related_list(
+            info,
+            self,
+            "analyses",
+            queryset=Analysis.objects.only("id", "analyzer_id", "analyzed_corpus_id"),
+            key="analyzer_ids",
         )
+        return list(dict.fromkeys(analysis.analyzer_id for analysis in analyses))
 
     def resolve_icon(self, info):
         return "" if not self.icon else info.context.build_absolute_uri(self.icon.url)
@@ -375,7 +416,7 @@ class AnalyzerType(AnnotatePermissionsForReadMixin, DjangoObjectType):
     full_label_list = graphene.List(AnnotationLabelType)
 
     def resolve_full_label_list(self, info):
-        return self.annotation_labels.all()
+        return load_related_list(info, self, "annotation_labels")
 
     def resolve_icon(self, info):
         return "" if not self.icon else info.context.build_absolute_uri(self.icon.url)
@@ -405,7 +446,7 @@ class AnalysisType(AnnotatePermissionsForReadMixin, DjangoObjectType):
     full_annotation_list = graphene.List(AnnotationType)
 
     def resolve_full_annotation_list(self, info):
-        return self.annotations.all()
+        return load_related_list(info, self, "annotations")
 
     class Meta:
         model = Analysis
@@ -429,7 +470,7 @@ class FieldsetType(AnnotatePermissionsForReadMixin, DjangoObjectType):
         connection_class = CountableConnection
 
     def resolve_full_column_list(self, info):
-        return self.columns.all()
+        return load_related_list(info, self, "columns")
 
 
 class DatacellType(AnnotatePermissionsForReadMixin, DjangoObjectType):
@@ -437,7 +478,7 @@ class DatacellType(AnnotatePermissionsForReadMixin, DjangoObjectType):
     full_source_list = graphene.List(AnnotationType)
 
     def resolve_full_source_list(self, info):
-        return self.sources.all()
+        return load_related_list(info, self, "sources")
 
     class Meta:
         model = Datacell
@@ -455,17 +496,17 @@ class ExtractType(AnnotatePermissionsForReadMixin, DjangoObjectType):
         connection_class = CountableConnection
 
     def resolve_full_datacell_list(self, info):
-        return self.extracted_datacells.all()
+        return load_related_list(info, self, "extracted_datacells")
 
     def resolve_full_document_list(self, info):
-        return self.documents.all()
+        return load_related_list(info, self, "documents")
 
 
 class CorpusQueryType(AnnotatePermissionsForReadMixin, DjangoObjectType):
     full_source_list = graphene.List(AnnotationType)
 
     def resolve_full_source_list(self, info):
-        return self.sources.all()
+        return load_related_list(info, self, "sources")
 
     class Meta:
         model = CorpusQuery
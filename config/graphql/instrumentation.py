@@ -0,0 +1,77 @@
+import logging
+import time
+from collections import defaultdict
+from typing import Optional
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class ResolverQueryRecorder:
+    """
+    connection.execute_wrapper hook that counts and times the SQL run while a resolver executes
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.query_time += time.perf_counter() - start
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Records how many SQL queries each resolver runs and how long it takes, when settings.GRAPHQL_QUERY_INSTRUMENTATION
+    is on (or the middleware is created with enabled=True). Stats are totalled per "ParentType.field" in
+    info.context.resolver_query_stats, and resolvers that run queries are logged at debug level.
+
+    Only the queries a resolver runs itself are counted. Querysets it returns unevaluated are charged to whichever
+    resolver ends up evaluating them.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None):
+        self.enabled = enabled
+
+    def resolve(self, next, root, info, **kwargs):
+
+        enabled = (
+            self.enabled
+            if self.enabled is not None
+            else settings.GRAPHQL_QUERY_INSTRUMENTATION
+        )
+        if not enabled:
+            return next(root, info, **kwargs)
+
+        recorder = ResolverQueryRecorder()
+        start = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            result = next(root, info, **kwargs)
+        elapsed = time.perf_counter() - start
+
+        resolver_name = f"{info.parent_type.name}.{info.field_name}"
+
+        if not hasattr(info.context, "resolver_query_stats"):
+            info.context.resolver_query_stats = defaultdict(
+                lambda: {"calls": 0, "queries": 0, "query_time": 0.0, "time": 0.0}
+            )
+        stats = info.context.resolver_query_stats[resolver_name]
+        stats["calls"] += 1
+        stats["queries"] += recorder.queries
+        stats["query_time"] += recorder.query_time
+        stats["time"] += elapsed
+
+        if recorder.queries:
+            logger.debug(
+                f"{resolver_name} ({'.'.join(str(key) for key in info.path.as_list())}) - {recorder.queries} "
+                f"queries in {recorder.query_time * 1000:.1f}ms, {elapsed * 1000:.1f}ms total"
+            )
+
+        return result
@@ -77,6 +77,7 @@ from opencontractserver.types.dicts import OpenContractsAnnotatedDocumentImportT
 from opencontractserver.types.enums import ExportType, PermissionTypes
 from opencontractserver.users.models import UserExport
 from opencontractserver.utils.etl import is_dict_instance_of_typed_dict
+from opencontractserver.utils.parse_cache import calculate_bytes_hash
 from opencontractserver.utils.permissioning import (
     set_permissions_for_obj_to_user,
     user_has_permission_for_obj,
@@ -877,6 +878,7 @@ class UploadDocument(graphene.Mutation):
                 description=description,
                 custom_meta=custom_meta,
                 pdf_file=pdf_file,
+                pdf_file_hash=calculate_bytes_hash(file_bytes),
                 backend_lock=True,
                 is_public=make_public,
             )
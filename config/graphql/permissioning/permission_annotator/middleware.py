@@ -1,83 +1,26 @@
 import logging
-from functools import reduce
 
 from django.contrib.auth import get_user_model
 
+from config.graphql.permissioning.permission_annotator.permission_cache import (
+    RequestPermissionCache,
+    get_request_permission_cache,
+)
+
 logger = logging.getLogger(__name__)
 
 User = get_user_model()
 
 
-def combine(a, b):
-    c = {**a}
-    if isinstance(b, tuple):
-        c[b[0]] = b[1]
-    return c
-
-
 # Used to annotate nodes
 def get_permissions_for_user_on_model_in_app(
     app_name: str, model_name: str, user: type[User]
 ):
-    # logger.info(
-    #     f"get_permissions_for_user_on_model_in_app() - start for app_name {app_name} and model_name {model_name}")
-
-    from django.contrib.auth.models import Permission
-    from django.contrib.contenttypes.models import ContentType
-
-    this_model_permission_id_map = {}
-    this_user_group_ids = []
-    permissions_annotated_for_models = []
-    can_publish = False
-
-    try:
-
-        if user:
-
-            # logger.info(f"get_user_model_permissions_from_info_and_model - user exists.")
-
-            model_permissions = user.get_all_permissions()
-            # logger.info(f"get_user_model_permissions_from_info_and_model - model_permissions: {model_permissions}")
-
-            if f"{app_name}.publish_{model_name}" in model_permissions:
-                # logger.info("Can publish")
-                can_publish = True
-
-            model_type = ContentType.objects.get(app_label=app_name, model=model_name)
-
-            this_user_group_ids = list(user.groups.all().values_list("id", flat=True))
-            # logger.info(f"get_user_model_permissions_from_info_and_model() - "
-            #             f"this_user_group_ids: {this_user_group_ids}")
-
-            # perms_objs = Permission.objects.filter(content_type_id=model_type.id)
-            # logger.info(f"get_user_model_permissions_from_info_and_model - perms_objs: {perms_objs}")
-
-            this_model_permission_objs = list(
-                Permission.objects.filter(content_type_id=model_type.id).values_list(
-                    "id", "codename"
-                )
-            )
-            # logger.info(f"get_user_model_permissions_from_info_and_model - "
-            #             f"this_model_permission_objs: {this_model_permission_objs}")
-
-            this_model_permission_id_map = reduce(
-                combine, this_model_permission_objs, {}
-            )
-            # logger.info(f"get_user_model_permissions_from_info_and_model - "
-            #             f"this_model_permission_id_map: {this_model_permission_id_map}")
-
-    except Exception as e:
-        logger.error(
-            f"Error getting object-level permissions based on {user} and with "
-            f"app_name {app_name} and model_name {model_name}: {e}"
-        )
-
-    return {
-        "permissions_annotated_for_models": permissions_annotated_for_models,
-        "this_user_group_ids": this_user_group_ids,
-        "this_model_permission_id_map": this_model_permission_id_map,
-        "can_publish": can_publish,
-    }
+    """
+    Model-level permission annotations for user. Inside GraphQL resolvers, prefer the operation's
+    RequestPermissionCache (get_request_permission_cache), which only looks these up once per operation.
+    """
+    return RequestPermissionCache(user).model_permissions(app_name, model_name)
 
 
 class PermissionAnnotatingMiddleware:
@@ -126,6 +69,9 @@ class PermissionAnnotatingMiddleware:
                 full_name = f"{app_name}.{model_name}"
                 # logger.info(f"PermissionAnnotatingMiddleware - full model name: {full_name}")
 
+                model_permissions = get_request_permission_cache(
+                    info
+                ).model_permissions(app_name, model_name)
                 if hasattr(info.context, "permission_annotations"):
                     # logger.info(
                     #     f"PermissionAnnotatingMiddleware - info.context has permission_annotations:
@@ -135,18 +81,21 @@ class PermissionAnnotatingMiddleware:
                     else:
                         info.context.permission_annotations[
                             full_name
-                        ] = get_permissions_for_user_on_model_in_app(
-                            app_name, model_name, info.context.user
-                        )
+                        ] = model_permissions
                 else:
-                    info.context.permission_annotations = {
-                        full_name: get_permissions_for_user_on_model_in_app(
-                            app_name, model_name, info.context.user
-                        )
-                    }
+                    info.context.permission_annotations = {full_name: model_permissions}
                 # logger.info(f"Context permission_annotations: {info.context.permission_annotations}")
 
         except Exception as e:
             logger.warning(f"Unable to annotate with permissions due to error: {e}")
 
-        return next(root, info, **kwargs)
+        result = next(root, info, **kwargs)
+
+        # Let the operation's permission cache know which objects it'll be asked about, so it can load their
+        # permissions together. (Lists of models aren't always typed as a model type, so check every result.)
+        try:
+            get_request_permission_cache(info).register(result)
+        except Exception as e:
+            logger.warning(f"Unable to register objects for permissions: {e}")
+
+        return result
@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from functools import cached_property, lru_cache
+
+import django.db.models
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_migrate
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+@lru_cache(maxsize=None)
+def get_model_permission_id_map(app_label: str, model_name: str) -> dict[int, str]:
+    """
+    Map of permission id to codename for every permission on a model. These only change when migrations run, so
+    they're looked up once per process (and dropped whenever migrations / test database flushes recreate them).
+    """
+
+    from django.contrib.auth.models import Permission
+    from django.contrib.contenttypes.models import ContentType
+
+    model_type = ContentType.objects.get_by_natural_key(app_label, model_name)
+    return dict(
+        Permission.objects.filter(content_type_id=model_type.id).values_list(
+            "id", "codename"
+        )
+    )
+
+
+def _clear_model_permission_id_maps(**kwargs):
+    get_model_permission_id_map.cache_clear()
+
+
+post_migrate.connect(
+    _clear_model_permission_id_maps,
+    dispatch_uid="clear_model_permission_id_maps",
+)
+
+
+class RequestPermissionCache:
+    """
+    Everything the GraphQL permission annotations need to know about one user's permissions, loaded once per
+    executed operation rather than once per resolved field.
+
+    PermissionAnnotatingMiddleware registers every model instance that resolvers return. The first time an object's
+    permissions (or who it's shared with) are asked for, the rows for ALL registered objects of that model are loaded
+    in one query, so a list of N objects costs one query instead of N.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._model_permissions: dict[str, dict] = {}
+        self._registered_ids: dict[type, set] = defaultdict(set)
+        self._registered_instances: dict[type, list] = defaultdict(list)
+        self._registered_objects: set[int] = set()
+        self._object_permissions: dict[type, dict[int, set[str]]] = defaultdict(dict)
+        self._shared_with: dict[type, dict[int, list[dict]]] = defaultdict(dict)
+
+    @cached_property
+    def is_anonymous(self) -> bool:
+        return self.user.id == User.get_anonymous().id
+
+    @cached_property
+    def user_permissions(self) -> set[str]:
+        return self.user.get_all_permissions()
+
+    @cached_property
+    def group_ids(self) -> list[int]:
+        return list(self.user.groups.all().values_list("id", flat=True))
+
+    def model_permissions(self, app_label: str, model_name: str) -> dict:
+        """
+        The model-level permission annotations for app_label.model_name (see get_permissions_for_user_on_model_in_app)
+        """
+
+        full_name = f"{app_label}.{model_name}"
+        if full_name not in self._model_permissions:
+
+            model_permissions = {
+                "permissions_annotated_for_models": [],
+                "this_user_group_ids": [],
+                "this_model_permission_id_map": {},
+                "can_publish": False,
+            }
+
+            try:
+                if self.user:
+                    model_permissions["can_publish"] = (
+                        f"{app_label}.publish_{model_name}" in self.user_permissions
+                    )
+                    model_permissions["this_user_group_ids"] = self.group_ids
+                    model_permissions[
+                        "this_model_permission_id_map"
+                    ] = get_model_permission_id_map(app_label, model_name)
+            except Exception as e:
+                logger.error(
+                    f"Error getting object-level permissions based on {self.user} and with "
+                    f"app_name {app_label} and model_name {model_name}: {e}"
+                )
+
+            self._model_permissions[full_name] = model_permissions
+
+        return self._model_permissions[full_name]
+
+    def register(self, value):
+        """
+        Note any model instances in a resolver's return value (an instance, a list / queryset of them or a relay
+        connection) so their permissions are loaded with the first of their type that's asked for.
+        """
+
+        if isinstance(value, django.db.models.Model):
+            instances = [value]
+        elif isinstance(value, (list, tuple)):
+            # Lists of scalars / dicts (e.g. JSON fields) can be long - only look through lists of models
+            if not value or not isinstance(value[0], django.db.models.Model):
+                return
+            instances = value
+        elif isinstance(value, django.db.models.QuerySet):
+            # GraphQL is about to iterate this same queryset, so evaluating it here doesn't cost an extra query
+            instances = list(value)
+        elif hasattr(value, "edges") and isinstance(value.edges, list):
+            instances = [getattr(edge, "node", None) for edge in value.edges]
+        else:
+            return
+
+        for instance in instances:
+            if (
+                isinstance(instance, django.db.models.Model)
+                and instance.pk is not None
+                # The dataloaders register what they load ahead of the resolvers returning it
+                and id(instance) not in self._registered_objects
+            ):
+                self._registered_objects.add(id(instance))
+                self._registered_ids[type(instance)].add(instance.pk)
+                self._registered_instances[type(instance)].append(instance)
+
+                # Objects nested through foreign keys (e.g. each annotation's label) are resolved one at a time, so
+                # note them now too. Their ids are already on the instance - this doesn't query anything.
+                for field in instance._meta.concrete_fields:
+                    if field.many_to_one:
+                        related_id = getattr(instance, field.attname)
+                        if related_id is not None:
+                            self._registered_ids[field.related_model].add(related_id)
+
+    def registered_instances(
+        self, model: type[django.db.models.Model]
+    ) -> list[django.db.models.Model]:
+        """
+        Every instance of model resolvers have returned so far in this operation (see config.graphql.dataloaders)
+        """
+        return self._registered_instances[model]
+
+    def _ids_to_load(self, instance: django.db.models.Model, loaded: dict) -> set:
+        return (self._registered_ids[type(instance)] | {instance.pk}) - loaded.keys()
+
+    @staticmethod
+    def _object_permission_model(
+        model: type[django.db.models.Model], kind: str
+    ) -> type[django.db.models.Model] | None:
+        related = getattr(
+            model, f"{model._meta.model_name}{kind}objectpermission_set", None
+        )
+        return related.rel.related_model if related is not None else None
+
+    def object_permissions(self, instance: django.db.models.Model) -> set[str]:
+        """
+        Codenames of the permissions the user holds on instance directly or through their groups
+        """
+
+        model = type(instance)
+        loaded = self._object_permissions[model]
+
+        if instance.pk not in loaded:
+
+            ids = self._ids_to_load(instance, loaded)
+            for pk in ids:
+                loaded[pk] = set()
+
+            permission_id_map = get_model_permission_id_map(
+                model._meta.app_label, model._meta.model_name
+            )
+            permission_rows = []
+
+            user_permission_model = self._object_permission_model(model, "user")
+            if user_permission_model is not None and self.user.id is not None:
+                permission_rows += list(
+                    user_permission_model.objects.filter(
+                        content_object_id__in=ids, user_id=self.user.id
+                    ).values_list("content_object_id", "permission_id")
+                )
+
+            group_permission_model = self._object_permission_model(model, "group")
+            if group_permission_model is not None and self.group_ids:
+                permission_rows += list(
+                    group_permission_model.objects.filter(
+                        content_object_id__in=ids, group_id__in=self.group_ids
+                    ).values_list("content_object_id", "permission_id")
+                )
+
+            for object_id, permission_id in permission_rows:
+                if permission_id in permission_id_map:
+                    loaded[object_id].add(permission_id_map[permission_id])
+                else:
+                    logger.warning(
+                        f"RequestPermissionCache.object_permissions() - unknown permission id {permission_id} "
+                        f"for {model._meta.label} {object_id}"
+                    )
+
+        return loaded[instance.pk]
+
+    def shared_with(self, instance: django.db.models.Model) -> list[dict]:
+        """
+        Every user instance has been shared with directly and the permissions each of them holds on it
+        """
+
+        model = type(instance)
+        loaded = self._shared_with[model]
+
+        if instance.pk not in loaded:
+
+            ids = self._ids_to_load(instance, loaded)
+            shares: dict[int, dict[int, dict]] = {pk: {} for pk in ids}
+            permission_id_map = get_model_permission_id_map(
+                model._meta.app_label, model._meta.model_name
+            )
+
+            user_permission_model = self._object_permission_model(model, "user")
+            if user_permission_model is not None:
+                for (object_id, user_id, email, username, permission_id,) in (
+                    user_permission_model.objects.filter(content_object_id__in=ids)
+                    .order_by("content_object_id", "id")
+                    .values_list(
+                        "content_object_id",
+                        "user_id",
+                        "user__email",
+                        "user__username",
+                        "permission_id",
+                    )
+                ):
+                    share = shares[object_id].setdefault(
+                        user_id,
+                        {
+                            "id": user_id,
+                            "email": email,
+                            "username": username,
+                            "permissions": [],
+                        },
+                    )
+                    codename = permission_id_map.get(permission_id)
+                    if codename is not None and codename not in share["permissions"]:
+                        share["permissions"].append(codename)
+
+            for pk, object_shares in shares.items():
+                loaded[pk] = list(object_shares.values())
+
+        return loaded[instance.pk]
+
+
+def get_request_permission_cache(info) -> RequestPermissionCache:
+    """
+    The RequestPermissionCache for the operation info belongs to, created on first use. It's tied to the operation
+    rather than just the context because a context object can be reused for several operations (as the test clients
+    do), and permissions may have changed in between.
+    """
+
+    context = info.context
+    permission_cache = getattr(context, "permission_cache", None)
+
+    if permission_cache is None or permission_cache[0] is not info.operation:
+        permission_cache = (info.operation, RequestPermissionCache(context.user))
+        context.permission_cache = permission_cache
+
+    return permission_cache[1]
@@ -7,12 +7,14 @@ from django.conf import settings
 from django.db.models import Q
 from graphene import relay
 from graphene.types.generic import GenericScalar
-from graphene_django.fields import DjangoConnectionField
-from graphene_django.filter import DjangoFilterConnectionField
 from graphql_jwt.decorators import login_required
 from graphql_relay import from_global_id
 
-from config.graphql.base import OpenContractsNode
+from config.graphql.base import (
+    CountingConnectionField,
+    CountingFilterConnectionField,
+    OpenContractsNode,
+)
 from config.graphql.filters import (
     AnalysisFilter,
     AnalyzerFilter,
@@ -60,6 +62,7 @@ from opencontractserver.annotations.models import (
     LabelSet,
     Relationship,
 )
+from opencontractserver.annotations.page_cache import get_page_annotations
 from opencontractserver.corpuses.models import Corpus, CorpusAction, CorpusQuery
 from opencontractserver.documents.models import Document
 from opencontractserver.extracts.models import Column, Datacell, Extract, Fieldset
@@ -74,7 +77,7 @@ logger = logging.getLogger(__name__)
 class Query(graphene.ObjectType):
 
     # ANNOTATION RESOLVERS #####################################
-    annotations = DjangoConnectionField(
+    annotations = CountingConnectionField(
         AnnotationType,
         raw_text_contains=graphene.String(),
         annotation_label_id=graphene.ID(),
@@ -102,7 +105,6 @@ class Query(graphene.ObjectType):
         elif info.context.user.is_anonymous:
             logger.info("User is anonymous, returning public annotations")
             queryset = Annotation.objects.filter(Q(is_public=True))
-            logger.info(f"{queryset.count()} public annotations...")
         else:
             logger.info(
                 "User is authenticated, returning user's and public annotations"
@@ -199,9 +201,6 @@ class Query(graphene.ObjectType):
             )
 
         # Filter by annotation_label__label_type
-        logger.info(
-            f"Queryset county before filtering by annotation_label__label_type: {queryset.count()}"
-        )
         label_type = kwargs.get("annotation_label__label_type")
         if label_type:
             logger.info(f"Filtering by annotation_label__label_type: {label_type}")
@@ -210,7 +209,7 @@ class Query(graphene.ObjectType):
         logger.info(f"QFilter value for analysis_isnull: {analysis_isnull}")
         # Filter by analysis
         if analysis_isnull is not None:
-            logger.info(f"Filtering by analysis_isnull: {queryset.count()}")
+            logger.info(f"Filtering by analysis_isnull: {analysis_isnull}")
             queryset = queryset.filter(analysis__isnull=analysis_isnull)
 
         # Filter by document_id
@@ -221,13 +220,11 @@ class Query(graphene.ObjectType):
             queryset = queryset.filter(document_id=django_pk)
 
         # Filter by corpus_id
-        logger.info(f"{queryset.count()} annotations pre corpus_id filter...")
         corpus_id = kwargs.get("corpus_id")
         if corpus_id:
             django_pk = from_global_id(corpus_id)[1]
             logger.info(f"Filtering by corpus_id: {django_pk}")
             queryset = queryset.filter(corpus_id=django_pk)
-            logger.info(f"{queryset.count()} annotations post corpus_id filter...")
 
         # Filter by structural
         if structural is not None:
@@ -243,8 +240,7 @@ class Query(graphene.ObjectType):
             logger.info("Ordering by default: -modified")
             queryset = queryset.order_by("-modified")
 
-        logger.info(f"Final queryset: {queryset}")
-
+        # NOTE - don't log the queryset (or its count) here. Either one runs the query, on every call.
         return queryset
 
     label_type_enum = graphene.Enum.from_enum(LabelType)
@@ -334,7 +330,7 @@ class Query(graphene.ObjectType):
             doc_pk = from_global_id(document_id)[1]
             q_objects.add(Q(document_id=doc_pk), Q.AND)
 
-        logger.info(f"Filter queryset {queryset} bulk annotations: {q_objects}")
+        logger.info(f"resolve_bulk_doc_annotations - filter: {q_objects}")
 
         return queryset.filter(q_objects).order_by("created", "page")
 
@@ -353,26 +349,15 @@ class Query(graphene.ObjectType):
 
         doc_django_pk = from_global_id(document_id)[1]
 
-        document = Document.objects.get(id=doc_django_pk)
-
-        # Get the base queryset first (only stuff given user CAN see)
-        if info.context.user.is_superuser:
-            queryset = Annotation.objects.all().order_by("page")
-        elif info.context.user.is_anonymous:
-            queryset = Annotation.objects.filter(Q(is_public=True))
-        else:
-            queryset = Annotation.objects.filter(
-                Q(creator=info.context.user) | Q(is_public=True)
-            )
-
-        # Now build query to stuff they want to see
-        q_objects = Q(document_id=doc_django_pk)
-        if corpus_id is not None:
-            q_objects.add(Q(corpus_id=from_global_id(corpus_id)[1]), Q.AND)
+        # Only the page count is needed - don't pull the whole document row
+        page_count = Document.objects.values_list("page_count", flat=True).get(
+            id=doc_django_pk
+        )
 
         # If for_analysis_ids is passed in, only show annotations from those analyses, otherwise only show human
         # annotations.
         for_analysis_ids = kwargs.get("for_analysis_ids", None)
+        analysis_pks = None
         if for_analysis_ids is not None:
             logger.info(
                 f"resolve_page_annotations - for_analysis_ids is not none and split ids:"
@@ -387,20 +372,14 @@ class Query(graphene.ObjectType):
             logger.info(
                 f"resolve_page_annotations - for_analysis_ids is not none and Analysis pks: {analysis_pks}"
             )
-            q_objects.add(Q(analysis_id__in=analysis_pks), Q.AND)
         else:
             logger.info("resolve_page_annotations - for_analysis_ids is None")
-            q_objects.add(Q(analysis__isnull=True), Q.AND)
 
         label_type = kwargs.get("label_type", None)
         if label_type is not None:
             logger.info(
                 f"resolve_page_annotations - label_type is not none: {label_type}"
             )
-            q_objects.add(Q(annotation_label__label_type=label_type), Q.AND)
-
-        # Get total page count before filtering by page.
-        all_pages_annotations = queryset.filter(q_objects).order_by("page")
 
         # Now filter down to page we want to view / request values for
         page_containing_annotation_with_id = kwargs.get(
@@ -412,13 +391,12 @@ class Query(graphene.ObjectType):
                 f"resolve_page_annotations - current_page is not None: {page_containing_annotation_with_id}"
             )
             current_page = kwargs.get("current_page")  # 1 -indexed
-            logger.info(f"resolve_page_annotations- q_objects: {q_objects}")
         elif page_number_list is not None:
-            if re.search(r"((\d,{0,1})*)", page_number_list) is not None:
+            if re.fullmatch(r"\d+(,\d+)*", page_number_list) is not None:
                 logger.info(
                     f"resolve_page_annotations - page_number_list is not none: {page_number_list}"
                 )
-                pages = [eval(page) for page in page_number_list.split(",")]
+                pages = [int(page) for page in page_number_list.split(",")]
                 logger.info(f"resolve_page_annotations - pages is: {pages}")
                 current_page = pages[-1]
             else:
@@ -432,7 +410,8 @@ class Query(graphene.ObjectType):
             annotation_pk = int(from_global_id(page_containing_annotation_with_id)[1])
             logger.info(f"resolve_page_annotations - Annotation pk {annotation_pk}")
             current_page = (
-                Annotation.objects.get(id=annotation_pk).page + 1
+                Annotation.objects.values_list("page", flat=True).get(id=annotation_pk)
+                + 1
             )  # DB is 0-indexed, but make 1-indexed
             logger.info(
                 f"resolve_page_annotations - Current page: {current_page} ({type(current_page)})"
@@ -446,19 +425,36 @@ class Query(graphene.ObjectType):
         current_page = current_page - 1
 
         if page_number_list is not None:
-            page_annotations = all_pages_annotations.filter(
-                page__in=[page - 1 for page in pages]
-            ).order_by("page", "created")
+            requested_pages = sorted({page - 1 for page in pages})
         else:
-            page_annotations = all_pages_annotations.filter(page=current_page).order_by(
-                "page", "created"
-            )
-        logger.info(f"resolve_page_annotations - page annotations: {page_annotations}")
+            requested_pages = [current_page]
+
+        # Each page's annotations are cached for everyone (see annotations.page_cache), so narrow them down to the
+        # ones this user can see here rather than in the query
+        annotations_by_page = get_page_annotations(
+            doc_django_pk,
+            requested_pages,
+            corpus_id=from_global_id(corpus_id)[1] if corpus_id is not None else None,
+            analysis_ids=analysis_pks,
+            label_type=label_type,
+        )
+        user = info.context.user
+        page_annotations = [
+            annotation
+            for page in requested_pages
+            for annotation in annotations_by_page[page]
+            if user.is_superuser
+            or annotation.is_public
+            or (not user.is_anonymous and annotation.creator_id == user.id)
+        ]
+        logger.info(
+            f"resolve_page_annotations - {len(page_annotations)} page annotations"
+        )
 
         pdf_page_info = PdfPageInfoType(
-            page_count=document.page_count,
+            page_count=page_count,
             current_page=current_page,  # convert to DB 0-index
-            has_next_page=current_page < document.page_count - 1,
+            has_next_page=current_page < page_count - 1,
             has_previous_page=current_page > 0,
             corpus_id=corpus_id,
             document_id=document_id,
@@ -484,7 +480,7 @@ class Query(graphene.ObjectType):
             )
 
     # RELATIONSHIP RESOLVERS #####################################
-    relationships = DjangoFilterConnectionField(
+    relationships = CountingFilterConnectionField(
         RelationshipType, filterset_class=RelationshipFilter
     )
 
@@ -513,7 +509,7 @@ class Query(graphene.ObjectType):
 
     # LABEL RESOLVERS #####################################
 
-    annotation_labels = DjangoFilterConnectionField(
+    annotation_labels = CountingFilterConnectionField(
         AnnotationLabelType, filterset_class=LabelFilter
     )
 
@@ -542,7 +538,7 @@ class Query(graphene.ObjectType):
 
     # LABEL SET RESOLVERS #####################################
 
-    labelsets = DjangoFilterConnectionField(
+    labelsets = CountingFilterConnectionField(
         LabelSetType, filterset_class=LabelsetFilter
     )
 
@@ -570,7 +566,7 @@ class Query(graphene.ObjectType):
             )
 
     # CORPUS RESOLVERS #####################################
-    corpuses = DjangoFilterConnectionField(CorpusType, filterset_class=CorpusFilter)
+    corpuses = CountingFilterConnectionField(CorpusType, filterset_class=CorpusFilter)
 
     def resolve_corpuses(self, info, **kwargs):
         # if info.context.user.is_superuser:
@@ -589,7 +585,7 @@ class Query(graphene.ObjectType):
 
     # DOCUMENT RESOLVERS #####################################
 
-    documents = DjangoFilterConnectionField(
+    documents = CountingFilterConnectionField(
         DocumentType, filterset_class=DocumentFilter
     )
 
@@ -617,7 +613,7 @@ class Query(graphene.ObjectType):
             )
 
     # IMPORT RESOLVERS #####################################
-    userimports = DjangoConnectionField(UserImportType)
+    userimports = CountingConnectionField(UserImportType)
 
     @login_required
     def resolve_userimports(self, info, **kwargs):
@@ -638,7 +634,7 @@ class Query(graphene.ObjectType):
         )
 
     # EXPORT RESOLVERS #####################################
-    userexports = DjangoFilterConnectionField(
+    userexports = CountingFilterConnectionField(
         UserExportType, filterset_class=ExportFilter
     )
 
@@ -661,7 +657,7 @@ class Query(graphene.ObjectType):
         )
 
     # ASSIGNMENT RESOLVERS #####################################
-    assignments = DjangoFilterConnectionField(
+    assignments = CountingFilterConnectionField(
         AssignmentType, filterset_class=AssignmentFilter
     )
 
@@ -697,7 +693,7 @@ class Query(graphene.ObjectType):
                     Q(id=django_pk) & (Q(creator=info.context.user) | Q(is_public=True))
                 )
 
-        gremlin_engines = DjangoFilterConnectionField(
+        gremlin_engines = CountingFilterConnectionField(
             GremlinEngineType_READ, filterset_class=GremlinEngineFilter
         )
 
@@ -732,7 +728,7 @@ class Query(graphene.ObjectType):
                     Q(id=django_pk) & (Q(creator=info.context.user) | Q(is_public=True))
                 )
 
-        analyzers = DjangoFilterConnectionField(
+        analyzers = CountingFilterConnectionField(
             AnalyzerType, filterset_class=AnalyzerFilter
         )
 
@@ -760,7 +756,7 @@ class Query(graphene.ObjectType):
                     Q(id=django_pk) & (Q(creator=info.context.user) | Q(is_public=True))
                 )
 
-        analyses = DjangoFilterConnectionField(
+        analyses = CountingFilterConnectionField(
             AnalysisType, filterset_class=AnalysisFilter
         )
 
@@ -787,7 +783,7 @@ class Query(graphene.ObjectType):
                 Q(id=django_pk) & (Q(creator=info.context.user) | Q(is_public=True))
             )
 
-    fieldsets = DjangoFilterConnectionField(
+    fieldsets = CountingFilterConnectionField(
         FieldsetType, filterset_class=FieldsetFilter
     )
 
@@ -815,7 +811,7 @@ class Query(graphene.ObjectType):
                 & (Q(fieldset__creator=info.context.user) | Q(is_public=True))
             )
 
-    columns = DjangoFilterConnectionField(ColumnType, filterset_class=ColumnFilter)
+    columns = CountingFilterConnectionField(ColumnType, filterset_class=ColumnFilter)
 
     def resolve_columns(self, info, **kwargs):
         if info.context.user.is_superuser:
@@ -840,7 +836,7 @@ class Query(graphene.ObjectType):
                 Q(id=django_pk) & (Q(creator=info.context.user) | Q(is_public=True))
             )
 
-    extracts = DjangoFilterConnectionField(
+    extracts = CountingFilterConnectionField(
         ExtractType, filterset_class=ExtractFilter, max_limit=15
     )
 
@@ -868,7 +864,7 @@ class Query(graphene.ObjectType):
                 Q(id=django_pk) & (Q(creator=info.context.user) | Q(is_public=True))
             )
 
-    corpus_queries = DjangoFilterConnectionField(
+    corpus_queries = CountingFilterConnectionField(
         CorpusQueryType, filterset_class=CorpusQueryFilter
     )
 
@@ -897,7 +893,7 @@ class Query(graphene.ObjectType):
                 & (Q(extract__creator=info.context.user) | Q(is_public=True))
             )
 
-    datacells = DjangoFilterConnectionField(
+    datacells = CountingFilterConnectionField(
         DatacellType, filterset_class=DatacellFilter
     )
 
@@ -414,7 +414,8 @@ CELERY_RESULT_SERIALIZER = "json"
 # http://docs.celeryproject.org/en/latest/userguide/configuration.html#beat-scheduler
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
 CELERY_WORKER_MAX_MEMORY_PER_CHILD = 14240000  # 14 GB (thousands of kilobytes)
-CELERY_MAX_TASKS_PER_CHILD = 4
+# Models cached in the ModelRegistry live as long as the child process, so raising this means fewer reloads.
+CELERY_MAX_TASKS_PER_CHILD = env.int("CELERY_MAX_TASKS_PER_CHILD", default=4)
 CELERY_PREFETCH_MULTIPLIER = 1
 CELERY_RESULT_BACKEND_MAX_RETRIES = 10
 # django-rest-framework
@@ -442,9 +443,13 @@ GRAPHENE = {
         "config.graphql.permissioning.permission_annotator.middleware.PermissionAnnotatingMiddleware",
         "graphql_jwt.middleware.JSONWebTokenMiddleware",
         "config.graphql_api_key_auth.middleware.ApiKeyTokenMiddleware",
+        "config.graphql.instrumentation.QueryInstrumentationMiddleware",
     ],
 }
 
+# Log / record the SQL query count and time of every GraphQL resolver (config.graphql.instrumentation)
+GRAPHQL_QUERY_INSTRUMENTATION = env.bool("GRAPHQL_QUERY_INSTRUMENTATION", default=False)
+
 
 GRAPHQL_JWT = {
     "JWT_AUTH_HEADER_PREFIX": "Bearer",
@@ -472,10 +477,95 @@ NLM_INGEST_HOSTNAME = (
 )
 NLM_INGEST_API_KEY = None  # If the endpoint is secured with an API_KEY, specify it here, otherwise use None
 
+# PAWLS parser settings
+# -----------------------------------------------------------------------------
+PAWLS_REASSEMBLY_MAX_WORKERS = env.int(
+    "PAWLS_REASSEMBLY_MAX_WORKERS", default=8
+)  # How many page fragments to fetch concurrently when reassembling a parsed document
+PAWLS_PAGES_PER_CHUNK = env.int(
+    "PAWLS_PAGES_PER_CHUNK", default=4
+)  # How many pages of a pdf each OCR task processes
+PAWLS_SHARED_FILESYSTEM = env.bool(
+    "PAWLS_SHARED_FILESYSTEM", default=False
+)  # If True, workers read page ranges from one local copy of the pdf instead of per-chunk files
+PAWLS_DETECT_TEXT_LAYER = env.bool(
+    "PAWLS_DETECT_TEXT_LAYER", default=True
+)  # If True, only pages without an embedded text layer are sent to tesseract
+PAWLS_TEXT_LAYER_MIN_CHARS = (
+    10  # Pages with fewer embedded characters than this are treated as image-only
+)
+
 # Embeddings / Semantic Search
 EMBEDDINGS_MICROSERVICE_URL = "http://vector-embedder:8000"
 VECTOR_EMBEDDER_API_KEY = "abc123"
 
+# Annotation embeddings are coalesced and calculated in batches rather than one task per annotation.
+# Set EMBEDDINGS_BATCH_MODE to "in_process" to calculate them in the worker instead of the microservice.
+EMBEDDINGS_BATCH_MODE = env.str("EMBEDDINGS_BATCH_MODE", default="microservice")
+EMBEDDINGS_BATCH_SIZE = env.int("EMBEDDINGS_BATCH_SIZE", default=64)
+EMBEDDINGS_BATCH_MAX_WAIT_SECONDS = env.float(
+    "EMBEDDINGS_BATCH_MAX_WAIT_SECONDS", default=5.0
+)
+EMBEDDINGS_IN_PROCESS_MODEL = "multi-qa-MiniLM-L6-cos-v1"
+
+# Run all (non-agentic, default pipeline) columns of an extract for one document in a single task that shares
+# retrieval work across columns. EXTRACT_BATCH_MAX_CONCURRENT_LLM_CALLS bounds the parallel marvin calls per task.
+EXTRACT_BATCH_MODE = env.bool("EXTRACT_BATCH_MODE", default=False)
+EXTRACT_BATCH_MAX_CONCURRENT_LLM_CALLS = env.int(
+    "EXTRACT_BATCH_MAX_CONCURRENT_LLM_CALLS", default=8
+)
+
+# Corpus imports bulk insert documents (and their annotations) this many at a time, one transaction per batch.
+CORPUS_IMPORT_BATCH_SIZE = env.int("CORPUS_IMPORT_BATCH_SIZE", default=100)
+
+# Corpus forks bulk copy documents and annotations this many at a time, one transaction per batch. With
+# CORPUS_FORK_COPY_ON_WRITE, forked documents share the original's stored files instead of copying them.
+CORPUS_FORK_BATCH_SIZE = env.int("CORPUS_FORK_BATCH_SIZE", default=500)
+CORPUS_FORK_COPY_ON_WRITE = env.bool("CORPUS_FORK_COPY_ON_WRITE", default=True)
+
+# How long (seconds) a document's PawlsTokenIndex (opencontractserver.utils.pawls) stays cached for span to token
+# mapping. Entries are keyed on the stored PAWLS file, so a re-parsed document never gets a stale index.
+PAWLS_TOKEN_INDEX_CACHE_TIMEOUT = env.int(
+    "PAWLS_TOKEN_INDEX_CACHE_TIMEOUT", default=60 * 60 * 24
+)
+
+# Also store a compact binary copy of each document's PAWLS layer (Document.pawls_binary_file) that backend code can
+# read one page at a time. Existing documents can be converted with the convert_pawls_layers_to_binary task.
+PAWLS_BINARY_FORMAT = env.bool("PAWLS_BINARY_FORMAT", default=False)
+
+# How long (seconds) each page's annotations stay cached for the pageAnnotations query
+# (opencontractserver.annotations.page_cache). Entries are versioned, so edits are visible as soon as they commit.
+PAGE_ANNOTATIONS_CACHE_TIMEOUT = env.int(
+    "PAGE_ANNOTATIONS_CACHE_TIMEOUT", default=60 * 60
+)
+
+# GraphQL connection totals (opencontractserver.utils.counting.count_queryset). Forward pages (first / after) are
+# paginated without counting, so their totalCount is only counted when it's asked for. Counts can be cached per filter
+# signature for QUERYSET_COUNT_CACHE_TIMEOUT seconds (0 = always count) and, for results the planner estimates at
+# QUERYSET_APPROXIMATE_COUNT_THRESHOLD rows or more, served from Postgres statistics instead (unset = always exact).
+QUERYSET_COUNT_CACHE_TIMEOUT = env.int("QUERYSET_COUNT_CACHE_TIMEOUT", default=0)
+QUERYSET_APPROXIMATE_COUNT_THRESHOLD = env.int(
+    "QUERYSET_APPROXIMATE_COUNT_THRESHOLD", default=None
+)
+
+# Resolve which objects a user can see from the trigger-maintained users_objectvisibility table
+# (opencontractserver.users.models.ObjectVisibility) with a semi-join, rather than ORing creator, is_public and the
+# guardian permission tables together and de-duplicating with DISTINCT.
+OBJECT_VISIBILITY_TABLE = env.bool("OBJECT_VISIBILITY_TABLE", default=True)
+
+# ANN search tuning for the HNSW (ef_search) / IVFFlat (probes) embedding indexes. Leave unset to use pgvector's
+# defaults (ef_search=40, probes=1). Higher values trade latency for recall.
+VECTOR_SEARCH_EF_SEARCH = env.int("VECTOR_SEARCH_EF_SEARCH", default=None)
+VECTOR_SEARCH_PROBES = env.int("VECTOR_SEARCH_PROBES", default=None)
+
+# Process-wide ML model cache (opencontractserver.utils.model_registry). Least recently used models are evicted
+# once their estimated footprint exceeds the budget. MODEL_REGISTRY_WARMUP lists models (e.g.
+# "huggingface_embedder,reranker") to load when each Celery worker process starts.
+MODEL_REGISTRY_MEMORY_BUDGET_MB = env.int(
+    "MODEL_REGISTRY_MEMORY_BUDGET_MB", default=4096
+)
+MODEL_REGISTRY_WARMUP = env.list("MODEL_REGISTRY_WARMUP", default=[])
+
 # LLM SETTING
 OPENAI_API_KEY = env.str("OPENAI_API_KEY", default="")
 OPENAI_MODEL = env.str("OPENAI_MODEL", default="gpt-4o")
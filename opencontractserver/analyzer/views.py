@@ -1,7 +1,8 @@
-import json
 import logging
+import shutil
+import tempfile
 
-from django.core.files.base import ContentFile
+from django.core.files.base import File
 from django.db import transaction
 from django.utils import timezone
 from rest_framework import status
@@ -10,12 +11,12 @@ from rest_framework.views import APIView
 
 from opencontractserver.analyzer.models import Analysis
 from opencontractserver.tasks.analyzer_tasks import import_analysis
-from opencontractserver.types.dicts import OpenContractsGeneratedCorpusPythonType
 from opencontractserver.types.enums import JobStatus
-from opencontractserver.utils.etl import is_dict_instance_of_typed_dict
 
 logger = logging.getLogger(__name__)
 
+CALLBACK_READ_CHUNK_SIZE = 1024 * 1024
+
 
 class AnalysisCallbackView(APIView):
 
@@ -68,42 +69,49 @@ class AnalysisCallbackView(APIView):
                 )
             else:
 
-                received_json = json.loads(request.body.decode("utf-8"))
-                logger.info(f"Received json data from analysis {analysis_id}")
+                logger.info(f"Received results for analysis {analysis_id}")
+
+                # DRF gives us no stream at all for an empty body
+                if request.stream is None:
+                    with transaction.atomic():
+                        analysis.analysis_completed = timezone.now()
+                        analysis.status = JobStatus.FAILED
+                        analysis.save()
+
+                    return Response(
+                        {
+                            "message": "No analysis results received.",
+                            "analysis_id": f"{analysis_id}",
+                        },
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
 
-                if is_dict_instance_of_typed_dict(
-                    received_json, OpenContractsGeneratedCorpusPythonType
-                ):
+                # Spool the body to a temp file in chunks rather than reading it into memory (request.body), then
+                # store it. The import task reads, validates and imports the results from storage, so the payload
+                # never goes through the Celery message and the Gremlin engine isn't kept waiting on validation.
+                with tempfile.TemporaryFile() as received_results:
+                    shutil.copyfileobj(
+                        request.stream, received_results, CALLBACK_READ_CHUNK_SIZE
+                    )
+                    received_results.seek(0)
 
                     with transaction.atomic():
                         analysis.received_callback_file.save(
                             f"analysis_{analysis.id}_results.json",
-                            ContentFile(request.body),
+                            File(received_results),
                         )
                         analysis.analysis_completed = timezone.now()
                         analysis.status = JobStatus.COMPLETED
                         analysis.save()
 
-                    # logger.info("Launch async import task!")
-                    import_analysis.si(
+                transaction.on_commit(
+                    lambda: import_analysis.si(
                         creator_id=analysis.creator.id,
                         analysis_id=analysis.id,
-                        analysis_results=received_json,
                     ).apply_async()
+                )
 
-                else:
-
-                    with transaction.atomic():
-                        analysis.analysis_completed = timezone.now()
-                        analysis.status = JobStatus.FAILED
-                        analysis.save()
-
-                    return Response(
-                        {
-                            "message": "Received data is not of the proper format.",
-                            "analysis_id": f"{analysis_id}",
-                        },
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-
-        return Response({"status": "OK", "analysis_id": analysis_id})
+        return Response(
+            {"status": "ACCEPTED", "analysis_id": analysis_id},
+            status=status.HTTP_202_ACCEPTED,
+        )
@@ -1,7 +1,7 @@
 import uuid
 
 from django.apps import AppConfig
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.utils.translation import gettext_lazy as _
 
 
@@ -13,8 +13,13 @@ class AnnotationsConfig(AppConfig):
     def ready(self):
         try:
             import opencontractserver.annotations.signals  # noqa F401
-            from opencontractserver.annotations.models import Annotation
+            from opencontractserver.annotations.models import (
+                Annotation,
+                AnnotationLabel,
+            )
             from opencontractserver.annotations.signals import (
+                invalidate_page_annotation_labels_on_change,
+                invalidate_page_annotations_on_change,
                 process_annot_on_create_atomic,
             )
 
@@ -23,5 +28,21 @@ class AnnotationsConfig(AppConfig):
                 sender=Annotation,
                 dispatch_uid=uuid.uuid4(),
             )
+
+            # Keep the pageAnnotations cache (annotations.page_cache) in step with annotation and label edits
+            for signal_name, signal in (
+                ("post_save", post_save),
+                ("post_delete", post_delete),
+            ):
+                signal.connect(
+                    invalidate_page_annotations_on_change,
+                    sender=Annotation,
+                    dispatch_uid=f"invalidate_page_annotations_{signal_name}",
+                )
+                signal.connect(
+                    invalidate_page_annotation_labels_on_change,
+                    sender=AnnotationLabel,
+                    dispatch_uid=f"invalidate_page_annotation_labels_{signal_name}",
+                )
         except ImportError:
             pass
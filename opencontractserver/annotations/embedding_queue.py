@@ -0,0 +1,150 @@
+import logging
+import threading
+import time
+import weakref
+
+from celery import current_task
+from celery.signals import task_postrun
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class AnnotationEmbeddingQueue:
+    """
+    Coalesces annotation ids that need embeddings into batches so that creating thousands of
+    annotations (e.g. NLM structural annotations for a long contract) produces a handful of
+    batched embedding tasks instead of one Celery task and one HTTP round-trip per annotation.
+
+    Inside a transaction, ids are collected into batches owned by that transaction, and each batch is only sent
+    from a transaction.on_commit hook. The batch task therefore never runs before the annotations are visible to it,
+    and a rollback discards the hook together with the ids it would have sent. Filling a batch just closes it and
+    starts the next one.
+
+    Outside of a transaction, pending ids are held per-thread and sent to calculate_embeddings_for_annotation_batch
+    when:
+
+        1) batch_size ids are pending,
+        2) the oldest pending id has waited longer than max_wait seconds, or
+        3) the Celery task that created the annotations finishes.
+
+    Outside of a Celery task nothing else would flush the queue, so ids are sent immediately.
+    """
+
+    def __init__(self, batch_size: int | None = None, max_wait: float | None = None):
+        self.batch_size = (
+            batch_size if batch_size is not None else settings.EMBEDDINGS_BATCH_SIZE
+        )
+        self.max_wait = (
+            max_wait
+            if max_wait is not None
+            else settings.EMBEDDINGS_BATCH_MAX_WAIT_SECONDS
+        )
+        self._local = threading.local()
+
+    @property
+    def _pending(self) -> list[int]:
+        if not hasattr(self._local, "pending"):
+            self._local.pending = []
+            self._local.oldest = None
+        return self._local.pending
+
+    def enqueue(self, annotation_id: int | str):
+        self.enqueue_many([annotation_id])
+
+    def enqueue_many(self, annotation_ids: list[int | str]):
+
+        if not annotation_ids:
+            return
+
+        if connection.in_atomic_block:
+            self._enqueue_in_transaction(annotation_ids)
+            return
+
+        pending = self._pending
+        if not pending:
+            self._local.oldest = time.monotonic()
+        pending.extend(annotation_ids)
+
+        if len(pending) >= self.batch_size or (
+            time.monotonic() - self._local.oldest > self.max_wait
+        ):
+            self.flush()
+        elif not (current_task and current_task.request.id):
+            self.flush()
+
+    def _enqueue_in_transaction(self, annotation_ids: list[int | str]):
+
+        batch = self._open_transaction_batch()
+        for annotation_id in annotation_ids:
+            if len(batch) >= self.batch_size:
+                batch = self._start_transaction_batch()
+            batch.append(annotation_id)
+
+    def _open_transaction_batch(self) -> list:
+        """
+        The current transaction's unfilled batch. Only Django's list of commit hooks holds on to a batch's hook, and a
+        rollback (of the transaction or of the savepoint the hook was registered in) discards it, so a batch whose hook
+        has been garbage collected belongs to a transaction that was rolled back and a new one is started instead.
+        Committed batches clear themselves when their hook runs.
+        """
+
+        current = getattr(self._local, "transaction_batch", None)
+        if current is not None:
+            batch, hook_ref = current
+            if hook_ref() is not None and len(batch) < self.batch_size:
+                return batch
+
+        return self._start_transaction_batch()
+
+    def _start_transaction_batch(self) -> list:
+
+        batch = []
+
+        def send_batch():
+            current = getattr(self._local, "transaction_batch", None)
+            if current is not None and current[0] is batch:
+                self._local.transaction_batch = None
+            self._send(batch)
+
+        self._local.transaction_batch = (batch, weakref.ref(send_batch))
+        transaction.on_commit(send_batch)
+        return batch
+
+    def flush(self):
+
+        pending = self._pending
+        self._local.pending = []
+        self._local.oldest = None
+
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start : start + self.batch_size]
+            if connection.in_atomic_block:
+                transaction.on_commit(lambda batch=batch: self._send(batch))
+            else:
+                self._send(batch)
+
+    @staticmethod
+    def _send(batch: list[int | str]):
+
+        from opencontractserver.tasks.embeddings_task import (
+            calculate_embeddings_for_annotation_batch,
+        )
+
+        if not batch:
+            return
+
+        logger.info(
+            f"AnnotationEmbeddingQueue - queueing embeddings for {len(batch)} annotations"
+        )
+        calculate_embeddings_for_annotation_batch.si(annotation_ids=batch).apply_async()
+
+
+annotation_embedding_queue = AnnotationEmbeddingQueue()
+
+
+@task_postrun.connect(weak=False)
+def flush_annotation_embedding_queue(*args, **kwargs):
+    if annotation_embedding_queue._pending:
+        annotation_embedding_queue.flush()
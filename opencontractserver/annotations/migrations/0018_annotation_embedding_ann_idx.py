@@ -0,0 +1,53 @@
+# Generated by Django 4.2.16 on 2026-10-18 21:10
+
+import pgvector.django
+from django.db import migrations
+
+from opencontractserver.utils.vector_search import (
+    create_embedding_ann_index,
+    drop_embedding_ann_index,
+)
+
+INDEX_NAME = "annotation_embedding_ann_idx"
+
+
+def create_index(apps, schema_editor):
+    Annotation = apps.get_model("annotations", "Annotation")
+    create_embedding_ann_index(schema_editor, Annotation, INDEX_NAME)
+
+
+def drop_index(apps, schema_editor):
+    Annotation = apps.get_model("annotations", "Annotation")
+    drop_embedding_ann_index(schema_editor, Annotation, INDEX_NAME)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            "annotations",
+            "0017_remove_annotationlabel_only_install_one_label_of_given_name_for_each_analyzer_id_no_duplicates__and_",
+        ),
+    ]
+
+    operations = [
+        # The model state always records an HNSW index. What actually gets built depends on the installed pgvector
+        # version (IVFFlat for pgvector < 0.5.0).
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name="annotation",
+                    index=pgvector.django.HnswIndex(
+                        ef_construction=64,
+                        fields=["embedding"],
+                        m=16,
+                        name=INDEX_NAME,
+                        opclasses=["vector_cosine_ops"],
+                    ),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_index, reverse_code=drop_index),
+            ],
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.16 on 2026-10-18 21:40
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("annotations", "0018_annotation_embedding_ann_idx"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name="annotation",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                blank=True, editable=False, null=True
+            ),
+        ),
+        # Keep search_vector in sync with raw_text on every insert / update, including bulk_create.
+        migrations.RunSQL(
+            sql="""
+            CREATE TRIGGER annotation_search_vector_update
+            BEFORE INSERT OR UPDATE OF raw_text, search_vector ON annotations_annotation
+            FOR EACH ROW EXECUTE FUNCTION
+            tsvector_update_trigger(search_vector, 'pg_catalog.english', raw_text);
+
+            UPDATE annotations_annotation
+            SET search_vector = to_tsvector('pg_catalog.english', coalesce(raw_text, ''));
+            """,
+            reverse_sql="""
+            DROP TRIGGER IF EXISTS annotation_search_vector_update ON annotations_annotation;
+            """,
+        ),
+        migrations.AddIndex(
+            model_name="annotation",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="annotation_search_vector_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="annotation",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["raw_text"],
+                name="annotation_raw_text_trgm_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+    ]
@@ -2,10 +2,12 @@ import uuid
 
 import django
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from guardian.models import GroupObjectPermissionBase, UserObjectPermissionBase
-from pgvector.django import VectorField
+from pgvector.django import HnswIndex, VectorField
 
 from opencontractserver.shared.defaults import (
     empty_bounding_box,
@@ -15,6 +17,7 @@ from opencontractserver.shared.defaults import (
 from opencontractserver.shared.fields import NullableJSONField
 from opencontractserver.shared.Models import BaseOCModel
 from opencontractserver.shared.utils import calc_oc_file_path
+from opencontractserver.utils.vector_search import HNSW_EF_CONSTRUCTION, HNSW_M
 
 # TODO - can we use the Python enum in data_types.py to drive choices
 RELATIONSHIP_LABEL = "RELATIONSHIP_LABEL"
@@ -216,6 +219,10 @@ class RelationshipGroupObjectPermission(GroupObjectPermissionBase):
     # enabled = False
 
 
+# Text search configuration used for Annotation.search_vector (see migration 0019)
+ANNOTATION_SEARCH_CONFIG = "english"
+
+
 class Annotation(BaseOCModel):
     page = django.db.models.IntegerField(default=1, blank=False)
     raw_text = django.db.models.TextField(null=True, blank=True)
@@ -246,6 +253,10 @@ class Annotation(BaseOCModel):
     # Vector for vector search
     embedding = VectorField(dimensions=384, null=True)
 
+    # Full-text search vector for raw_text. Maintained by a database trigger (see migration 0019) so it's also
+    # populated for bulk_created annotations. Never set this from Python.
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
+
     # If this annotation was created as part of an analysis... track that.
     analysis = django.db.models.ForeignKey(
         "analyzer.Analysis",
@@ -296,6 +307,21 @@ class Annotation(BaseOCModel):
             django.db.models.Index(fields=["creator"]),
             django.db.models.Index(fields=["created"]),
             django.db.models.Index(fields=["modified"]),
+            GinIndex(fields=["search_vector"], name="annotation_search_vector_idx"),
+            # Trigram index so raw_text__icontains filters don't have to scan the whole table
+            GinIndex(
+                fields=["raw_text"],
+                name="annotation_raw_text_trgm_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+            # ANN index for vector search. The migration falls back to IVFFlat on pgvector < 0.5.0.
+            HnswIndex(
+                name="annotation_embedding_ann_idx",
+                fields=["embedding"],
+                m=HNSW_M,
+                ef_construction=HNSW_EF_CONSTRUCTION,
+                opclasses=["vector_cosine_ops"],
+            ),
         ]
 
 
@@ -0,0 +1,130 @@
+"""
+Cache of the annotations on each page of a document, as served to the document viewer by the pageAnnotations query.
+
+Entries hold every annotation on a (document, corpus, analyses, label type, page) regardless of who's asking, so
+callers still have to drop the ones the requesting user can't see. Keys include a version for the document and a
+version for annotation labels (whose text / color are cached with each annotation). Any change to a document's
+annotations, or to any label, moves to a new version once the change commits, so stale entries are simply never read
+again and age out of the cache.
+
+Saves and deletes of individual annotations / labels invalidate through signals. Code that bulk creates or updates
+annotations (bulk_create / QuerySet.update skip signals) must call invalidate_page_annotations itself.
+"""
+
+import hashlib
+import time
+from collections.abc import Iterable
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+PAGE_ANNOTATIONS_CACHE_KEY_PREFIX = "page_annotations"
+PAGE_ANNOTATIONS_LABELS_VERSION_KEY = f"{PAGE_ANNOTATIONS_CACHE_KEY_PREFIX}:labels"
+
+
+def _document_version_key(document_id: int | str) -> str:
+    return f"{PAGE_ANNOTATIONS_CACHE_KEY_PREFIX}:version:{document_id}"
+
+
+def _get_version(key: str) -> int:
+    version = cache.get(key)
+    if version is None:
+        # add() so concurrent first readers agree on the version
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_versions(keys: list[str]):
+    # A fresh, never before used version rather than an increment, so a version key that was evicted from the cache
+    # can't come back as a version that old entries were stored under
+    cache.set_many({key: time.time_ns() for key in keys}, timeout=None)
+
+
+def invalidate_page_annotations(document_ids: Iterable[int | str]):
+    """
+    Drop the cached page annotations of document_ids once the current transaction commits (immediately outside one).
+    """
+    keys = [_document_version_key(document_id) for document_id in set(document_ids)]
+    if keys:
+        transaction.on_commit(lambda: _bump_versions(keys))
+
+
+def invalidate_page_annotation_labels():
+    """
+    Drop every document's cached page annotations once the current transaction commits (after a label changed).
+    """
+    transaction.on_commit(lambda: _bump_versions([PAGE_ANNOTATIONS_LABELS_VERSION_KEY]))
+
+
+def get_page_annotations(
+    document_id: int | str,
+    pages: Iterable[int],
+    corpus_id: Optional[int | str] = None,
+    analysis_ids: Optional[list[int]] = None,
+    label_type: Optional[str] = None,
+) -> dict[int, list]:
+    """
+    Map each of pages (0-indexed) to the annotations on it, ordered by creation, reading through the cache. Pages that
+    aren't cached are loaded with one query between them. With analysis_ids None, only human (non-analysis)
+    annotations are included.
+
+    Annotations come with their annotation_label but without their embedding. They are NOT filtered by visibility.
+    """
+
+    from opencontractserver.annotations.models import Annotation
+
+    pages = sorted(set(pages))
+
+    analyses_key = (
+        "human"
+        if analysis_ids is None
+        else hashlib.sha256(
+            ",".join(str(pk) for pk in sorted(analysis_ids)).encode("utf-8")
+        ).hexdigest()
+    )
+    key_prefix = (
+        f"{PAGE_ANNOTATIONS_CACHE_KEY_PREFIX}:{document_id}:"
+        f"{_get_version(_document_version_key(document_id))}:"
+        f"{_get_version(PAGE_ANNOTATIONS_LABELS_VERSION_KEY)}:"
+        f"{corpus_id}:{analyses_key}:{label_type}"
+    )
+    page_keys = {page: f"{key_prefix}:{page}" for page in pages}
+
+    cached = cache.get_many(page_keys.values())
+    page_annotations = {
+        page: cached[key] for page, key in page_keys.items() if key in cached
+    }
+
+    missing_pages = [page for page in pages if page not in page_annotations]
+    if missing_pages:
+
+        queryset = Annotation.objects.filter(
+            document_id=document_id, page__in=missing_pages
+        )
+        if corpus_id is not None:
+            queryset = queryset.filter(corpus_id=corpus_id)
+        if analysis_ids is None:
+            queryset = queryset.filter(analysis__isnull=True)
+        else:
+            queryset = queryset.filter(analysis_id__in=analysis_ids)
+        if label_type is not None:
+            queryset = queryset.filter(annotation_label__label_type=label_type)
+
+        loaded = {page: [] for page in missing_pages}
+        for annotation in (
+            queryset.select_related("annotation_label")
+            .defer("embedding")
+            .order_by("page", "created")
+        ):
+            loaded[annotation.page].append(annotation)
+
+        cache.set_many(
+            {page_keys[page]: annotations for page, annotations in loaded.items()},
+            timeout=settings.PAGE_ANNOTATIONS_CACHE_TIMEOUT,
+        )
+        page_annotations.update(loaded)
+
+    return page_annotations
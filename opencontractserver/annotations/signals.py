@@ -1,13 +1,24 @@
-from opencontractserver.tasks.embeddings_task import (
-    calculate_embedding_for_annotation_text,
+from opencontractserver.annotations.embedding_queue import annotation_embedding_queue
+from opencontractserver.annotations.page_cache import (
+    invalidate_page_annotation_labels,
+    invalidate_page_annotations,
 )
 
 
 def process_annot_on_create_atomic(sender, instance, created, **kwargs):
 
     # When a new annotation is created *AND* no embeddings are present at creation,
-    # hit the embeddings microservice.
-    if created and not instance.embedding:
-        calculate_embedding_for_annotation_text.si(
-            annotation_id=instance.id
-        ).apply_async()
+    # queue it for a batched call to the embeddings microservice.
+    if created and instance.embedding is None:
+        annotation_embedding_queue.enqueue(instance.id)
+
+
+def invalidate_page_annotations_on_change(sender, instance, **kwargs):
+
+    # Any save or delete can change what's on one (or, if the page moved, two) of the document's pages
+    if instance.document_id is not None:
+        invalidate_page_annotations([instance.document_id])
+
+
+def invalidate_page_annotation_labels_on_change(sender, instance, **kwargs):
+    invalidate_page_annotation_labels()
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0008_documentanalysisrow_analysis_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="ocr_page_count",
+            field=models.IntegerField(blank=True, default=0),
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="text_layer_page_count",
+            field=models.IntegerField(blank=True, default=0),
+        ),
+    ]
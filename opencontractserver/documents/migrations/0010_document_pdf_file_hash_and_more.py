@@ -0,0 +1,24 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0009_document_text_layer_page_count_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="pdf_file_hash",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="document",
+            index=models.Index(
+                fields=["pdf_file_hash"], name="documents_d_pdf_fil_156416_idx"
+            ),
+        ),
+    ]
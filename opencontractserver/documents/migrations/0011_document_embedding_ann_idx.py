@@ -0,0 +1,50 @@
+# Generated by Django 4.2.16 on 2026-10-18 21:10
+
+import pgvector.django
+from django.db import migrations
+
+from opencontractserver.utils.vector_search import (
+    create_embedding_ann_index,
+    drop_embedding_ann_index,
+)
+
+INDEX_NAME = "document_embedding_ann_idx"
+
+
+def create_index(apps, schema_editor):
+    Document = apps.get_model("documents", "Document")
+    create_embedding_ann_index(schema_editor, Document, INDEX_NAME)
+
+
+def drop_index(apps, schema_editor):
+    Document = apps.get_model("documents", "Document")
+    drop_embedding_ann_index(schema_editor, Document, INDEX_NAME)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0010_document_pdf_file_hash_and_more"),
+    ]
+
+    operations = [
+        # The model state always records an HNSW index. What actually gets built depends on the installed pgvector
+        # version (IVFFlat for pgvector < 0.5.0).
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name="document",
+                    index=pgvector.django.HnswIndex(
+                        ef_construction=64,
+                        fields=["embedding"],
+                        m=16,
+                        name=INDEX_NAME,
+                        opclasses=["vector_cosine_ops"],
+                    ),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_index, reverse_code=drop_index),
+            ],
+        ),
+    ]
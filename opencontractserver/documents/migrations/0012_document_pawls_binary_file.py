@@ -0,0 +1,31 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:02
+
+import functools
+
+from django.db import migrations, models
+
+import opencontractserver.shared.utils
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0011_document_embedding_ann_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="pawls_binary_file",
+            field=models.FileField(
+                blank=True,
+                max_length=1024,
+                null=True,
+                upload_to=functools.partial(
+                    opencontractserver.shared.utils.calc_oc_file_path,
+                    *(),
+                    **{"sub_folder": "pawls_binary_files"}
+                ),
+            ),
+        ),
+    ]
@@ -3,12 +3,13 @@ import functools
 import django
 from django.core.exceptions import ValidationError
 from guardian.models import GroupObjectPermissionBase, UserObjectPermissionBase
-from pgvector.django import VectorField
+from pgvector.django import HnswIndex, VectorField
 
 from opencontractserver.shared.defaults import jsonfield_default_value
 from opencontractserver.shared.fields import NullableJSONField
 from opencontractserver.shared.Models import BaseOCModel
 from opencontractserver.shared.utils import calc_oc_file_path
+from opencontractserver.utils.vector_search import HNSW_EF_CONSTRUCTION, HNSW_M
 
 
 # Create your models here.
@@ -55,6 +56,21 @@ class Document(BaseOCModel):
         upload_to=functools.partial(calc_oc_file_path, sub_folder="pawls_layers_files"),
         null=True,
     )
+    # Optional compact binary copy of the PAWLS layer with per-page random access (see
+    # opencontractserver.utils.pawls). pawls_parse_file stays the source of truth the API serves.
+    pawls_binary_file = django.db.models.FileField(
+        max_length=1024,
+        blank=True,
+        upload_to=functools.partial(calc_oc_file_path, sub_folder="pawls_binary_files"),
+        null=True,
+    )
+
+    # sha256 of the pdf bytes. Lets us reuse parse artifacts when the same pdf is uploaded again.
+    pdf_file_hash = django.db.models.CharField(max_length=64, null=True, blank=True)
+
+    # How many pages had their PAWLS tokens read from an embedded text layer vs. how many had to be OCRed
+    text_layer_page_count = django.db.models.IntegerField(default=0, blank=True)
+    ocr_page_count = django.db.models.IntegerField(default=0, blank=True)
 
     # Vector for vector search
     embedding = VectorField(dimensions=384, null=True)
@@ -71,9 +87,18 @@ class Document(BaseOCModel):
         indexes = [
             django.db.models.Index(fields=["title"]),
             django.db.models.Index(fields=["page_count"]),
+            django.db.models.Index(fields=["pdf_file_hash"]),
             django.db.models.Index(fields=["creator"]),
             django.db.models.Index(fields=["created"]),
             django.db.models.Index(fields=["modified"]),
+            # ANN index for vector search. The migration falls back to IVFFlat on pgvector < 0.5.0.
+            HnswIndex(
+                name="document_embedding_ann_idx",
+                fields=["embedding"],
+                m=HNSW_M,
+                ef_construction=HNSW_EF_CONSTRUCTION,
+                opclasses=["vector_cosine_ops"],
+            ),
         ]
 
     def __str__(self):
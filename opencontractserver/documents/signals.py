@@ -1,3 +1,5 @@
+import logging
+
 from celery import chain
 from django.conf import settings
 from django.db import transaction
@@ -5,21 +7,66 @@ from django.db import transaction
 from opencontractserver.tasks.doc_tasks import (
     extract_thumbnail,
     nlm_ingest_pdf,
+    reuse_parse_artifacts,
     set_doc_lock_state,
     split_pdf_for_processing,
 )
 from opencontractserver.tasks.embeddings_task import calculate_embedding_for_doc_text
+from opencontractserver.utils.parse_cache import (
+    calculate_file_hash,
+    find_cached_parse_source,
+    record_parse_cache_hit,
+    record_parse_cache_miss,
+)
+
+logger = logging.getLogger(__name__)
 
 
 def process_doc_on_create_atomic(sender, instance, created, **kwargs):
 
+    if created and not instance.pdf_file_hash and instance.pdf_file:
+        instance.pdf_file_hash = calculate_file_hash(instance.pdf_file)
+        # Use update() so we don't fire post_save again
+        sender.objects.filter(id=instance.id).update(
+            pdf_file_hash=instance.pdf_file_hash
+        )
+
     # When a new document is created *AND* a pawls_parse_file is NOT present at creation,
     # run OCR and token extract. Sometimes a doc will be created with tokens preloaded,
     # such as when we do an import.
     if created and not instance.pawls_parse_file:
 
+        cached_source = find_cached_parse_source(instance)
+
+        # If we've already parsed these exact pdf bytes, reuse the artifacts rather than parsing again
+        if cached_source is not None:
+            record_parse_cache_hit()
+            logger.info(
+                f"process_doc_on_create_atomic() - parse cache hit for doc {instance.id} "
+                f"(source doc {cached_source.id})"
+            )
+            ingest_tasks = [
+                *(
+                    []
+                    if cached_source.icon
+                    else [extract_thumbnail.si(doc_id=instance.id)]
+                ),
+                reuse_parse_artifacts.si(
+                    doc_id=instance.id,
+                    source_doc_id=cached_source.id,
+                    user_id=instance.creator.id,
+                ),
+                *(
+                    [calculate_embedding_for_doc_text.si(doc_id=instance.id)]
+                    if instance.embedding is None and cached_source.embedding is None
+                    else []
+                ),
+                set_doc_lock_state.si(locked=False, doc_id=instance.id),
+            ]
+
         # USE NLM Ingestor if NLM_INGESTOR_ACTIVE is set to True
-        if settings.NLM_INGESTOR_ACTIVE:
+        elif settings.NLM_INGESTOR_ACTIVE:
+            record_parse_cache_miss()
             ingest_tasks = [
                 extract_thumbnail.s(doc_id=instance.id),
                 nlm_ingest_pdf.si(user_id=instance.creator.id, doc_id=instance.id),
@@ -32,6 +79,7 @@ def process_doc_on_create_atomic(sender, instance, created, **kwargs):
             ]
         # Otherwise fall back to PAWLs parser
         else:
+            record_parse_cache_miss()
             ingest_tasks = [
                 extract_thumbnail.s(doc_id=instance.id),
                 split_pdf_for_processing.si(
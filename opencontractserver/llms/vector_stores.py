@@ -2,7 +2,8 @@ import logging
 from typing import Any, Optional
 
 from asgiref.sync import sync_to_async
-from django.db import models
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
 from django.db.models import Q, QuerySet
 from llama_index.core.schema import BaseNode, TextNode
 from llama_index.core.vector_stores.types import (
@@ -14,10 +15,15 @@ from llama_index.core.vector_stores.types import (
 )
 from pgvector.django import CosineDistance
 
-from opencontractserver.annotations.models import Annotation
+from opencontractserver.annotations.models import ANNOTATION_SEARCH_CONFIG, Annotation
+from opencontractserver.corpuses.models import Corpus
+from opencontractserver.utils.vector_search import ann_search_settings
 
 _logger = logging.getLogger(__name__)
 
+# Standard reciprocal rank fusion constant. Dampens the influence of the very top ranks of any single list.
+RRF_K = 60
+
 
 class DjangoAnnotationVectorStore(BasePydanticVectorStore):
     """Django Annotation Vector Store.
@@ -27,6 +33,10 @@ class DjangoAnnotationVectorStore(BasePydanticVectorStore):
 
     Args:
         connection_string (str): The Django database connection string.
+        ef_search (int): hnsw.ef_search to use for vector queries (defaults to settings.VECTOR_SEARCH_EF_SEARCH).
+        probes (int): ivfflat.probes to use for vector queries (defaults to settings.VECTOR_SEARCH_PROBES).
+
+    Both can also be overridden per query by passing ef_search= / probes= to query().
 
     Example:
         >>> from opencontractserver.llms.vector_stores import DjangoAnnotationVectorStore
@@ -39,6 +49,8 @@ class DjangoAnnotationVectorStore(BasePydanticVectorStore):
     corpus_id: str | int | None
     document_id: str | int | None
     must_have_text: str | None
+    ef_search: int | None
+    probes: int | None
 
     def __init__(
         self,
@@ -52,6 +64,8 @@ class DjangoAnnotationVectorStore(BasePydanticVectorStore):
         perform_setup: bool = True,
         debug: bool = False,
         use_jsonb: bool = False,
+        ef_search: int | None = None,
+        probes: int | None = None,
     ):
 
         super().__init__(
@@ -65,6 +79,10 @@ class DjangoAnnotationVectorStore(BasePydanticVectorStore):
             perform_setup=perform_setup,
             debug=debug,
             use_jsonb=use_jsonb,
+            ef_search=ef_search
+            if ef_search is not None
+            else settings.VECTOR_SEARCH_EF_SEARCH,
+            probes=probes if probes is not None else settings.VECTOR_SEARCH_PROBES,
         )
 
     async def close(self) -> None:
@@ -87,6 +105,8 @@ class DjangoAnnotationVectorStore(BasePydanticVectorStore):
         perform_setup: bool = True,
         debug: bool = False,
         use_jsonb: bool = False,
+        ef_search: int | None = None,
+        probes: int | None = None,
     ) -> "DjangoAnnotationVectorStore":
         return cls(
             corpus_id=corpus_id,
@@ -99,6 +119,8 @@ class DjangoAnnotationVectorStore(BasePydanticVectorStore):
             perform_setup=perform_setup,
             debug=debug,
             use_jsonb=use_jsonb,
+            ef_search=ef_search,
+            probes=probes,
         )
 
     def _get_annotation_queryset(self) -> QuerySet:
@@ -106,16 +128,21 @@ class DjangoAnnotationVectorStore(BasePydanticVectorStore):
         # Need to do this this way because some annotations don't travel with the corpus but the document itself - e.g.
         # layout and structural annotations from the nlm parser.
 
+        # Corpus membership is checked with a subquery rather than a join so no duplicate rows are produced. That
+        # keeps DISTINCT out of the query, which would otherwise stop postgres from using the embedding ANN index.
         queryset = Annotation.objects.all()
         if self.corpus_id is not None:
+            corpus_document_ids = Corpus.documents.through.objects.filter(
+                corpus_id=self.corpus_id
+            ).values("document_id")
             queryset = queryset.filter(
-                Q(corpus_id=self.corpus_id) | Q(document__corpus=self.corpus_id)
+                Q(corpus_id=self.corpus_id) | Q(document_id__in=corpus_document_ids)
             )
         if self.document_id is not None:
             queryset = queryset.filter(document=self.document_id)
         if self.must_have_text is not None:
             queryset = queryset.filter(raw_text__icontains=self.must_have_text)
-        return queryset.distinct()
+        return queryset
 
     def _build_filter_query(self, filters: Optional[MetadataFilters]) -> QuerySet:
         """Build the filter query based on the provided metadata filters."""
@@ -190,10 +217,51 @@ class DjangoAnnotationVectorStore(BasePydanticVectorStore):
         """Don't want this to occur through LlamaIndex."""
         pass
 
+    def _vector_search_queryset(
+        self, queryset: QuerySet, query_embedding: list[float], top_k: int
+    ) -> QuerySet:
+        return (
+            queryset.filter(embedding__isnull=False)
+            .order_by(CosineDistance("embedding", query_embedding))
+            .annotate(similarity=CosineDistance("embedding", query_embedding))
+        )[:top_k]
+
+    def _text_search_queryset(
+        self, queryset: QuerySet, query_str: str, top_k: int
+    ) -> QuerySet:
+        # search_vector is maintained with the english config, so the query has to use the same one to match
+        search_query = SearchQuery(query_str, config=ANNOTATION_SEARCH_CONFIG)
+        return (
+            queryset.filter(search_vector=search_query)
+            .annotate(similarity=SearchRank("search_vector", search_query))
+            .order_by("-similarity")
+        )[:top_k]
+
+    @staticmethod
+    def _reciprocal_rank_fusion(
+        ranked_id_lists: list[list[int]], weights: list[float], k: int = RRF_K
+    ) -> list[tuple[int, float]]:
+        """
+        Fuse several independently ranked lists of ids. Each id scores sum(weight / (k + rank)) over the lists it
+        appears in, so neither the cosine distances nor the text ranks have to be on a comparable scale.
+        """
+        scores: dict[int, float] = {}
+        for ranked_ids, weight in zip(ranked_id_lists, weights):
+            for rank, annotation_id in enumerate(ranked_ids, start=1):
+                scores[annotation_id] = scores.get(annotation_id, 0.0) + weight / (
+                    k + rank
+                )
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
     def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
         """Query the vector store."""
         queryset = self._build_filter_query(query.filters)
 
+        ann_settings = {
+            "ef_search": kwargs.get("ef_search", self.ef_search),
+            "probes": kwargs.get("probes", self.probes),
+        }
+
         if query.mode == VectorStoreQueryMode.HYBRID:
             if query.query_str is None:
                 raise ValueError("query_str must be provided for hybrid search.")
@@ -203,11 +271,43 @@ class DjangoAnnotationVectorStore(BasePydanticVectorStore):
             else:
                 alpha = query.alpha
 
-            queryset = queryset.annotate(
-                similarity=alpha * CosineDistance("embeddings", query.query_embedding)
-                + (1 - alpha)
-                * models.functions.TrigramSimilarity("raw_text", query.query_str)
-            ).order_by("-similarity")[: query.hybrid_top_k]
+            # Take the top-k from the ANN index and from the full-text index independently, then fuse the two
+            # rankings, rather than scoring every row in the table against both.
+            top_k = query.hybrid_top_k or query.similarity_top_k
+            candidate_k = max(
+                top_k, query.similarity_top_k, query.sparse_top_k or top_k
+            )
+
+            with ann_search_settings(**ann_settings):
+                vector_ids = (
+                    list(
+                        self._vector_search_queryset(
+                            queryset, query.query_embedding, candidate_k
+                        ).values_list("id", flat=True)
+                    )
+                    if query.query_embedding is not None
+                    else []
+                )
+            text_ids = list(
+                self._text_search_queryset(
+                    queryset, query.query_str, candidate_k
+                ).values_list("id", flat=True)
+            )
+
+            fused = self._reciprocal_rank_fusion(
+                [vector_ids, text_ids], [alpha, 1 - alpha]
+            )[:top_k]
+
+            rows_by_id = Annotation.objects.select_related("annotation_label").in_bulk(
+                [annotation_id for annotation_id, _ in fused]
+            )
+            rows = []
+            for annotation_id, score in fused:
+                row = rows_by_id[annotation_id]
+                row.similarity = score
+                rows.append(row)
+
+            return self._db_rows_to_query_result(rows)
 
         elif query.mode in [
             VectorStoreQueryMode.SPARSE,
@@ -216,26 +316,17 @@ class DjangoAnnotationVectorStore(BasePydanticVectorStore):
             if query.query_str is None:
                 raise ValueError("query_str must be provided for text search.")
 
-            queryset = (
-                queryset.filter(raw_text__search=query.query_str)
-                .annotate(
-                    similarity=models.functions.TrigramSimilarity(
-                        "raw_text", query.query_str
-                    )
-                )
-                .order_by("-similarity")[: query.sparse_top_k]
+            queryset = self._text_search_queryset(
+                queryset, query.query_str, query.sparse_top_k or query.similarity_top_k
             )
 
         else:  # Default to vector search
-            queryset = (
-                queryset.order_by(
-                    CosineDistance("embedding", query.query_embedding)
-                ).annotate(
-                    similarity=CosineDistance("embedding", query.query_embedding)
-                )
-            )[: query.similarity_top_k]
+            queryset = self._vector_search_queryset(
+                queryset, query.query_embedding, query.similarity_top_k
+            )
 
-        rows = list(queryset)
+        with ann_search_settings(**ann_settings):
+            rows = list(queryset.select_related("annotation_label"))
         # print(f"Returned rows: {rows}")
 
         return self._db_rows_to_query_result(rows)
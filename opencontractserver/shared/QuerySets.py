@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import models
 
@@ -11,6 +12,46 @@ from tree_queries.query import TreeQuerySet
 User = get_user_model()
 
 
+def tracks_object_visibility(model: type[models.Model]) -> bool:
+    """
+    Whether model's visibility should be read from the ObjectVisibility table (see
+    opencontractserver.users.models) instead of being worked out from its own and its guardian permission tables.
+    """
+
+    from opencontractserver.users.models import (  # Import here to avoid circular imports
+        OBJECT_VISIBILITY_MODELS,
+    )
+
+    return (
+        settings.OBJECT_VISIBILITY_TABLE
+        and model._meta.label_lower in OBJECT_VISIBILITY_MODELS
+    )
+
+
+def visible_object_ids(
+    model: type[models.Model], user, include_permissions: bool = True
+) -> models.QuerySet:
+    """
+    Subquery of the ids of model's objects user (not anonymous) created or that are public, plus, with
+    include_permissions, those they hold the read permission on. Filter with pk__in so it runs as a semi-join, which
+    never repeats rows and so needs no DISTINCT.
+    """
+
+    from opencontractserver.users.models import (  # Import here to avoid circular imports
+        ObjectVisibility,
+    )
+
+    queryset = ObjectVisibility.objects.filter(
+        Q(user=user) | Q(user__isnull=True), object_type=model._meta.label_lower
+    )
+    if not include_permissions:
+        queryset = queryset.filter(
+            reason__in=[ObjectVisibility.Reason.CREATOR, ObjectVisibility.Reason.PUBLIC]
+        )
+
+    return queryset.values("object_id")
+
+
 class PermissionedTreeQuerySet(TreeQuerySet):
     def approved(self):
         return self.filter(approved=True)
@@ -40,7 +81,16 @@ class PermissionedTreeQuerySet(TreeQuerySet):
         if user.is_superuser:
             return self.all()
 
-        if user.is_anonymous:
+        if tracks_object_visibility(self.model):
+            if user.is_anonymous:
+                queryset = self.filter(is_public=True)
+            else:
+                queryset = self.filter(
+                    pk__in=visible_object_ids(
+                        self.model, user, include_permissions=False
+                    )
+                )
+        elif user.is_anonymous:
             queryset = self.filter(Q(is_public=True)).distinct()
         else:
             queryset = self.filter(Q(creator=user) | Q(is_public=True)).distinct()
@@ -100,6 +150,13 @@ class PermissionQuerySet(models.QuerySet):
         if user.is_superuser:
             return self.all()
 
+        if tracks_object_visibility(self.model):
+            if user.is_anonymous:
+                return self.filter(is_public=True)
+            return self.filter(
+                pk__in=visible_object_ids(self.model, user, include_permissions=False)
+            )
+
         # model = self.model
         # content_type = ContentType.objects.get_for_model(model)
         #
@@ -1,28 +1,69 @@
 import json
 import logging
+import time
 from functools import wraps
 
 from celery import shared_task
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import transaction
-from plasmapdf.models.PdfDataLayer import makePdfTranslationLayerFromPawlsTokens
 
 from opencontractserver.analyzer.models import Analysis
+from opencontractserver.annotations.embedding_queue import annotation_embedding_queue
 from opencontractserver.annotations.models import Annotation, AnnotationLabel
+from opencontractserver.annotations.page_cache import invalidate_page_annotations
 from opencontractserver.corpuses.models import Corpus
 from opencontractserver.documents.models import Document, DocumentAnalysisRow
 from opencontractserver.types.dicts import TextSpan
 from opencontractserver.types.enums import LabelType
 from opencontractserver.utils.etl import is_dict_instance_of_typed_dict
+from opencontractserver.utils.pawls import get_pawls_token_index
 
 # Timing constants for retry and backoff durations
 MAX_DELAY = 1800  # 30 minutes
 INITIAL_DELAY = 30  # 30 seconds
 DELAY_INCREMENT = 300  # 5 minutes
 
+ANNOTATION_BULK_CREATE_BATCH_SIZE = 1000
+
 logger = logging.getLogger(__name__)
 
 
+def _get_or_create_analyzer_labels(
+    label_texts: set[str], label_type: str, analysis: Analysis
+) -> dict[str, AnnotationLabel]:
+    """
+    Resolve each distinct label text to the analyzer's AnnotationLabel of label_type, creating any that don't exist
+    yet. Takes two queries however many labels (and spans using them) there are.
+    """
+
+    if not label_texts:
+        return {}
+
+    labels = {}
+    for label in AnnotationLabel.objects.filter(
+        text__in=label_texts,
+        label_type=label_type,
+        creator=analysis.creator,
+        analyzer=analysis.analyzer,
+    ).order_by("id"):
+        labels.setdefault(label.text, label)
+
+    new_labels = AnnotationLabel.objects.bulk_create(
+        [
+            AnnotationLabel(
+                text=text,
+                label_type=label_type,
+                creator=analysis.creator,
+                analyzer=analysis.analyzer,
+            )
+            for text in sorted(label_texts - labels.keys())
+        ]
+    )
+    labels.update({label.text: label for label in new_labels})
+
+    return labels
+
+
 def doc_analyzer_task(max_retries=None):
     def decorator(func):
         @shared_task(bind=True, max_retries=max_retries)
@@ -92,20 +133,17 @@ def doc_analyzer_task(max_retries=None):
                     else None
                 )
 
-                # Create PdfDataLayer
-                pdf_data_layer = makePdfTranslationLayerFromPawlsTokens(
-                    pdf_pawls_extract
-                )
-
                 # Call the wrapped function with the retrieved data
+                phase_start = time.perf_counter()
                 result = func(
                     pdf_text_extract=pdf_text_extract,
                     pdf_pawls_extract=pdf_pawls_extract,
                     *args,
                     **kwargs,
                 )
-
-                logger.info(f"Function result: {result}")
+                logger.info(
+                    f"Doc {doc_id} - analyzer function ran in {time.perf_counter() - phase_start:.2f}s"
+                )
 
                 if not isinstance(result, tuple) or len(result) != 4:
                     raise ValueError(
@@ -156,74 +194,95 @@ def doc_analyzer_task(max_retries=None):
                             "Third element of the tuple must be a list of dictionaries with 'data' key"
                         )
 
-                    resulting_annotations = []
+                    for span_label_pair in span_label_pairs:
+                        if not (
+                            isinstance(span_label_pair, tuple)
+                            and len(span_label_pair) == 2
+                            and is_dict_instance_of_typed_dict(
+                                span_label_pair[0], TextSpan
+                            )
+                            and isinstance(span_label_pair[1], str)
+                        ):
+                            raise ValueError(
+                                "Second element of the tuple must be a list of (TextSpan, str) tuples"
+                            )
+
+                    phase_start = time.perf_counter()
+                    annotation_kwargs = {
+                        "document": doc,
+                        "analysis": analysis,
+                        "creator": analysis.creator,
+                        **({"corpus_id": corpus_id} if corpus_id else {}),
+                    }
+
+                    # Convert (TextSpan, str) pairs to OpenContractsAnnotationPythonType. The token index is only
+                    # worth fetching (or building) if there are spans to translate.
+                    span_annotations_data = []
+                    if span_label_pairs:
+                        pawls_token_index = get_pawls_token_index(
+                            doc, pdf_pawls_extract
+                        )
+                        span_annotations_data = [
+                            pawls_token_index.create_opencontract_annotation_from_span(
+                                {"span": span, "annotation_label": label}
+                            )
+                            for span, label in span_label_pairs
+                        ]
+                    logger.info(
+                        f"Doc {doc_id} - translated {len(span_annotations_data)} spans in "
+                        f"{time.perf_counter() - phase_start:.2f}s"
+                    )
 
+                    phase_start = time.perf_counter()
                     with transaction.atomic():
-                        for span_label_pair in span_label_pairs:
 
-                            logger.debug(f"Look at span_label_pair: {span_label_pair}")
+                        span_labels = _get_or_create_analyzer_labels(
+                            {data["annotationLabel"] for data in span_annotations_data},
+                            LabelType.TOKEN_LABEL,
+                            analysis,
+                        )
+                        doc_labels = _get_or_create_analyzer_labels(
+                            set(doc_annotations), LabelType.DOC_TYPE_LABEL, analysis
+                        )
 
-                            if not (
-                                isinstance(span_label_pair, tuple)
-                                and len(span_label_pair) == 2
-                                and is_dict_instance_of_typed_dict(
-                                    span_label_pair[0], TextSpan
-                                )
-                                and isinstance(span_label_pair[1], str)
-                            ):
-                                raise ValueError(
-                                    "Second element of the tuple must be a list of (TextSpan, str) tuples"
+                        # Harder to filter these to ensure no duplicates...
+                        resulting_annotations = Annotation.objects.bulk_create(
+                            [
+                                Annotation(
+                                    annotation_label=span_labels[
+                                        annotation_data["annotationLabel"]
+                                    ],
+                                    page=annotation_data["page"],
+                                    raw_text=annotation_data["rawText"],
+                                    json=annotation_data["annotation_json"],
+                                    **annotation_kwargs,
                                 )
-
-                            # Convert (TextSpan, str) pairs to OpenContractsAnnotationPythonType
-                            logger.info(f"Create Annotation Linked to {corpus_id}")
-                            span, label = span_label_pair
-                            annotation_data = (
-                                pdf_data_layer.create_opencontract_annotation_from_span(
-                                    {"span": span, "annotation_label": label}
+                                for annotation_data in span_annotations_data
+                            ]
+                            + [
+                                Annotation(
+                                    annotation_label=doc_labels[doc_label],
+                                    page=1,
+                                    raw_text="",
+                                    json={},
+                                    **annotation_kwargs,
                                 )
-                            )
-                            label, _ = AnnotationLabel.objects.get_or_create(
-                                text=annotation_data["annotationLabel"],
-                                label_type=LabelType.TOKEN_LABEL,
-                                creator=analysis.creator,
-                                analyzer=analysis.analyzer,
-                            )
+                                for doc_label in doc_annotations
+                            ],
+                            batch_size=ANNOTATION_BULK_CREATE_BATCH_SIZE,
+                        )
 
-                            # Harder to filter these to ensure no duplicates...
-                            annot = Annotation(
-                                document=doc,
-                                analysis=analysis,
-                                annotation_label=label,
-                                page=annotation_data["page"],
-                                raw_text=annotation_data["rawText"],
-                                json=annotation_data["annotation_json"],
-                                creator=analysis.creator,
-                                **({"corpus_id": corpus_id} if corpus_id else {}),
-                            )
-                            annot.save()
-                            resulting_annotations.append(annot)
-
-                        for doc_label in doc_annotations:
-                            label, _ = AnnotationLabel.objects.get_or_create(
-                                text=doc_label,
-                                label_type=LabelType.DOC_TYPE_LABEL,
-                                creator=analysis.creator,
-                                analyzer=analysis.analyzer,
-                            )
+                        # bulk_create skips the post_save signal that would otherwise queue these for embeddings
+                        annotation_embedding_queue.enqueue_many(
+                            [annotation.id for annotation in resulting_annotations]
+                        )
+                        # ...and the one that would invalidate the doc's cached page annotations
+                        invalidate_page_annotations([doc_id])
 
-                            annot = Annotation(
-                                document=doc,
-                                analysis=analysis,
-                                annotation_label=label,
-                                page=1,
-                                raw_text="",
-                                json={},
-                                creator=analysis.creator,
-                                **({"corpus_id": corpus_id} if corpus_id else {}),
-                            )
-                            annot.save()
-                            resulting_annotations.append(annot)
+                    logger.info(
+                        f"Doc {doc_id} - created {len(resulting_annotations)} annotations in "
+                        f"{time.perf_counter() - phase_start:.2f}s"
+                    )
 
                     # Link resulting annotations
                     transaction.on_commit(
@@ -8,6 +8,10 @@ from django.db.models import Q, QuerySet
 from graphql_relay import from_global_id
 
 from opencontractserver.shared.Models import BaseOCModel
+from opencontractserver.shared.QuerySets import (
+    tracks_object_visibility,
+    visible_object_ids,
+)
 
 User = get_user_model()
 
@@ -31,6 +35,11 @@ def resolve_oc_model_queryset(
     # Otherwise, if user is anonymous, try easy query
     elif user.is_anonymous:
         queryset = django_obj_model_type.objects.filter(Q(is_public=True)).distinct()
+    # If the model's visibility is materialized, it's one semi-join against that
+    elif tracks_object_visibility(django_obj_model_type):
+        queryset = django_obj_model_type.objects.filter(
+            id__in=visible_object_ids(django_obj_model_type, user)
+        )
     # Finally, in all other cases, actually do the hard work
     else:
 
@@ -76,6 +85,10 @@ def resolve_single_oc_model_from_id(
         obj = model_type.objects.get(id=django_pk)
     elif user.is_anonymous:
         obj = model_type.objects.get(id=django_pk, is_public=True)
+    elif tracks_object_visibility(model_type):
+        obj = model_type.objects.filter(
+            id=django_pk, id__in=visible_object_ids(model_type, user)
+        ).first()
     else:
 
         permission_model_type = apps.get_model(
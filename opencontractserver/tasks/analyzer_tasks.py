@@ -29,8 +29,12 @@ User = get_user_model()
 def import_analysis(
     creator_id: int | str,
     analysis_id: int | str,
-    analysis_results: OpenContractsGeneratedCorpusPythonType,
+    analysis_results: Optional[OpenContractsGeneratedCorpusPythonType] = None,
 ) -> bool:
+    """
+    Import an analysis' results. Without analysis_results, they're read from the analysis' stored
+    received_callback_file, which is also how a failed import is resumed.
+    """
     logger.info(f"import_analysis - creator_id: {creator_id}")
     logger.info(f"import_analysis - analysis_id: {analysis_id}")
 
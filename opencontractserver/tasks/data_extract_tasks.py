@@ -1,4 +1,5 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import marvin
 import numpy as np
@@ -11,10 +12,8 @@ from llama_index.core.agent import (
     ReActAgent,
     StructuredPlannerAgent,
 )
-from llama_index.core.postprocessor import SentenceTransformerRerank
 from llama_index.core.schema import Node, NodeWithScore
 from llama_index.core.tools import QueryEngineTool, ToolMetadata
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from llama_index.llms.openai import OpenAI
 from pgvector.django import CosineDistance
 from pydantic import BaseModel
@@ -22,12 +21,56 @@ from pydantic import BaseModel
 from opencontractserver.annotations.models import Annotation
 from opencontractserver.extracts.models import Datacell
 from opencontractserver.llms.vector_stores import DjangoAnnotationVectorStore
-from opencontractserver.utils.embeddings import calculate_embedding_for_text
+from opencontractserver.utils.embeddings import (
+    calculate_embedding_for_text,
+    calculate_embeddings_for_texts,
+)
 from opencontractserver.utils.etl import parse_model_or_primitive
+from opencontractserver.utils.model_registry import (
+    HUGGINGFACE_EMBEDDER,
+    RERANKER,
+    model_registry,
+)
 
 logger = logging.getLogger(__name__)
 
 
+def _structure_retrieved_text(column, retrieved_text: str, output_type) -> dict:
+    """
+    Have marvin parse the retrieved text into the column's output type. Returns the value to store in
+    Datacell.data.
+    """
+
+    parse_instructions = column.instructions
+    query = column.query
+
+    print(f"Resulting data for marvin: {retrieved_text}")
+
+    if column.extract_is_list:
+        print("Extract as list!")
+        result = marvin.extract(
+            retrieved_text,
+            target=output_type,
+            instructions=parse_instructions if parse_instructions else query,
+        )
+    else:
+        print("Extract single instance")
+        result = marvin.cast(
+            retrieved_text,
+            target=output_type,
+            instructions=parse_instructions if parse_instructions else query,
+        )
+
+    print(f"Result processed from marvin: {result}")
+
+    if issubclass(output_type, BaseModel) or isinstance(output_type, BaseModel):
+        return {"data": result.model_dump()}
+    elif output_type in [str, int, bool, float]:
+        return {"data": result}
+    else:
+        raise ValueError(f"Unsupported output type: {output_type}")
+
+
 @shared_task
 def oc_llama_index_doc_query(cell_id, similarity_top_k=15, max_token_length: int = 512):
     """
@@ -43,10 +86,7 @@ def oc_llama_index_doc_query(cell_id, similarity_top_k=15, max_token_length: int
         datacell.save()
 
         document = datacell.document
-        embed_model = HuggingFaceEmbedding(
-            model_name="multi-qa-MiniLM-L6-cos-v1", cache_folder="/models"
-        )  # Using our pre-load cache path where the model was stored on container build
-        Settings.embed_model = embed_model
+        Settings.embed_model = model_registry.get(HUGGINGFACE_EMBEDDER)
 
         llm = OpenAI(model=settings.OPENAI_MODEL, api_key=settings.OPENAI_API_KEY)
         Settings.llm = llm
@@ -115,9 +155,7 @@ def oc_llama_index_doc_query(cell_id, similarity_top_k=15, max_token_length: int
                 for row in queryset
             ]
 
-            sbert_rerank = SentenceTransformerRerank(
-                model="cross-encoder/ms-marco-MiniLM-L-2-v2", top_n=5
-            )
+            sbert_rerank = model_registry.get(RERANKER)
             retrieved_nodes = sbert_rerank.postprocess_nodes(nodes, QueryBundle(query))
 
             annotation_ids = [
@@ -138,9 +176,7 @@ def oc_llama_index_doc_query(cell_id, similarity_top_k=15, max_token_length: int
 
             results = retriever.retrieve(search_text if search_text else query)
 
-            sbert_rerank = SentenceTransformerRerank(
-                model="cross-encoder/ms-marco-MiniLM-L-2-v2", top_n=5
-            )
+            sbert_rerank = model_registry.get(RERANKER)
             retrieved_nodes = sbert_rerank.postprocess_nodes(
                 results, QueryBundle(query)
             )
@@ -159,8 +195,6 @@ def oc_llama_index_doc_query(cell_id, similarity_top_k=15, max_token_length: int
         output_type = parse_model_or_primitive(datacell.column.output_type)
         logger.info(f"Output type: {output_type}")
 
-        parse_instructions = datacell.column.instructions
-
         # TODO - eventually this can just be pulled from a separate Django vector index where we filter to definitions!
         definitions = ""
         if datacell.column.agentic:
@@ -222,34 +256,13 @@ def oc_llama_index_doc_query(cell_id, similarity_top_k=15, max_token_length: int
             f"Related Document:\n```\n{retrieved_text}\n```\n\n" + definitions
         )
 
-        print(f"Resulting data for marvin: {retrieved_text}")
-
-        if datacell.column.extract_is_list:
-            print("Extract as list!")
-            result = marvin.extract(
-                retrieved_text,
-                target=output_type,
-                instructions=parse_instructions if parse_instructions else query,
-            )
-        else:
-            print("Extract single instance")
-            result = marvin.cast(
-                retrieved_text,
-                target=output_type,
-                instructions=parse_instructions if parse_instructions else query,
-            )
-
-        print(f"Result processed from marvin: {result}")
         logger.debug(
             f"run_extract() - processing column datacell {datacell.id} for {datacell.document.id}"
         )
 
-        if issubclass(output_type, BaseModel) or isinstance(output_type, BaseModel):
-            datacell.data = {"data": result.model_dump()}
-        elif output_type in [str, int, bool, float]:
-            datacell.data = {"data": result}
-        else:
-            raise ValueError(f"Unsupported output type: {output_type}")
+        datacell.data = _structure_retrieved_text(
+            datacell.column, retrieved_text, output_type
+        )
         datacell.completed = timezone.now()
         datacell.save()
 
@@ -275,10 +288,7 @@ def llama_index_react_agent_query(cell_id):
         datacell.save()
 
         document = datacell.document
-        embed_model = HuggingFaceEmbedding(
-            model_name="multi-qa-MiniLM-L6-cos-v1", cache_folder="/models"
-        )  # Using our pre-load cache path where the model was stored on container build
-        Settings.embed_model = embed_model
+        Settings.embed_model = model_registry.get(HUGGINGFACE_EMBEDDER)
 
         llm = OpenAI(model=settings.OPENAI_MODEL, api_key=settings.OPENAI_API_KEY)
         Settings.llm = llm
@@ -318,3 +328,206 @@ def llama_index_react_agent_query(cell_id):
         datacell.stacktrace = f"Error processing: {e}"
         datacell.failed = timezone.now()
         datacell.save()
+
+
+def _retrieve_nodes_from_pool(
+    pool: list[Annotation],
+    pool_matrix: np.ndarray,
+    query_embedding: np.ndarray,
+    similarity_top_k: int,
+    must_contain_text: str | None = None,
+) -> list[NodeWithScore]:
+    """
+    Exact cosine search over a document's (already loaded) annotation pool. Returns the top-k annotations as
+    LlamaIndex nodes so they can go straight into the reranker.
+    """
+
+    candidate_indices = np.arange(len(pool))
+    if must_contain_text:
+        needle = must_contain_text.lower()
+        candidate_indices = np.array(
+            [
+                i
+                for i, annotation in enumerate(pool)
+                if annotation.raw_text and needle in annotation.raw_text.lower()
+            ],
+            dtype=int,
+        )
+
+    if len(candidate_indices) == 0:
+        return []
+
+    query_norm = np.linalg.norm(query_embedding)
+    if query_norm == 0:
+        return []
+
+    similarities = pool_matrix[candidate_indices] @ (query_embedding / query_norm)
+    top = np.argsort(-similarities)[:similarity_top_k]
+
+    nodes = []
+    for position in top:
+        row = pool[candidate_indices[position]]
+        nodes.append(
+            NodeWithScore(
+                node=Node(
+                    doc_id=str(row.id),
+                    text=row.raw_text,
+                    extra_info={
+                        "page": row.page,
+                        "bounding_box": row.bounding_box,
+                        "annotation_id": row.id,
+                        "label": row.annotation_label.text
+                        if row.annotation_label
+                        else None,
+                        "label_id": row.annotation_label.id
+                        if row.annotation_label
+                        else None,
+                    },
+                ),
+                score=float(similarities[position]),
+            )
+        )
+    return nodes
+
+
+@shared_task
+def oc_llama_index_doc_query_batch(
+    cell_ids: list[int | str],
+    similarity_top_k: int = 15,
+    max_concurrent_llm_calls: int | None = None,
+):
+    """
+    Batched counterpart to oc_llama_index_doc_query for all the (non-agentic) columns of a single document. Instead of
+    rebuilding the retrieval pipeline for every cell, we:
+
+        1) load the document's embedded annotations once and use them as the shared candidate pool,
+        2) embed every column's search text in one batched request,
+        3) run retrieval + reranking per column against the shared pool, and
+        4) fan the marvin calls out concurrently, with at most max_concurrent_llm_calls in flight.
+
+    Each cell still succeeds or fails independently.
+    """
+
+    if max_concurrent_llm_calls is None:
+        max_concurrent_llm_calls = settings.EXTRACT_BATCH_MAX_CONCURRENT_LLM_CALLS
+
+    datacells = list(
+        Datacell.objects.filter(id__in=cell_ids).select_related("column", "document")
+    )
+    if not datacells:
+        return
+
+    document_ids = {datacell.document_id for datacell in datacells}
+    if len(document_ids) != 1:
+        raise ValueError(
+            "oc_llama_index_doc_query_batch() - all cells in a batch must belong to the same document"
+        )
+
+    now = timezone.now()
+    for datacell in datacells:
+        datacell.started = now
+    Datacell.objects.bulk_update(datacells, ["started"])
+
+    prompts: dict[int, tuple[Datacell, str, type]] = {}
+    failures: dict[int, Exception] = {}
+
+    # The candidate pool, search text embeddings and reranker are shared by every cell, so if any of them can't be
+    # set up, every cell fails with that error.
+    try:
+        pool = list(
+            Annotation.objects.filter(
+                document_id=document_ids.pop(), embedding__isnull=False
+            ).select_related("annotation_label")
+        )
+        pool_matrix = (
+            np.array([annotation.embedding for annotation in pool], dtype=np.float32)
+            if pool
+            else np.zeros((0, 384), dtype=np.float32)
+        )
+        norms = np.linalg.norm(pool_matrix, axis=1, keepdims=True)
+        pool_matrix = pool_matrix / np.where(norms == 0, 1, norms)
+
+        # Same "|||" convention as oc_llama_index_doc_query: multiple examples get their embeddings averaged
+        search_texts_per_cell = []
+        for datacell in datacells:
+            search_text = datacell.column.match_text or datacell.column.query or ""
+            search_texts_per_cell.append(
+                search_text.split("|||") if "|||" in search_text else [search_text]
+            )
+
+        flat_embeddings = iter(
+            calculate_embeddings_for_texts(
+                [text for texts in search_texts_per_cell for text in texts]
+            )
+        )
+
+        reranker = model_registry.get(RERANKER)
+    except Exception as e:
+        failures = {datacell.id: e for datacell in datacells}
+    else:
+        for datacell, texts in zip(datacells, search_texts_per_cell):
+            try:
+                vectors = [next(flat_embeddings) for _ in texts]
+                vectors = [vector for vector in vectors if vector is not None]
+                if not vectors:
+                    raise ValueError(
+                        "Unable to calculate embeddings for the search text"
+                    )
+
+                nodes = _retrieve_nodes_from_pool(
+                    pool,
+                    pool_matrix,
+                    np.mean(vectors, axis=0),
+                    similarity_top_k,
+                    datacell.column.must_contain_text,
+                )
+                retrieved_nodes = reranker.postprocess_nodes(
+                    nodes, QueryBundle(datacell.column.query or "")
+                )
+
+                datacell.sources.add(
+                    *[n.node.extra_info["annotation_id"] for n in retrieved_nodes]
+                )
+
+                retrieved_text = "\n".join(
+                    [f"```Relevant Section:\n\n{n.text}\n```" for n in retrieved_nodes]
+                )
+                prompts[datacell.id] = (
+                    datacell,
+                    f"Related Document:\n```\n{retrieved_text}\n```\n\n",
+                    parse_model_or_primitive(datacell.column.output_type),
+                )
+            except Exception as e:
+                failures[datacell.id] = e
+
+    # LLM calls are network bound, so run them concurrently. Only the marvin calls happen off the main thread; all
+    # database writes stay here.
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrent_llm_calls)) as executor:
+        futures = {
+            executor.submit(
+                _structure_retrieved_text, datacell.column, prompt, output_type
+            ): cell_id
+            for cell_id, (datacell, prompt, output_type) in prompts.items()
+        }
+        results = {}
+        for future in as_completed(futures):
+            cell_id = futures[future]
+            try:
+                results[cell_id] = future.result()
+            except Exception as e:
+                failures[cell_id] = e
+
+    now = timezone.now()
+    for datacell in datacells:
+        if datacell.id in failures:
+            logger.error(
+                f"oc_llama_index_doc_query_batch() - cell {datacell.id} failed: {failures[datacell.id]}"
+            )
+            datacell.stacktrace = f"Error processing: {failures[datacell.id]}"
+            datacell.failed = now
+        else:
+            datacell.data = results[datacell.id]
+            datacell.completed = now
+    Datacell.objects.bulk_update(
+        datacells, ["data", "completed", "failed", "stacktrace"]
+    )
@@ -3,6 +3,12 @@ from django.conf import settings
 
 from opencontractserver.shared.decorators import doc_analyzer_task
 from opencontractserver.types.dicts import TextSpan
+from opencontractserver.utils.model_registry import (
+    GLINER,
+    SPACY_LG,
+    SPACY_SM,
+    model_registry,
+)
 
 # Pass OpenAI API key to marvin for parsing / extract
 marvin.settings.openai.api_key = settings.OPENAI_API_KEY
@@ -29,19 +35,8 @@ def legal_entity_tagger(*args, pdf_text_extract, **kawrgs):
     """
     Use SALI tags plus GLINER plus SPACY sentence splitter to tag legal entities.
     """
-    import spacy
-    from gliner import GLiNER
-
-    nlp = spacy.load("en_core_web_lg")
-
-    model = GLiNER.from_pretrained("urchade/gliner_base")
-    model.set_sampling_params(
-        max_types=25,  # maximum number of entity types during training
-        shuffle_types=True,  # if shuffle or not entity types
-        random_drop=True,  # randomly drop entity types
-        max_neg_type_ratio=1,  # ratio of positive/negative types, 1 mean 50%/50%, 2 mean 33%/66%, 3 mean 25%/75% ...
-        max_len=2500,  # maximum sentence length
-    )
+    nlp = model_registry.get(SPACY_LG)
+    model = model_registry.get(GLINER)
 
     labels = [
         "Legal Entity",
@@ -119,9 +114,7 @@ def proper_name_tagger(*args, pdf_text_extract, **kawrgs):
     Use Spacy to tag named entities for organizations, geopolitical entities, people and products.
     """
 
-    import spacy
-
-    nlp = spacy.load("en_core_web_sm")
+    nlp = model_registry.get(SPACY_SM)
     doc = nlp(pdf_text_extract)
 
     results = []
@@ -1,12 +1,18 @@
 from __future__ import annotations
 
+import collections
 import enum
 import io
+import itertools
 import json
 import logging
 import pathlib
+import shutil
+import tempfile
+import time
 import uuid
-from typing import Any
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Iterator
 
 import requests
 from celery import chord, group
@@ -14,7 +20,7 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.base import ContentFile, File
 from django.core.files.storage import default_storage
-from plasmapdf.models.PdfDataLayer import makePdfTranslationLayerFromPawlsTokens
+from django.db.models import Q
 from pydantic import validate_arguments
 
 from config import celery_app
@@ -24,23 +30,36 @@ from opencontractserver.annotations.models import (
     Annotation,
     AnnotationLabel,
 )
+from opencontractserver.annotations.page_cache import invalidate_page_annotations
 from opencontractserver.documents.models import Document
 from opencontractserver.types.dicts import (
     FunsdAnnotationType,
-    FunsdTokenType,
     LabelLookupPythonType,
     OpenContractDocExport,
     PawlsPagePythonType,
-    PawlsTokenPythonType,
 )
 from opencontractserver.types.enums import PermissionTypes
 from opencontractserver.utils.etl import build_document_export, pawls_bbox_to_funsd_box
+from opencontractserver.utils.pawls import (
+    PawlsBinaryWriter,
+    PawlsTokenIndex,
+    cache_pawls_token_index,
+    get_pawls_token_index,
+    join_token_texts,
+    save_pawls_binary,
+)
 from opencontractserver.utils.pdf import (
     check_if_pdf_needs_ocr,
+    extract_pawls_from_pdf_page_range,
+    extract_pawls_from_pdf_page_range_by_text_layer,
+    extract_pawls_from_pdf_path,
     extract_pawls_from_pdfs_bytes,
     split_pdf_into_images,
 )
-from opencontractserver.utils.permissioning import set_permissions_for_obj_to_user
+from opencontractserver.utils.permissioning import (
+    set_permissions_for_obj_to_user,
+    set_permissions_for_objs_to_user,
+)
 from opencontractserver.utils.text import __consolidate_common_equivalent_chars
 
 logger = logging.getLogger(__name__)
@@ -94,12 +113,28 @@ def process_pdf_page(
         "process_pdf_page() - write to temporary storage to avoid overloading Redis"
     )
 
+    pawls_fragment_path = _write_pawls_fragment(annotations[0], user_id)
+
+    logger.info(f"process_pdf_page() - annotations written to {pawls_fragment_path}")
+
+    return page_num, pawls_fragment_path, page_path
+
+
+def _write_pawls_fragment(page_pawls_layer: PawlsPagePythonType, user_id: int) -> str:
+    """
+    Write a single page's PAWLS layer to temporary storage (rather than passing it through Redis)
+    and return the path / key it was written to.
+    """
+
     if settings.USE_AWS:
+        import boto3
+
+        s3 = boto3.client("s3")
         pawls_fragment_path = f"user_{user_id}/pawls_fragments/{uuid.uuid4()}.json"
         s3.put_object(
             Key=pawls_fragment_path,
             Bucket=settings.AWS_STORAGE_BUCKET_NAME,
-            Body=json.dumps(annotations[0]),
+            Body=json.dumps(page_pawls_layer),
         )
     else:
         pawls_fragment_folder_path = pathlib.Path(
@@ -108,12 +143,156 @@ def process_pdf_page(
         pawls_fragment_folder_path.mkdir(parents=True, exist_ok=True)
         pawls_fragment_path = pawls_fragment_folder_path / f"{uuid.uuid4()}.json"
         with pawls_fragment_path.open("w") as f:
-            f.write(json.dumps(annotations[0]))
+            f.write(json.dumps(page_pawls_layer))
         pawls_fragment_path = pawls_fragment_path.resolve().__str__()
 
-    logger.info(f"process_pdf_page() - annotations written to {pawls_fragment_path}")
+    return pawls_fragment_path
 
-    return page_num, pawls_fragment_path, page_path
+
+def _extract_pawls_for_page_range(
+    local_pdf_path: str, first_page: int, last_page: int, whole_file: bool = False
+) -> tuple[list[PawlsPagePythonType], list[str]]:
+    """
+    Extract PAWLS pages for a page range of a pdf on local disk. If PAWLS_DETECT_TEXT_LAYER is set, pages with
+    an embedded text layer skip OCR. Otherwise, every page goes through tesseract. Pass whole_file=True when
+    the range covers the entire file (i.e. it's a chunk) so tesseract can run on it without re-splitting.
+    """
+
+    if settings.PAWLS_DETECT_TEXT_LAYER:
+        return extract_pawls_from_pdf_page_range_by_text_layer(
+            local_pdf_path,
+            first_page,
+            last_page,
+            threshold=settings.PAWLS_TEXT_LAYER_MIN_CHARS,
+        )
+
+    if whole_file:
+        annotations = extract_pawls_from_pdf_path(local_pdf_path)
+    else:
+        annotations = extract_pawls_from_pdf_page_range(
+            local_pdf_path, first_page, last_page
+        )
+    return annotations, ["ocr" for _ in annotations]
+
+
+@celery_app.task(
+    autoretry_for=(Exception,), retry_backoff=True, retry_kwargs={"max_retries": 5}
+)
+def process_pdf_page_range(
+    total_page_count: int,
+    first_page_num: int,
+    last_page_num: int,
+    pdf_path: str,
+    user_id: int,
+    shared_source: bool = False,
+) -> list[tuple[int, str, str, str]]:
+    """
+    Range-based version of process_pdf_page. Extracts PAWLS tokens for pages first_page_num through
+    last_page_num (inclusive) and returns one (page_num, pawls_fragment_path, pdf_path, route) entry per page,
+    where route is "text" if the page's tokens came from its embedded text layer or "ocr" if it went through
+    tesseract.
+
+    If shared_source is True, pdf_path points to a local copy of the *entire* original pdf on a filesystem
+    shared by the workers, and only the requested range is read from it. Otherwise, pdf_path points to a
+    chunk containing only the requested pages (on S3 if USE_AWS is set, else on local disk).
+    """
+
+    logger.info(
+        f"process_pdf_page_range() - Process pages {first_page_num}-{last_page_num} of {total_page_count} "
+        f"from path {pdf_path}"
+    )
+
+    if shared_source:
+        annotations, routes = _extract_pawls_for_page_range(
+            pdf_path, first_page_num, last_page_num
+        )
+    elif settings.USE_AWS:
+        import boto3
+
+        # Stream the chunk straight to disk for tesseract rather than reading it into memory first
+        s3 = boto3.client("s3")
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as chunk_file:
+            s3.download_fileobj(settings.AWS_STORAGE_BUCKET_NAME, pdf_path, chunk_file)
+            chunk_file.flush()
+            annotations, routes = _extract_pawls_for_page_range(
+                chunk_file.name, 0, last_page_num - first_page_num, whole_file=True
+            )
+    else:
+        annotations, routes = _extract_pawls_for_page_range(
+            pdf_path, 0, last_page_num - first_page_num, whole_file=True
+        )
+
+    results: list[tuple[int, str, str, str]] = []
+    for offset, (page_pawls_layer, route) in enumerate(zip(annotations, routes)):
+        page_num = first_page_num + offset
+        # Tesseract indexes pages relative to the chunk it was handed
+        page_pawls_layer["page"]["index"] = page_num
+        results.append(
+            (
+                page_num,
+                _write_pawls_fragment(page_pawls_layer, user_id),
+                pdf_path,
+                route,
+            )
+        )
+
+    logger.info(
+        f"process_pdf_page_range() - wrote {len(results)} page fragments for pages "
+        f"{first_page_num}-{last_page_num}"
+    )
+
+    return results
+
+
+def _load_pawls_fragment(
+    pawls_page_path: str, s3_client: Any = None
+) -> tuple[PawlsPagePythonType, float]:
+    """
+    Load a single page's PAWLS fragment written by process_pdf_page and return it along with the
+    number of seconds it took to fetch and parse.
+    """
+
+    start = time.perf_counter()
+
+    if s3_client is not None:
+        page_obj = s3_client.get_object(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=pawls_page_path
+        )
+        page_pawls_layer = json.loads(page_obj["Body"].read().decode("utf-8"))
+    else:
+        with open(pawls_page_path) as f:
+            page_pawls_layer = json.loads(f.read())
+
+    return page_pawls_layer, time.perf_counter() - start
+
+
+def _iter_pawls_fragments(
+    pawls_page_paths: list[str], max_workers: int, s3_client: Any = None
+) -> Iterator[tuple[PawlsPagePythonType, float]]:
+    """
+    Yield PAWLS fragments in the order of pawls_page_paths while fetching up to max_workers
+    fragments concurrently. Only max_workers fragments are ever in flight, so memory is bounded
+    by the fetch window rather than by the length of the document.
+    """
+
+    path_iter = iter(pawls_page_paths)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight: collections.deque[Future] = collections.deque(
+            executor.submit(_load_pawls_fragment, path, s3_client)
+            for path in itertools.islice(path_iter, max_workers)
+        )
+
+        while in_flight:
+            result = in_flight.popleft().result()
+
+            next_path = next(path_iter, None)
+            if next_path is not None:
+                in_flight.append(
+                    executor.submit(_load_pawls_fragment, next_path, s3_client)
+                )
+
+            yield result
 
 
 @celery_app.task(
@@ -122,102 +301,239 @@ def process_pdf_page(
 def reassemble_extracted_pdf_parts(
     doc_parts: list[list[int, str, str]],
     doc_id: int,
-):
+    pdf_source_path: str | None = None,
+) -> list[dict[str, float | int]]:
+    """
+    Chord callback for split_pdf_for_processing. Stitches the per-page PAWLS fragments back into
+    a single PAWLS layer and text layer for the document. Fragments are fetched concurrently,
+    the PAWLS layer is streamed page-by-page into a temporary file rather than held in memory
+    and dumped in one shot, and per-page fetch / processing times are logged and returned.
+
+    pdf_source_path is the shared local copy of the pdf the page ranges were read from (if any), which is
+    removed once the document has been reassembled.
+    """
 
     logger.info(f"reassemble_extracted_pdf_parts() - received parts: {doc_parts}")
 
-    sorted_doc_parts = sorted(doc_parts)
-    pawls_layer: list[PawlsPagePythonType] = []
+    # process_pdf_page_range returns a list of parts per chunk of pages
+    flattened_doc_parts = []
+    for doc_part in doc_parts:
+        if doc_part and isinstance(doc_part[0], (list, tuple)):
+            flattened_doc_parts.extend(doc_part)
+        else:
+            flattened_doc_parts.append(doc_part)
+
+    sorted_doc_parts = sorted(flattened_doc_parts)
+
+    if settings.USE_AWS:
+        import boto3
+
+        s3_client = boto3.client("s3")
+    else:
+        s3_client = None
+
+    fragments = _iter_pawls_fragments(
+        [doc_part[1] for doc_part in sorted_doc_parts],
+        max_workers=settings.PAWLS_REASSEMBLY_MAX_WORKERS,
+        s3_client=s3_client,
+    )
 
-    doc_text = ""
-    line_start_char = 0
-    last_token_height = -1
+    doc_text = io.StringIO()
+    doc_text_length = 0
+    page_timings: list[dict[str, float | int]] = []
+    route_counts: collections.Counter[str] = collections.Counter()
 
-    for doc_part in sorted_doc_parts:
+    # The binary copy of the layer is built page by page alongside the JSON one
+    pawls_binary_writer = PawlsBinaryWriter() if settings.PAWLS_BINARY_FORMAT else None
 
-        page_num, pawls_page_path, pdf_page_path = doc_part
+    with tempfile.TemporaryFile() as pawls_layer_file:
 
-        if settings.USE_AWS:
-            import boto3
+        pawls_layer_file.write(b"[")
 
-            logger.info("process_pdf_page() - Load obj from s3")
-            s3 = boto3.client("s3")
+        for doc_part, (page_pawls_layer, fetch_seconds) in zip(
+            sorted_doc_parts, fragments
+        ):
 
-            page_obj = s3.get_object(
-                Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=pawls_page_path
+            page_num = doc_part[0]
+            process_start = time.perf_counter()
+
+            # Parts from process_pdf_page_range record whether the page was OCRed or read from its text layer
+            if len(doc_part) > 3:
+                route_counts[doc_part[3]] += 1
+
+            # Append the page's tokens to the text layer the same way PawlsTokenIndex builds it. Text is only
+            # written to a buffer here... repeated string concatenation is quadratic over a long document.
+            token_texts = [
+                __consolidate_common_equivalent_chars(token["text"])
+                for token in page_pawls_layer["tokens"]
+            ]
+            if token_texts:
+                if doc_text_length > 0:
+                    page_text = " " + " ".join(token_texts)
+                else:
+                    page_text = join_token_texts(token_texts)
+                doc_text.write(page_text)
+                doc_text_length += len(page_text)
+
+            if page_timings:
+                pawls_layer_file.write(b",")
+            pawls_layer_file.write(json.dumps(page_pawls_layer).encode("utf-8"))
+            if pawls_binary_writer:
+                pawls_binary_writer.add_page(page_pawls_layer)
+
+            page_timing = {
+                "page": page_num,
+                "tokens": len(page_pawls_layer["tokens"]),
+                "fetch_seconds": round(fetch_seconds, 4),
+                "process_seconds": round(time.perf_counter() - process_start, 4),
+            }
+            page_timings.append(page_timing)
+            logger.debug(
+                f"reassemble_extracted_pdf_parts() - page timing: {page_timing}"
             )
-            page_pawls_layer = json.loads(page_obj["Body"].read().decode("utf-8"))
 
-        else:
-            with open(pawls_page_path) as f:
-                page_pawls_layer = json.loads(f.read())
-
-        # Process PAWLS tokens to create a text layer
-        # We DO want to reset y pos on every page, which will be set to y of first token.
-        last_y = -1
-        line_text = ""
-        lines: list[tuple[int, int, int, int]] = []
-
-        for page_token_index, token in enumerate(page_pawls_layer["tokens"]):
-
-            token_text = __consolidate_common_equivalent_chars(token["text"])
-
-            new_y = round(token["y"], 0)
-            new_token_height = round(token["height"], 0)
-
-            if last_y == -1:
-                last_y = round(token["y"], 0)
-
-            if last_token_height == -1:
-                # Not really sure how to handle situations where the token height is 0 at the beginning... just
-                # try 1 pixel, I guess?
-                last_token_height = new_token_height if new_token_height > 0 else 1
-
-            # Tesseract line positions seem a bit erratic, honestly. Figuring out when a token is on the same line is
-            # not as easy as checking if y positions are the same as they are often off by a couple pixels. This is
-            # dependent on document, font size, OCR quality, and more... Decent heuristic I came up with was to look
-            # at two consecutive tokens, take the max token height and then see if the y difference was more than some
-            # percentage of the larger of the two token heights (to account for things like periods or dashes or
-            # whatever next to a word). Seems to work pretty well, though I am *SURE* it will fail in some cases. Easy
-            # enough fix there... just don't give a cr@p about line height and newlines and always use a space. That's
-            # actually probably fine for ML purposes.
-            # logger.info(f"Token: {token['text']} (len {len(token['text'])})")
-            # logger.info(f"Line y difference: {abs(new_y - last_y)}")
-            # logger.info(f"Compared to averaged token height: {0.5 * max(new_token_height, last_token_height)}")
-
-            if abs(new_y - last_y) > (0.5 * max(new_token_height, last_token_height)):
-
-                lines.append(
-                    (
-                        page_num,
-                        len(lines),
-                        line_start_char,
-                        len(line_text) + line_start_char,
-                    )
+        pawls_layer_file.write(b"]")
+        pawls_layer_file.seek(0)
+
+        document = Document.objects.get(pk=doc_id)
+        document.txt_extract_file.save(
+            f"doc_{doc_id}.txt", ContentFile(doc_text.getvalue().encode("utf-8"))
+        )
+        document.pawls_parse_file.save(
+            f"doc_{doc_id}.pawls", File(pawls_layer_file, name=f"doc_{doc_id}.pawls")
+        )
+        if pawls_binary_writer:
+            with tempfile.TemporaryFile() as pawls_binary_file:
+                pawls_binary_writer.finish(pawls_binary_file)
+                pawls_binary_file.seek(0)
+                document.pawls_binary_file.save(
+                    f"doc_{doc_id}.pawlsb", File(pawls_binary_file), save=False
                 )
+        else:
+            # A binary copy from an earlier parse doesn't match the layer that was just written
+            document.pawls_binary_file = None
+        document.page_count = len(sorted_doc_parts)
+        document.text_layer_page_count = route_counts["text"]
+        document.ocr_page_count = route_counts["ocr"]
+        document.save()
 
-                line_start_char = len(doc_text) + 1  # Accounting for newline
-                line_text = token_text
+    if pdf_source_path:
+        _remove_pdf_source(pdf_source_path)
 
-            else:
-                line_text += " " if len(line_text) > 0 else ""
-                line_text += token_text
+    logger.info(
+        f"reassemble_extracted_pdf_parts() - reassembled {len(page_timings)} pages for doc {doc_id} "
+        f"({route_counts['text']} from text layer, {route_counts['ocr']} OCRed) "
+        f"(fetch {sum(t['fetch_seconds'] for t in page_timings):.2f}s, "
+        f"process {sum(t['process_seconds'] for t in page_timings):.2f}s)"
+    )
 
-            doc_text += " " if len(doc_text) > 0 else ""
-            doc_text += token_text
+    return page_timings
+
+
+def _remove_pdf_source(pdf_source_path: str):
+    pathlib.Path(pdf_source_path).unlink(missing_ok=True)
+    logger.info(f"Removed shared pdf source {pdf_source_path}")
+
+
+@celery_app.task()
+def remove_pdf_source(*args, pdf_source_path: str):
+    """
+    Error callback for split_pdf_for_processing's chord. Removes the shared local copy of the pdf if a page
+    range or the reassembly fails for good, as reassemble_extracted_pdf_parts won't get to it.
+    """
+    _remove_pdf_source(pdf_source_path)
 
-        pawls_layer.append(page_pawls_layer)
 
-    pawls_string = json.dumps(pawls_layer)
-    pawls_file = ContentFile(pawls_string.encode("utf-8"))
-    txt_file = ContentFile(doc_text.encode("utf-8"))
+@celery_app.task(
+    autoretry_for=(Exception,), retry_backoff=True, retry_kwargs={"max_retries": 5}
+)
+def reuse_parse_artifacts(*args, doc_id: int, source_doc_id: int, user_id: int):
+    """
+    Parse-cache hit path. The pdf for doc_id is byte-for-byte identical to source_doc_id's, which has already
+    been parsed, so point doc_id at source_doc_id's PAWLS layer, text layer, icon and embedding rather than
+    running the parsing chain again. Stored files are shared by storage key, not copied. If the source was
+    parsed by the nlm-ingestor, its structural annotations are cloned onto the new document as well.
+    """
 
     document = Document.objects.get(pk=doc_id)
-    document.txt_extract_file.save(f"doc_{doc_id}.txt", txt_file)
-    document.pawls_parse_file.save(f"doc_{doc_id}.pawls", pawls_file)
-    document.page_count = len(sorted_doc_parts)
+    source = Document.objects.get(pk=source_doc_id)
+
+    document.pawls_parse_file.name = source.pawls_parse_file.name
+    document.txt_extract_file.name = source.txt_extract_file.name
+    document.pawls_binary_file.name = source.pawls_binary_file.name
+    if source.icon.name and not document.icon.name:
+        document.icon.name = source.icon.name
+    if document.embedding is None and source.embedding is not None:
+        document.embedding = source.embedding
+    document.page_count = source.page_count
+    document.text_layer_page_count = source.text_layer_page_count
+    document.ocr_page_count = source.ocr_page_count
     document.save()
 
+    structural_annotations = list(
+        Annotation.objects.filter(document_id=source_doc_id, structural=True)
+        .select_related("annotation_label")
+        .order_by("id")
+    )
+
+    if structural_annotations:
+
+        label_lookup: dict[str, AnnotationLabel] = {}
+        cloned_annotations = []
+
+        for annotation in structural_annotations:
+
+            label_text = annotation.annotation_label.text
+            if label_text not in label_lookup:
+                label_obj, created = AnnotationLabel.objects.get_or_create(
+                    text=label_text,
+                    creator_id=user_id,
+                    label_type=TOKEN_LABEL,
+                    read_only=True,
+                    analyzer=None,
+                    defaults={
+                        "color": "grey",
+                        "description": "NLM Structural Label",
+                        "icon": "expand",
+                    },
+                )
+                if created:
+                    set_permissions_for_obj_to_user(
+                        user_id, label_obj, [PermissionTypes.ALL]
+                    )
+                label_lookup[label_text] = label_obj
+
+            cloned_annotations.append(
+                Annotation(
+                    raw_text=annotation.raw_text,
+                    page=annotation.page,
+                    json=annotation.json,
+                    tokens_jsons=annotation.tokens_jsons,
+                    bounding_box=annotation.bounding_box,
+                    embedding=annotation.embedding,
+                    annotation_label=label_lookup[label_text],
+                    document_id=doc_id,
+                    creator_id=user_id,
+                    structural=True,
+                )
+            )
+
+        created_annotations = Annotation.objects.bulk_create(cloned_annotations)
+        set_permissions_for_objs_to_user(
+            user_id,
+            Annotation,
+            [annotation.id for annotation in created_annotations],
+            [PermissionTypes.ALL],
+            replace=False,
+        )
+        # bulk_create skips the post_save signal, so drop anything cached while the doc was still being parsed
+        invalidate_page_annotations([doc_id])
+
+    logger.info(
+        f"reuse_parse_artifacts() - doc {doc_id} reused parse artifacts from doc {source_doc_id} "
+        f"({len(structural_annotations)} structural annotations cloned)"
+    )
+
 
 @celery_app.task()
 def set_doc_lock_state(*args, locked: bool, doc_id: int):
@@ -277,22 +593,27 @@ def nlm_ingest_pdf(user_id: int, doc_id: int) -> list[tuple[int, str]]:
         pawls_file = ContentFile(pawls_string.encode("utf-8"))
 
         # We want to use our own algorithm to create text layer from pawls tokens
-        span_translation_layer = makePdfTranslationLayerFromPawlsTokens(
-            json.loads(pawls_string.encode("utf-8"))
-        )
+        pawls_token_index = PawlsTokenIndex(open_contracts_data["pawls_file_content"])
 
         # We need to use the same translation algorithm from x,y tokens to spans EVERYWHERE... so when we first
         # parse the document,we want to use the same translation algorithm we'll later use when we try to map spans
         # BACK to the tokens.
-        txt_file = ContentFile(span_translation_layer.doc_text.encode("utf-8"))
+        txt_file = ContentFile(pawls_token_index.doc_text.encode("utf-8"))
 
         document.txt_extract_file.save(f"doc_{doc_id}.txt", txt_file)
         document.pawls_parse_file.save(f"doc_{doc_id}.pawls", pawls_file)
+
+        # Analyzers run against this document next will want the same index
+        cache_pawls_token_index(document, pawls_token_index)
+        save_pawls_binary(
+            document, open_contracts_data["pawls_file_content"], save=False
+        )
         document.page_count = len(open_contracts_data["pawls_file_content"])
 
         existing_text_labels: dict[str, AnnotationLabel] = {}
 
         # Now, annotate the document with any annotations that bubbled up from parser.
+        structural_annotation_ids = []
         for label_data in open_contracts_data["labelled_text"]:
 
             label_name = label_data["annotationLabel"]
@@ -338,7 +659,15 @@ def nlm_ingest_pdf(user_id: int, doc_id: int) -> list[tuple[int, str]]:
                 structural=True,  # Mark these explicitly as structural annotations.
             )
             annot_obj.save()
-            set_permissions_for_obj_to_user(user_id, annot_obj, [PermissionTypes.ALL])
+            structural_annotation_ids.append(annot_obj.id)
+
+        set_permissions_for_objs_to_user(
+            user_id,
+            Annotation,
+            structural_annotation_ids,
+            [PermissionTypes.ALL],
+            replace=False,
+        )
 
     document.save()
 
@@ -347,6 +676,14 @@ def nlm_ingest_pdf(user_id: int, doc_id: int) -> list[tuple[int, str]]:
     autoretry_for=(Exception,), retry_backoff=True, retry_kwargs={"max_retries": 5}
 )
 def split_pdf_for_processing(user_id: int, doc_id: int) -> list[tuple[int, str]]:
+    """
+    Split a pdf into chunks of PAWLS_PAGES_PER_CHUNK pages, fan those chunks out to process_pdf_page_range
+    and reassemble the results into the document's PAWLS and text layers.
+
+    If PAWLS_SHARED_FILESYSTEM is set, the workers share a filesystem, so the original pdf is copied to
+    local disk once and each worker reads its page range from that copy instead of from its own chunk. The
+    copy is removed after reassembly, or by remove_pdf_source if the chord fails.
+    """
 
     logger.info(f"split_pdf_for_processing() - split doc {doc_id} for user {user_id}")
 
@@ -356,67 +693,88 @@ def split_pdf_for_processing(user_id: int, doc_id: int) -> list[tuple[int, str]]
     doc_path = doc.pdf_file.name
     doc_file = default_storage.open(doc_path, mode="rb")
 
-    if settings.USE_AWS:
+    pages_per_chunk = max(1, settings.PAWLS_PAGES_PER_CHUNK)
+    shared_source = settings.PAWLS_SHARED_FILESYSTEM
+
+    if shared_source:
+        pdf_source_folder_path = pathlib.Path(f"/tmp/user_{user_id}/pdf_sources")
+        pdf_source_folder_path.mkdir(parents=True, exist_ok=True)
+        pdf_source_path = pdf_source_folder_path / f"{uuid.uuid4()}.pdf"
+        with pdf_source_path.open("wb") as f:
+            shutil.copyfileobj(doc_file, f)
+        pdf_source_path = pdf_source_path.resolve().__str__()
+        pdf = PdfReader(pdf_source_path)
+    else:
+        pdf = PdfReader(doc_file)
+
+    if settings.USE_AWS and not shared_source:
         import boto3
 
         s3 = boto3.client("s3")
 
-    pdf = PdfReader(doc_file)
-
-    # TODO - for each page, store to disk as a temporary file OR
-    # store to cloud storage and pass the path to the storage
-    # location rather than the bytes themselves (to cut down on
-    # Redis usage)
-
     pages_and_paths: list[tuple[int, str]] = []
     processing_tasks = []
     total_page_count = len(pdf.pages)
 
-    for page in range(total_page_count):
-
-        page_bytes_stream = io.BytesIO()
+    for first_page in range(0, total_page_count, pages_per_chunk):
 
-        logger.info(f"split_pdf_for_processing() - process page {page}")
-        pdf_writer = PdfWriter()
-        pdf_writer.add_page(pdf.pages[page])
-        pdf_writer.write(page_bytes_stream)
+        last_page = min(first_page + pages_per_chunk, total_page_count) - 1
+        logger.info(
+            f"split_pdf_for_processing() - process pages {first_page}-{last_page}"
+        )
 
-        if settings.USE_AWS:
-            page_path = f"user_{user_id}/fragments/{uuid.uuid4()}.pdf"
-            s3.put_object(
-                Key=page_path,
-                Bucket=settings.AWS_STORAGE_BUCKET_NAME,
-                Body=page_bytes_stream.getvalue(),
-            )
+        if shared_source:
+            chunk_path = pdf_source_path
         else:
-            pdf_fragment_folder_path = pathlib.Path(
-                f"/tmp/user_{user_id}/pdf_fragments"
-            )
-            pdf_fragment_folder_path.mkdir(parents=True, exist_ok=True)
-            pdf_fragment_path = pdf_fragment_folder_path / f"{uuid.uuid4()}.pdf"
-            with pdf_fragment_path.open("wb") as f:
-                f.write(page_bytes_stream.getvalue())
-
-            page_path = pdf_fragment_path.resolve().__str__()
-
-        pages_and_paths.append((page, page_path))
+            pdf_writer = PdfWriter()
+            for page in range(first_page, last_page + 1):
+                pdf_writer.add_page(pdf.pages[page])
+
+            # Write each chunk exactly once - straight into the upload stream or onto disk.
+            if settings.USE_AWS:
+                chunk_path = f"user_{user_id}/fragments/{uuid.uuid4()}.pdf"
+                chunk_bytes_stream = io.BytesIO()
+                pdf_writer.write(chunk_bytes_stream)
+                chunk_bytes_stream.seek(0)
+                s3.upload_fileobj(
+                    chunk_bytes_stream, settings.AWS_STORAGE_BUCKET_NAME, chunk_path
+                )
+            else:
+                pdf_fragment_folder_path = pathlib.Path(
+                    f"/tmp/user_{user_id}/pdf_fragments"
+                )
+                pdf_fragment_folder_path.mkdir(parents=True, exist_ok=True)
+                pdf_fragment_path = pdf_fragment_folder_path / f"{uuid.uuid4()}.pdf"
+                with pdf_fragment_path.open("wb") as f:
+                    pdf_writer.write(f)
+                chunk_path = pdf_fragment_path.resolve().__str__()
+
+        pages_and_paths.extend(
+            (page, chunk_path) for page in range(first_page, last_page + 1)
+        )
         processing_tasks.append(
-            process_pdf_page.si(
+            process_pdf_page_range.si(
                 total_page_count=total_page_count,
-                page_num=page,
-                page_path=page_path,
+                first_page_num=first_page,
+                last_page_num=last_page,
+                pdf_path=chunk_path,
                 user_id=user_id,
+                shared_source=shared_source,
             )
         )
 
-    logger.info("plit_pdf_for_processing() - launch processing workflow")
-    process_workflow = chord(
-        group(processing_tasks),
-        reassemble_extracted_pdf_parts.s(doc_id=doc_id),
-    )
+    logger.info("split_pdf_for_processing() - launch processing workflow")
+    if shared_source:
+        reassemble_task = reassemble_extracted_pdf_parts.s(
+            doc_id=doc_id, pdf_source_path=pdf_source_path
+        ).on_error(remove_pdf_source.si(pdf_source_path=pdf_source_path))
+    else:
+        reassemble_task = reassemble_extracted_pdf_parts.s(doc_id=doc_id)
+
+    process_workflow = chord(group(processing_tasks), reassemble_task)
     process_workflow.apply_async()
     logger.info(
-        f"plit_pdf_for_processing() - pdf for doc_id {doc_id} being processed async"
+        f"split_pdf_for_processing() - pdf for doc_id {doc_id} being processed async"
     )
 
     logger.info(f"split_pdf_for_processing() - pages_and_paths: {pages_and_paths}")
@@ -428,10 +786,11 @@ def split_pdf_for_processing(user_id: int, doc_id: int) -> list[tuple[int, str]]
 @validate_arguments
 def burn_doc_annotations(
     label_lookups: LabelLookupPythonType, doc_id: int, corpus_id: int
-) -> tuple[str, str, OpenContractDocExport | None, Any, Any]:
+) -> tuple[str, str, str, Any, Any]:
     """
     Simple task wrapper for a fairly complex task to burn in the annotations for a given corpus on a given doc.
-    This will alter the PDF and add highlight and labels.
+    This will alter the PDF and add highlight and labels. Returns storage keys for the annotated pdf and doc json
+    rather than their contents (see build_document_export).
     """
     return build_document_export(
         label_lookups=label_lookups, doc_id=doc_id, corpus_id=corpus_id
@@ -442,19 +801,6 @@ def burn_doc_annotations(
 def convert_doc_to_funsd(
     user_id: int, doc_id: int, corpus_id: int
 ) -> tuple[int, dict[int, list[FunsdAnnotationType]], list[tuple[int, str, str]]]:
-    def pawls_token_to_funsd_token(pawls_token: PawlsTokenPythonType) -> FunsdTokenType:
-        pawls_xleft = pawls_token["x"]
-        pawls_ybottom = pawls_token["y"]
-        pawls_ytop = pawls_xleft + pawls_token["width"]
-        pawls_xright = pawls_ybottom + pawls_token["height"]
-        funsd_token = {
-            "text": pawls_token["text"],
-            # In FUNSD, this must be serialzied to list but that's done by json.dumps and tuple has better typing
-            # control (fixed length, positional datatypes, etc.)
-            "box": (pawls_xleft, pawls_ytop, pawls_xright, pawls_ybottom),
-        }
-        return funsd_token
-
     doc = Document.objects.get(id=doc_id)
 
     annotation_map: dict[int, list[dict]] = {}
@@ -465,8 +811,7 @@ def convert_doc_to_funsd(
         corpus_id=corpus_id,
     ).order_by("page")
 
-    file_object = default_storage.open(doc.pawls_parse_file.name)
-    pawls_tokens = json.loads(file_object.read().decode("utf-8"))
+    pawls_token_index = get_pawls_token_index(doc)
 
     pdf_object = default_storage.open(doc.pdf_file.name)
     pdf_bytes = pdf_object.read()
@@ -545,15 +890,13 @@ def convert_doc_to_funsd(
             page_annot_json = annot_json[page]
             page_token_refs = page_annot_json["tokensJsons"]
 
-            expanded_tokens = []
-            for token_ref in page_token_refs:
-                page_index = token_ref["pageIndex"]
-                token_index = token_ref["tokenIndex"]
-                token = pawls_tokens[page_index]["tokens"][token_index]
-
-                # Convert token from PAWLS to FUNSD format (simple but annoying transforming done via function
-                # defined above)
-                expanded_tokens.append(pawls_token_to_funsd_token(token))
+            # Convert tokens from PAWLS to FUNSD format
+            expanded_tokens = pawls_token_index.funsd_tokens(
+                pawls_token_index.token_positions(
+                    [token_ref["pageIndex"] for token_ref in page_token_refs],
+                    [token_ref["tokenIndex"] for token_ref in page_token_refs],
+                )
+            )
 
             # TODO - build FUNSD annotation here
             funsd_annotation: FunsdAnnotationType = {
@@ -680,3 +1023,44 @@ def extract_thumbnail(*args, doc_id=-1, **kwargs):
         logger.error(
             f"Unable to create a screenshot for doc_id {doc_id} due to error: {e}"
         )
+
+
+@celery_app.task()
+def convert_pawls_layer_to_binary(doc_id: int) -> bool:
+    """
+    Write the binary copy (Document.pawls_binary_file) of an existing document's JSON PAWLS layer. Returns False if
+    the document has no PAWLS layer to convert.
+    """
+
+    document = Document.objects.get(pk=doc_id)
+    if not document.pawls_parse_file:
+        return False
+
+    with document.pawls_parse_file.open("rb") as pawls_file:
+        pawls_pages = json.loads(pawls_file.read())
+
+    save_pawls_binary(document, pawls_pages, force=True)
+    logger.info(
+        f"convert_pawls_layer_to_binary() - converted {len(pawls_pages)} pages for doc {doc_id}"
+    )
+    return True
+
+
+@celery_app.task()
+def convert_pawls_layers_to_binary(doc_ids: list[int] | None = None) -> int:
+    """
+    Queue convert_pawls_layer_to_binary for doc_ids, or for every document that has a JSON PAWLS layer but no
+    binary copy yet. Returns the number of documents queued.
+    """
+
+    if doc_ids is None:
+        doc_ids = list(
+            Document.objects.exclude(
+                Q(pawls_parse_file="") | Q(pawls_parse_file__isnull=True)
+            )
+            .filter(Q(pawls_binary_file="") | Q(pawls_binary_file__isnull=True))
+            .values_list("id", flat=True)
+        )
+
+    group(convert_pawls_layer_to_binary.si(doc_id) for doc_id in doc_ids).apply_async()
+    return len(doc_ids)
@@ -1,9 +1,15 @@
 import logging
+import time
+
+from django.conf import settings
 
 from config import celery_app
 from opencontractserver.annotations.models import Annotation
 from opencontractserver.documents.models import Document
-from opencontractserver.utils.embeddings import calculate_embedding_for_text
+from opencontractserver.utils.embeddings import (
+    calculate_embedding_for_text,
+    calculate_embeddings_for_texts,
+)
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -48,3 +54,47 @@ def calculate_embedding_for_annotation_text(annotation_id: str | int):
         logger.error(
             f"calculate_embedding_for_annotation_text() - failed to generate embeddings due to error: {e}"
         )
+
+
+@celery_app.task(
+    autoretry_for=(Exception,), retry_backoff=True, retry_kwargs={"max_retries": 5}
+)
+def calculate_embeddings_for_annotation_batch(annotation_ids: list[str | int]):
+    """
+    Calculate embeddings for a batch of annotations with one embeddings request per
+    EMBEDDINGS_BATCH_SIZE annotations and write the vectors back with a single bulk_update.
+    Annotations that were deleted (or rolled back) since being queued, or that already have an
+    embedding, are skipped. Failures are logged and re-raised so the task is retried.
+    """
+    try:
+        start = time.perf_counter()
+        annotations = list(
+            Annotation.objects.filter(
+                id__in=annotation_ids, embedding__isnull=True
+            ).only("id", "raw_text")
+        )
+
+        updated: list[Annotation] = []
+        batch_size = settings.EMBEDDINGS_BATCH_SIZE
+        for batch_start in range(0, len(annotations), batch_size):
+            batch = annotations[batch_start : batch_start + batch_size]
+            vectors = calculate_embeddings_for_texts(
+                [annot.raw_text if annot.raw_text else "" for annot in batch]
+            )
+            for annot, vector in zip(batch, vectors):
+                if vector is not None:
+                    annot.embedding = vector
+                    updated.append(annot)
+
+        Annotation.objects.bulk_update(updated, ["embedding"], batch_size=batch_size)
+
+        logger.info(
+            f"calculate_embeddings_for_annotation_batch() - embedded {len(updated)} of {len(annotation_ids)} "
+            f"annotations in {time.perf_counter() - start:.2f}s"
+        )
+
+    except Exception as e:
+        logger.error(
+            f"calculate_embeddings_for_annotation_batch() - failed to generate embeddings due to error: {e}"
+        )
+        raise
@@ -1,24 +1,26 @@
 from __future__ import annotations
 
-import base64
 import io
 import json
 import logging
+import shutil
+import tempfile
 import zipfile
 
 from celery import shared_task
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.files.storage import default_storage
 from django.utils import timezone
 
 from opencontractserver.corpuses.models import Corpus
 from opencontractserver.types.dicts import (
     AnnotationLabelPythonType,
     FunsdAnnotationType,
-    OpenContractDocExport,
-    OpenContractsExportDataJsonPythonType,
 )
 from opencontractserver.users.models import UserExport
+from opencontractserver.utils.etl import delete_document_export_parts
 from opencontractserver.utils.packaging import (
     package_corpus_for_export,
     package_label_set_for_export,
@@ -30,6 +32,8 @@ logger.setLevel(logging.DEBUG)
 
 User = get_user_model()
 
+EXPORT_COPY_CHUNK_SIZE = 1024 * 1024
+
 
 # @celery_app.task(bind=True)
 @shared_task
@@ -38,7 +42,7 @@ def package_annotated_docs(
         tuple[
             str | None,
             str | None,
-            OpenContractDocExport | None,
+            str | None,
             dict[str | int, AnnotationLabelPythonType],
             dict[str | int, AnnotationLabelPythonType],
         ]
@@ -46,60 +50,84 @@ def package_annotated_docs(
     export_id: str | int,
     corpus_pk: str | int,
 ):
+    """
+    Zip up the annotated pdfs and doc jsons that burn_doc_annotations staged in storage. Everything is streamed:
+    each pdf is copied from storage straight into the zip, data.json is written into the zip one document at a
+    time, and the zip itself is built in a temp file on disk that's then handed to the UserExport.file storage
+    backend. Memory use doesn't grow with the size of the corpus.
+    """
 
     logger.info(f"Package corpus for export {export_id}...")
 
-    annotated_docs = {}
     doc_labels: dict[str | int, AnnotationLabelPythonType] | None = None
     text_labels: dict[str | int, AnnotationLabelPythonType] | None = None
 
     corpus = Corpus.objects.get(id=corpus_pk)
 
-    output_bytes = io.BytesIO()
-    zip_file = zipfile.ZipFile(output_bytes, mode="w", compression=zipfile.ZIP_DEFLATED)
-
-    for doc in burned_docs:
-
-        # logger.info(f"Handling burned doc: {doc[0]}")
-
-        if not doc_labels:
-            doc_labels: dict[str | int, AnnotationLabelPythonType] = doc[4]
-
-        if not text_labels:
-            text_labels: dict[str | int, AnnotationLabelPythonType] = doc[3]
-
-        base64_img_bytes = doc[1].encode("utf-8")
-        decoded_file_data = base64.decodebytes(base64_img_bytes)
-        # logger.info("Data decoded successfully")
-
-        zip_file.writestr(doc[0], decoded_file_data)
-        # logger.info("Pdf written successfully")
-
-        annotated_docs[doc[0]] = doc[2]
-        # logger.info("doc json added to json")
-
-    export_file_data: OpenContractsExportDataJsonPythonType = {
-        "annotated_docs": annotated_docs,
-        "corpus": package_corpus_for_export(corpus),
-        "label_set": package_label_set_for_export(corpus.label_set),
-        "doc_labels": doc_labels,
-        "text_labels": text_labels,
-    }
-
-    json_str = json.dumps(export_file_data) + "\n"
-
-    json_bytes = json_str.encode("utf-8")
+    # Skip docs that failed to burn
+    burned_docs = [doc for doc in burned_docs if doc[1] and doc[2]]
+
+    with tempfile.TemporaryFile() as output_file:
+
+        with zipfile.ZipFile(
+            output_file, mode="w", compression=zipfile.ZIP_DEFLATED
+        ) as zip_file:
+
+            for doc in burned_docs:
+
+                if not doc_labels:
+                    doc_labels = doc[4]
+
+                if not text_labels:
+                    text_labels = doc[3]
+
+                with default_storage.open(doc[1], "rb") as pdf_file, zip_file.open(
+                    doc[0], mode="w", force_zip64=True
+                ) as zip_entry:
+                    shutil.copyfileobj(pdf_file, zip_entry, EXPORT_COPY_CHUNK_SIZE)
+
+            # Write data.json incrementally. The resulting json is the same as json.dumps() of an
+            # OpenContractsExportDataJsonPythonType, but only one doc's json is in memory at a time.
+            with zip_file.open("data.json", mode="w", force_zip64=True) as data_json:
+
+                data_json.write(b'{"annotated_docs": {')
+                for index, doc in enumerate(burned_docs):
+                    with default_storage.open(doc[2], "rb") as doc_json_file:
+                        doc_json = doc_json_file.read()
+                    if index > 0:
+                        data_json.write(b", ")
+                    data_json.write(json.dumps(doc[0]).encode("utf-8") + b": ")
+                    data_json.write(doc_json)
+
+                data_json.write(b"}, ")
+                for key, value in (
+                    ("corpus", package_corpus_for_export(corpus)),
+                    ("label_set", package_label_set_for_export(corpus.label_set)),
+                    ("doc_labels", doc_labels),
+                ):
+                    data_json.write(
+                        json.dumps(key).encode("utf-8")
+                        + b": "
+                        + json.dumps(value).encode("utf-8")
+                        + b", "
+                    )
+                data_json.write(
+                    b'"text_labels": '
+                    + json.dumps(text_labels).encode("utf-8")
+                    + b"}\n"
+                )
 
-    zip_file.writestr("data.json", json_bytes)
-    zip_file.close()
+        output_file.seek(0)
 
-    output_bytes.seek(io.SEEK_SET)
+        export = UserExport.objects.get(pk=export_id)
+        export.file.save(f"{corpus.title} EXPORT.zip", File(output_file))
+        export.finished = timezone.now()
+        export.backend_lock = False
+        export.save()
 
-    export = UserExport.objects.get(pk=export_id)
-    export.file.save(f"{corpus.title} EXPORT.zip", output_bytes)
-    export.finished = timezone.now()
-    export.backend_lock = False
-    export.save()
+    # Clean up the staged parts
+    for doc in burned_docs:
+        delete_document_export_parts(doc[1], doc[2])
 
     logger.info(f"Export {export_id} is completed. Signal should now notify creator.")
 
@@ -9,9 +9,10 @@ from django.utils import timezone
 
 from opencontractserver.documents.models import DocumentAnalysisRow
 from opencontractserver.extracts.models import Datacell, Extract
+from opencontractserver.tasks.data_extract_tasks import oc_llama_index_doc_query_batch
 from opencontractserver.types.enums import PermissionTypes
 from opencontractserver.utils.celery_tasks import get_task_by_name
-from opencontractserver.utils.permissioning import set_permissions_for_obj_to_user
+from opencontractserver.utils.permissioning import set_permissions_for_objs_to_user
 
 logger = logging.getLogger(__name__)
 
@@ -26,10 +27,23 @@ def mark_extract_complete(extract_id):
     extract.save()
 
 
+# Columns using the default pipeline can be run together, one task per document, when batching is enabled
+BATCHABLE_EXTRACT_TASK = (
+    "opencontractserver.tasks.data_extract_tasks.oc_llama_index_doc_query"
+)
+
+
 @shared_task
-def run_extract(extract_id: Optional[str | int], user_id: str | int):
+def run_extract(
+    extract_id: Optional[str | int],
+    user_id: str | int,
+    batched: Optional[bool] = None,
+):
     logger.info(f"Run extract for extract {extract_id}")
 
+    if batched is None:
+        batched = settings.EXTRACT_BATCH_MODE
+
     extract = Extract.objects.get(pk=extract_id)
 
     with transaction.atomic():
@@ -37,9 +51,11 @@ def run_extract(extract_id: Optional[str | int], user_id: str | int):
         extract.save()
 
     fieldset = extract.fieldset
+    columns = list(fieldset.columns.all())
 
     document_ids = extract.documents.all().values_list("id", flat=True)
     tasks = []
+    cell_ids = []
 
     for document_id in document_ids:
 
@@ -48,7 +64,9 @@ def run_extract(extract_id: Optional[str | int], user_id: str | int):
         )
         row_results.save()
 
-        for column in fieldset.columns.all():
+        batched_cell_ids = []
+
+        for column in columns:
             with transaction.atomic():
                 cell = Datacell.objects.create(
                     extract=extract,
@@ -57,10 +75,19 @@ def run_extract(extract_id: Optional[str | int], user_id: str | int):
                     creator_id=user_id,
                     document_id=document_id,
                 )
-                set_permissions_for_obj_to_user(user_id, cell, [PermissionTypes.CRUD])
+                cell_ids.append(cell.pk)
 
                 # Add data cell to tracking
                 row_results.data.add(cell)
+
+                if (
+                    batched
+                    and column.task_name == BATCHABLE_EXTRACT_TASK
+                    and not column.agentic
+                ):
+                    batched_cell_ids.append(cell.pk)
+                    continue
+
                 # Get the task function dynamically based on the column's task_name
                 task_func = get_task_by_name(column.task_name)
                 if task_func is None:
@@ -72,4 +99,12 @@ def run_extract(extract_id: Optional[str | int], user_id: str | int):
                 # Add the task to the group
                 tasks.append(task_func.si(cell.pk))
 
+        if batched_cell_ids:
+            tasks.append(oc_llama_index_doc_query_batch.si(batched_cell_ids))
+
+    # Permission all the cells at once (before any task can run) instead of cell-by-cell
+    set_permissions_for_objs_to_user(
+        user_id, Datacell, cell_ids, [PermissionTypes.CRUD], replace=False
+    )
+
     chord(group(*tasks))(mark_extract_complete.si(extract_id))
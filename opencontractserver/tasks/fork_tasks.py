@@ -2,17 +2,20 @@ import logging
 from pathlib import Path
 from typing import Optional
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 from django.db import transaction
+from django.db.models.fields.files import FieldFile
 
 from config import celery_app
+from opencontractserver.annotations.embedding_queue import annotation_embedding_queue
 from opencontractserver.annotations.models import Annotation, AnnotationLabel, LabelSet
+from opencontractserver.annotations.page_cache import invalidate_page_annotations
 from opencontractserver.corpuses.models import Corpus
 from opencontractserver.documents.models import Document
 from opencontractserver.types.enums import PermissionTypes
-from opencontractserver.utils.permissioning import set_permissions_for_obj_to_user
+from opencontractserver.utils.permissioning import set_permissions_for_objs_to_user
 
 # Excellent django logging guidance here: https://docs.python.org/3/howto/logging-cookbook.html
 logger = logging.getLogger(__name__)
@@ -20,200 +23,257 @@ logger.setLevel(logging.DEBUG)
 
 User = get_user_model()
 
+# Stored files a forked document can share with (or, without copy-on-write, copy from) its original
+FORKED_DOCUMENT_FILE_FIELDS = (
+    "pdf_file",
+    "txt_extract_file",
+    "pawls_parse_file",
+    "pawls_binary_file",
+    "icon",
+)
 
-@celery_app.task()
+
+def _copy_stored_file(field_file: FieldFile) -> str:
+    """
+    Duplicate a stored file under a new key and return that key. Only used when forking without copy-on-write.
+    """
+    with default_storage.open(field_file.name, "rb") as file_obj:
+        return default_storage.save(
+            f"{Path(field_file.name).parent}/fork_{Path(field_file.name).name}",
+            file_obj,
+        )
+
+
+def _report_fork_progress(task, stage: str, done: int, total: int):
+    logger.info(f"fork_corpus() - {stage}: {done} of {total}")
+    # Eager (test) runs have no result backend to report to
+    if task.request.id and not task.request.is_eager:
+        task.update_state(
+            state="PROGRESS", meta={"stage": stage, "done": done, "total": total}
+        )
+
+
+def _fork_labels(
+    corpus: Corpus, label_set_id: Optional[str], user_id: str, copy_on_write: bool
+) -> dict[int, int]:
+
+    if not label_set_id:
+        return {}
+
+    with transaction.atomic():
+
+        old_label_set = LabelSet.objects.get(pk=label_set_id)
+        label_set = LabelSet.objects.create(
+            creator_id=user_id,
+            title=f"[FORK] {old_label_set.title}",
+            description=old_label_set.description,
+        )
+        if old_label_set.icon:
+            label_set.icon.name = (
+                old_label_set.icon.name
+                if copy_on_write
+                else _copy_stored_file(old_label_set.icon)
+            )
+            label_set.save()
+        logger.info(f"Cloned labelset: {label_set}")
+
+        old_labels = list(old_label_set.annotation_labels.all())
+        new_labels = AnnotationLabel.objects.bulk_create(
+            [
+                AnnotationLabel(
+                    creator_id=user_id,
+                    label_type=old_label.label_type,
+                    color=old_label.color,
+                    description=old_label.description,
+                    icon=old_label.icon,
+                    text=old_label.text,
+                )
+                for old_label in old_labels
+            ]
+        )
+        label_set.annotation_labels.add(*new_labels)
+
+        # Point the corpus at the cloned labelset
+        corpus.label_set = label_set
+        corpus.save()
+
+    return {
+        old_label.id: new_label.id
+        for old_label, new_label in zip(old_labels, new_labels)
+    }
+
+
+def _fork_document_batch(
+    corpus: Corpus,
+    doc_ids: list[str],
+    user_id: str,
+    copy_on_write: bool,
+) -> dict[int, int]:
+
+    with transaction.atomic():
+
+        old_ids = []
+        forked_docs = []
+        for document in Document.objects.filter(pk__in=doc_ids).order_by("pk"):
+
+            old_ids.append(document.pk)
+
+            # Resetting the pk makes bulk_create insert a NEW row with the old row's values, except as modified. With
+            # copy-on-write the clone keeps pointing at the original's stored files. Media storage never overwrites
+            # an existing key, so anything that later rewrites a file for either document (a re-parse, a new
+            # thumbnail) saves a new object for that document only and the other keeps the original.
+            document.pk = None
+            document._state.adding = True
+            document.title = f"[FORK] {document.title}"
+            document.creator_id = user_id
+            document.backend_lock = False
+
+            if not copy_on_write:
+                for field_name in FORKED_DOCUMENT_FILE_FIELDS:
+                    field_file = getattr(document, field_name)
+                    if field_file:
+                        field_file.name = _copy_stored_file(field_file)
+
+            forked_docs.append(document)
+
+        forked_docs = Document.objects.bulk_create(forked_docs)
+        corpus.documents.add(*forked_docs)
+
+        doc_map = {
+            old_id: forked_doc.pk for old_id, forked_doc in zip(old_ids, forked_docs)
+        }
+        set_permissions_for_objs_to_user(
+            user_id,
+            Document,
+            list(doc_map.values()),
+            [PermissionTypes.CRUD],
+            replace=False,
+        )
+
+    return doc_map
+
+
+def _fork_annotation_batch(
+    corpus: Corpus,
+    annotation_ids: list[str],
+    doc_map: dict[int, int],
+    label_map: dict[int, int],
+    user_id: str,
+) -> int:
+
+    with transaction.atomic():
+
+        forked_annotations = []
+        for annotation in Annotation.objects.filter(pk__in=annotation_ids):
+
+            # Copy the annotation, update label and doc object references using our
+            # maps of old ids to new ids
+            annotation.pk = None
+            annotation._state.adding = True
+            annotation.creator_id = user_id
+            annotation.corpus_id = corpus.id
+            annotation.document_id = doc_map[annotation.document_id]
+            if annotation.annotation_label_id is not None:
+                annotation.annotation_label_id = label_map[
+                    annotation.annotation_label_id
+                ]
+            forked_annotations.append(annotation)
+
+        forked_annotations = Annotation.objects.bulk_create(forked_annotations)
+        set_permissions_for_objs_to_user(
+            user_id,
+            Annotation,
+            [annotation.id for annotation in forked_annotations],
+            [PermissionTypes.CRUD],
+            replace=False,
+        )
+
+        # The forked documents were committed by an earlier batch, so their (empty) pages may already be cached
+        invalidate_page_annotations(
+            {annotation.document_id for annotation in forked_annotations}
+        )
+
+        # bulk_create skips the post_save signal, so queue anything that still needs an embedding ourselves
+        annotation_embedding_queue.enqueue_many(
+            [
+                annotation.id
+                for annotation in forked_annotations
+                if annotation.embedding is None
+            ]
+        )
+
+    return len(forked_annotations)
+
+
+@celery_app.task(bind=True)
 def fork_corpus(
+    self,
     new_corpus_id: str,
     doc_ids: list[str],
     label_set_id: str,
     annotation_ids: list[str],
     user_id: str,
+    copy_on_write: Optional[bool] = None,
 ) -> Optional[str]:
+    """
+    Copy a corpus' labelset, labels, documents and annotations into the (already created) corpus new_corpus_id.
+
+    Rows are bulk created settings.CORPUS_FORK_BATCH_SIZE at a time, each batch in its own transaction, with
+    progress reported as the task's PROGRESS state. With copy_on_write (default settings.CORPUS_FORK_COPY_ON_WRITE),
+    forked documents share the original's stored pdf / text / PAWLS / icon files rather than copying them.
+    """
 
     logger.info(
-        f"Start fork_corpus -----\n\tnew_corpus_id: {new_corpus_id}\n\tdoc_ids: "
-        f"{doc_ids}\n\tannotation_ids: {annotation_ids}\n\tuser_id: {user_id}"
+        f"Start fork_corpus -----\n\tnew_corpus_id: {new_corpus_id}\n\tdocs: "
+        f"{len(doc_ids)}\n\tannotations: {len(annotation_ids)}\n\tuser_id: {user_id}"
     )
 
+    if copy_on_write is None:
+        copy_on_write = settings.CORPUS_FORK_COPY_ON_WRITE
+    batch_size = settings.CORPUS_FORK_BATCH_SIZE
+
     # We need reference to corpus model so we can unlock it upon completion
     corpus = Corpus.objects.get(pk=new_corpus_id)
 
-    with transaction.atomic():
-
-        try:
+    try:
 
-            label_map = {}
-            doc_map = {}
-            label_ids = []
+        label_map = _fork_labels(corpus, label_set_id, user_id, copy_on_write)
+        logger.info(f"Label map: {label_map}")
 
-            try:
-                # Create the label set copy first.
-                old_label_set = LabelSet.objects.get(pk=label_set_id)
-                label_ids = list(
-                    old_label_set.annotation_labels.all().values_list("id", flat=True)
-                )
-
-                label_set = LabelSet(
-                    creator_id=user_id,
-                    title=f"[FORK] {old_label_set.title}",
-                    description=old_label_set.description,
-                )
-                label_set.save()
-                logger.info(f"Cloned labelset: {label_set}")
-
-                # If there's an icon... copy it to a new file
-                if old_label_set.icon:
-                    icon_obj = default_storage.open(old_label_set.icon.name)
-                    icon_file = ContentFile(icon_obj.read())
-                    logger.info(
-                        f"Label set icon name: {Path(old_label_set.icon.name).name}"
-                    )
-                    label_set.icon.save(Path(old_label_set.icon.name).name, icon_file)
-                    label_set.save()
-
-            except Exception as e:
-                logger.error(f"ERROR forking label_set for corpus {new_corpus_id}: {e}")
-                raise e
-
-            # Get old label objs (can't just get these earlier as manytomany values are cleared by django when we call
-            # clear(), it seems)
-            # Copy labels and add new labels to label_set
-            logger.info("Cloning labels")
-            try:
-                for old_label in AnnotationLabel.objects.filter(pk__in=label_ids):
-
-                    try:
-                        new_label = AnnotationLabel(
-                            creator_id=user_id,
-                            label_type=old_label.label_type,
-                            color=old_label.color,
-                            description=old_label.description,
-                            icon=old_label.icon,
-                            text=old_label.text,
-                        )
-                        new_label.save()
-
-                        # store map of old id to new id
-                        label_map[old_label.id] = new_label.id
-
-                        # Add to new labelset
-                        label_set.annotation_labels.add(new_label)
-
-                    except Exception as e:
-                        logger.error(
-                            f"ERROR - could not fork label for labelset {label_set_id}: {e}"
-                        )
-
-                # Save label_set
-                label_set.save()
-
-                # Update corpus LabelSet to point to cloned copy of original labelset:
-                corpus.label_set = label_set
-
-            except Exception as e:
-                logger.error(
-                    f"ERROR - could not populate labels for labelset {label_set_id}: {e}"
+        doc_map = {}
+        for batch_start in range(0, len(doc_ids), batch_size):
+            doc_map.update(
+                _fork_document_batch(
+                    corpus,
+                    doc_ids[batch_start : batch_start + batch_size],
+                    user_id,
+                    copy_on_write,
                 )
-                raise e
-
-            # logger.info("Cloning documents")
-            for document in Document.objects.filter(pk__in=doc_ids):
-
-                try:
-                    logger.info(f"Clone document: {document}")
-                    old_id = document.pk
-
-                    # First start by copying the document (the procedure below
-                    # is a trick to get ORM to copy the Django database obj). Resetting
-                    # pk to None will, on save, save a NEW object with old obj properties,
-                    # except as modified
-                    document.pk = None
-                    document.title = f"[FORK] {document.title}"
-                    document.creator_id = user_id
-                    document.backend_lock = True  # Lock doc while we process stuff
-                    document.save()
-
-                    # If there's a text extract file... copy it to a new file
-                    if document.txt_extract_file:
-                        file_object = default_storage.open(
-                            document.txt_extract_file.name
-                        )
-                        txt_file = ContentFile(file_object.read())
-                        document.txt_extract_file.save(f"{document.id}.txt", txt_file)
-                        document.save()
-                        logger.info("Clone txt layer")
-
-                    # If there's a pawls file... copy it to new file
-                    if document.pawls_parse_file:
-                        file_object = default_storage.open(
-                            document.pawls_parse_file.name
-                        )
-                        pawls_file = ContentFile(file_object.read())
-                        document.pawls_parse_file.save(
-                            f"doc_{document.id}.pawls", pawls_file
-                        )
-                        document.save()
-                        logger.info("Cloned pawls file")
-
-                    # Unlock the document.
-                    document.backend_lock = False
-                    document.save()
-
-                    set_permissions_for_obj_to_user(
-                        user_id, document, [PermissionTypes.CRUD]
-                    )
-
-                    corpus.documents.add(document)
-
-                    # Store map of old id to new id
-                    doc_map[old_id] = document.pk
-
-                except Exception as e:
-                    logger.error(f"ERROR - could not fork document {document}: {e}")
-                    raise e
-
-            # Save updated corpus with docs and new LabelSet.
-            corpus.save()
-
-            logger.info("Start Annotations...")
-            logger.info(f"Label map: {label_map}")
-
-            # Fetch annotations and map to new docs, labels and corpus
-            for annotation in Annotation.objects.filter(pk__in=annotation_ids):
-
-                try:
-                    logger.info(f"Clone annotation: {annotation}")
-
-                    # Copy the annotation, update label and doc object references using our
-                    # object maps of old objs to new objs
-                    annotation.pk = None
-                    annotation.creator_id = user_id
-                    annotation.corpus_id = new_corpus_id
-                    annotation.document_id = doc_map[annotation.document.id]
-                    annotation.annotation_label_id = label_map[
-                        annotation.annotation_label.id
-                    ]
-                    annotation.save()
-
-                    set_permissions_for_obj_to_user(
-                        user_id, annotation, [PermissionTypes.CRUD]
-                    )
-
-                except Exception as e:
-                    logger.error(f"ERROR - could not fork annotation {annotation}: {e}")
-                    raise e
-
-            logger.info("Annotations completed...")
-
-            # Unlock the corpus
-            corpus.backend_lock = False
-            corpus.save()
-
-            return corpus.id
-
-        except Exception as e:
-            logger.error(f"ERROR - Unable to fork corpus: {e}")
-            corpus.backend_lock = False
-            corpus.error = True
-            corpus.save()
-            return None
+            )
+            _report_fork_progress(self, "documents", len(doc_map), len(doc_ids))
+
+        forked_annotation_count = 0
+        for batch_start in range(0, len(annotation_ids), batch_size):
+            forked_annotation_count += _fork_annotation_batch(
+                corpus,
+                annotation_ids[batch_start : batch_start + batch_size],
+                doc_map,
+                label_map,
+                user_id,
+            )
+            _report_fork_progress(
+                self, "annotations", forked_annotation_count, len(annotation_ids)
+            )
+
+        # Unlock the corpus
+        corpus.backend_lock = False
+        corpus.save()
+
+        return corpus.id
+
+    except Exception as e:
+        logger.error(f"ERROR - Unable to fork corpus: {e}")
+        corpus.backend_lock = False
+        corpus.error = True
+        corpus.save()
+        return None
@@ -2,10 +2,10 @@ import base64
 import json
 import logging
 import zipfile
-from typing import Any, Optional
+from typing import Optional
 
 from django.contrib.auth import get_user_model
-from django.core.files.base import ContentFile, File
+from django.core.files.base import ContentFile
 
 from config import celery_app
 from config.graphql.serializers import AnnotationLabelSerializer
@@ -17,16 +17,23 @@ from opencontractserver.annotations.models import (
 )
 from opencontractserver.corpuses.models import Corpus, TemporaryFileHandle
 from opencontractserver.documents.models import Document
-from opencontractserver.types.dicts import (
-    OpenContractsAnnotatedDocumentImportType,
-    OpenContractsExportDataJsonPythonType,
-)
+from opencontractserver.types.dicts import OpenContractsAnnotatedDocumentImportType
 from opencontractserver.types.enums import PermissionTypes
+from opencontractserver.utils.importing import (
+    ExportDataJsonReader,
+    bulk_create_labels,
+    bulk_import_annotated_docs,
+    validate_import_data_json,
+)
 from opencontractserver.utils.packaging import (
     unpack_corpus_from_export,
     unpack_label_set_from_export,
 )
-from opencontractserver.utils.permissioning import set_permissions_for_obj_to_user
+from opencontractserver.utils.pawls import save_pawls_binary
+from opencontractserver.utils.permissioning import (
+    set_permissions_for_obj_to_user,
+    set_permissions_for_objs_to_user,
+)
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -56,225 +63,74 @@ def import_corpus(
 
                 logger.info("import_corpus() - Job... loaded import data.")
 
-                text_label_inst_lookup: dict[str, Any] = {}
-                doc_label_inst_lookup: dict[str, Any] = {}
-                doc_isnt_lookup: dict[str, Any] = {}
-
                 files = importZip.namelist()
                 logger.info(f"import_corpus() - Raw files: {files}")
 
                 if "data.json" in files:
 
                     files.remove("data.json")
-                    with importZip.open("data.json") as corpus_data:
 
-                        data_json: OpenContractsExportDataJsonPythonType = json.loads(
-                            corpus_data.read().decode("UTF-8")
+                    # data.json is read incrementally so only one document's tokens are in memory at a time
+                    data_json_reader = ExportDataJsonReader(importZip)
+                    data_json = data_json_reader.read_metadata()
+
+                    # Validate the whole export once, before anything is created
+                    validate_import_data_json(
+                        data_json, data_json_reader.annotated_doc_keys, files
+                    )
+
+                    text_labels = data_json["text_labels"]
+                    doc_labels = data_json["doc_labels"]
+
+                    label_set_data = {**data_json["label_set"]}  # noqa
+                    label_set_data.pop("id")  # noqa
+
+                    corpus_data = {**data_json["corpus"]}
+                    corpus_data.pop("id")
+
+                    # Create labelset by loading JSON and converting to Django with DRF serializer
+                    labelset_obj = unpack_label_set_from_export(
+                        data=label_set_data, user=user_obj  # noqa
+                    )
+                    logger.info(f"LabelSet created: {labelset_obj}")
+
+                    # If a seed_corpus_id was passed in (so the mutation could return a corpus id for lookups
+                    # immediately), this gets mixed in and passed to the serializer
+                    if seed_corpus_id:
+                        corpus_obj = unpack_corpus_from_export(
+                            data=corpus_data,  # noqa
+                            user=user_obj,
+                            label_set_id=labelset_obj.id,
+                            corpus_id=seed_corpus_id,
                         )
-                        text_labels = data_json["text_labels"]
-                        doc_labels = data_json["doc_labels"]
-
-                        label_set_data = {**data_json["label_set"]}  # noqa
-                        label_set_data.pop("id")  # noqa
-
-                        corpus_data = {**data_json["corpus"]}
-                        corpus_data.pop("id")
-
-                        # Create labelset by loading JSON and converting to Django with DRF serializer
-                        labelset_obj = unpack_label_set_from_export(
-                            data=label_set_data, user=user_obj  # noqa
+                    else:
+                        corpus_obj = unpack_corpus_from_export(
+                            data=corpus_data,  # noqa
+                            user=user_obj,
+                            label_set_id=labelset_obj.id,
+                            corpus_id=None,
                         )
-                        logger.info(f"LabelSet created: {labelset_obj}")
-
-                        # If a seed_corpus_id was passed in (so the mutation could return a corpus id for lookups
-                        # immediately), this gets mixed in and passed to the serializer
-                        if seed_corpus_id:
-                            corpus_obj = unpack_corpus_from_export(
-                                data=corpus_data,  # noqa
-                                user=user_obj,
-                                label_set_id=labelset_obj.id,
-                                corpus_id=seed_corpus_id,
-                            )
-                        else:
-                            corpus_obj = unpack_corpus_from_export(
-                                data=corpus_data,  # noqa
-                                user=user_obj,
-                                label_set_id=labelset_obj.id,
-                                corpus_id=None,
-                            )
-                        logger.info(f"Created corpus_obj: {corpus_obj}")
-
-                        logger.info("Create text-level annotations")
-                        for label in text_labels:
-
-                            logger.info(
-                                f"Create text-level annotations for: {label} / User: {user_id}"
-                            )
-
-                            # Convert the label JSON to an AnnotationLabel obj using a
-                            # DRF serializer and django API
-                            label_data = {**text_labels[label]}
-                            label_data.pop("id")
-                            label_data["creator"] = user_id
-
-                            label_serializer = AnnotationLabelSerializer(
-                                data=label_data
-                            )
-                            label_serializer.is_valid(raise_exception=True)
-                            label_obj = label_serializer.save()
-                            set_permissions_for_obj_to_user(
-                                user_obj, label_obj, [PermissionTypes.ALL]
-                            )
-
-                            # Add the resulting label to labelset
-                            labelset_obj.annotation_labels.add(label_obj)
-
-                            # Add the label name (text) to name / id lookup
-                            text_label_inst_lookup[label] = label_obj
-
-                            logger.info(f"Loaded text label: {label_obj}")
-
-                        for label in doc_labels:
-
-                            # Convert the label JSON to an AnnotationLabel obj using a
-                            # DRF serializer and django API
-                            doc_label_data = {**doc_labels[label]}
-                            doc_label_data.pop("id")
-                            doc_label_data["creator"] = user_id
-
-                            label_serializer = AnnotationLabelSerializer(
-                                data=doc_label_data
-                            )
-                            label_serializer.is_valid(raise_exception=True)
-                            label_obj = label_serializer.save()
-                            set_permissions_for_obj_to_user(
-                                user_obj, label_obj, [PermissionTypes.ALL]
-                            )
-
-                            # Add the resulting label to labelset
-                            labelset_obj.annotation_labels.add(label_obj)
-
-                            # Add the label name (text) to name / id lookup
-                            doc_label_inst_lookup[label] = label_obj
-
-                            logger.info(f"Loaded text label: {label_obj}")
-
-                        for doc in data_json["annotated_docs"]:
-
-                            logger.info(f"Start load for doc: {doc}")
-                            doc_data = data_json["annotated_docs"][doc]
-                            pawls_layers = doc_data["pawls_file_content"]
-                            # logger.info(f"Pawls layer: {doc_data['pawls_file_content']}")
-
-                            try:
-                                with importZip.open(doc) as pdfFile:
-
-                                    pdf_file = File(pdfFile, doc)
-                                    logger.info("pdf_file obj created in memory")
-
-                                    pawls_parse_file = ContentFile(
-                                        json.dumps(pawls_layers).encode("utf-8"),
-                                        name="pawls_tokens.json",
-                                    )
-                                    logger.info(
-                                        "Pawls parse file obj created in memory"
-                                    )
-
-                                    logger.info(
-                                        f"Create doc instance with creator: {user_obj}"
-                                    )
-                                    doc_obj = Document.objects.create(
-                                        title=data_json["annotated_docs"][doc]["title"],
-                                        description=f"Imported document with filename {doc}",
-                                        pdf_file=pdf_file,
-                                        pawls_parse_file=pawls_parse_file,
-                                        backend_lock=True,  # Lock doc so pawls parser doesn't pick it up (already done)
-                                        creator=user_obj,
-                                        page_count=len(pawls_layers),
-                                    )
-                                    logger.info(f"Doc created: {doc_obj}")
-
-                                    set_permissions_for_obj_to_user(
-                                        user_obj, doc_obj, [PermissionTypes.ALL]
-                                    )
-                                    logger.info("Doc permissioned")
-
-                                    doc_isnt_lookup[doc] = doc_obj
-
-                                    # Link to corpus
-                                    corpus_obj.documents.add(doc_obj)
-                                    corpus_obj.save()
-
-                            except Exception as e:
-                                logger.error(
-                                    f"import_corpus() - Error trying to load contract file: {e}"
-                                )
-
-                            # Create the doc labels...
-                            logger.info(f"Label lookup: {doc_label_inst_lookup}")
-                            for doc_label in data_json["annotated_docs"][doc][
-                                "doc_labels"
-                            ]:
-                                logger.info(f"Add doc label: {doc_label}")
-                                try:
-                                    annot_obj = Annotation(
-                                        annotation_label=doc_label_inst_lookup[
-                                            doc_label
-                                        ],
-                                        document=doc_isnt_lookup[doc],
-                                        corpus=corpus_obj,
-                                        creator=user_obj,
-                                    )
-                                    annot_obj.save()
-
-                                    set_permissions_for_obj_to_user(
-                                        user_obj, annot_obj, [PermissionTypes.ALL]
-                                    )
-
-                                except Exception as e:
-                                    logger.error(
-                                        f"import_corpus() - Error creating annotation: {e}"
-                                    )
-
-                            # Create the text labels
-                            logger.info(f"Doc inst lookup: {doc_isnt_lookup}")
-                            for annotation in data_json["annotated_docs"][doc][
-                                "labelled_text"
-                            ]:
-                                logger.info(
-                                    f"Add text label: {text_label_inst_lookup[annotation['annotationLabel']]}"
-                                )
-                                try:
-                                    logger.info(f"doc obj: {doc_isnt_lookup[doc]}")
-                                    annot_obj = Annotation.objects.create(
-                                        raw_text=annotation["rawText"],
-                                        page=annotation["page"],
-                                        json=annotation["annotation_json"],
-                                        annotation_label=text_label_inst_lookup[
-                                            annotation["annotationLabel"]
-                                        ],
-                                        document=doc_isnt_lookup[doc],
-                                        corpus=corpus_obj,
-                                        creator=user_obj,
-                                    )
-                                    annot_obj.save()
-
-                                    set_permissions_for_obj_to_user(
-                                        user_obj, annot_obj, [PermissionTypes.ALL]
-                                    )
-
-                                except Exception as e:
-                                    logger.error(
-                                        f"import_corpus() - Error creating txt annotation: {e} with input: {annotation}"
-                                    )
-
-                            # Unlock the document
-                            doc_obj.backend_lock = False
-                            doc_obj.save()
-
-                            logger.info("\tDoc load complete.")
-
-                        return corpus_obj.id
+                    logger.info(f"Created corpus_obj: {corpus_obj}")
+
+                    logger.info("Create labels")
+                    text_label_inst_lookup = bulk_create_labels(
+                        text_labels, user_id, labelset_obj
+                    )
+                    doc_label_inst_lookup = bulk_create_labels(
+                        doc_labels, user_id, labelset_obj
+                    )
+
+                    import_stats = bulk_import_annotated_docs(
+                        import_zip=importZip,
+                        annotated_docs=data_json_reader.iter_annotated_docs(),
+                        corpus=corpus_obj,
+                        user_id=user_id,
+                        text_label_lookup=text_label_inst_lookup,
+                        doc_label_lookup=doc_label_inst_lookup,
+                    )
+                    logger.info(f"import_corpus() - import complete: {import_stats}")
+
+                    return corpus_obj.id
 
         # If we didn't successfully complete import
         return None
@@ -389,6 +245,9 @@ def import_document_to_corpus(
             creator_id=user_id,
             page_count=document_import_data["doc_data"]["page_count"],
         )
+        save_pawls_binary(
+            doc_obj, document_import_data["doc_data"]["pawls_file_content"]
+        )
         set_permissions_for_obj_to_user(user_id, doc_obj, [PermissionTypes.ALL])
 
         # Link to corpus
@@ -397,6 +256,7 @@ def import_document_to_corpus(
 
         # Import the annotations for the document
         doc_annotations_data = document_import_data["doc_data"]["labelled_text"]
+        annotation_ids = []
         for annotation in doc_annotations_data:
             label_obj = existing_text_labels[annotation["annotationLabel"]]
             annot_obj = Annotation.objects.create(
@@ -409,7 +269,7 @@ def import_document_to_corpus(
                 creator_id=user_id,
             )
             annot_obj.save()
-            set_permissions_for_obj_to_user(user_id, annot_obj, [PermissionTypes.ALL])
+            annotation_ids.append(annot_obj.id)
 
         for doc_label in document_import_data["doc_data"]["doc_labels"]:
             label_obj = existing_doc_labels[doc_label]
@@ -420,7 +280,11 @@ def import_document_to_corpus(
                 creator_id=user_id,
             )
             annot_obj.save()
-            set_permissions_for_obj_to_user(user_id, annot_obj, [PermissionTypes.ALL])
+            annotation_ids.append(annot_obj.id)
+
+        set_permissions_for_objs_to_user(
+            user_id, Annotation, annotation_ids, [PermissionTypes.ALL], replace=False
+        )
 
         return doc_obj.id
 
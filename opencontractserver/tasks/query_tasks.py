@@ -6,12 +6,15 @@ from django.conf import settings
 from django.utils import timezone
 from llama_index.core import Settings, VectorStoreIndex
 from llama_index.core.query_engine import CitationQueryEngine
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from llama_index.llms.openai import OpenAI
 
 from config import celery_app
 from opencontractserver.corpuses.models import CorpusQuery
 from opencontractserver.llms.vector_stores import DjangoAnnotationVectorStore
+from opencontractserver.utils.model_registry import (
+    HUGGINGFACE_EMBEDDER,
+    model_registry,
+)
 
 
 @celery_app.task()
@@ -24,10 +27,7 @@ def run_query(
     query.save()
 
     try:
-        embed_model = HuggingFaceEmbedding(
-            model_name="multi-qa-MiniLM-L6-cos-v1", cache_folder="/models"
-        )  # Using our pre-load cache path where the model was stored on container build
-        Settings.embed_model = embed_model
+        Settings.embed_model = model_registry.get(HUGGINGFACE_EMBEDDER)
 
         llm = OpenAI(model=settings.OPENAI_MODEL, api_key=settings.OPENAI_API_KEY)
         Settings.llm = llm
@@ -0,0 +1,87 @@
+from typing import Optional
+
+from django.conf import settings
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils.module_loading import import_string
+from graphene.test import Client
+
+from config.graphql.instrumentation import QueryInstrumentationMiddleware
+from config.graphql.schema import schema
+
+
+class GraphQLQueryBudgetMixin:
+    """
+    TestCase mixin to assert a GraphQL operation runs no more than a given number of SQL queries. On failure, the
+    message breaks the queries down by resolver (see config.graphql.instrumentation) and lists the SQL.
+
+    Operations run through the middleware in settings.GRAPHENE["MIDDLEWARE"], as they would in production, against a
+    real request (the auth middleware reads its headers).
+    """
+
+    def _execute_graphql(
+        self, user, query: str, variables: Optional[dict] = None
+    ) -> tuple[dict, CaptureQueriesContext, object]:
+
+        middleware = [
+            middleware_class()
+            for middleware_class in map(import_string, settings.GRAPHENE["MIDDLEWARE"])
+            if middleware_class is not QueryInstrumentationMiddleware
+        ]
+
+        context = RequestFactory().post("/graphql")
+        context.user = user
+        client = Client(
+            schema,
+            context_value=context,
+            middleware=[*middleware, QueryInstrumentationMiddleware(enabled=True)],
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            result = client.execute(query, variables=variables)
+
+        self.assertIsNone(result.get("errors"))
+        return result["data"], queries, context
+
+    def countGraphQLQueries(
+        self, user, query: str, variables: Optional[dict] = None
+    ) -> tuple[dict, int]:
+        """
+        Execute query as user, assert it succeeded and return its data and the number of queries it ran
+        """
+
+        data, queries, _ = self._execute_graphql(user, query, variables)
+        return data, len(queries)
+
+    def assertGraphQLQueryBudget(
+        self,
+        user,
+        query: str,
+        max_queries: int,
+        variables: Optional[dict] = None,
+    ) -> dict:
+        """
+        Execute query as user, assert it succeeded within max_queries queries and return its data
+        """
+
+        data, queries, context = self._execute_graphql(user, query, variables)
+
+        if len(queries) > max_queries:
+            resolver_stats = sorted(
+                getattr(context, "resolver_query_stats", {}).items(),
+                key=lambda item: -item[1]["queries"],
+            )
+            self.fail(
+                f"Operation ran {len(queries)} queries, over its budget of {max_queries}.\n"
+                "By resolver:\n"
+                + "\n".join(
+                    f"  {resolver}: {stats['queries']} queries in {stats['calls']} calls"
+                    for resolver, stats in resolver_stats
+                    if stats["queries"]
+                )
+                + "\nQueries:\n"
+                + "\n".join(f"  {query['sql']}" for query in queries.captured_queries)
+            )
+
+        return data
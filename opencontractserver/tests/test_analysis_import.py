@@ -0,0 +1,196 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from opencontractserver.analyzer.models import Analysis, Analyzer
+from opencontractserver.analyzer.views import AnalysisCallbackView
+from opencontractserver.annotations.models import Annotation
+from opencontractserver.annotations.signals import process_annot_on_create_atomic
+from opencontractserver.corpuses.models import Corpus
+from opencontractserver.documents.models import Document
+from opencontractserver.documents.signals import process_doc_on_create_atomic
+from opencontractserver.tasks.analyzer_tasks import import_analysis
+from opencontractserver.tests.fixtures import SAMPLE_GREMLIN_OUTPUT_FOR_PUBLIC_DOCS
+from opencontractserver.types.enums import JobStatus, PermissionTypes
+from opencontractserver.utils.permissioning import user_has_permission_for_obj
+
+User = get_user_model()
+
+
+class AnalysisImportTestCase(TestCase):
+    def setUp(self):
+
+        post_save.disconnect(process_annot_on_create_atomic, sender=Annotation)
+        post_save.disconnect(process_doc_on_create_atomic, sender=Document)
+
+        self.user = User.objects.create_user(username="bob", password="12345678")
+        self.corpus = Corpus.objects.create(title="Analyzed", creator=self.user)
+        self.docs = [
+            Document.objects.create(title=f"Doc {i}", creator=self.user)
+            for i in range(3)
+        ]
+        self.corpus.documents.add(*self.docs)
+
+        self.analyzer = Analyzer.objects.create(
+            id="test.analyzer",
+            description="Test Analyzer",
+            creator=self.user,
+            task_name="not.a.real.task",
+        )
+        self.analysis = Analysis.objects.create(
+            analyzer=self.analyzer,
+            analyzed_corpus=self.corpus,
+            creator=self.user,
+        )
+
+        # Map the sample Gremlin output's docs onto our docs
+        sample_output = json.loads(SAMPLE_GREMLIN_OUTPUT_FOR_PUBLIC_DOCS.read_text())
+        self.analysis_results = {
+            **sample_output,
+            "annotated_docs": {
+                str(doc.id): doc_annotations
+                for doc, doc_annotations in zip(
+                    self.docs, sample_output["annotated_docs"].values()
+                )
+            },
+        }
+        self.expected_counts = {
+            doc.id: len(doc_annotations["doc_labels"])
+            + len(doc_annotations["labelled_text"])
+            for doc, doc_annotations in zip(
+                self.docs, self.analysis_results["annotated_docs"].values()
+            )
+        }
+
+    def _import(self, analysis_results=None) -> bool:
+        return (
+            import_analysis.si(
+                creator_id=self.user.id,
+                analysis_id=self.analysis.id,
+                analysis_results=analysis_results,
+            )
+            .apply()
+            .get()
+        )
+
+    def test_bulk_import(self):
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(self._import(self.analysis_results))
+
+        for doc in self.docs:
+            self.assertEqual(
+                Annotation.objects.filter(analysis=self.analysis, document=doc).count(),
+                self.expected_counts[doc.id],
+            )
+
+        annotation = Annotation.objects.filter(analysis=self.analysis).first()
+        self.assertEqual(annotation.corpus_id, self.corpus.id)
+        self.assertTrue(
+            user_has_permission_for_obj(self.user, annotation, PermissionTypes.CRUD)
+        )
+
+        # Far fewer queries than the ~1,850 annotations imported
+        self.assertLess(len(queries), sum(self.expected_counts.values()) // 5)
+
+    def test_errors_are_logged_once(self):
+
+        annotated_docs = self.analysis_results["annotated_docs"]
+        annotated_docs["999999"] = next(iter(annotated_docs.values()))
+        annotated_docs[str(self.docs[0].id)] = {
+            "doc_labels": [],
+            "labelled_text": [
+                {
+                    "id": "1",
+                    "annotationLabel": "NOT_A_LABEL",
+                    "rawText": "Nope",
+                    "page": 0,
+                    "annotation_json": {},
+                }
+            ],
+        }
+
+        self.assertTrue(self._import(self.analysis_results))
+
+        self.analysis.refresh_from_db()
+        log_lines = self.analysis.import_log.split("\n")
+        self.assertEqual(len(log_lines), 2)
+        self.assertIn("999999", log_lines[0] + log_lines[1])
+        self.assertIn("NOT_A_LABEL", log_lines[0] + log_lines[1])
+
+        # The other docs were still imported
+        self.assertEqual(
+            Annotation.objects.filter(
+                analysis=self.analysis, document=self.docs[1]
+            ).count(),
+            self.expected_counts[self.docs[1].id],
+        )
+
+    def test_resume_from_received_callback_file(self):
+
+        self.analysis.received_callback_file.save(
+            f"analysis_{self.analysis.id}_results.json",
+            ContentFile(json.dumps(self.analysis_results).encode("utf-8")),
+        )
+
+        self.assertTrue(self._import())
+        total = Annotation.objects.filter(analysis=self.analysis).count()
+        self.assertEqual(total, sum(self.expected_counts.values()))
+
+        # Simulate an import that died before finishing the last doc
+        Annotation.objects.filter(
+            analysis=self.analysis, document=self.docs[2]
+        ).delete()
+
+        self.assertTrue(self._import())
+
+        # Only the missing doc was imported again - nothing was duplicated
+        self.assertEqual(
+            Annotation.objects.filter(analysis=self.analysis).count(), total
+        )
+
+    def test_callback_stores_results_and_imports_from_storage(self):
+
+        request = APIRequestFactory().post(
+            f"/analysis/{self.analysis.id}/complete",
+            json.dumps(self.analysis_results),
+            content_type="application/json",
+            HTTP_CALLBACK_TOKEN=str(self.analysis.callback_token),
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = AnalysisCallbackView.as_view()(
+                request, analysis_id=self.analysis.id
+            )
+
+        self.assertEqual(response.status_code, 202)
+
+        self.analysis.refresh_from_db()
+        self.assertEqual(self.analysis.status, JobStatus.COMPLETED)
+        with self.analysis.received_callback_file.open("rb") as callback_file:
+            self.assertEqual(json.loads(callback_file.read()), self.analysis_results)
+
+        # The import task ran from the stored file
+        self.assertEqual(
+            Annotation.objects.filter(analysis=self.analysis).count(),
+            sum(self.expected_counts.values()),
+        )
+
+    def test_invalid_stored_results_fail_the_analysis(self):
+
+        self.analysis.received_callback_file.save(
+            f"analysis_{self.analysis.id}_results.json",
+            ContentFile(json.dumps({"annotated_docs": {}}).encode("utf-8")),
+        )
+
+        self.assertFalse(self._import())
+
+        self.analysis.refresh_from_db()
+        self.assertEqual(self.analysis.status, JobStatus.FAILED)
+        self.assertIn("label_set", self.analysis.import_log)
@@ -0,0 +1,122 @@
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from opencontractserver.annotations.models import Annotation
+from opencontractserver.annotations.signals import process_annot_on_create_atomic
+from opencontractserver.documents.models import Document
+from opencontractserver.documents.signals import process_doc_on_create_atomic
+from opencontractserver.tests.fixtures import SAMPLE_PDF_FILE_ONE_PATH
+from opencontractserver.types.enums import PermissionTypes
+from opencontractserver.utils.permissioning import (
+    get_permission_codenames,
+    get_users_permissions_for_obj,
+    set_permissions_for_objs_to_user,
+    user_has_permission_for_obj,
+)
+
+User = get_user_model()
+
+
+class BulkPermissioningTestCase(TestCase):
+    def setUp(self):
+
+        post_save.disconnect(process_annot_on_create_atomic, sender=Annotation)
+        post_save.disconnect(process_doc_on_create_atomic, sender=Document)
+
+        self.user = User.objects.create_user(username="bob", password="12345678")
+        self.other_user = User.objects.create_user(
+            username="alice", password="12345678"
+        )
+        self.doc = Document.objects.create(
+            creator=self.user,
+            title="Test Doc",
+            pdf_file=ContentFile(
+                SAMPLE_PDF_FILE_ONE_PATH.open("rb").read(), name="test.pdf"
+            ),
+        )
+        self.annotations = [
+            Annotation.objects.create(
+                raw_text=f"Annotation {i}", document=self.doc, creator=self.user
+            )
+            for i in range(50)
+        ]
+        self.annotation_ids = [annotation.id for annotation in self.annotations]
+
+    def test_permission_codenames(self):
+
+        self.assertEqual(
+            get_permission_codenames("annotation", [PermissionTypes.CRUD]),
+            [
+                "create_annotation",
+                "read_annotation",
+                "update_annotation",
+                "remove_annotation",
+            ],
+        )
+        self.assertEqual(
+            len(get_permission_codenames("annotation", [PermissionTypes.ALL])), 6
+        )
+        self.assertEqual(
+            get_permission_codenames("annotation", [PermissionTypes.READ]),
+            ["read_annotation"],
+        )
+
+    def test_bulk_permissions_match_single_object_permissions(self):
+
+        set_permissions_for_objs_to_user(
+            self.user, Annotation, self.annotation_ids, [PermissionTypes.CRUD]
+        )
+
+        for annotation in self.annotations:
+            self.assertTrue(
+                user_has_permission_for_obj(self.user, annotation, PermissionTypes.CRUD)
+            )
+            self.assertFalse(
+                user_has_permission_for_obj(
+                    self.user, annotation, PermissionTypes.PUBLISH
+                )
+            )
+
+        self.assertEqual(
+            get_users_permissions_for_obj(self.other_user, self.annotations[0]), set()
+        )
+
+    def test_bulk_permissions_replace_existing(self):
+
+        set_permissions_for_objs_to_user(
+            self.user.id, Annotation, self.annotation_ids, [PermissionTypes.ALL]
+        )
+        set_permissions_for_objs_to_user(
+            self.user.id, Annotation, self.annotation_ids[:10], [PermissionTypes.READ]
+        )
+
+        self.assertEqual(
+            get_users_permissions_for_obj(self.user, self.annotations[0]),
+            {"read_annotation"},
+        )
+        self.assertEqual(
+            len(get_users_permissions_for_obj(self.user, self.annotations[20])), 6
+        )
+
+    def test_bulk_permissions_query_count_is_independent_of_object_count(self):
+
+        # Warm the ContentType cache so both measured calls start from the same state
+        set_permissions_for_objs_to_user(
+            self.user, Annotation, self.annotation_ids[:1], [PermissionTypes.ALL]
+        )
+
+        with CaptureQueriesContext(connection) as few_objects:
+            set_permissions_for_objs_to_user(
+                self.user, Annotation, self.annotation_ids[:2], [PermissionTypes.ALL]
+            )
+
+        with CaptureQueriesContext(connection) as many_objects:
+            set_permissions_for_objs_to_user(
+                self.user, Annotation, self.annotation_ids, [PermissionTypes.ALL]
+            )
+
+        self.assertEqual(len(few_objects), len(many_objects))
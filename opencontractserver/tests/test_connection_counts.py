@@ -0,0 +1,216 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from graphene.test import Client
+
+from config.graphql.schema import schema
+from opencontractserver.annotations.models import Annotation, AnnotationLabel
+from opencontractserver.annotations.signals import process_annot_on_create_atomic
+from opencontractserver.documents.models import Document
+from opencontractserver.documents.signals import process_doc_on_create_atomic
+from opencontractserver.types.enums import LabelType
+from opencontractserver.utils.counting import count_queryset
+
+User = get_user_model()
+
+
+class TestContext:
+    def __init__(self, user):
+        self.user = user
+
+
+class ConnectionCountTestCase(TestCase):
+    def setUp(self):
+
+        post_save.disconnect(process_annot_on_create_atomic, sender=Annotation)
+        post_save.disconnect(process_doc_on_create_atomic, sender=Document)
+        cache.clear()
+
+        self.user = User.objects.create_user(username="bob", password="12345678")
+        self.document = Document.objects.create(title="Doc", creator=self.user)
+        label = AnnotationLabel.objects.create(
+            text="Label", label_type=LabelType.TOKEN_LABEL, creator=self.user
+        )
+        Annotation.objects.bulk_create(
+            [
+                Annotation(
+                    document=self.document,
+                    annotation_label=label,
+                    creator=self.user,
+                    raw_text=f"Annotation {i}",
+                    json={},
+                )
+                for i in range(25)
+            ]
+        )
+
+    def test_total_count_does_not_load_every_row(self):
+
+        with CaptureQueriesContext(connection) as queries:
+            result = Client(schema, context_value=TestContext(self.user)).execute(
+                """
+                {
+                  annotations(first: 2) {
+                    totalCount
+                    edges {
+                      node {
+                        rawText
+                      }
+                    }
+                  }
+                }
+                """
+            )
+
+        self.assertIsNone(result.get("errors"))
+        self.assertEqual(result["data"]["annotations"]["totalCount"], 25)
+        self.assertEqual(len(result["data"]["annotations"]["edges"]), 2)
+
+        # Counts and pages of rows only - nothing selects the whole table
+        annotation_queries = [
+            query["sql"]
+            for query in queries.captured_queries
+            if 'FROM "annotations_annotation"' in query["sql"]
+        ]
+        self.assertTrue(
+            all("COUNT(" in sql or "LIMIT" in sql for sql in annotation_queries),
+            annotation_queries,
+        )
+
+    @override_settings(QUERYSET_COUNT_CACHE_TIMEOUT=60)
+    def test_counts_are_cached_per_filter(self):
+
+        queryset = Annotation.objects.filter(document=self.document)
+        self.assertEqual(count_queryset(queryset), 25)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                count_queryset(Annotation.objects.filter(document=self.document)), 25
+            )
+
+        # A different filter is counted separately
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                count_queryset(Annotation.objects.filter(raw_text__endswith="1")),
+                3,
+            )
+
+    def test_approximate_counts_above_threshold(self):
+
+        queryset = Annotation.objects.filter(document=self.document)
+
+        # Below the threshold the count is exact
+        self.assertEqual(count_queryset(queryset, approximate_threshold=10**9), 25)
+
+        # At or above it, the planner's estimate is used without counting
+        with CaptureQueriesContext(connection) as queries:
+            count_queryset(queryset, approximate_threshold=1)
+
+        self.assertFalse(
+            any("COUNT(" in query["sql"] for query in queries.captured_queries)
+        )
+        self.assertTrue(
+            any(
+                query["sql"].startswith("EXPLAIN") for query in queries.captured_queries
+            )
+        )
+
+    def _annotation_queries(self, query: str) -> tuple[dict, list[str]]:
+
+        with CaptureQueriesContext(connection) as queries:
+            result = Client(schema, context_value=TestContext(self.user)).execute(query)
+
+        self.assertIsNone(result.get("errors"))
+        return result["data"], [
+            query["sql"]
+            for query in queries.captured_queries
+            if 'FROM "annotations_annotation"' in query["sql"]
+        ]
+
+    def test_forward_pagination_does_not_count(self):
+
+        data, queries = self._annotation_queries(
+            """
+            {
+              partial: annotations(first: 24) {
+                pageInfo {
+                  hasNextPage
+                }
+                edges {
+                  cursor
+                }
+              }
+              whole: annotations(first: 25) {
+                pageInfo {
+                  hasNextPage
+                }
+              }
+            }
+            """
+        )
+
+        self.assertTrue(data["partial"]["pageInfo"]["hasNextPage"])
+        self.assertEqual(len(data["partial"]["edges"]), 24)
+        self.assertFalse(data["whole"]["pageInfo"]["hasNextPage"])
+        self.assertFalse(any("COUNT(" in sql for sql in queries), queries)
+
+        after = data["partial"]["edges"][22]["cursor"]
+        data, _ = self._annotation_queries(
+            f"""
+            {{
+              annotations(first: 5, after: "{after}") {{
+                totalCount
+                pageInfo {{
+                  hasNextPage
+                }}
+                edges {{
+                  node {{
+                    rawText
+                  }}
+                }}
+              }}
+            }}
+            """
+        )
+
+        self.assertEqual(data["annotations"]["totalCount"], 25)
+        self.assertEqual(len(data["annotations"]["edges"]), 2)
+        self.assertFalse(data["annotations"]["pageInfo"]["hasNextPage"])
+
+    @override_settings(
+        QUERYSET_COUNT_CACHE_TIMEOUT=60, QUERYSET_APPROXIMATE_COUNT_THRESHOLD=1
+    )
+    def test_approximate_totals_skip_the_count(self):
+
+        data, queries = self._annotation_queries(
+            """
+            {
+              first: annotations(first: 2) {
+                totalCount
+              }
+              last: annotations(last: 2) {
+                totalCount
+                pageInfo {
+                  hasPreviousPage
+                }
+                edges {
+                  node {
+                    rawText
+                  }
+                }
+              }
+            }
+            """
+        )
+
+        # Forward pages take their total from the planner's estimate rather than a COUNT(*)...
+        self.assertIsInstance(data["first"]["totalCount"], int)
+        self.assertEqual(sum("COUNT(" in sql for sql in queries), 1, queries)
+
+        # ...while backward pagination still needs (and so reports) the exact count
+        self.assertEqual(data["last"]["totalCount"], 25)
+        self.assertEqual(len(data["last"]["edges"]), 2)
+        self.assertTrue(data["last"]["pageInfo"]["hasPreviousPage"])
@@ -0,0 +1,233 @@
+import io
+import json
+import pathlib
+import types
+import zipfile
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from opencontractserver.annotations.embedding_queue import annotation_embedding_queue
+from opencontractserver.annotations.models import Annotation, LabelSet
+from opencontractserver.corpuses.models import Corpus
+from opencontractserver.tests.fixtures import (
+    SAMPLE_PAWLS_FILE_ONE_PATH,
+    SAMPLE_PDF_FILE_ONE_PATH,
+)
+from opencontractserver.types.enums import PermissionTypes
+from opencontractserver.utils.importing import (
+    ExportDataJsonReader,
+    bulk_create_labels,
+    bulk_import_annotated_docs,
+    validate_import_data_json,
+)
+from opencontractserver.utils.permissioning import user_has_permission_for_obj
+
+User = get_user_model()
+
+
+def _label(text: str, label_type: str) -> dict:
+    return {
+        "id": text,
+        "color": "#c17717",
+        "description": f"Description for {text}",
+        "icon": "tag",
+        "text": text,
+        "label_type": label_type,
+    }
+
+
+class CorpusBulkImportTestCase(TestCase):
+
+    fixtures_path = pathlib.Path(__file__).parent / "fixtures"
+
+    def setUp(self):
+
+        self.user = User.objects.create_user(username="bob", password="12345678")
+        self.labelset = LabelSet.objects.create(title="Import", creator=self.user)
+        self.corpus = Corpus.objects.create(
+            title="Import", creator=self.user, label_set=self.labelset
+        )
+
+        self.pawls_content = json.loads(SAMPLE_PAWLS_FILE_ONE_PATH.read_text())
+        self.pdf_bytes = SAMPLE_PDF_FILE_ONE_PATH.read_bytes()
+
+    def _build_export(self, doc_count: int) -> tuple[zipfile.ZipFile, dict]:
+
+        annotated_docs = {
+            f"doc_{i}.pdf": {
+                "title": f"Doc {i}",
+                "content": "",
+                "description": None,
+                "page_count": len(self.pawls_content),
+                "pawls_file_content": self.pawls_content,
+                "doc_labels": ["Contract"],
+                "labelled_text": [
+                    {
+                        "id": f"{i}-{j}",
+                        "annotationLabel": "Parties",
+                        "rawText": f"Party {j}",
+                        "page": 0,
+                        "annotation_json": {},
+                    }
+                    for j in range(3)
+                ],
+            }
+            for i in range(doc_count)
+        }
+        data_json = {
+            "annotated_docs": annotated_docs,
+            "corpus": {},
+            "label_set": {},
+            "text_labels": {"Parties": _label("Parties", "TOKEN_LABEL")},
+            "doc_labels": {"Contract": _label("Contract", "DOC_TYPE_LABEL")},
+        }
+
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, mode="w") as import_zip:
+            for doc_name in annotated_docs:
+                import_zip.writestr(doc_name, self.pdf_bytes)
+        buffer.seek(0)
+
+        return zipfile.ZipFile(buffer, mode="r"), data_json
+
+    def _import(self, import_zip: zipfile.ZipFile, data_json: dict) -> dict:
+
+        text_labels = bulk_create_labels(
+            data_json["text_labels"], self.user.id, self.labelset
+        )
+        doc_labels = bulk_create_labels(
+            data_json["doc_labels"], self.user.id, self.labelset
+        )
+        return bulk_import_annotated_docs(
+            import_zip=import_zip,
+            annotated_docs=data_json["annotated_docs"].items(),
+            corpus=self.corpus,
+            user_id=self.user.id,
+            text_label_lookup=text_labels,
+            doc_label_lookup=doc_labels,
+        )
+
+    def test_bulk_import(self):
+
+        import_zip, data_json = self._build_export(doc_count=3)
+        validate_import_data_json(
+            data_json, data_json["annotated_docs"], import_zip.namelist()
+        )
+
+        with patch(
+            "opencontractserver.tasks.embeddings_task.calculate_embeddings_for_annotation_batch.si"
+        ) as mock_embeddings_task, patch.object(
+            annotation_embedding_queue, "batch_size", 5
+        ), self.captureOnCommitCallbacks(
+            execute=True
+        ):
+            stats = self._import(import_zip, data_json)
+
+        self.assertEqual(stats["documents"], 3)
+        self.assertEqual(stats["annotations"], 12)  # 1 doc label + 3 spans per doc
+        self.assertEqual(stats["labels"], 2)
+        self.assertGreater(stats["docs_per_second"], 0)
+
+        self.assertEqual(self.labelset.annotation_labels.count(), 2)
+        self.assertEqual(self.corpus.documents.count(), 3)
+
+        for doc in self.corpus.documents.all():
+            self.assertFalse(doc.backend_lock)
+            self.assertEqual(doc.page_count, len(self.pawls_content))
+            self.assertIsNotNone(doc.pdf_file_hash)
+            self.assertTrue(
+                user_has_permission_for_obj(self.user, doc, PermissionTypes.ALL)
+            )
+            self.assertEqual(Annotation.objects.filter(document=doc).count(), 4)
+
+        annotation = Annotation.objects.filter(raw_text="Party 0").first()
+        self.assertTrue(
+            user_has_permission_for_obj(self.user, annotation, PermissionTypes.ALL)
+        )
+
+        # Imported annotations are embedded in EMBEDDINGS_BATCH_SIZE chunks
+        embedded_batches = [
+            call.kwargs["annotation_ids"]
+            for call in mock_embeddings_task.call_args_list
+        ]
+        self.assertEqual([len(batch) for batch in embedded_batches], [5, 5, 2])
+        self.assertEqual(
+            sorted(sum(embedded_batches, [])),
+            sorted(Annotation.objects.values_list("id", flat=True)),
+        )
+
+    def test_query_count_is_independent_of_annotation_count(self):
+
+        # Warm the ContentType cache so both measured imports start from the same state
+        self._import(*self._build_export(doc_count=1))
+
+        with CaptureQueriesContext(connection) as small_import:
+            self._import(*self._build_export(doc_count=1))
+
+        with CaptureQueriesContext(connection) as large_import:
+            self._import(*self._build_export(doc_count=5))
+
+        self.assertEqual(len(small_import), len(large_import))
+
+    def test_validation_rejects_broken_exports(self):
+
+        import_zip, data_json = self._build_export(doc_count=1)
+        data_json["annotated_docs"]["missing.pdf"] = data_json["annotated_docs"][
+            "doc_0.pdf"
+        ]
+        data_json["text_labels"]["Parties"]["label_type"] = "NOT_A_LABEL_TYPE"
+
+        with self.assertRaisesRegex(ValueError, "missing.pdf"):
+            validate_import_data_json(
+                data_json, data_json["annotated_docs"], import_zip.namelist()
+            )
+
+        with self.assertRaisesRegex(ValueError, "label_set"):
+            validate_import_data_json({"text_labels": {}, "doc_labels": {}}, {}, [])
+
+    def test_export_data_json_reader_matches_json_loads(self):
+
+        with zipfile.ZipFile(
+            self.fixtures_path / "Test_Corpus_EXPORT.zip"
+        ) as import_zip:
+
+            with import_zip.open("data.json") as data_json_file:
+                data_json = json.loads(data_json_file.read().decode("utf-8"))
+
+            # A tiny chunk size makes every value straddle several reads
+            reader = ExportDataJsonReader(import_zip, chunk_size=16)
+            metadata = reader.read_metadata()
+
+            self.assertEqual(
+                metadata,
+                {
+                    key: value
+                    for key, value in data_json.items()
+                    if key != "annotated_docs"
+                },
+            )
+            self.assertEqual(
+                reader.annotated_doc_keys,
+                {
+                    doc_name: list(doc_data)
+                    for doc_name, doc_data in data_json["annotated_docs"].items()
+                },
+            )
+
+            annotated_docs = reader.iter_annotated_docs()
+            self.assertIsInstance(annotated_docs, types.GeneratorType)
+            self.assertEqual(dict(annotated_docs), data_json["annotated_docs"])
+
+    def test_export_data_json_reader_rejects_malformed_json(self):
+
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, mode="w") as import_zip:
+            import_zip.writestr("data.json", '{"corpus": {}, "label_set" {}}')
+
+        with zipfile.ZipFile(buffer, mode="r") as import_zip:
+            with self.assertRaises(ValueError):
+                ExportDataJsonReader(import_zip).read_metadata()
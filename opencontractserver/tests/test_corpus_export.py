@@ -11,7 +11,11 @@ from opencontractserver.corpuses.models import Corpus, TemporaryFileHandle
 from opencontractserver.tasks import import_corpus
 from opencontractserver.tasks.utils import package_zip_into_base64
 from opencontractserver.types.enums import PermissionTypes
-from opencontractserver.utils.etl import build_document_export, build_label_lookups
+from opencontractserver.utils.etl import (
+    build_document_export,
+    build_label_lookups,
+    delete_document_export_parts,
+)
 from opencontractserver.utils.permissioning import set_permissions_for_obj_to_user
 
 User = get_user_model()
@@ -78,11 +82,12 @@ class ExportCorpusTestCase:
         )
         for doc in self.original_corpus_obj.documents.all():
 
-            build_document_export(
+            burned_doc = build_document_export(
                 label_lookups=label_lookups,
                 doc_id=doc.id,
                 corpus_id=self.original_corpus_obj.id,
             )
+            delete_document_export_parts(burned_doc[1], burned_doc[2])
 
             # TODO - need to check that each doc returns data of this format and it's valid (check against import)
 
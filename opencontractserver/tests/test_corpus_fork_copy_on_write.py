@@ -0,0 +1,150 @@
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db.models.signals import post_save
+from django.test import TestCase
+
+from opencontractserver.annotations.models import (
+    TOKEN_LABEL,
+    Annotation,
+    AnnotationLabel,
+    LabelSet,
+)
+from opencontractserver.annotations.signals import process_annot_on_create_atomic
+from opencontractserver.corpuses.models import Corpus
+from opencontractserver.documents.models import Document
+from opencontractserver.documents.signals import process_doc_on_create_atomic
+from opencontractserver.tasks import fork_corpus
+from opencontractserver.tests.fixtures import (
+    SAMPLE_PAWLS_FILE_ONE_PATH,
+    SAMPLE_PDF_FILE_ONE_PATH,
+)
+from opencontractserver.types.enums import PermissionTypes
+from opencontractserver.utils.permissioning import user_has_permission_for_obj
+
+User = get_user_model()
+
+
+class CorpusForkCopyOnWriteTestCase(TestCase):
+    def setUp(self):
+
+        post_save.disconnect(process_annot_on_create_atomic, sender=Annotation)
+        post_save.disconnect(process_doc_on_create_atomic, sender=Document)
+
+        self.user = User.objects.create_user(username="bob", password="12345678")
+
+        self.label_set = LabelSet.objects.create(title="Labels", creator=self.user)
+        self.label = AnnotationLabel.objects.create(
+            text="Parties", label_type=TOKEN_LABEL, creator=self.user
+        )
+        self.label_set.annotation_labels.add(self.label)
+
+        self.corpus = Corpus.objects.create(
+            title="Original", creator=self.user, label_set=self.label_set
+        )
+
+        pdf_bytes = SAMPLE_PDF_FILE_ONE_PATH.read_bytes()
+        pawls_bytes = SAMPLE_PAWLS_FILE_ONE_PATH.read_bytes()
+        self.docs = [
+            Document.objects.create(
+                title=f"Doc {i}",
+                creator=self.user,
+                pdf_file=ContentFile(pdf_bytes, name=f"doc_{i}.pdf"),
+                pawls_parse_file=ContentFile(pawls_bytes, name=f"doc_{i}.pawls"),
+                txt_extract_file=ContentFile(b"Some text", name=f"doc_{i}.txt"),
+            )
+            for i in range(3)
+        ]
+        self.corpus.documents.add(*self.docs)
+
+        self.annotations = [
+            Annotation.objects.create(
+                raw_text=f"Party {i}",
+                document=doc,
+                corpus=self.corpus,
+                annotation_label=self.label,
+                creator=self.user,
+                embedding=[0.5] * 384,
+            )
+            for i, doc in enumerate(self.docs)
+        ]
+
+    def _fork(self, copy_on_write: bool) -> Corpus:
+
+        new_corpus = Corpus.objects.create(
+            title="Fork", creator=self.user, parent=self.corpus, backend_lock=True
+        )
+        forked_corpus_id = (
+            fork_corpus.si(
+                new_corpus.id,
+                [doc.id for doc in self.docs],
+                self.label_set.id,
+                [annotation.id for annotation in self.annotations],
+                self.user.id,
+                copy_on_write=copy_on_write,
+            )
+            .apply()
+            .get()
+        )
+
+        self.assertEqual(forked_corpus_id, new_corpus.id)
+        new_corpus.refresh_from_db()
+        return new_corpus
+
+    def test_copy_on_write_fork_shares_stored_files(self):
+
+        with self.settings(CORPUS_FORK_BATCH_SIZE=2):
+            forked_corpus = self._fork(copy_on_write=True)
+
+        self.assertFalse(forked_corpus.backend_lock)
+        self.assertFalse(forked_corpus.error)
+
+        original_files = {
+            doc.title: (doc.pdf_file.name, doc.pawls_parse_file.name)
+            for doc in self.docs
+        }
+        forked_docs = list(forked_corpus.documents.all())
+        self.assertEqual(len(forked_docs), 3)
+
+        for forked_doc in forked_docs:
+            self.assertTrue(
+                user_has_permission_for_obj(self.user, forked_doc, PermissionTypes.CRUD)
+            )
+            self.assertEqual(
+                (forked_doc.pdf_file.name, forked_doc.pawls_parse_file.name),
+                original_files[forked_doc.title.replace("[FORK] ", "")],
+            )
+
+        # Labels and annotations are remapped onto the fork's own copies
+        forked_label = forked_corpus.label_set.annotation_labels.get()
+        self.assertNotEqual(forked_label.id, self.label.id)
+
+        forked_annotations = Annotation.objects.filter(corpus=forked_corpus)
+        self.assertEqual(forked_annotations.count(), 3)
+        for annotation in forked_annotations:
+            self.assertEqual(annotation.annotation_label_id, forked_label.id)
+            self.assertIn(annotation.document, forked_docs)
+            self.assertIsNotNone(annotation.embedding)
+
+        # Rewriting a forked document's file leaves the original's untouched
+        forked_doc = forked_docs[0]
+        original_doc = Document.objects.get(
+            title=forked_doc.title.replace("[FORK] ", "")
+        )
+        forked_doc.txt_extract_file.save("edited.txt", ContentFile(b"Edited"))
+
+        original_doc.refresh_from_db()
+        self.assertNotEqual(
+            forked_doc.txt_extract_file.name, original_doc.txt_extract_file.name
+        )
+        with original_doc.txt_extract_file.open("rb") as txt_file:
+            self.assertEqual(txt_file.read(), b"Some text")
+
+    def test_fork_without_copy_on_write_copies_files(self):
+
+        forked_corpus = self._fork(copy_on_write=False)
+
+        original_pdf_names = {doc.pdf_file.name for doc in self.docs}
+        for forked_doc in forked_corpus.documents.all():
+            self.assertNotIn(forked_doc.pdf_file.name, original_pdf_names)
+            with forked_doc.txt_extract_file.open("rb") as txt_file:
+                self.assertEqual(txt_file.read(), b"Some text")
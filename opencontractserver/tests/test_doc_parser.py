@@ -1,5 +1,6 @@
 #  Copyright (C) 2022  John Scrudato
 import io
+import json
 import logging
 import pathlib
 import uuid
@@ -9,6 +10,7 @@ from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 from django.db import transaction
 from django.test import TestCase
+from django.test.utils import override_settings
 from PyPDF2 import PdfReader, PdfWriter
 
 from opencontractserver.annotations.models import Annotation, AnnotationLabel
@@ -19,6 +21,7 @@ from opencontractserver.tasks.doc_tasks import (
     convert_doc_to_funsd,
     extract_thumbnail,
     process_pdf_page,
+    reassemble_extracted_pdf_parts,
     set_doc_lock_state,
     split_pdf_for_processing,
 )
@@ -27,6 +30,7 @@ from opencontractserver.tests.fixtures import (
     SAMPLE_PDF_FILE_ONE_PATH,
 )
 from opencontractserver.types.enums import LabelType
+from opencontractserver.utils.etl import delete_document_export_parts
 
 User = get_user_model()
 
@@ -76,6 +80,23 @@ class DocParserTestCase(TestCase):
 
         self.assertEqual(len(shards), 23)
 
+    @override_settings(PAWLS_SHARED_FILESYSTEM=True, PAWLS_PAGES_PER_CHUNK=10)
+    def test_pdf_sharding_from_shared_source(self):
+        shards = (
+            split_pdf_for_processing.s(user_id=self.user.id, doc_id=self.doc.id)
+            .apply()
+            .get()
+        )
+
+        self.assertEqual(len(shards), 23)
+        # Every page range should be read from the same local copy of the pdf
+        self.assertEqual(len({path for _, path in shards}), 1)
+        # ...and that copy is cleaned up once the document has been reassembled
+        self.assertFalse(pathlib.Path(shards[0][1]).exists())
+
+        self.doc.refresh_from_db()
+        self.assertEqual(self.doc.page_count, 23)
+
     def test_process_pdf_page(self):
         page_bytes_stream = io.BytesIO()
         doc_path = self.doc.pdf_file.name
@@ -112,6 +133,46 @@ class DocParserTestCase(TestCase):
         self.assertIsInstance(result[1], str)  # pawls fragment path
         self.assertEqual(result[2], pdf_fragment_path.__str__())  # page path
 
+    def test_reassemble_extracted_pdf_parts(self):
+
+        pawls_fragment_folder_path = pathlib.Path(
+            f"/tmp/user_{self.user.id}/pawls_fragments"
+        )
+        pawls_fragment_folder_path.mkdir(parents=True, exist_ok=True)
+
+        doc_parts = []
+        pages = [
+            {
+                "page": {"width": 612, "height": 792, "index": index},
+                "tokens": [
+                    {"x": 72, "y": 72, "width": 30, "height": 12, "text": "Page"},
+                    {"x": 110, "y": 72, "width": 10, "height": 12, "text": str(index)},
+                ],
+            }
+            for index in range(3)
+        ]
+
+        # Hand the parts over out of order to make sure they're stitched back together by page number
+        for index in (2, 0, 1):
+            fragment_path = pawls_fragment_folder_path / f"{uuid.uuid4()}.json"
+            fragment_path.write_text(json.dumps(pages[index]))
+            doc_parts.append([index, str(fragment_path), ""])
+
+        page_timings = (
+            reassemble_extracted_pdf_parts.si(doc_parts=doc_parts, doc_id=self.doc.id)
+            .apply()
+            .get()
+        )
+
+        self.assertEqual([timing["page"] for timing in page_timings], [0, 1, 2])
+
+        self.doc.refresh_from_db()
+        self.assertEqual(self.doc.page_count, 3)
+        with self.doc.txt_extract_file.open("r") as txt_file:
+            self.assertEqual(txt_file.read(), "Page 0 Page 1 Page 2")
+        with self.doc.pawls_parse_file.open("r") as pawls_file:
+            self.assertEqual(json.loads(pawls_file.read()), pages)
+
     def test_set_doc_lock_state(self):
         set_doc_lock_state.apply(kwargs={"locked": True, "doc_id": self.doc.id}).get()
 
@@ -145,6 +206,12 @@ class DocParserTestCase(TestCase):
         ).get()
         self.assertEqual(len(result), 5)
 
+        # The annotated pdf and doc json are staged in storage until whoever packages them cleans them up
+        self.assertTrue(default_storage.exists(result[1]))
+        self.assertTrue(default_storage.exists(result[2]))
+        delete_document_export_parts(result[1], result[2])
+        self.assertFalse(default_storage.exists(result[1]))
+
     def test_convert_doc_to_funsd(self):
 
         AnnotationLabel.objects.create(
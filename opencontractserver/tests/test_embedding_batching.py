@@ -0,0 +1,107 @@
+from unittest.mock import patch
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, transaction
+from django.db.models.signals import post_save
+from django.test import TestCase
+
+from opencontractserver.annotations.embedding_queue import AnnotationEmbeddingQueue
+from opencontractserver.annotations.models import Annotation
+from opencontractserver.annotations.signals import process_annot_on_create_atomic
+from opencontractserver.documents.models import Document
+from opencontractserver.documents.signals import process_doc_on_create_atomic
+from opencontractserver.tasks.embeddings_task import (
+    calculate_embeddings_for_annotation_batch,
+)
+from opencontractserver.tests.fixtures import SAMPLE_PDF_FILE_ONE_PATH
+
+User = get_user_model()
+
+
+class EmbeddingBatchingTestCase(TestCase):
+    def setUp(self):
+
+        post_save.disconnect(process_annot_on_create_atomic, sender=Annotation)
+        post_save.disconnect(process_doc_on_create_atomic, sender=Document)
+
+        self.user = User.objects.create_user(username="bob", password="12345678")
+        self.doc = Document.objects.create(
+            creator=self.user,
+            title="Test Doc",
+            pdf_file=ContentFile(
+                SAMPLE_PDF_FILE_ONE_PATH.open("rb").read(), name="test.pdf"
+            ),
+        )
+        self.annotations = [
+            Annotation.objects.create(
+                raw_text=f"Annotation text {i}",
+                document=self.doc,
+                creator=self.user,
+            )
+            for i in range(5)
+        ]
+
+    def test_queue_sends_full_batches_on_commit(self):
+
+        queue = AnnotationEmbeddingQueue(batch_size=2, max_wait=0)
+
+        with patch(
+            "opencontractserver.tasks.embeddings_task.calculate_embeddings_for_annotation_batch"
+        ) as mock_task:
+            with self.captureOnCommitCallbacks(execute=True):
+                queue.enqueue(1)
+                queue.enqueue(2)
+                queue.enqueue_many([3, 4, 5])
+
+                # Nothing is sent before the annotations are committed, however full or old the batches are
+                mock_task.si.assert_not_called()
+
+            self.assertEqual(
+                [call.kwargs["annotation_ids"] for call in mock_task.si.call_args_list],
+                [[1, 2], [3, 4], [5]],
+            )
+
+    def test_rolled_back_ids_are_dropped(self):
+
+        queue = AnnotationEmbeddingQueue(batch_size=10, max_wait=60)
+
+        with patch(
+            "opencontractserver.tasks.embeddings_task.calculate_embeddings_for_annotation_batch"
+        ) as mock_task:
+            with self.captureOnCommitCallbacks(execute=True):
+                try:
+                    with transaction.atomic():
+                        queue.enqueue_many([1, 2])
+                        raise IntegrityError()
+                except IntegrityError:
+                    pass
+
+                queue.enqueue(3)
+
+            mock_task.si.assert_called_once_with(annotation_ids=[3])
+
+    def test_batch_task_bulk_updates_embeddings(self):
+
+        annotation_ids = [annot.id for annot in self.annotations]
+
+        with patch(
+            "opencontractserver.tasks.embeddings_task.calculate_embeddings_for_texts",
+            side_effect=lambda texts: [
+                None if text.endswith("0") else np.ones(384) for text in texts
+            ],
+        ) as mock_embed:
+            calculate_embeddings_for_annotation_batch.si(
+                annotation_ids=annotation_ids
+            ).apply()
+
+        mock_embed.assert_called_once()
+
+        self.assertEqual(
+            Annotation.objects.filter(
+                id__in=annotation_ids, embedding__isnull=False
+            ).count(),
+            4,
+        )
+        self.assertIsNone(Annotation.objects.get(id=annotation_ids[0]).embedding)
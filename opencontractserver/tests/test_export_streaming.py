@@ -0,0 +1,101 @@
+import base64
+import json
+import pathlib
+import uuid
+import zipfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.test import TestCase
+
+from opencontractserver.corpuses.models import Corpus, TemporaryFileHandle
+from opencontractserver.tasks import import_corpus
+from opencontractserver.tasks.export_tasks import package_annotated_docs
+from opencontractserver.tasks.utils import package_zip_into_base64
+from opencontractserver.types.enums import PermissionTypes
+from opencontractserver.users.models import UserExport
+from opencontractserver.utils.etl import build_document_export, build_label_lookups
+from opencontractserver.utils.permissioning import set_permissions_for_obj_to_user
+
+User = get_user_model()
+
+
+class ExportStreamingTestCase(TestCase):
+
+    fixtures_path = pathlib.Path(__file__).parent / "fixtures"
+
+    def setUp(self):
+
+        self.user = User.objects.create_user(username="bob", password="12345678")
+
+        self.corpus = Corpus.objects.create(
+            title="New Import", creator=self.user, backend_lock=False
+        )
+        set_permissions_for_obj_to_user(self.user, self.corpus, [PermissionTypes.ALL])
+
+        export_zip_base64_file_string = package_zip_into_base64(
+            self.fixtures_path / "Test_Corpus_EXPORT.zip"
+        )
+        decoded_file_data = base64.decodebytes(
+            export_zip_base64_file_string.encode("utf-8")
+        )
+
+        with transaction.atomic():
+            temporary_file = TemporaryFileHandle.objects.create()
+            temporary_file.file.save(
+                f"corpus_import_{uuid.uuid4()}.pdf", ContentFile(decoded_file_data)
+            )
+
+        import_corpus.s(temporary_file.id, self.user.id, self.corpus.id).apply().get()
+
+    def test_burn_and_package_via_storage(self):
+
+        label_lookups = build_label_lookups(corpus_id=self.corpus.id)
+
+        burned_docs = []
+        for doc in self.corpus.documents.all():
+            burned_doc = build_document_export(
+                label_lookups=label_lookups, doc_id=doc.id, corpus_id=self.corpus.id
+            )
+
+            # Only storage keys come back, not file contents
+            doc_name, pdf_key, doc_json_key, _, _ = burned_doc
+            self.assertTrue(default_storage.exists(pdf_key))
+            self.assertTrue(default_storage.exists(doc_json_key))
+            with default_storage.open(pdf_key, "rb") as pdf_file:
+                self.assertEqual(pdf_file.read(4), b"%PDF")
+
+            # Round-trip through json like the Celery result backend would
+            burned_docs.append(json.loads(json.dumps(burned_doc)))
+
+        export = UserExport.objects.create(creator=self.user, backend_lock=True)
+
+        package_annotated_docs.apply(
+            args=(burned_docs, export.id, self.corpus.id)
+        ).get()
+
+        export.refresh_from_db()
+        self.assertFalse(export.backend_lock)
+        self.assertIsNotNone(export.finished)
+
+        with export.file.open("rb") as export_file:
+            with zipfile.ZipFile(export_file) as zip_file:
+                names = zip_file.namelist()
+                data_json = json.loads(zip_file.read("data.json").decode("utf-8"))
+
+        self.assertIn("data.json", names)
+        self.assertEqual(
+            set(data_json.keys()),
+            {"annotated_docs", "corpus", "label_set", "doc_labels", "text_labels"},
+        )
+        self.assertEqual(len(data_json["annotated_docs"]), len(burned_docs))
+        for doc_name, _, _, _, _ in burned_docs:
+            self.assertIn(doc_name, names)
+            self.assertIn("pawls_file_content", data_json["annotated_docs"][doc_name])
+
+        # Staged export parts are cleaned up once packaged
+        for _, pdf_key, doc_json_key, _, _ in burned_docs:
+            self.assertFalse(default_storage.exists(pdf_key))
+            self.assertFalse(default_storage.exists(doc_json_key))
@@ -0,0 +1,133 @@
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db.models.signals import post_save
+from django.test import TestCase
+
+from opencontractserver.annotations.models import Annotation
+from opencontractserver.annotations.signals import process_annot_on_create_atomic
+from opencontractserver.documents.models import Document
+from opencontractserver.documents.signals import process_doc_on_create_atomic
+from opencontractserver.extracts.models import Column, Datacell, Extract, Fieldset
+from opencontractserver.tasks.extract_orchestrator_tasks import run_extract
+from opencontractserver.tests.fixtures import SAMPLE_PDF_FILE_ONE_PATH
+
+User = get_user_model()
+
+
+def _unit_vector(index: int, dims: int = 384) -> np.ndarray:
+    vector = np.zeros(dims)
+    vector[index] = 1.0
+    return vector
+
+
+class ExtractBatchingTestCase(TestCase):
+    def setUp(self):
+
+        post_save.disconnect(process_annot_on_create_atomic, sender=Annotation)
+        post_save.disconnect(process_doc_on_create_atomic, sender=Document)
+
+        self.user = User.objects.create_user(username="bob", password="12345678")
+
+        self.fieldset = Fieldset.objects.create(
+            name="TestFieldset", description="Test description", creator=self.user
+        )
+        self.name_column = Column.objects.create(
+            fieldset=self.fieldset,
+            query="What is the name of the buyer?",
+            output_type="str",
+            creator=self.user,
+        )
+        self.date_column = Column.objects.create(
+            fieldset=self.fieldset,
+            query="What is the effective date?",
+            match_text="Effective date|||Dated as of",
+            output_type="str",
+            creator=self.user,
+        )
+
+        self.doc = Document.objects.create(
+            creator=self.user,
+            title="Test Doc",
+            pdf_file=ContentFile(
+                SAMPLE_PDF_FILE_ONE_PATH.open("rb").read(), name="test.pdf"
+            ),
+        )
+        self.annotations = [
+            Annotation.objects.create(
+                raw_text=f"Section {i}",
+                document=self.doc,
+                creator=self.user,
+                embedding=_unit_vector(i).tolist(),
+            )
+            for i in range(8)
+        ]
+
+        self.extract = Extract.objects.create(
+            name="TestExtract", fieldset=self.fieldset, creator=self.user
+        )
+        self.extract.documents.add(self.doc)
+
+    def test_batched_extract_runs_one_pipeline_per_document(self):
+
+        reranker = MagicMock()
+        reranker.postprocess_nodes.side_effect = lambda nodes, query_bundle: nodes[:2]
+
+        with patch(
+            "opencontractserver.tasks.data_extract_tasks.calculate_embeddings_for_texts",
+            side_effect=lambda texts: [_unit_vector(i) for i, _ in enumerate(texts)],
+        ) as mock_embed, patch(
+            "opencontractserver.tasks.data_extract_tasks.model_registry.get",
+            return_value=reranker,
+        ), patch(
+            "opencontractserver.tasks.data_extract_tasks._structure_retrieved_text",
+            return_value={"data": "extracted"},
+        ) as mock_structure, patch(
+            "opencontractserver.tasks.data_extract_tasks.oc_llama_index_doc_query.si"
+        ) as mock_single_cell_task:
+            run_extract.delay(self.extract.id, self.user.id, batched=True)
+
+        # One embeddings request for every column's search text (1 query + 2 examples)
+        mock_embed.assert_called_once()
+        self.assertEqual(len(mock_embed.call_args[0][0]), 3)
+        self.assertEqual(mock_structure.call_count, 2)
+        mock_single_cell_task.assert_not_called()
+
+        cells = Datacell.objects.filter(extract=self.extract)
+        self.assertEqual(cells.count(), 2)
+        for cell in cells:
+            self.assertIsNotNone(cell.completed)
+            self.assertIsNone(cell.failed)
+            self.assertEqual(cell.data, {"data": "extracted"})
+            self.assertEqual(cell.sources.count(), 2)
+
+        # The name column searched with vector 0, so its best source is the first annotation
+        name_cell = cells.get(column=self.name_column)
+        self.assertIn(self.annotations[0], name_cell.sources.all())
+
+        self.extract.refresh_from_db()
+        self.assertIsNotNone(self.extract.finished)
+
+    def test_shared_setup_failure_fails_every_cell(self):
+
+        with patch(
+            "opencontractserver.tasks.data_extract_tasks.calculate_embeddings_for_texts",
+            side_effect=RuntimeError("Embedder unavailable"),
+        ), patch(
+            "opencontractserver.tasks.data_extract_tasks._structure_retrieved_text"
+        ) as mock_structure:
+            run_extract.delay(self.extract.id, self.user.id, batched=True)
+
+        mock_structure.assert_not_called()
+
+        cells = Datacell.objects.filter(extract=self.extract)
+        self.assertEqual(cells.count(), 2)
+        for cell in cells:
+            self.assertIsNotNone(cell.failed)
+            self.assertIsNone(cell.completed)
+            self.assertIn("Embedder unavailable", cell.stacktrace)
+
+        self.extract.refresh_from_db()
+        self.assertIsNotNone(self.extract.finished)
@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save
+from django.test import TestCase
+from graphql_relay import to_global_id
+
+from opencontractserver.annotations.models import (
+    Annotation,
+    AnnotationLabel,
+    Relationship,
+)
+from opencontractserver.annotations.signals import process_annot_on_create_atomic
+from opencontractserver.corpuses.models import Corpus
+from opencontractserver.documents.models import Document
+from opencontractserver.documents.signals import process_doc_on_create_atomic
+from opencontractserver.tests.query_budget import GraphQLQueryBudgetMixin
+from opencontractserver.types.enums import LabelType
+
+User = get_user_model()
+
+DOCUMENT_ANNOTATIONS_QUERY = """
+query ($corpusId: ID!) {
+  documents {
+    edges {
+      node {
+        title
+        allAnnotations(corpusId: $corpusId) {
+          rawText
+          annotationLabel {
+            text
+          }
+          allSourceNodeInRelationship {
+            id
+          }
+        }
+        allRelationships(corpusId: $corpusId) {
+          id
+        }
+      }
+    }
+  }
+}
+"""
+
+
+class GraphQLDataLoaderTestCase(GraphQLQueryBudgetMixin, TestCase):
+    def setUp(self):
+
+        post_save.disconnect(process_annot_on_create_atomic, sender=Annotation)
+        post_save.disconnect(process_doc_on_create_atomic, sender=Document)
+
+        self.user = User.objects.create_user(username="bob", password="12345678")
+        self.corpus = Corpus.objects.create(title="Corpus", creator=self.user)
+        self.variables = {"corpusId": to_global_id("CorpusType", self.corpus.id)}
+
+    def _create_documents(self, count: int, annotations_per_document: int):
+
+        for i in range(count):
+            document = Document.objects.create(title=f"Doc {i}", creator=self.user)
+            self.corpus.documents.add(document)
+
+            annotations = []
+            for j in range(annotations_per_document):
+                label = AnnotationLabel.objects.create(
+                    text=f"Label {i}.{j}",
+                    label_type=LabelType.TOKEN_LABEL,
+                    creator=self.user,
+                )
+                annotations.append(
+                    Annotation.objects.create(
+                        document=document,
+                        corpus=self.corpus,
+                        annotation_label=label,
+                        creator=self.user,
+                        raw_text=f"Annotation {i}.{j}",
+                        json={},
+                    )
+                )
+
+            relationship = Relationship.objects.create(
+                document=document, corpus=self.corpus, creator=self.user
+            )
+            relationship.source_annotations.set(annotations[:1])
+
+    def test_nested_relations_are_batched(self):
+
+        self._create_documents(2, 2)
+        data, small_response_queries = self.countGraphQLQueries(
+            self.user, DOCUMENT_ANNOTATIONS_QUERY, variables=self.variables
+        )
+
+        documents = {
+            edge["node"]["title"]: edge["node"] for edge in data["documents"]["edges"]
+        }
+        self.assertEqual(
+            sorted(
+                (
+                    annotation["rawText"],
+                    annotation["annotationLabel"]["text"],
+                    len(annotation["allSourceNodeInRelationship"]),
+                )
+                for annotation in documents["Doc 1"]["allAnnotations"]
+            ),
+            [("Annotation 1.0", "Label 1.0", 1), ("Annotation 1.1", "Label 1.1", 0)],
+        )
+        self.assertEqual(len(documents["Doc 1"]["allRelationships"]), 1)
+
+        # Several times the documents and annotations, but one query per relation per level either way
+        self._create_documents(6, 5)
+        data = self.assertGraphQLQueryBudget(
+            self.user,
+            DOCUMENT_ANNOTATIONS_QUERY,
+            small_response_queries,
+            variables=self.variables,
+        )
+        self.assertEqual(len(data["documents"]["edges"]), 8)
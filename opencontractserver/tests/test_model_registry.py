@@ -0,0 +1,60 @@
+from django.test import TestCase
+
+from opencontractserver.utils.model_registry import ModelRegistry
+
+
+class ModelRegistryTestCase(TestCase):
+    def setUp(self):
+
+        self.load_counts = {"small": 0, "medium": 0, "large": 0}
+
+        def make_loader(name):
+            def loader():
+                self.load_counts[name] += 1
+                return object()
+
+            return loader
+
+        self.registry = ModelRegistry(memory_budget_mb=1000)
+        self.registry.register("small", make_loader("small"), size_mb=100)
+        self.registry.register("medium", make_loader("medium"), size_mb=400)
+        self.registry.register("large", make_loader("large"), size_mb=700)
+
+    def test_models_are_loaded_once(self):
+
+        first = self.registry.get("small")
+        second = self.registry.get("small")
+
+        self.assertIs(first, second)
+        self.assertEqual(self.load_counts["small"], 1)
+
+        stats = self.registry.get_stats()["small"]
+        self.assertEqual(stats["loads"], 1)
+        self.assertEqual(stats["hits"], 1)
+        self.assertTrue(stats["loaded"])
+
+    def test_least_recently_used_model_is_evicted(self):
+
+        self.registry.get("small")
+        self.registry.get("medium")
+        self.registry.get("small")  # medium is now the least recently used
+
+        # 100 + 400 + 700 > 1000, so medium has to go
+        self.registry.get("large")
+
+        self.assertTrue(self.registry.is_loaded("small"))
+        self.assertFalse(self.registry.is_loaded("medium"))
+        self.assertTrue(self.registry.is_loaded("large"))
+        self.assertEqual(self.registry.get_stats()["medium"]["evictions"], 1)
+
+        self.registry.get("medium")
+        self.assertEqual(self.load_counts["medium"], 2)
+
+    def test_warm_up_and_unknown_models(self):
+
+        self.registry.warm_up(["small", "medium"])
+        self.assertTrue(self.registry.is_loaded("small"))
+        self.assertTrue(self.registry.is_loaded("medium"))
+
+        with self.assertRaises(KeyError):
+            self.registry.get("missing")
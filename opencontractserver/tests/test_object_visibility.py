@@ -0,0 +1,180 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.db.models.signals import post_save
+from django.test import TestCase
+from django.test.utils import override_settings
+from graphql_relay import to_global_id
+
+from opencontractserver.annotations.models import Annotation
+from opencontractserver.annotations.signals import process_annot_on_create_atomic
+from opencontractserver.corpuses.models import Corpus
+from opencontractserver.documents.models import Document
+from opencontractserver.documents.signals import process_doc_on_create_atomic
+from opencontractserver.shared.resolvers import (
+    resolve_oc_model_queryset,
+    resolve_single_oc_model_from_id,
+)
+from opencontractserver.types.enums import PermissionTypes
+from opencontractserver.users.models import ObjectVisibility
+from opencontractserver.utils.permissioning import (
+    set_permissions_for_obj_to_user,
+    set_permissions_for_objs_to_user,
+)
+
+User = get_user_model()
+
+
+class ObjectVisibilityTestCase(TestCase):
+    def setUp(self):
+
+        post_save.disconnect(process_annot_on_create_atomic, sender=Annotation)
+        post_save.disconnect(process_doc_on_create_atomic, sender=Document)
+
+        self.owner = User.objects.create_user(username="owner", password="12345678")
+        self.collaborator = User.objects.create_user(
+            username="collaborator", password="12345678"
+        )
+        self.stranger = User.objects.create_user(
+            username="stranger", password="12345678"
+        )
+
+        self.document = Document.objects.create(title="Doc", creator=self.owner)
+        self.corpus = Corpus.objects.create(title="Corpus", creator=self.owner)
+        self.annotations = Annotation.objects.bulk_create(
+            [
+                Annotation(
+                    document=self.document,
+                    creator=self.owner,
+                    raw_text=f"Annotation {i}",
+                    json={},
+                    is_public=i == 0,
+                )
+                for i in range(4)
+            ]
+        )
+
+    def _visibility(self, instance) -> set[tuple]:
+        return set(
+            ObjectVisibility.objects.filter(
+                object_type=instance._meta.label_lower, object_id=instance.id
+            ).values_list("user_id", "reason")
+        )
+
+    def test_triggers_maintain_visibility(self):
+
+        public_annotation, annotation = self.annotations[:2]
+        Reason = ObjectVisibility.Reason
+
+        # bulk_create is covered as well as save()
+        self.assertEqual(
+            self._visibility(public_annotation),
+            {(self.owner.id, Reason.CREATOR), (None, Reason.PUBLIC)},
+        )
+        self.assertEqual(
+            self._visibility(self.document), {(self.owner.id, Reason.CREATOR)}
+        )
+
+        # Only the read permission grants visibility
+        set_permissions_for_obj_to_user(
+            self.collaborator, annotation, [PermissionTypes.UPDATE]
+        )
+        self.assertEqual(
+            self._visibility(annotation), {(self.owner.id, Reason.CREATOR)}
+        )
+        set_permissions_for_obj_to_user(
+            self.collaborator, annotation, [PermissionTypes.CRUD]
+        )
+        self.assertIn(
+            (self.collaborator.id, Reason.PERMISSION), self._visibility(annotation)
+        )
+        set_permissions_for_obj_to_user(self.collaborator, annotation, [])
+        self.assertEqual(
+            self._visibility(annotation), {(self.owner.id, Reason.CREATOR)}
+        )
+
+        set_permissions_for_objs_to_user(
+            self.collaborator,
+            Annotation,
+            [instance.id for instance in self.annotations],
+            [PermissionTypes.READ],
+        )
+        self.assertEqual(
+            ObjectVisibility.objects.filter(
+                object_type="annotations.annotation",
+                user=self.collaborator,
+                reason=Reason.PERMISSION,
+            ).count(),
+            4,
+        )
+
+        # Queryset updates and a change of creator
+        Annotation.objects.filter(id=annotation.id).update(is_public=True)
+        self.assertIn((None, Reason.PUBLIC), self._visibility(annotation))
+        annotation.refresh_from_db()
+        annotation.is_public = False
+        annotation.creator = self.stranger
+        annotation.save()
+        self.assertEqual(
+            self._visibility(annotation),
+            {
+                (self.stranger.id, Reason.CREATOR),
+                (self.collaborator.id, Reason.PERMISSION),
+            },
+        )
+
+        annotation_id = annotation.id
+        annotation.delete()
+        self.assertFalse(
+            ObjectVisibility.objects.filter(
+                object_type="annotations.annotation", object_id=annotation_id
+            ).exists()
+        )
+
+    def test_matches_permission_table_queries(self):
+
+        public_annotation, shared_annotation = self.annotations[:2]
+        public_annotation.creator = self.stranger
+        public_annotation.save()
+        set_permissions_for_obj_to_user(
+            self.collaborator, shared_annotation, [PermissionTypes.READ]
+        )
+        set_permissions_for_obj_to_user(
+            self.collaborator, self.corpus, [PermissionTypes.READ]
+        )
+        Corpus.objects.create(title="Public", creator=self.stranger, is_public=True)
+
+        for model in (Annotation, Document, Corpus):
+            for user in (self.owner, self.collaborator, self.stranger, AnonymousUser()):
+                with self.subTest(model=model.__name__, user=user):
+                    visible = {}
+                    for use_table in (False, True):
+                        with override_settings(OBJECT_VISIBILITY_TABLE=use_table):
+                            resolved = resolve_oc_model_queryset(model, user)
+                            if use_table and not user.is_anonymous:
+                                self.assertNotIn("DISTINCT", str(resolved.query))
+                            visible[use_table] = (
+                                set(resolved.values_list("id", flat=True)),
+                                set(
+                                    model.objects.visible_to_user(user).values_list(
+                                        "id", flat=True
+                                    )
+                                ),
+                            )
+                    self.assertEqual(visible[True], visible[False])
+
+        with override_settings(OBJECT_VISIBILITY_TABLE=True):
+            self.assertEqual(
+                resolve_single_oc_model_from_id(
+                    Annotation,
+                    to_global_id("AnnotationType", shared_annotation.id),
+                    self.collaborator,
+                ),
+                shared_annotation,
+            )
+            self.assertIsNone(
+                resolve_single_oc_model_from_id(
+                    Annotation,
+                    to_global_id("AnnotationType", self.annotations[2].id),
+                    self.collaborator,
+                )
+            )
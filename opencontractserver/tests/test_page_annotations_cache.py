@@ -0,0 +1,208 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from graphene.test import Client
+from graphql_relay import to_global_id
+
+from config.graphql.schema import schema
+from opencontractserver.annotations.models import Annotation, AnnotationLabel
+from opencontractserver.annotations.page_cache import get_page_annotations
+from opencontractserver.annotations.signals import process_annot_on_create_atomic
+from opencontractserver.corpuses.models import Corpus
+from opencontractserver.documents.models import Document
+from opencontractserver.documents.signals import process_doc_on_create_atomic
+from opencontractserver.tasks.fork_tasks import _fork_annotation_batch
+from opencontractserver.types.enums import LabelType
+
+User = get_user_model()
+
+
+class TestContext:
+    def __init__(self, user):
+        self.user = user
+
+
+PAGE_ANNOTATIONS_QUERY = """
+query ($documentId: ID!, $corpusId: ID, $pageNumberList: String) {
+  pageAnnotations(
+    documentId: $documentId
+    corpusId: $corpusId
+    pageNumberList: $pageNumberList
+  ) {
+    pdfPageInfo {
+      pageCount
+      currentPage
+    }
+    pageAnnotations {
+      rawText
+      page
+      annotationLabel {
+        text
+      }
+    }
+  }
+}
+"""
+
+
+class PageAnnotationsCacheTestCase(TestCase):
+    def setUp(self):
+
+        post_save.disconnect(process_annot_on_create_atomic, sender=Annotation)
+        post_save.disconnect(process_doc_on_create_atomic, sender=Document)
+        cache.clear()
+
+        self.user = User.objects.create_user(username="bob", password="12345678")
+        self.other_user = User.objects.create_user(
+            username="alice", password="12345678"
+        )
+
+        self.corpus = Corpus.objects.create(title="Corpus", creator=self.user)
+        self.document = Document.objects.create(
+            title="Doc", creator=self.user, page_count=3
+        )
+        self.corpus.documents.add(self.document)
+        self.label = AnnotationLabel.objects.create(
+            text="Label", label_type=LabelType.TOKEN_LABEL, creator=self.user
+        )
+
+        for page in range(3):
+            for i in range(3):
+                self._create_annotation(page, f"Page {page} - {i}")
+        self._create_annotation(0, "Public", is_public=True)
+
+    def _create_annotation(self, page, raw_text, **kwargs) -> Annotation:
+        return Annotation.objects.create(
+            document=self.document,
+            corpus=self.corpus,
+            annotation_label=self.label,
+            creator=self.user,
+            page=page,
+            raw_text=raw_text,
+            json={},
+            **kwargs,
+        )
+
+    def _execute(self, user, page_number_list) -> dict:
+        return Client(schema, context_value=TestContext(user)).execute(
+            PAGE_ANNOTATIONS_QUERY,
+            variables={
+                "documentId": to_global_id("DocumentType", self.document.id),
+                "corpusId": to_global_id("CorpusType", self.corpus.id),
+                "pageNumberList": page_number_list,
+            },
+        )
+
+    def _query(self, user, page_number_list="1,2"):
+
+        result = self._execute(user, page_number_list)
+        self.assertIsNone(result.get("errors"))
+        return result["data"]["pageAnnotations"]
+
+    def _annotation_queries(self, user, **kwargs) -> tuple[list[str], list[str]]:
+
+        with CaptureQueriesContext(connection) as queries:
+            raw_texts = [
+                annotation["rawText"]
+                for annotation in self._query(user, **kwargs)["pageAnnotations"]
+            ]
+        return raw_texts, [
+            query["sql"]
+            for query in queries.captured_queries
+            if 'FROM "annotations_annotation"' in query["sql"]
+        ]
+
+    def test_pages_are_served_from_cache(self):
+
+        raw_texts, queries = self._annotation_queries(self.user)
+        self.assertEqual(
+            raw_texts,
+            [f"Page 0 - {i}" for i in range(3)]
+            + ["Public"]
+            + [f"Page 1 - {i}" for i in range(3)],
+        )
+        self.assertEqual(len(queries), 1)
+
+        cached_raw_texts, queries = self._annotation_queries(self.user)
+        self.assertEqual(cached_raw_texts, raw_texts)
+        self.assertEqual(queries, [])
+
+        # Only the page that isn't cached yet is loaded
+        _, queries = self._annotation_queries(self.user, page_number_list="2,3")
+        self.assertEqual(len(queries), 1)
+
+        # Page lists are parsed, not evaluated
+        self.assertIsNotNone(self._execute(self.user, "__import__('os')").get("errors"))
+
+    def test_changes_invalidate_cached_pages(self):
+
+        self._annotation_queries(self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            new_annotation = self._create_annotation(1, "New")
+        raw_texts, queries = self._annotation_queries(self.user)
+        self.assertIn("New", raw_texts)
+        self.assertEqual(len(queries), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            new_annotation.delete()
+        raw_texts, _ = self._annotation_queries(self.user)
+        self.assertNotIn("New", raw_texts)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.label.text = "Renamed"
+            self.label.save()
+        page_annotations = self._query(self.user)["pageAnnotations"]
+        self.assertEqual(
+            {annotation["annotationLabel"]["text"] for annotation in page_annotations},
+            {"Renamed"},
+        )
+
+    def test_forked_annotations_invalidate_cached_pages(self):
+
+        fork = Corpus.objects.create(title="Fork", creator=self.user)
+        forked_document = Document.objects.create(
+            title="Doc", creator=self.user, page_count=3
+        )
+
+        # The forked document is committed (and can be read) before its annotations are bulk created
+        self.assertEqual(
+            get_page_annotations(forked_document.id, [0], corpus_id=fork.id), {0: []}
+        )
+
+        with patch(
+            "opencontractserver.tasks.fork_tasks.annotation_embedding_queue"
+        ), self.captureOnCommitCallbacks(execute=True):
+            _fork_annotation_batch(
+                fork,
+                list(self.document.doc_annotations.values_list("id", flat=True)),
+                {self.document.id: forked_document.id},
+                {self.label.id: self.label.id},
+                self.user.id,
+            )
+
+        self.assertEqual(
+            len(get_page_annotations(forked_document.id, [0], corpus_id=fork.id)[0]),
+            4,
+        )
+
+    def test_cached_pages_respect_visibility(self):
+
+        # Warm the cache as the creator, who can see everything
+        self.assertEqual(len(self._query(self.user)["pageAnnotations"]), 7)
+
+        for user in (self.other_user, AnonymousUser()):
+            with self.subTest(user=user):
+                self.assertEqual(
+                    [
+                        annotation["rawText"]
+                        for annotation in self._query(user)["pageAnnotations"]
+                    ],
+                    ["Public"],
+                )
@@ -0,0 +1,127 @@
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TestCase
+
+from opencontractserver.annotations.models import (
+    TOKEN_LABEL,
+    Annotation,
+    AnnotationLabel,
+)
+from opencontractserver.documents.models import Document
+from opencontractserver.tasks.doc_tasks import reuse_parse_artifacts
+from opencontractserver.tests.fixtures import (
+    SAMPLE_PAWLS_FILE_ONE_PATH,
+    SAMPLE_PDF_FILE_ONE_PATH,
+    SAMPLE_PDF_FILE_TWO_PATH,
+    SAMPLE_TXT_FILE_ONE_PATH,
+)
+from opencontractserver.utils.parse_cache import (
+    calculate_bytes_hash,
+    find_cached_parse_source,
+    get_parse_cache_stats,
+    record_parse_cache_hit,
+    record_parse_cache_miss,
+)
+
+User = get_user_model()
+
+
+class ParseCacheTestCase(TestCase):
+    def setUp(self):
+
+        self.user = User.objects.create_user(username="bob", password="12345678")
+        self.other_user = User.objects.create_user(
+            username="alice", password="12345678"
+        )
+
+        self.pdf_bytes = SAMPLE_PDF_FILE_ONE_PATH.open("rb").read()
+
+        self.parsed_doc = Document.objects.create(
+            creator=self.user,
+            title="Parsed Doc",
+            pdf_file=ContentFile(self.pdf_bytes, name="parsed.pdf"),
+            pawls_parse_file=ContentFile(
+                SAMPLE_PAWLS_FILE_ONE_PATH.open("rb").read(), name="parsed.pawls"
+            ),
+            txt_extract_file=ContentFile(
+                SAMPLE_TXT_FILE_ONE_PATH.open("rb").read(), name="parsed.txt"
+            ),
+            page_count=23,
+            backend_lock=False,
+        )
+
+        label = AnnotationLabel.objects.create(
+            text="Paragraph",
+            label_type=TOKEN_LABEL,
+            read_only=True,
+            creator=self.user,
+        )
+        Annotation.objects.create(
+            raw_text="Structural text",
+            document=self.parsed_doc,
+            annotation_label=label,
+            creator=self.user,
+            structural=True,
+        )
+
+    def test_hash_is_calculated_on_create(self):
+        self.parsed_doc.refresh_from_db()
+        self.assertEqual(
+            self.parsed_doc.pdf_file_hash, calculate_bytes_hash(self.pdf_bytes)
+        )
+
+    def test_identical_pdf_reuses_parse_artifacts(self):
+
+        duplicate_doc = Document.objects.create(
+            creator=self.other_user,
+            title="Duplicate Doc",
+            pdf_file=ContentFile(self.pdf_bytes, name="duplicate.pdf"),
+            pdf_file_hash=calculate_bytes_hash(self.pdf_bytes),
+            backend_lock=True,
+        )
+
+        self.assertEqual(find_cached_parse_source(duplicate_doc), self.parsed_doc)
+
+        reuse_parse_artifacts.si(
+            doc_id=duplicate_doc.id,
+            source_doc_id=self.parsed_doc.id,
+            user_id=self.other_user.id,
+        ).apply().get()
+
+        duplicate_doc.refresh_from_db()
+        self.assertEqual(
+            duplicate_doc.pawls_parse_file.name, self.parsed_doc.pawls_parse_file.name
+        )
+        self.assertEqual(
+            duplicate_doc.txt_extract_file.name, self.parsed_doc.txt_extract_file.name
+        )
+        self.assertEqual(duplicate_doc.page_count, 23)
+
+        cloned = Annotation.objects.get(document=duplicate_doc, structural=True)
+        self.assertEqual(cloned.raw_text, "Structural text")
+        self.assertEqual(cloned.creator, self.other_user)
+        self.assertEqual(cloned.annotation_label.creator, self.other_user)
+
+    def test_different_pdf_misses_cache(self):
+
+        pdf_bytes = SAMPLE_PDF_FILE_TWO_PATH.open("rb").read()
+        other_doc = Document.objects.create(
+            creator=self.user,
+            title="Other Doc",
+            pdf_file=ContentFile(pdf_bytes, name="other.pdf"),
+            pdf_file_hash=calculate_bytes_hash(pdf_bytes),
+            backend_lock=True,
+        )
+
+        self.assertIsNone(find_cached_parse_source(other_doc))
+
+    def test_cache_stats(self):
+
+        before = get_parse_cache_stats()
+        record_parse_cache_hit()
+        record_parse_cache_miss()
+        record_parse_cache_miss()
+        after = get_parse_cache_stats()
+
+        self.assertEqual(after["hits"] - before["hits"], 1)
+        self.assertEqual(after["misses"] - before["misses"], 2)
@@ -0,0 +1,159 @@
+import io
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db.models.signals import post_save
+from django.test import TestCase
+from django.test.utils import override_settings
+from graphene.test import Client
+from graphql_relay import to_global_id
+
+from config.graphql.schema import schema
+from opencontractserver.documents.models import Document
+from opencontractserver.documents.signals import process_doc_on_create_atomic
+from opencontractserver.tasks.doc_tasks import convert_pawls_layers_to_binary
+from opencontractserver.tests.fixtures import SAMPLE_PAWLS_FILE_ONE_PATH
+from opencontractserver.utils.pawls import (
+    PawlsBinaryReader,
+    load_pawls_pages,
+    save_pawls_binary,
+    write_pawls_binary,
+)
+
+User = get_user_model()
+
+
+class TestContext:
+    def __init__(self, user):
+        self.user = user
+
+
+class PawlsBinaryFormatTestCase(TestCase):
+    def setUp(self):
+
+        post_save.disconnect(process_doc_on_create_atomic, sender=Document)
+
+        self.pawls_bytes = SAMPLE_PAWLS_FILE_ONE_PATH.read_bytes()
+        self.pawls_pages = json.loads(self.pawls_bytes)
+        self.pawls_pages[0]["tokens"].append(
+            {"x": 1.5, "y": 2, "width": 3, "height": 4, "text": "naïve ’quote’"}
+        )
+
+    def assertPagesAlmostEqual(self, pages, expected_pages):
+
+        self.assertEqual(len(pages), len(expected_pages))
+        for page, expected_page in zip(pages, expected_pages):
+            self.assertEqual(page["page"]["index"], expected_page["page"]["index"])
+            self.assertAlmostEqual(
+                page["page"]["width"], expected_page["page"]["width"], places=3
+            )
+            self.assertEqual(
+                [token["text"] for token in page["tokens"]],
+                [token["text"] for token in expected_page["tokens"]],
+            )
+            for token, expected_token in zip(page["tokens"], expected_page["tokens"]):
+                for key in ("x", "y", "width", "height"):
+                    self.assertAlmostEqual(token[key], expected_token[key], places=3)
+
+    def test_round_trip_and_single_page_reads(self):
+
+        binary_file = io.BytesIO()
+        write_pawls_binary(self.pawls_pages, binary_file)
+
+        # float32 coordinates and a string table are much smaller than the JSON
+        self.assertLess(len(binary_file.getvalue()), len(self.pawls_bytes) / 2)
+
+        reader = PawlsBinaryReader(binary_file)
+        self.assertEqual(reader.page_count, len(self.pawls_pages))
+        self.assertPagesAlmostEqual(list(reader.read_pages()), self.pawls_pages)
+        self.assertPagesAlmostEqual(
+            list(reader.read_pages([2, 0])),
+            [self.pawls_pages[2], self.pawls_pages[0]],
+        )
+
+        with self.assertRaises(ValueError):
+            PawlsBinaryReader(io.BytesIO(self.pawls_bytes))
+
+    def test_convert_existing_documents(self):
+
+        user = User.objects.create_user(username="bob", password="12345678")
+        document = Document.objects.create(
+            title="Doc",
+            creator=user,
+            pawls_parse_file=ContentFile(
+                json.dumps(self.pawls_pages).encode("utf-8"), name="doc.pawls"
+            ),
+        )
+        Document.objects.create(title="Unparsed", creator=user)
+
+        self.assertEqual(convert_pawls_layers_to_binary.si().apply().get(), 1)
+
+        document.refresh_from_db()
+        self.assertTrue(document.pawls_binary_file)
+        self.assertPagesAlmostEqual(load_pawls_pages(document), self.pawls_pages)
+        self.assertPagesAlmostEqual(
+            load_pawls_pages(document, [1]), [self.pawls_pages[1]]
+        )
+
+        # Nothing left to convert
+        self.assertEqual(convert_pawls_layers_to_binary.si().apply().get(), 0)
+
+    def test_rewriting_json_clears_stale_binary(self):
+
+        user = User.objects.create_user(username="bob", password="12345678")
+        document = Document.objects.create(
+            title="Doc",
+            creator=user,
+            pawls_parse_file=ContentFile(
+                json.dumps(self.pawls_pages).encode("utf-8"), name="doc.pawls"
+            ),
+        )
+        save_pawls_binary(document, self.pawls_pages, force=True)
+
+        # Re-parse with the binary format off
+        reparsed_pages = self.pawls_pages[:1]
+        with override_settings(PAWLS_BINARY_FORMAT=False):
+            document.pawls_parse_file.save(
+                "doc.pawls",
+                ContentFile(json.dumps(reparsed_pages).encode("utf-8")),
+                save=False,
+            )
+            save_pawls_binary(document, reparsed_pages)
+
+        document.refresh_from_db()
+        self.assertFalse(document.pawls_binary_file)
+        self.assertPagesAlmostEqual(load_pawls_pages(document), reparsed_pages)
+
+    def test_pawls_page_query(self):
+
+        user = User.objects.create_user(username="bob", password="12345678")
+        document = Document.objects.create(
+            title="Doc",
+            creator=user,
+            page_count=len(self.pawls_pages),
+            pawls_parse_file=ContentFile(
+                json.dumps(self.pawls_pages).encode("utf-8"), name="doc.pawls"
+            ),
+        )
+
+        query = """
+        query ($id: String!, $page: Int!) {
+          document(id: $id) {
+            pawlsPage(page: $page)
+          }
+        }
+        """
+        client = Client(schema, context_value=TestContext(user))
+
+        for page, expected in ((1, self.pawls_pages[1]), (len(self.pawls_pages), None)):
+            with self.subTest(page=page):
+                result = client.execute(
+                    query,
+                    variables={
+                        "id": to_global_id("DocumentType", document.id),
+                        "page": page,
+                    },
+                )
+                self.assertIsNone(result.get("errors"))
+                self.assertEqual(result["data"]["document"]["pawlsPage"], expected)
@@ -0,0 +1,94 @@
+import json
+import random
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import TestCase
+from plasmapdf.models.PdfDataLayer import makePdfTranslationLayerFromPawlsTokens
+
+from opencontractserver.documents.models import Document
+from opencontractserver.tests.fixtures import SAMPLE_PAWLS_FILE_ONE_PATH
+from opencontractserver.utils.pawls import PawlsTokenIndex, get_pawls_token_index
+
+User = get_user_model()
+
+
+class PawlsTokenIndexTestCase(TestCase):
+    def setUp(self):
+
+        self.pawls_bytes = SAMPLE_PAWLS_FILE_ONE_PATH.read_bytes()
+        self.pawls_pages = json.loads(self.pawls_bytes)
+
+    def test_matches_plasmapdf_translation_layer(self):
+
+        pdf_data_layer = makePdfTranslationLayerFromPawlsTokens(
+            json.loads(self.pawls_bytes)
+        )
+        token_index = PawlsTokenIndex(self.pawls_pages)
+
+        self.assertEqual(token_index.doc_text, pdf_data_layer.doc_text)
+
+        # Spans at the edges of the document and across page breaks, plus a spread of random ones
+        doc_length = len(token_index.doc_text)
+        page_break = int(token_index.page_char_ends[0])
+        rng = random.Random(42)
+        spans = [
+            (0, 4),
+            (0, doc_length),
+            (doc_length - 10, doc_length),
+            (page_break - 20, page_break + 20),
+        ] + [
+            tuple(sorted((rng.randint(0, doc_length), rng.randint(0, doc_length))))
+            for _ in range(50)
+        ]
+
+        for start, end in spans:
+            span_annotation = {
+                "span": {"id": "1", "start": start, "end": end, "text": ""},
+                "annotation_label": "Label",
+            }
+            expected = pdf_data_layer.create_opencontract_annotation_from_span(
+                span_annotation
+            )
+            actual = token_index.create_opencontract_annotation_from_span(
+                span_annotation
+            )
+
+            with self.subTest(start=start, end=end):
+                self.assertEqual(actual["rawText"], expected["rawText"])
+                self.assertEqual(actual["page"], expected["page"])
+                self.assertEqual(
+                    json.loads(json.dumps(actual["annotation_json"])),
+                    json.loads(json.dumps(expected["annotation_json"])),
+                )
+
+    def test_document_index_is_cached(self):
+
+        user = User.objects.create_user(username="bob", password="12345678")
+        document = Document.objects.create(
+            title="Doc",
+            creator=user,
+            pawls_parse_file=ContentFile(self.pawls_bytes, name="doc.pawls"),
+        )
+        cache.clear()
+
+        token_index = get_pawls_token_index(document)
+        self.assertEqual(
+            token_index.doc_text, PawlsTokenIndex(self.pawls_pages).doc_text
+        )
+
+        with patch(
+            "opencontractserver.utils.pawls.PawlsTokenIndex"
+        ) as mock_token_index:
+            cached_token_index = get_pawls_token_index(document)
+
+        mock_token_index.assert_not_called()
+        self.assertEqual(cached_token_index.doc_text, token_index.doc_text)
+
+        # A new PAWLS layer is saved under a new storage key, so it gets its own index
+        document.pawls_parse_file.save(
+            "doc.pawls", ContentFile(json.dumps(self.pawls_pages[:1]).encode("utf-8"))
+        )
+        self.assertEqual(get_pawls_token_index(document).page_count, 1)
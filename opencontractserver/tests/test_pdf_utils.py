@@ -1,6 +1,7 @@
 import io
 import os
 import tempfile
+from unittest.mock import patch
 
 from django.test import TestCase
 
@@ -13,6 +14,7 @@ from opencontractserver.utils.pdf import (
     check_if_pdf_needs_ocr,
     convert_hex_to_rgb_tuple,
     createHighlight,
+    extract_pawls_from_pdf_page_range_by_text_layer,
     split_pdf_into_images,
 )
 
@@ -68,3 +70,35 @@ class PDFUtilsTestCase(TestCase):
             # Verify that files were actually created
             for path in result:
                 self.assertTrue(os.path.exists(path))
+
+    def test_text_layer_pages_skip_ocr(self):
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as pdf_file:
+            pdf_file.write(self.sample_pdf_content)
+            pdf_file.flush()
+
+            with patch(
+                "opencontractserver.utils.pdf.extract_pawls_from_pdf_path"
+            ) as mock_tesseract:
+                pages, routes = extract_pawls_from_pdf_page_range_by_text_layer(
+                    pdf_file.name, 0, 0
+                )
+                mock_tesseract.assert_not_called()
+
+        self.assertEqual(routes, ["text"])
+        self.assertEqual(pages[0]["page"]["index"], 0)
+        self.assertTrue(len(pages[0]["tokens"]) > 0)
+        self.assertEqual(
+            set(pages[0]["tokens"][0].keys()), {"x", "y", "width", "height", "text"}
+        )
+
+    def test_image_only_pages_are_ocred(self):
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as pdf_file:
+            pdf_file.write(self.need_ocr_pdf_content)
+            pdf_file.flush()
+
+            pages, routes = extract_pawls_from_pdf_page_range_by_text_layer(
+                pdf_file.name, 0, 0
+            )
+
+        self.assertEqual(routes, ["ocr"])
+        self.assertEqual(len(pages), 1)
@@ -0,0 +1,151 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from graphene.test import Client
+
+from config.graphql.permissioning.permission_annotator.middleware import (
+    PermissionAnnotatingMiddleware,
+)
+from config.graphql.schema import schema
+from opencontractserver.annotations.models import Annotation, AnnotationLabel
+from opencontractserver.annotations.signals import process_annot_on_create_atomic
+from opencontractserver.documents.models import Document
+from opencontractserver.documents.signals import process_doc_on_create_atomic
+from opencontractserver.types.enums import LabelType, PermissionTypes
+from opencontractserver.utils.permissioning import set_permissions_for_obj_to_user
+
+User = get_user_model()
+
+
+class TestContext:
+    def __init__(self, user):
+        self.user = user
+
+
+ANNOTATIONS_WITH_PERMISSIONS_QUERY = """
+{
+  annotations {
+    edges {
+      node {
+        rawText
+        myPermissions
+        objectSharedWith
+        annotationLabel {
+          myPermissions
+        }
+      }
+    }
+  }
+}
+"""
+
+
+class RequestPermissionCacheTestCase(TestCase):
+    def setUp(self):
+
+        post_save.disconnect(process_annot_on_create_atomic, sender=Annotation)
+        post_save.disconnect(process_doc_on_create_atomic, sender=Document)
+
+        self.user = User.objects.create_user(username="bob", password="12345678")
+        self.other_user = User.objects.create_user(
+            username="alice", password="12345678"
+        )
+        self.document = Document.objects.create(title="Doc", creator=self.user)
+        self.client = Client(
+            schema,
+            context_value=TestContext(self.user),
+            middleware=[PermissionAnnotatingMiddleware()],
+        )
+
+    def _create_annotations(self, count: int):
+
+        for i in range(count):
+            label = AnnotationLabel.objects.create(
+                text=f"Label {i}",
+                label_type=LabelType.TOKEN_LABEL,
+                creator=self.user,
+            )
+            set_permissions_for_obj_to_user(self.user, label, [PermissionTypes.READ])
+
+            annotation = Annotation.objects.create(
+                document=self.document,
+                annotation_label=label,
+                creator=self.user,
+                raw_text=f"Annotation {i}",
+                json={},
+            )
+            set_permissions_for_obj_to_user(
+                self.user, annotation, [PermissionTypes.CRUD]
+            )
+
+    def _query(self) -> tuple[list[dict], int]:
+        """
+        Run the query, returning the annotations and how many permission queries it took
+        """
+
+        with CaptureQueriesContext(connection) as queries:
+            result = self.client.execute(ANNOTATIONS_WITH_PERMISSIONS_QUERY)
+
+        self.assertIsNone(result.get("errors"))
+        permission_queries = [
+            query
+            for query in queries.captured_queries
+            if "objectpermission" in query["sql"] or "auth_permission" in query["sql"]
+        ]
+        return [edge["node"] for edge in result["data"]["annotations"]["edges"]], len(
+            permission_queries
+        )
+
+    def test_permissions_are_loaded_once_per_type(self):
+
+        self._create_annotations(2)
+        nodes, few_annotation_queries = self._query()
+
+        for node in nodes:
+            self.assertEqual(
+                set(node["myPermissions"]),
+                {
+                    "create_annotation",
+                    "read_annotation",
+                    "update_annotation",
+                    "remove_annotation",
+                },
+            )
+            self.assertEqual(
+                node["annotationLabel"]["myPermissions"], ["read_annotationlabel"]
+            )
+
+        self._create_annotations(10)
+        nodes, many_annotation_queries = self._query()
+
+        # Six times the annotations and labels, but no more permission queries (rather than two or so per object)
+        self.assertEqual(len(nodes), 12)
+        self.assertEqual(many_annotation_queries, few_annotation_queries)
+
+    def test_permission_changes_show_up_in_the_next_operation(self):
+
+        self._create_annotations(1)
+        annotation = Annotation.objects.get()
+
+        nodes, _ = self._query()
+        self.assertEqual(
+            [share["username"] for share in nodes[0]["objectSharedWith"]], ["bob"]
+        )
+
+        set_permissions_for_obj_to_user(
+            self.other_user, annotation, [PermissionTypes.READ]
+        )
+        set_permissions_for_obj_to_user(self.user, annotation, [PermissionTypes.READ])
+
+        # The same context object is reused, but each operation gets fresh permissions
+        nodes, _ = self._query()
+        self.assertEqual(nodes[0]["myPermissions"], ["read_annotation"])
+        self.assertEqual(
+            {
+                share["username"]: share["permissions"]
+                for share in nodes[0]["objectSharedWith"]
+            },
+            {"bob": ["read_annotation"], "alice": ["read_annotation"]},
+        )
@@ -0,0 +1,125 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db.models.signals import post_save
+from django.test import TestCase
+from graphql_relay import to_global_id
+
+from config.graphql.permissioning.permission_annotator.permission_cache import (
+    get_model_permission_id_map,
+)
+from opencontractserver.annotations.models import Annotation, AnnotationLabel
+from opencontractserver.annotations.signals import process_annot_on_create_atomic
+from opencontractserver.corpuses.models import Corpus
+from opencontractserver.documents.models import Document
+from opencontractserver.documents.signals import process_doc_on_create_atomic
+from opencontractserver.tests.query_budget import GraphQLQueryBudgetMixin
+from opencontractserver.types.enums import LabelType
+
+User = get_user_model()
+
+ANNOTATIONS_QUERY = """
+query ($corpusId: ID, $labelType: String) {
+  annotations(
+    first: 5
+    corpusId: $corpusId
+    annotationLabel_LabelType: $labelType
+    analysisIsnull: true
+  ) {
+    totalCount
+    edges {
+      node {
+        id
+        rawText
+      }
+    }
+  }
+}
+"""
+
+PAGE_ANNOTATIONS_QUERY = """
+query ($documentId: ID!, $corpusId: ID) {
+  pageAnnotations(documentId: $documentId, corpusId: $corpusId, currentPage: 1) {
+    pdfPageInfo {
+      pageCount
+    }
+    pageAnnotations {
+      rawText
+    }
+  }
+}
+"""
+
+
+class GraphQLQueryBudgetTestCase(GraphQLQueryBudgetMixin, TestCase):
+    def setUp(self):
+
+        post_save.disconnect(process_annot_on_create_atomic, sender=Annotation)
+        post_save.disconnect(process_doc_on_create_atomic, sender=Document)
+        cache.clear()
+
+        self.user = User.objects.create_user(username="bob", password="12345678")
+
+        # The permission lookups cached per process and per user are warm in a running server
+        self.user.get_all_permissions()
+        get_model_permission_id_map("annotations", "annotation")
+        self.corpus = Corpus.objects.create(title="Corpus", creator=self.user)
+        self.document = Document.objects.create(
+            title="Doc", creator=self.user, page_count=1
+        )
+        label = AnnotationLabel.objects.create(
+            text="Label", label_type=LabelType.TOKEN_LABEL, creator=self.user
+        )
+        Annotation.objects.bulk_create(
+            [
+                Annotation(
+                    document=self.document,
+                    corpus=self.corpus,
+                    annotation_label=label,
+                    creator=self.user,
+                    raw_text=f"Annotation {i}",
+                    page=0,
+                    json={},
+                    is_public=i % 2 == 0,
+                )
+                for i in range(30)
+            ]
+        )
+
+    def test_annotations_connection_budget(self):
+
+        variables = {
+            "corpusId": to_global_id("CorpusType", self.corpus.id),
+            "labelType": LabelType.TOKEN_LABEL.value,
+        }
+
+        # One COUNT and one page of rows, however many annotations match, plus the user's group ids for the
+        # permission annotations (anonymous users have none to look up)
+        for user, expected_count, budget in (
+            (self.user, 30, 3),
+            (AnonymousUser(), 15, 2),
+        ):
+            with self.subTest(user=user):
+                data = self.assertGraphQLQueryBudget(
+                    user, ANNOTATIONS_QUERY, budget, variables=variables
+                )
+                self.assertEqual(data["annotations"]["totalCount"], expected_count)
+                self.assertEqual(len(data["annotations"]["edges"]), 5)
+
+    def test_page_annotations_budget(self):
+
+        variables = {
+            "documentId": to_global_id("DocumentType", self.document.id),
+            "corpusId": to_global_id("CorpusType", self.corpus.id),
+        }
+
+        # The page count and the page's annotations...
+        data = self.assertGraphQLQueryBudget(
+            self.user, PAGE_ANNOTATIONS_QUERY, 2, variables=variables
+        )
+        self.assertEqual(len(data["pageAnnotations"]["pageAnnotations"]), 30)
+
+        # ...then just the page count once the page is cached
+        self.assertGraphQLQueryBudget(
+            self.user, PAGE_ANNOTATIONS_QUERY, 1, variables=variables
+        )
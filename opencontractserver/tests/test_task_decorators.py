@@ -1,9 +1,12 @@
 import json
+from unittest.mock import patch
 
 from celery.exceptions import Retry
 from django.contrib.auth import get_user_model
 from django.core.files.base import ContentFile
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from opencontractserver.analyzer.models import Analysis, Analyzer
 from opencontractserver.annotations.models import (
@@ -316,3 +319,68 @@ class DocAnalyzerTaskTestCase(TestCase):
             missing_data_key_task.si(
                 doc_id=self.document.id, analysis_id=self.analysis.id
             ).apply().get()
+
+    def test_span_annotations_are_bulk_created(self):
+        def make_task(span_count: int):
+            @doc_analyzer_task()
+            def many_spans_task(*args, **kwargs):
+                return (
+                    ["IMPORTANT_DOCUMENT"],
+                    [
+                        (
+                            TextSpan(id=str(i), start=0, end=4, text="This"),
+                            f"LABEL_{i % 2}",
+                        )
+                        for i in range(span_count)
+                    ],
+                    [],
+                    True,
+                )
+
+            return many_spans_task
+
+        def run(span_count: int) -> CaptureQueriesContext:
+            with CaptureQueriesContext(connection) as queries:
+                make_task(span_count).si(
+                    doc_id=self.unlocked_document.id, analysis_id=self.analysis.id
+                ).apply().get()
+            return queries
+
+        small_run = run(2)
+        large_run = run(200)
+
+        # Labels are resolved once per distinct text, so the second run reuses the first run's
+        self.assertEqual(AnnotationLabel.objects.count(), 3)
+        self.assertEqual(
+            Annotation.objects.filter(annotation_label__text="LABEL_0").count(), 101
+        )
+        self.assertEqual(
+            Annotation.objects.filter(annotation_label__text="IMPORTANT_DOCUMENT")
+            .values_list("raw_text", flat=True)
+            .distinct()
+            .get(),
+            "",
+        )
+
+        # ... and the number of queries doesn't grow with the number of spans
+        self.assertLessEqual(len(large_run), len(small_run))
+
+    def test_token_index_is_not_built_without_spans(self):
+        @doc_analyzer_task()
+        def doc_labels_only_task(*args, **kwargs):
+            return ["IMPORTANT_DOCUMENT"], [], [], True
+
+        with patch(
+            "opencontractserver.shared.decorators.get_pawls_token_index"
+        ) as mock_get_token_index:
+            result = (
+                doc_labels_only_task.si(
+                    doc_id=self.unlocked_document.id, analysis_id=self.analysis.id
+                )
+                .apply()
+                .get()
+            )
+
+        self.assertTrue(result[3])
+        mock_get_token_index.assert_not_called()
+        self.assertEqual(Annotation.objects.count(), 1)
@@ -0,0 +1,184 @@
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchQuery
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test import TestCase
+from llama_index.core.vector_stores.types import (
+    VectorStoreQuery,
+    VectorStoreQueryMode,
+)
+
+from opencontractserver.annotations.models import Annotation
+from opencontractserver.annotations.signals import process_annot_on_create_atomic
+from opencontractserver.corpuses.models import Corpus
+from opencontractserver.documents.models import Document
+from opencontractserver.documents.signals import process_doc_on_create_atomic
+from opencontractserver.llms.vector_stores import DjangoAnnotationVectorStore
+from opencontractserver.tests.fixtures import SAMPLE_PDF_FILE_ONE_PATH
+from opencontractserver.utils.vector_search import (
+    ann_search_settings,
+    benchmark_ann_recall,
+    calculate_ivfflat_lists,
+)
+
+User = get_user_model()
+
+
+def _unit_vector(index: int, dims: int = 384) -> list[float]:
+    vector = np.zeros(dims)
+    vector[index] = 1.0
+    return vector.tolist()
+
+
+class VectorSearchTestCase(TestCase):
+    def setUp(self):
+
+        post_save.disconnect(process_annot_on_create_atomic, sender=Annotation)
+        post_save.disconnect(process_doc_on_create_atomic, sender=Document)
+
+        self.user = User.objects.create_user(username="bob", password="12345678")
+        self.doc = Document.objects.create(
+            creator=self.user,
+            title="Test Doc",
+            pdf_file=ContentFile(
+                SAMPLE_PDF_FILE_ONE_PATH.open("rb").read(), name="test.pdf"
+            ),
+        )
+        self.corpus = Corpus.objects.create(title="Test Corpus", creator=self.user)
+        self.corpus.documents.add(self.doc)
+
+        self.annotations = [
+            Annotation.objects.create(
+                raw_text=f"Annotation text {i}",
+                document=self.doc,
+                creator=self.user,
+                embedding=_unit_vector(i),
+            )
+            for i in range(10)
+        ]
+        self.clause_annotation = Annotation.objects.create(
+            raw_text="The indemnification obligations survive termination",
+            document=self.doc,
+            creator=self.user,
+            embedding=_unit_vector(20),
+        )
+        # Annotations without embeddings should never be returned by a vector query
+        Annotation.objects.create(
+            raw_text="No embedding", document=self.doc, creator=self.user
+        )
+
+    def test_ann_indexes_exist(self):
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT indexname FROM pg_indexes WHERE indexname IN "
+                "('annotation_embedding_ann_idx', 'document_embedding_ann_idx')"
+            )
+            index_names = {row[0] for row in cursor.fetchall()}
+
+        self.assertEqual(
+            index_names, {"annotation_embedding_ann_idx", "document_embedding_ann_idx"}
+        )
+
+    def test_vector_store_query_with_ann_settings(self):
+
+        vector_store = DjangoAnnotationVectorStore.from_params(
+            corpus_id=self.corpus.id, ef_search=100
+        )
+        self.assertEqual(vector_store.ef_search, 100)
+
+        results = vector_store.query(
+            VectorStoreQuery(query_embedding=_unit_vector(3), similarity_top_k=3),
+            probes=5,
+        )
+
+        self.assertEqual(len(results.ids), 3)
+        self.assertEqual(results.ids[0], str(self.annotations[3].id))
+
+    def test_search_vector_maintained_by_trigger(self):
+
+        self.assertTrue(
+            Annotation.objects.filter(
+                id=self.clause_annotation.id,
+                search_vector=SearchQuery("indemnification", config="english"),
+            ).exists()
+        )
+
+        self.clause_annotation.raw_text = "Governing law is Delaware"
+        self.clause_annotation.save()
+
+        self.assertFalse(
+            Annotation.objects.filter(
+                id=self.clause_annotation.id,
+                search_vector=SearchQuery("indemnification", config="english"),
+            ).exists()
+        )
+
+    def test_text_search_query(self):
+
+        vector_store = DjangoAnnotationVectorStore.from_params(document_id=self.doc.id)
+        results = vector_store.query(
+            VectorStoreQuery(
+                query_str="indemnify",
+                mode=VectorStoreQueryMode.TEXT_SEARCH,
+                sparse_top_k=5,
+            )
+        )
+
+        self.assertEqual(results.ids, [str(self.clause_annotation.id)])
+
+    def test_hybrid_query_fuses_vector_and_text_results(self):
+
+        vector_store = DjangoAnnotationVectorStore.from_params(corpus_id=self.corpus.id)
+        results = vector_store.query(
+            VectorStoreQuery(
+                query_embedding=_unit_vector(3),
+                query_str="indemnification",
+                mode=VectorStoreQueryMode.HYBRID,
+                similarity_top_k=1,
+                sparse_top_k=1,
+                hybrid_top_k=2,
+            )
+        )
+
+        self.assertEqual(
+            set(results.ids),
+            {str(self.annotations[3].id), str(self.clause_annotation.id)},
+        )
+
+    def test_reciprocal_rank_fusion(self):
+
+        fused = DjangoAnnotationVectorStore._reciprocal_rank_fusion(
+            [[1, 2, 3], [3, 4]], [0.5, 0.5], k=60
+        )
+
+        self.assertEqual(fused[0][0], 3)
+        self.assertEqual({annotation_id for annotation_id, _ in fused}, {1, 2, 3, 4})
+
+    def test_ann_search_settings_are_transaction_local(self):
+
+        with ann_search_settings(ef_search=123):
+            with connection.cursor() as cursor:
+                cursor.execute("SHOW hnsw.ef_search")
+                self.assertEqual(cursor.fetchone()[0], "123")
+
+    def test_benchmark_ann_recall(self):
+
+        stats = benchmark_ann_recall(
+            Annotation.objects.filter(document=self.doc),
+            [_unit_vector(i) for i in range(3)],
+            k=1,
+            ef_search=40,
+        )
+
+        self.assertEqual(stats["queries"], 3)
+        self.assertEqual(stats["recall"], 1.0)
+        self.assertGreaterEqual(stats["ann_latency_ms"], 0)
+        self.assertGreaterEqual(stats["exact_latency_ms"], 0)
+
+    def test_calculate_ivfflat_lists(self):
+        self.assertEqual(calculate_ivfflat_lists(0), 1)
+        self.assertEqual(calculate_ivfflat_lists(500_000), 500)
+        self.assertEqual(calculate_ivfflat_lists(4_000_000), 2000)
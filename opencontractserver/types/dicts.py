@@ -284,6 +284,19 @@ class OpenContractsAnnotatedDocumentImportType(TypedDict):
     metadata_labels: dict[str, AnnotationLabelPythonType]
 
 
+class OpenContractsImportStatsPythonType(TypedDict):
+    """
+    Summary returned by the bulk corpus import engine (opencontractserver.utils.importing)
+    """
+
+    documents: int
+    annotations: int
+    labels: int
+    seconds: float
+    docs_per_second: float
+    annotations_per_second: float
+
+
 class OpenContractsAnalysisTaskResult(TypedDict):
     doc_id: int
     annotations: OpenContractsDocAnnotations
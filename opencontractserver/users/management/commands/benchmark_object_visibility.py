@@ -0,0 +1,207 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models, transaction
+from django.test.utils import override_settings
+
+from opencontractserver.annotations.models import (
+    Annotation,
+    AnnotationUserObjectPermission,
+)
+from opencontractserver.documents.models import Document
+from opencontractserver.shared.resolvers import resolve_oc_model_queryset
+from opencontractserver.users.models import ObjectVisibility
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a large number of annotations and compare how long visibility-filtered annotation queries take "
+        "against the ObjectVisibility table versus the creator / is_public / guardian permission OR with "
+        "DISTINCT. Everything is seeded in one transaction that is rolled back afterwards unless --keep is passed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--annotations", type=int, default=10_000_000)
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=1000,
+            help="Annotations are spread evenly across this many creators.",
+        )
+        parser.add_argument(
+            "--public-fraction",
+            type=float,
+            default=0.05,
+            help="Share of annotations that are public.",
+        )
+        parser.add_argument(
+            "--shared-fraction",
+            type=float,
+            default=0.01,
+            help="Share of annotations a random user is given read permission on.",
+        )
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument(
+            "--explain",
+            action="store_true",
+            help="Also print each queryset's EXPLAIN ANALYZE plan.",
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Commit the seeded rows instead of rolling them back.",
+        )
+
+    def handle(self, *args, **options):
+
+        with transaction.atomic():
+            user = self._seed(options)
+            self._benchmark(user, options)
+
+            if not options["keep"]:
+                transaction.set_rollback(True)
+
+    def _seed(self, options) -> User:
+
+        started = time.perf_counter()
+
+        creators = User.objects.bulk_create(
+            [
+                User(username=f"visibility-benchmark-{i}")
+                for i in range(options["users"])
+            ]
+        )
+        creator_ids = [creator.id for creator in creators]
+        document = Document.objects.bulk_create(
+            [Document(title="Visibility benchmark", creator=creators[0])]
+        )[0]
+
+        # Set-based inserts, so the visibility triggers see the same bulk statements a real import would produce
+        columns, values, params = self._annotation_columns(
+            document, creator_ids, options["public_fraction"]
+        )
+        read_permission = Permission.objects.get(
+            content_type__app_label="annotations", codename="read_annotation"
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {Annotation._meta.db_table} ({', '.join(columns)}) "
+                f"SELECT {', '.join(values)} FROM generate_series(1, %s) AS series(n)",
+                [*params, options["annotations"]],
+            )
+            cursor.execute(
+                f"INSERT INTO {AnnotationUserObjectPermission._meta.db_table} "
+                "(permission_id, user_id, content_object_id) "
+                "SELECT %s, (%s::bigint[])[1 + floor(random() * %s)::int], id "
+                f"FROM {Annotation._meta.db_table} "
+                "WHERE document_id = %s AND random() < %s "
+                "ON CONFLICT DO NOTHING",
+                [
+                    read_permission.id,
+                    creator_ids,
+                    len(creator_ids),
+                    document.id,
+                    options["shared_fraction"],
+                ],
+            )
+            for model in (Annotation, AnnotationUserObjectPermission, ObjectVisibility):
+                cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+        self.stdout.write(
+            f"Seeded {options['annotations']} annotations across {len(creator_ids)} creators in "
+            f"{time.perf_counter() - started:.1f}s"
+        )
+
+        return creators[0]
+
+    @staticmethod
+    def _annotation_columns(
+        document: Document, creator_ids: list[int], public_fraction: float
+    ) -> tuple[list[str], list[str], list]:
+        """
+        Column names, SQL expressions (over generate_series row n) and their params for the seeded annotations.
+        Required columns without an explicit expression get their field's Python default.
+        """
+
+        expressions = {
+            "document_id": ("%s", [document.id]),
+            "creator_id": (
+                "(%s::bigint[])[1 + mod(series.n, %s)]",
+                [creator_ids, len(creator_ids)],
+            ),
+            "is_public": ("random() < %s", [public_fraction]),
+            "page": ("1 + mod(series.n, 100)", []),
+            "raw_text": ("'Benchmark annotation ' || series.n", []),
+        }
+
+        columns, values, params = [], [], []
+        for field in Annotation._meta.concrete_fields:
+            if field.primary_key:
+                continue
+
+            if field.attname in expressions:
+                value, value_params = expressions[field.attname]
+            elif field.null:
+                continue
+            elif isinstance(field, models.DateTimeField):
+                value, value_params = "now()", []
+            else:
+                value, value_params = "%s", [
+                    field.get_db_prep_save(field.get_default(), connection)
+                ]
+
+            columns.append(field.column)
+            values.append(value)
+            params.extend(value_params)
+
+        return columns, values, params
+
+    def _benchmark(self, user: User, options):
+
+        queries = {
+            "resolve_oc_model_queryset": lambda: resolve_oc_model_queryset(
+                Annotation, user
+            ),
+            "visible_to_user": lambda: Annotation.objects.visible_to_user(user),
+        }
+
+        for name, build_queryset in queries.items():
+            counts = {}
+            for strategy, use_table in (("OR + DISTINCT", False), ("table", True)):
+                with override_settings(OBJECT_VISIBILITY_TABLE=use_table):
+                    queryset = build_queryset()
+
+                    count_timings, page_timings = [], []
+                    for _ in range(options["repeat"]):
+                        started = time.perf_counter()
+                        counts[strategy] = queryset.count()
+                        count_timings.append(time.perf_counter() - started)
+
+                        started = time.perf_counter()
+                        list(
+                            queryset.order_by("-id").values_list("id", flat=True)[
+                                : options["page_size"]
+                            ]
+                        )
+                        page_timings.append(time.perf_counter() - started)
+
+                    self.stdout.write(
+                        f"{name} [{strategy}]: {counts[strategy]} visible, median count "
+                        f"{statistics.median(count_timings) * 1000:.1f}ms, median first page "
+                        f"{statistics.median(page_timings) * 1000:.1f}ms"
+                    )
+
+                    if options["explain"]:
+                        self.stdout.write(queryset.values("id").explain(analyze=True))
+
+            if len(set(counts.values())) > 1:
+                raise CommandError(
+                    f"{name} found different numbers of visible annotations: {counts}"
+                )
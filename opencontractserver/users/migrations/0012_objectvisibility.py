@@ -0,0 +1,345 @@
+# Generated by Django 4.2.16 on 2026-10-18 23:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# (model label, table, user object permission table, read permission codename) for each model whose visibility
+# is materialized in users_objectvisibility. Analyzer is left out as its primary key isn't an integer.
+TRACKED_MODELS = [
+    (
+        "analyzer.analysis",
+        "analyzer_analysis",
+        "analyzer_analysisuserobjectpermission",
+        "read_analysis",
+    ),
+    (
+        "analyzer.gremlinengine",
+        "analyzer_gremlinengine",
+        "analyzer_gremlinengineuserobjectpermission",
+        "read_gremlinengine",
+    ),
+    (
+        "annotations.annotation",
+        "annotations_annotation",
+        "annotations_annotationuserobjectpermission",
+        "read_annotation",
+    ),
+    (
+        "annotations.annotationlabel",
+        "annotations_annotationlabel",
+        "annotations_annotationlabeluserobjectpermission",
+        "read_annotationlabel",
+    ),
+    (
+        "annotations.labelset",
+        "annotations_labelset",
+        "annotations_labelsetuserobjectpermission",
+        "read_labelset",
+    ),
+    (
+        "annotations.relationship",
+        "annotations_relationship",
+        "annotations_relationshipuserobjectpermission",
+        "read_relationship",
+    ),
+    (
+        "corpuses.corpus",
+        "corpuses_corpus",
+        "corpuses_corpususerobjectpermission",
+        "read_corpus",
+    ),
+    (
+        "corpuses.corpusaction",
+        "corpuses_corpusaction",
+        "corpuses_corpusactionuserobjectpermission",
+        "read_corpusaction",
+    ),
+    (
+        "corpuses.corpusquery",
+        "corpuses_corpusquery",
+        "corpuses_corpusqueryuserobjectpermission",
+        "read_corpusquery",
+    ),
+    (
+        "documents.document",
+        "documents_document",
+        "documents_documentuserobjectpermission",
+        "read_document",
+    ),
+    (
+        "documents.documentanalysisrow",
+        "documents_documentanalysisrow",
+        "documents_documentanalysisrowuserobjectpermission",
+        "read_documentanalysisrow",
+    ),
+    (
+        "extracts.column",
+        "extracts_column",
+        "extracts_columnuserobjectpermission",
+        "read_column",
+    ),
+    (
+        "extracts.datacell",
+        "extracts_datacell",
+        "extracts_datacelluserobjectpermission",
+        "read_datacell",
+    ),
+    (
+        "extracts.extract",
+        "extracts_extract",
+        "extracts_extractuserobjectpermission",
+        "read_extract",
+    ),
+    (
+        "extracts.fieldset",
+        "extracts_fieldset",
+        "extracts_fieldsetuserobjectpermission",
+        "read_fieldset",
+    ),
+    (
+        "feedback.userfeedback",
+        "feedback_userfeedback",
+        "feedback_userfeedbackuserobjectpermission",
+        "read_userfeedback",
+    ),
+]
+
+# Trigger functions. TG_ARGV[0] is the object's model label and, for permission tables, TG_ARGV[1] the read
+# permission codename. Inserts and deletes are handled per statement from the transition tables so bulk_create and
+# bulk deletes stay set based. Updates are per row, and only fire when is_public / creator (or a permission row)
+# actually change.
+CREATE_FUNCTIONS_SQL = """
+CREATE OR REPLACE FUNCTION object_visibility_objects_inserted() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO users_objectvisibility (object_type, object_id, user_id, reason)
+    SELECT TG_ARGV[0], id, creator_id, 'creator' FROM new_rows
+    UNION ALL
+    SELECT TG_ARGV[0], id, NULL, 'public' FROM new_rows WHERE is_public
+    ON CONFLICT DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION object_visibility_object_updated() RETURNS trigger AS $$
+BEGIN
+    DELETE FROM users_objectvisibility
+    WHERE object_type = TG_ARGV[0] AND object_id = OLD.id AND reason IN ('creator', 'public');
+
+    INSERT INTO users_objectvisibility (object_type, object_id, user_id, reason)
+    VALUES (TG_ARGV[0], NEW.id, NEW.creator_id, 'creator')
+    ON CONFLICT DO NOTHING;
+
+    IF NEW.is_public THEN
+        INSERT INTO users_objectvisibility (object_type, object_id, user_id, reason)
+        VALUES (TG_ARGV[0], NEW.id, NULL, 'public')
+        ON CONFLICT DO NOTHING;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION object_visibility_objects_deleted() RETURNS trigger AS $$
+BEGIN
+    DELETE FROM users_objectvisibility AS visibility
+    USING old_rows
+    WHERE visibility.object_type = TG_ARGV[0] AND visibility.object_id = old_rows.id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION object_visibility_permissions_inserted() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO users_objectvisibility (object_type, object_id, user_id, reason)
+    SELECT TG_ARGV[0], new_rows.content_object_id, new_rows.user_id, 'permission'
+    FROM new_rows
+    JOIN auth_permission ON auth_permission.id = new_rows.permission_id
+    WHERE auth_permission.codename = TG_ARGV[1]
+    ON CONFLICT DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION object_visibility_permission_updated() RETURNS trigger AS $$
+BEGIN
+    DELETE FROM users_objectvisibility AS visibility
+    USING auth_permission
+    WHERE auth_permission.id = OLD.permission_id
+        AND auth_permission.codename = TG_ARGV[1]
+        AND visibility.object_type = TG_ARGV[0]
+        AND visibility.object_id = OLD.content_object_id
+        AND visibility.user_id = OLD.user_id
+        AND visibility.reason = 'permission';
+
+    INSERT INTO users_objectvisibility (object_type, object_id, user_id, reason)
+    SELECT TG_ARGV[0], NEW.content_object_id, NEW.user_id, 'permission'
+    FROM auth_permission
+    WHERE auth_permission.id = NEW.permission_id AND auth_permission.codename = TG_ARGV[1]
+    ON CONFLICT DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION object_visibility_permissions_deleted() RETURNS trigger AS $$
+BEGIN
+    DELETE FROM users_objectvisibility AS visibility
+    USING old_rows
+    JOIN auth_permission ON auth_permission.id = old_rows.permission_id
+    WHERE auth_permission.codename = TG_ARGV[1]
+        AND visibility.object_type = TG_ARGV[0]
+        AND visibility.object_id = old_rows.content_object_id
+        AND visibility.user_id = old_rows.user_id
+        AND visibility.reason = 'permission';
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+DROP_FUNCTIONS_SQL = """
+DROP FUNCTION IF EXISTS object_visibility_objects_inserted();
+DROP FUNCTION IF EXISTS object_visibility_object_updated();
+DROP FUNCTION IF EXISTS object_visibility_objects_deleted();
+DROP FUNCTION IF EXISTS object_visibility_permissions_inserted();
+DROP FUNCTION IF EXISTS object_visibility_permission_updated();
+DROP FUNCTION IF EXISTS object_visibility_permissions_deleted();
+"""
+
+
+def create_triggers_sql(label, table, permission_table, codename):
+    return f"""
+    CREATE TRIGGER {table}_visibility_insert
+    AFTER INSERT ON {table} REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION object_visibility_objects_inserted('{label}');
+
+    CREATE TRIGGER {table}_visibility_update
+    AFTER UPDATE OF is_public, creator_id ON {table}
+    FOR EACH ROW
+    WHEN (OLD.is_public IS DISTINCT FROM NEW.is_public OR OLD.creator_id IS DISTINCT FROM NEW.creator_id)
+    EXECUTE FUNCTION object_visibility_object_updated('{label}');
+
+    CREATE TRIGGER {table}_visibility_delete
+    AFTER DELETE ON {table} REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION object_visibility_objects_deleted('{label}');
+
+    CREATE TRIGGER {permission_table}_visibility_insert
+    AFTER INSERT ON {permission_table} REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION object_visibility_permissions_inserted('{label}', '{codename}');
+
+    CREATE TRIGGER {permission_table}_visibility_update
+    AFTER UPDATE ON {permission_table}
+    FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*)
+    EXECUTE FUNCTION object_visibility_permission_updated('{label}', '{codename}');
+
+    CREATE TRIGGER {permission_table}_visibility_delete
+    AFTER DELETE ON {permission_table} REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION object_visibility_permissions_deleted('{label}', '{codename}');
+
+    INSERT INTO users_objectvisibility (object_type, object_id, user_id, reason)
+    SELECT '{label}', id, creator_id, 'creator' FROM {table}
+    UNION ALL
+    SELECT '{label}', id, NULL, 'public' FROM {table} WHERE is_public
+    UNION ALL
+    SELECT '{label}', {permission_table}.content_object_id, {permission_table}.user_id, 'permission'
+    FROM {permission_table}
+    JOIN auth_permission ON auth_permission.id = {permission_table}.permission_id
+    WHERE auth_permission.codename = '{codename}'
+    ON CONFLICT DO NOTHING;
+    """
+
+
+def drop_triggers_sql(label, table, permission_table, codename):
+    return f"""
+    DROP TRIGGER IF EXISTS {table}_visibility_insert ON {table};
+    DROP TRIGGER IF EXISTS {table}_visibility_update ON {table};
+    DROP TRIGGER IF EXISTS {table}_visibility_delete ON {table};
+    DROP TRIGGER IF EXISTS {permission_table}_visibility_insert ON {permission_table};
+    DROP TRIGGER IF EXISTS {permission_table}_visibility_update ON {permission_table};
+    DROP TRIGGER IF EXISTS {permission_table}_visibility_delete ON {permission_table};
+    """
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("users", "0011_setup_document_row_analysis_permissions"),
+        ("analyzer", "0008_alter_analysis_analyzed_corpus"),
+        ("annotations", "0019_annotation_search_vector_and_more"),
+        ("corpuses", "0014_alter_corpus_label_set"),
+        ("documents", "0012_document_pawls_binary_file"),
+        ("extracts", "0014_extract_corpus_action"),
+        ("feedback", "0004_rename_userfeedbackobjectpermission_userfeedbackuserobjectpermission"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ObjectVisibility",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("object_type", models.CharField(max_length=100)),
+                ("object_id", models.BigIntegerField()),
+                (
+                    "reason",
+                    models.CharField(
+                        choices=[
+                            ("creator", "Creator"),
+                            ("public", "Public"),
+                            ("permission", "Permission"),
+                        ],
+                        max_length=16,
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["object_type", "user", "reason", "object_id"],
+                        name="object_visibility_user_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="objectvisibility",
+            constraint=models.UniqueConstraint(
+                fields=("object_type", "object_id", "reason", "user"),
+                name="unique_object_visibility",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="objectvisibility",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("user__isnull", True)),
+                fields=("object_type", "object_id"),
+                name="unique_public_object_visibility",
+            ),
+        ),
+        # Keep users_objectvisibility in sync with every tracked table and its permission table, then fill it from
+        # the existing rows.
+        migrations.RunSQL(sql=CREATE_FUNCTIONS_SQL, reverse_sql=DROP_FUNCTIONS_SQL),
+        *(
+            migrations.RunSQL(
+                sql=create_triggers_sql(*tracked_model),
+                reverse_sql=drop_triggers_sql(*tracked_model),
+            )
+            for tracked_model in TRACKED_MODELS
+        ),
+    ]
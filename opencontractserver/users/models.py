@@ -284,3 +284,78 @@ class Auth0APIToken(django.db.models.Model):
     expiration_Date = django.db.models.DateTimeField("Token Expiration Date:")
     refreshing = django.db.models.BooleanField("Refreshing Token", default=False)
     auth0_Response = django.db.models.TextField("Last Response from Auth0")
+
+
+# Models whose visibility is materialized in ObjectVisibility. Tracking another model takes a migration that
+# installs the visibility triggers on its table and its *UserObjectPermission table (see users migration 0012).
+OBJECT_VISIBILITY_MODELS = frozenset(
+    {
+        "analyzer.analysis",
+        "analyzer.gremlinengine",
+        "annotations.annotation",
+        "annotations.annotationlabel",
+        "annotations.labelset",
+        "annotations.relationship",
+        "corpuses.corpus",
+        "corpuses.corpusaction",
+        "corpuses.corpusquery",
+        "documents.document",
+        "documents.documentanalysisrow",
+        "extracts.column",
+        "extracts.datacell",
+        "extracts.extract",
+        "extracts.fieldset",
+        "feedback.userfeedback",
+    }
+)
+
+
+class ObjectVisibility(django.db.models.Model):
+    """
+    Denormalized read access list for the models in OBJECT_VISIBILITY_MODELS: one row per object per principal that
+    can see it, so "what can this user see" is an index lookup rather than an OR across the object table and its
+    guardian permission table. Principals are the object's creator, users holding its read_<model> object permission
+    and, with a null user, everyone while the object is public.
+
+    Rows are written by database triggers on the tracked tables and their *UserObjectPermission tables, so they stay
+    in sync through bulk_create, queryset update / delete and raw SQL too. Never write to this table from Python.
+    """
+
+    class Reason(django.db.models.TextChoices):
+        CREATOR = "creator"
+        PUBLIC = "public"
+        PERMISSION = "permission"
+
+    # The object's model label, e.g. "annotations.annotation"
+    object_type = django.db.models.CharField(max_length=100)
+    object_id = django.db.models.BigIntegerField()
+    user = django.db.models.ForeignKey(
+        get_user_model(),
+        on_delete=django.db.models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    reason = django.db.models.CharField(max_length=16, choices=Reason.choices)
+
+    class Meta:
+        constraints = [
+            django.db.models.UniqueConstraint(
+                fields=["object_type", "object_id", "reason", "user"],
+                name="unique_object_visibility",
+            ),
+            django.db.models.UniqueConstraint(
+                fields=["object_type", "object_id"],
+                condition=django.db.models.Q(user__isnull=True),
+                name="unique_public_object_visibility",
+            ),
+        ]
+        indexes = [
+            django.db.models.Index(
+                fields=["object_type", "user", "reason", "object_id"],
+                name="object_visibility_user_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.object_type} {self.object_id} visible to {self.user_id or 'everyone'} ({self.reason})"
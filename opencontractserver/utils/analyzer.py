@@ -1,6 +1,9 @@
 from __future__ import annotations
 
 import logging
+import time
+from collections.abc import Container, Mapping
+from typing import Optional
 
 import django.db.models
 import requests
@@ -10,7 +13,9 @@ from django.db import transaction
 from django.utils import timezone
 
 from opencontractserver.analyzer.models import Analysis, Analyzer, GremlinEngine
+from opencontractserver.annotations.embedding_queue import annotation_embedding_queue
 from opencontractserver.annotations.models import Annotation, AnnotationLabel, LabelSet
+from opencontractserver.annotations.page_cache import invalidate_page_annotations
 from opencontractserver.documents.models import Document
 from opencontractserver.types.dicts import (
     AnalyzerManifest,
@@ -18,14 +23,25 @@ from opencontractserver.types.dicts import (
     OpenContractsGeneratedCorpusPythonType,
     OpenContractsLabelSetType,
 )
-from opencontractserver.types.enums import PermissionTypes
+from opencontractserver.types.enums import JobStatus, PermissionTypes
+from opencontractserver.utils.importing import (
+    LABEL_KEYS,
+    AnnotatedDocsJsonReader,
+    validate_label_data,
+)
 from opencontractserver.utils.packaging import (
     turn_base64_encoded_file_to_django_content_file,
 )
-from opencontractserver.utils.permissioning import set_permissions_for_obj_to_user
+from opencontractserver.utils.permissioning import (
+    set_permissions_for_obj_to_user,
+    set_permissions_for_objs_to_user,
+)
 
 logger = logging.getLogger(__name__)
 
+# Rows per INSERT when bulk creating an analysis' annotations
+ANALYSIS_IMPORT_BATCH_SIZE = 1000
+
 
 def get_django_file_field_url(
     field_name: str,
@@ -291,20 +307,106 @@ def run_analysis(
         return -1
 
 
+def _append_to_import_log(analysis: Analysis, messages: list[str]):
+    """
+    Write a whole import's worth of errors to analysis.import_log with a single save.
+    """
+
+    if not messages:
+        return
+
+    message = "\n".join(messages)
+    with transaction.atomic():
+        analysis.import_log = (
+            analysis.import_log + "\n" + message if analysis.import_log else message
+        )
+        analysis.save()
+
+
+def validate_analysis_results(
+    metadata: dict, annotated_doc_keys: Mapping[str, Container[str]]
+):
+    """
+    Check the structure of an analyzer's results (OpenContractsGeneratedCorpusPythonType) before importing
+    anything. metadata is the results without annotated_docs, annotated_doc_keys maps each doc id to its keys (see
+    AnnotatedDocsJsonReader). Raises a ValueError listing every problem found.
+    """
+
+    missing = [
+        key for key in ("doc_labels", "text_labels", "label_set") if key not in metadata
+    ]
+    if missing:
+        raise ValueError(f"Analysis results are missing {missing}")
+
+    errors = [
+        *validate_label_data(
+            metadata["text_labels"], "text_labels", (*LABEL_KEYS, "id")
+        ),
+        *validate_label_data(metadata["doc_labels"], "doc_labels", (*LABEL_KEYS, "id")),
+    ]
+    for doc_id, doc_keys in annotated_doc_keys.items():
+        missing = [
+            key for key in ("doc_labels", "labelled_text") if key not in doc_keys
+        ]
+        if missing:
+            errors.append(f"annotated_docs[{doc_id}] is missing {missing}")
+
+    if errors:
+        raise ValueError(f"Analysis results failed validation: {errors}")
+
+
 def import_annotations_from_analysis(
     analysis_id: str | int,
     creator_id: str | int,
-    analysis_results: OpenContractsGeneratedCorpusPythonType,
+    analysis_results: Optional[OpenContractsGeneratedCorpusPythonType] = None,
 ) -> bool:
     """
     Import the actual annotations and link them to proper analyzers, analysis, labels, etc.
+
+    Each document's annotations are bulk created (and permissioned in bulk) in one transaction, so a document is
+    either fully imported or not at all. Errors are collected as we go and written to analysis.import_log once at the
+    end.
+
+    If analysis_results isn't passed, the results are streamed from analysis.received_callback_file one document at
+    a time. Either way they're validated before anything is created, and an analysis whose results don't validate
+    is marked FAILED. Documents that already have annotations from this analysis are skipped, so running the import
+    again after a failure resumes where the last run stopped instead of duplicating annotations.
     """
     logger.info(
         f"import_annotations_from_analysis - start(analysis_id: {analysis_id}, creator_id: {creator_id})..."
     )
+    start = time.perf_counter()
     analysis = Analysis.objects.get(id=analysis_id)
     logger.info(f"import_annotations_from_analysis - analysis: {analysis}")
 
+    try:
+        if analysis_results is None:
+            results_reader = AnnotatedDocsJsonReader(
+                lambda: analysis.received_callback_file.open("rb")
+            )
+            analysis_results = results_reader.read_metadata()
+            annotated_doc_keys = results_reader.annotated_doc_keys
+            annotated_docs = results_reader.iter_annotated_docs()
+        else:
+            annotated_doc_keys = analysis_results["annotated_docs"]
+            annotated_docs = analysis_results["annotated_docs"].items()
+
+        validate_analysis_results(analysis_results, annotated_doc_keys)
+
+    except Exception as e:
+
+        message = (
+            f"import_annotations_from_analysis() - unable to read analysis results: {e}"
+        )
+        logger.error(message)
+        _append_to_import_log(analysis, [message])
+
+        with transaction.atomic():
+            analysis.status = JobStatus.FAILED
+            analysis.save()
+
+        return False
+
     try:
         label_id_map = install_labels_for_analyzer(
             creating_user_id=creator_id,
@@ -321,61 +423,64 @@ def import_annotations_from_analysis(
             f" {e}"
         )
         logger.error(message)
-
-        with transaction.atomic():
-            analysis.import_log = (
-                analysis.import_log + "\n" + message
-                if (analysis and len(analysis.import_log) > 0)
-                else message
-            )
-            analysis.save()
+        _append_to_import_log(analysis, [message])
 
         return False
 
-    for doc_id, doc_annotation_data in list(analysis_results["annotated_docs"].items()):
+    errors: list[str] = []
+    created_count = 0
+    skipped_count = 0
+
+    existing_doc_ids = {
+        str(doc_id)
+        for doc_id in Document.objects.filter(
+            id__in=[doc_id for doc_id in annotated_doc_keys if str(doc_id).isdigit()]
+        ).values_list("id", flat=True)
+    }
+    imported_doc_ids = {
+        str(doc_id)
+        for doc_id in Annotation.objects.filter(analysis_id=analysis_id)
+        .values_list("document_id", flat=True)
+        .distinct()
+    }
+
+    for doc_id, doc_annotation_data in annotated_docs:
+
+        if str(doc_id) in imported_doc_ids:
+            skipped_count += 1
+            continue
+
+        if str(doc_id) not in existing_doc_ids:
+            errors.append(
+                f"import_annotations_from_analysis() - doc {doc_id} does not exist, skipping its annotations"
+            )
+            continue
+
+        annotations = []
 
         # Create doc labels for the doc
         for doc_label_data in doc_annotation_data["doc_labels"]:
-
             try:
-                # logger.info(f"import_annotations_from_analysis() - create doc label {doc_label_data} for doc {
-                # doc_id}")
-
-                with transaction.atomic():
-                    annotation = Annotation.objects.create(
+                annotations.append(
+                    Annotation(
                         annotation_label_id=label_id_map[doc_label_data],
                         document_id=doc_id,
                         analysis_id=analysis_id,
                         creator_id=creator_id,
-                        corpus=analysis.analyzed_corpus,
-                    )
-                    set_permissions_for_obj_to_user(
-                        creator_id, annotation, [PermissionTypes.CRUD]
+                        corpus_id=analysis.analyzed_corpus_id,
                     )
-
-                    # logger.info(f"import_annotations_from_analysis() - Successfully created doc label {annotation}")
+                )
             except Exception as e:
-                message = (
+                errors.append(
                     f"import_annotations_from_analysis() - for doc {doc_id} failed to import doc annotation "
                     f"{doc_label_data} due to error: {e}"
                 )
-                logger.error(message)
-                with transaction.atomic():
-                    analysis.import_log = (
-                        analysis.import_log + "\n" + message
-                        if len(analysis.import_log) > 0
-                        else message
-                    )
-                    analysis.save()
 
         # Create span labels for the doc
         for span_label_data in doc_annotation_data["labelled_text"]:
-
             try:
-                # logger.info(f"import_annotations_from_analysis() - create span label {span_label_data} for doc
-                # {doc_id}")
-                with transaction.atomic():
-                    annotation = Annotation.objects.create(
+                annotations.append(
+                    Annotation(
                         annotation_label_id=label_id_map[
                             span_label_data["annotationLabel"]
                         ],
@@ -385,25 +490,49 @@ def import_annotations_from_analysis(
                         raw_text=span_label_data["rawText"],
                         page=span_label_data["page"],
                         json=span_label_data["annotation_json"],
-                        corpus=analysis.analyzed_corpus,
+                        corpus_id=analysis.analyzed_corpus_id,
                     )
-                    set_permissions_for_obj_to_user(
-                        creator_id, annotation, [PermissionTypes.CRUD]
-                    )
-                    # logger.info(f"import_annotations_from_analysis() - Successfully created span label {annotation}")
-
+                )
             except Exception as e:
-                message = (
+                errors.append(
                     f"import_annotations_from_analysis() - for doc {doc_id} failed to import span annotation "
                     f"{span_label_data} due to error: {e}"
                 )
-                logger.error(message)
-                with transaction.atomic():
-                    analysis.import_log = (
-                        analysis.import_log + "\n" + message
-                        if (analysis.import_log and len(analysis.import_log) > 0)
-                        else message
-                    )
-                    analysis.save()
+
+        try:
+            with transaction.atomic():
+                annotations = Annotation.objects.bulk_create(
+                    annotations, batch_size=ANALYSIS_IMPORT_BATCH_SIZE
+                )
+                annotation_ids = [annotation.id for annotation in annotations]
+                set_permissions_for_objs_to_user(
+                    creator_id,
+                    Annotation,
+                    annotation_ids,
+                    [PermissionTypes.CRUD],
+                    replace=False,
+                )
+
+                # bulk_create skips the post_save signal that would otherwise queue these for embeddings
+                annotation_embedding_queue.enqueue_many(annotation_ids)
+                # ...and the one that would invalidate the doc's cached page annotations
+                invalidate_page_annotations([doc_id])
+
+            created_count += len(annotation_ids)
+
+        except Exception as e:
+            errors.append(
+                f"import_annotations_from_analysis() - failed to import annotations for doc {doc_id} due to "
+                f"error: {e}"
+            )
+
+    for error in errors:
+        logger.error(error)
+    _append_to_import_log(analysis, errors)
+
+    logger.info(
+        f"import_annotations_from_analysis() - created {created_count} annotations for analysis {analysis_id} in "
+        f"{time.perf_counter() - start:.2f}s ({skipped_count} docs already imported, {len(errors)} errors)"
+    )
 
     return True
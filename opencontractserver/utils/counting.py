@@ -0,0 +1,91 @@
+import hashlib
+import json
+import logging
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import QuerySet
+
+logger = logging.getLogger(__name__)
+
+QUERYSET_COUNT_CACHE_KEY_PREFIX = "queryset_count"
+
+
+def estimate_queryset_count(queryset: QuerySet) -> Optional[int]:
+    """
+    The Postgres planner's estimate of how many rows queryset returns (from table statistics, without running it).
+    None on other databases.
+    """
+
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def count_queryset(
+    queryset: QuerySet,
+    cache_timeout: Optional[int] = None,
+    approximate_threshold: Optional[int] = None,
+) -> int:
+    """
+    Count queryset with a COUNT(*) rather than by loading its rows.
+
+    If cache_timeout (default settings.QUERYSET_COUNT_CACHE_TIMEOUT) is set, counts are cached for that many seconds
+    per distinct SQL statement - i.e. per filter signature, including whatever visibility filters were applied for the
+    requesting user. If approximate_threshold (default settings.QUERYSET_APPROXIMATE_COUNT_THRESHOLD) is set and the
+    planner estimates at least that many rows, the estimate is returned instead of an exact count.
+    """
+
+    # Already loaded - counting it is free
+    if queryset._result_cache is not None:
+        return len(queryset._result_cache)
+
+    if cache_timeout is None:
+        cache_timeout = settings.QUERYSET_COUNT_CACHE_TIMEOUT
+    if approximate_threshold is None:
+        approximate_threshold = settings.QUERYSET_APPROXIMATE_COUNT_THRESHOLD
+
+    # Ordering doesn't change the count
+    if not queryset.query.is_sliced:
+        queryset = queryset.order_by()
+
+    cache_key = None
+    if cache_timeout:
+        sql, params = queryset.query.sql_with_params()
+        cache_key = (
+            f"{QUERYSET_COUNT_CACHE_KEY_PREFIX}:{queryset.db}:"
+            f"{hashlib.sha256(repr((sql, params)).encode('utf-8')).hexdigest()}"
+        )
+        count = cache.get(cache_key)
+        if count is not None:
+            return count
+
+    count = None
+    if approximate_threshold:
+        try:
+            # In a savepoint so a failed EXPLAIN can't abort the surrounding (request) transaction
+            with transaction.atomic(using=queryset.db):
+                estimate = estimate_queryset_count(queryset)
+            if estimate is not None and estimate >= approximate_threshold:
+                count = estimate
+        except Exception as e:
+            logger.warning(f"count_queryset() - unable to estimate count: {e}")
+
+    if count is None:
+        count = queryset.count()
+
+    if cache_key is not None:
+        cache.set(cache_key, count, timeout=cache_timeout)
+
+    return count
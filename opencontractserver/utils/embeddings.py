@@ -6,6 +6,8 @@ import numpy as np
 import requests
 from django.conf import settings
 
+from opencontractserver.utils.model_registry import SENTENCE_TRANSFORMER, model_registry
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
@@ -41,3 +43,63 @@ def calculate_embedding_for_text(text: str) -> Optional[list[float | int]]:
         )
 
     return natural_lang_embeddings
+
+
+def _nan_to_none(vectors: np.ndarray) -> list[Optional[np.ndarray]]:
+    return [None if numpy.any(numpy.isnan(vector)) else vector for vector in vectors]
+
+
+def calculate_embeddings_for_texts(texts: list[str]) -> list[Optional[np.ndarray]]:
+    """
+    Batched counterpart to calculate_embedding_for_text. Returns one vector (or None where
+    no usable embedding could be produced) per input text, in input order.
+
+    When EMBEDDINGS_BATCH_MODE is "in_process", vectors are calculated with a locally loaded
+    sentence transformer. Otherwise, all texts are sent to the embeddings microservice in a
+    single request. If the microservice does not expose the batch endpoint, we fall back to
+    one request per text.
+    """
+
+    if not texts:
+        return []
+
+    if settings.EMBEDDINGS_BATCH_MODE == "in_process":
+        try:
+            vectors = model_registry.get(SENTENCE_TRANSFORMER).encode(
+                texts, batch_size=settings.EMBEDDINGS_BATCH_SIZE
+            )
+            return _nan_to_none(np.asarray(vectors))
+        except Exception as e:
+            logger.error(
+                f"calculate_embeddings_for_texts() - in-process embedding failed due to error: {e}"
+            )
+            return [None for _ in texts]
+
+    try:
+        response = requests.post(
+            f"{settings.EMBEDDINGS_MICROSERVICE_URL}/embeddings/batch",
+            json={"texts": texts},
+            headers={"X-API-Key": settings.VECTOR_EMBEDDER_API_KEY},
+        )
+
+        if response.status_code == 200:
+            vectors = np.array(response.json()["embeddings"])
+            if len(vectors) == len(texts):
+                return _nan_to_none(vectors)
+            logger.warning(
+                f"calculate_embeddings_for_texts() - expected {len(texts)} embeddings but got {len(vectors)}"
+            )
+        else:
+            logger.warning(
+                f"calculate_embeddings_for_texts() - batch endpoint returned {response.status_code}"
+            )
+
+    except Exception as e:
+        logger.error(
+            f"calculate_embeddings_for_texts() - failed to generate embeddings due to error: {e}"
+        )
+
+    logger.info(
+        "calculate_embeddings_for_texts() - falling back to one embeddings request per text"
+    )
+    return [calculate_embedding_for_text(text) for text in texts]
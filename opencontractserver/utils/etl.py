@@ -1,12 +1,12 @@
-import base64
-import io
 import json
 import logging
 import os
+import tempfile
 import uuid
 from typing import Any
 
 from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile, File
 from django.core.files.storage import default_storage
 from pydantic import TypeAdapter, ValidationError, create_model
 from typing_extensions import TypedDict
@@ -25,6 +25,9 @@ from opencontractserver.types.dicts import (
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
+# Where build_document_export stages annotated pdfs and doc jsons until package_annotated_docs zips them up
+EXPORT_PARTS_PATH = "export_parts"
+
 User = get_user_model()
 
 
@@ -83,11 +86,16 @@ def build_label_lookups(corpus_id: str) -> LabelLookupPythonType:
 
 def build_document_export(
     label_lookups: LabelLookupPythonType, doc_id: int, corpus_id: int
-) -> tuple[str, str, OpenContractDocExport | None, Any, Any]:
+) -> tuple[str, str, str, Any, Any]:
     """
     Fairly complex function to burn in the annotations for a given corpus on a given doc. This will alter the PDF
     and add highlight and labels. It's still a bit ugly, but it works.
 
+    The annotated pdf and the doc's export json (which carries the whole PAWLS layer) are written to storage
+    under EXPORT_PARTS_PATH, and only their storage keys are returned. That keeps large payloads out of the Celery
+    result backend - package_annotated_docs streams them back out of storage and cleans them up.
+
+    Returns (doc_name, annotated pdf storage key, doc export json storage key, text_labels, doc_labels).
     """
 
     logger.info(f"burn_doc_annotations - label_lookups: {label_lookups}")
@@ -126,7 +134,6 @@ def build_document_export(
         except Exception as e:
             logger.warning(f"Could not export pawls tokens for doc {doc_id}: {e}")
 
-        annotated_pdf_bytes = io.BytesIO()
         doc_annotations = Annotation.objects.filter(document=doc, corpus=corpus)
         # logger.info(f"Loaded {len(doc_annotations)} annotations")
 
@@ -287,15 +294,26 @@ def build_document_export(
 
             pdf_output.add_page(page)
 
-        # Serialize and write out the annotated pdf
-        pdf_output.write(annotated_pdf_bytes)
-        base64_encoded_data = base64.b64encode(annotated_pdf_bytes.getvalue())
-        base64_encoded_message: str = base64_encoded_data.decode("utf-8")
+        # Serialize the annotated pdf to a temp file on disk and hand that to storage, so we never hold a
+        # base64 copy of it in memory or push it through the result backend
+        export_part_prefix = f"{EXPORT_PARTS_PATH}/{uuid.uuid4().hex}"
+
+        with tempfile.TemporaryFile() as annotated_pdf_file:
+            pdf_output.write(annotated_pdf_file)
+            annotated_pdf_file.seek(0)
+            pdf_storage_key = default_storage.save(
+                f"{export_part_prefix}/{doc_name}", File(annotated_pdf_file)
+            )
+
+        doc_json_storage_key = default_storage.save(
+            f"{export_part_prefix}/doc.json",
+            ContentFile(json.dumps(doc_annotation_json).encode("utf-8")),
+        )
 
         return (
             doc_name,
-            base64_encoded_message,
-            doc_annotation_json,
+            pdf_storage_key,
+            doc_json_storage_key,
             text_labels,
             doc_labels,
         )
@@ -303,7 +321,22 @@ def build_document_export(
     except Exception as e:
 
         logger.error(f"Error building annotated doc for {doc_id}: {e}")
-        return "", "", None, {}, {}
+        return "", "", "", {}, {}
+
+
+def delete_document_export_parts(*storage_keys: str):
+    """
+    Delete the annotated pdf / doc json that build_document_export staged under EXPORT_PARTS_PATH. Whoever consumes
+    the parts (normally package_annotated_docs) owns cleaning them up.
+    """
+
+    for storage_key in storage_keys:
+        if not storage_key:
+            continue
+        try:
+            default_storage.delete(storage_key)
+        except Exception as e:
+            logger.warning(f"Could not delete export part {storage_key}: {e}")
 
 
 def is_dict_instance_of_typed_dict(instance: dict, typed_dict: type[TypedDict]):
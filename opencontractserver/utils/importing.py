@@ -0,0 +1,587 @@
+import io
+import json
+import logging
+import re
+import time
+from collections.abc import Container, Iterable, Iterator, Mapping
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Callable, Optional, TextIO
+from zipfile import ZipFile
+
+from django.conf import settings
+from django.core.files.base import ContentFile, File
+from django.db import transaction
+
+from opencontractserver.annotations.embedding_queue import annotation_embedding_queue
+from opencontractserver.annotations.models import (
+    Annotation,
+    AnnotationLabel,
+    LabelSet,
+)
+from opencontractserver.annotations.page_cache import invalidate_page_annotations
+from opencontractserver.corpuses.models import Corpus
+from opencontractserver.documents.models import Document
+from opencontractserver.types.dicts import (
+    AnnotationLabelPythonType,
+    OpenContractDocExport,
+    OpenContractsDocAnnotations,
+    OpenContractsImportStatsPythonType,
+)
+from opencontractserver.types.enums import LabelType, PermissionTypes
+from opencontractserver.utils.parse_cache import calculate_file_hash
+from opencontractserver.utils.pawls import save_pawls_binary
+from opencontractserver.utils.permissioning import set_permissions_for_objs_to_user
+
+logger = logging.getLogger(__name__)
+
+METADATA_KEYS = ("corpus", "label_set", "doc_labels", "text_labels")
+LABEL_KEYS = ("color", "description", "icon", "text", "label_type")
+ANNOTATED_DOC_KEYS = ("title", "pawls_file_content", "doc_labels", "labelled_text")
+
+# Rows per INSERT for labels and annotations. Documents are batched by settings.CORPUS_IMPORT_BATCH_SIZE.
+BULK_CREATE_BATCH_SIZE = 1000
+
+# Characters of data.json read at a time by ExportDataJsonReader
+EXPORT_JSON_READ_CHUNK_SIZE = 1024 * 1024
+
+_JSON_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_JSON_STRING = re.compile(r'"(?:[^"\\]|\\.)*"')
+_JSON_NOT_STRUCTURAL = re.compile(r'[^"{}\[\]]*')
+
+
+class _JsonObjectScanner:
+    """
+    Minimal pull parser over a text stream holding a JSON object. Keys are walked one at a time with iter_keys() and
+    each value is decoded on its own with decode_value() (or passed over with skip_value()), so only the value being
+    decoded (plus one read chunk) is ever held in memory.
+    """
+
+    def __init__(self, stream: TextIO, chunk_size: int):
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _read_more(self, size: int) -> bool:
+
+        if self._eof:
+            return False
+
+        chunk = self._stream.read(size)
+        if not chunk:
+            self._eof = True
+            return False
+
+        # Drop everything that's already been parsed
+        self._buffer = self._buffer[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        """
+        Skip whitespace and return the next character without consuming it ("" at the end of the stream)
+        """
+        while True:
+            self._pos = _JSON_WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read_more(self._chunk_size):
+                return ""
+
+    def _consume(self, expected: str):
+        char = self._peek()
+        if char != expected:
+            raise ValueError(
+                f"Malformed JSON: expected '{expected}' but found '{char}'"
+            )
+        self._pos += 1
+
+    def decode_value(self) -> Any:
+
+        self._peek()
+
+        # Grow the read size each time the value turns out to be incomplete so a large value costs a handful of
+        # decode attempts rather than one per chunk.
+        read_size = self._chunk_size
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # A number that runs into the end of the buffer may continue in the next chunk
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._read_more(read_size)
+            read_size *= 2
+
+    def skip_value(self):
+        """
+        Consume the value at the current position without decoding it. Objects and arrays are only scanned for their
+        brackets (skipping over strings), so no Python objects are built for them.
+        """
+
+        if self._peek() not in "{[":
+            self.decode_value()
+            return
+
+        depth = 0
+        read_size = self._chunk_size
+        while True:
+            self._pos = _JSON_NOT_STRUCTURAL.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                char = self._buffer[self._pos]
+                if char != '"':
+                    self._pos += 1
+                    depth += 1 if char in "{[" else -1
+                    if depth == 0:
+                        return
+                    continue
+
+                string = _JSON_STRING.match(self._buffer, self._pos)
+                if string is not None:
+                    self._pos = string.end()
+                    read_size = self._chunk_size
+                    continue
+
+            # The value (or a string in it) continues in the next chunk
+            if not self._read_more(read_size):
+                raise ValueError("Malformed JSON: unexpected end of data")
+            read_size *= 2
+
+    def iter_keys(self) -> Iterator[str]:
+        """
+        Walk the object starting at the current position, yielding its keys. The caller has to consume each key's
+        value (decode_value() or a nested iter_keys()) before asking for the next key.
+        """
+
+        self._consume("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+
+        while True:
+            key = self.decode_value()
+            if not isinstance(key, str):
+                raise ValueError(f"Malformed JSON: expected an object key, got {key}")
+            self._consume(":")
+
+            yield key
+
+            char = self._peek()
+            self._pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                raise ValueError(
+                    f"Malformed JSON: expected ',' or '}}' but found '{char}'"
+                )
+
+
+class AnnotatedDocsJsonReader:
+    """
+    Incremental reader for the JSON files we move annotated docs around in - an export's data.json and an analyzer's
+    results (OpenContractsGeneratedCorpusPythonType). json.loads needs the whole file - including every document's
+    annotations and, for exports, PAWLS tokens - in memory at once. This reader pulls one annotated doc at a time
+    instead, so peak memory is bounded by the largest single document rather than the whole corpus.
+
+    The labels the docs refer to can come after annotated_docs in the file, so it is read twice: read_metadata()
+    collects everything except the annotated docs (noting which keys each doc has, for validation) and
+    iter_annotated_docs() then yields the docs one by one. open_stream is called to (re)open the file as a binary
+    stream for each pass.
+    """
+
+    def __init__(
+        self,
+        open_stream: Callable[[], BinaryIO],
+        chunk_size: int = EXPORT_JSON_READ_CHUNK_SIZE,
+    ):
+        self.open_stream = open_stream
+        self.chunk_size = chunk_size
+        self.annotated_doc_keys: dict[str, list[str]] = {}
+
+    @contextmanager
+    def _scanner(self) -> Iterator[_JsonObjectScanner]:
+        with self.open_stream() as raw_stream:
+            with io.TextIOWrapper(raw_stream, encoding="utf-8") as text_stream:
+                yield _JsonObjectScanner(text_stream, self.chunk_size)
+
+    def read_metadata(self) -> dict[str, Any]:
+
+        metadata = {}
+        self.annotated_doc_keys = {}
+
+        with self._scanner() as scanner:
+            for key in scanner.iter_keys():
+                if key == "annotated_docs":
+                    # Only the docs' keys are needed here, so their contents (PAWLS tokens and all) aren't decoded
+                    for doc_name in scanner.iter_keys():
+                        doc_keys = self.annotated_doc_keys[doc_name] = []
+                        for doc_key in scanner.iter_keys():
+                            doc_keys.append(doc_key)
+                            scanner.skip_value()
+                else:
+                    metadata[key] = scanner.decode_value()
+
+        return metadata
+
+    def iter_annotated_docs(self) -> Iterator[tuple[str, Any]]:
+        with self._scanner() as scanner:
+            for key in scanner.iter_keys():
+                if key == "annotated_docs":
+                    for doc_name in scanner.iter_keys():
+                        yield doc_name, scanner.decode_value()
+                else:
+                    scanner.skip_value()
+
+
+class ExportDataJsonReader(AnnotatedDocsJsonReader):
+    """
+    AnnotatedDocsJsonReader for the data.json in an OpenContracts export zip
+    """
+
+    def __init__(
+        self,
+        import_zip: ZipFile,
+        name: str = "data.json",
+        chunk_size: int = EXPORT_JSON_READ_CHUNK_SIZE,
+    ):
+        super().__init__(lambda: import_zip.open(name), chunk_size=chunk_size)
+
+    def iter_annotated_docs(self) -> Iterator[tuple[str, OpenContractDocExport]]:
+        return super().iter_annotated_docs()
+
+
+def validate_label_data(
+    labels: dict[str, AnnotationLabelPythonType],
+    source: str,
+    required_keys: Iterable[str] = LABEL_KEYS,
+) -> list[str]:
+
+    valid_label_types = {label_type.value for label_type in LabelType}
+    errors = []
+
+    for label_key, label_data in labels.items():
+        missing = [key for key in required_keys if key not in label_data]
+        if missing:
+            errors.append(f"{source}[{label_key}] is missing {missing}")
+        elif label_data["label_type"] not in valid_label_types:
+            errors.append(
+                f"{source}[{label_key}] has unknown label_type {label_data['label_type']}"
+            )
+
+    return errors
+
+
+def validate_annotated_doc(
+    doc_name: str, doc_keys: Container[str], zip_files: Container[str]
+) -> list[str]:
+
+    errors = []
+
+    if doc_name not in zip_files:
+        errors.append(f"annotated_docs[{doc_name}] has no matching file in the zip")
+
+    missing = [key for key in ANNOTATED_DOC_KEYS if key not in doc_keys]
+    if missing:
+        errors.append(f"annotated_docs[{doc_name}] is missing {missing}")
+
+    return errors
+
+
+def validate_import_data_json(
+    metadata: dict[str, Any],
+    annotated_doc_keys: Mapping[str, Container[str]],
+    zip_files: Iterable[str],
+):
+    """
+    Check the structure of an export's data.json up front, once, rather than letting each row fail (or half-import)
+    as it is created. Raises a ValueError listing every problem found. Individual annotations that point at a
+    label that isn't in the export are not fatal - they're skipped (and logged) by the import, as they always were.
+
+    metadata is data.json without annotated_docs and annotated_doc_keys maps each annotated doc's filename to its
+    keys - ExportDataJsonReader.read_metadata() / .annotated_doc_keys, or data.json and data.json["annotated_docs"]
+    when the whole file is already loaded.
+    """
+
+    missing = [key for key in METADATA_KEYS if key not in metadata]
+    if missing:
+        raise ValueError(f"data.json is missing {missing}")
+
+    zip_files = set(zip_files)
+    errors = [
+        *validate_label_data(metadata["text_labels"], "text_labels"),
+        *validate_label_data(metadata["doc_labels"], "doc_labels"),
+    ]
+    for doc_name, doc_keys in annotated_doc_keys.items():
+        errors.extend(validate_annotated_doc(doc_name, doc_keys, zip_files))
+
+    if errors:
+        raise ValueError(f"data.json failed validation: {errors}")
+
+
+def bulk_create_labels(
+    labels: dict[str, AnnotationLabelPythonType],
+    user_id: int | str,
+    labelset: LabelSet,
+) -> dict[str, AnnotationLabel]:
+    """
+    Create every label in an export's label lookup with one insert, add them to the labelset and permission them for
+    the importing user. Returns a lookup of the export's label keys to the new AnnotationLabels.
+    """
+
+    label_keys = list(labels.keys())
+    label_objs = AnnotationLabel.objects.bulk_create(
+        [
+            AnnotationLabel(
+                creator_id=user_id,
+                label_type=labels[label_key]["label_type"],
+                color=labels[label_key]["color"],
+                description=labels[label_key]["description"],
+                icon=labels[label_key]["icon"],
+                text=labels[label_key]["text"],
+            )
+            for label_key in label_keys
+        ],
+        batch_size=BULK_CREATE_BATCH_SIZE,
+    )
+
+    labelset.annotation_labels.add(*label_objs)
+    set_permissions_for_objs_to_user(
+        user_id,
+        AnnotationLabel,
+        [label_obj.id for label_obj in label_objs],
+        [PermissionTypes.ALL],
+        replace=False,
+    )
+
+    return dict(zip(label_keys, label_objs))
+
+
+def _build_doc_annotations(
+    doc_name: str,
+    doc_annotations: OpenContractsDocAnnotations,
+    doc_obj: Document,
+    corpus: Corpus,
+    user_id: int | str,
+    text_label_lookup: dict[str, AnnotationLabel],
+    doc_label_lookup: dict[str, AnnotationLabel],
+) -> list[Annotation]:
+
+    annotations = []
+
+    for doc_label in doc_annotations["doc_labels"]:
+        if doc_label not in doc_label_lookup:
+            logger.warning(
+                f"_build_doc_annotations() - skipping doc label {doc_label} on {doc_name}: not in export labels"
+            )
+            continue
+        annotations.append(
+            Annotation(
+                annotation_label=doc_label_lookup[doc_label],
+                document=doc_obj,
+                corpus=corpus,
+                creator_id=user_id,
+            )
+        )
+
+    for annotation in doc_annotations["labelled_text"]:
+        if (
+            annotation.get("annotationLabel") not in text_label_lookup
+            or "annotation_json" not in annotation
+        ):
+            logger.warning(
+                f"_build_doc_annotations() - skipping text annotation {annotation.get('id')} on {doc_name}: "
+                f"unknown label or missing annotation_json"
+            )
+            continue
+        annotations.append(
+            Annotation(
+                raw_text=annotation["rawText"],
+                page=annotation["page"],
+                json=annotation["annotation_json"],
+                annotation_label=text_label_lookup[annotation["annotationLabel"]],
+                document=doc_obj,
+                corpus=corpus,
+                creator_id=user_id,
+            )
+        )
+
+    return annotations
+
+
+def _stage_document(
+    import_zip: ZipFile,
+    doc_name: str,
+    doc_data: OpenContractDocExport,
+    user_id: int | str,
+) -> Optional[Document]:
+    """
+    Write a document's pdf and PAWLS tokens to storage and return the (unsaved) Document for them. The tokens are
+    usually the bulk of an export, so writing them out straight away means a batch only holds on to annotations.
+    """
+
+    try:
+        pawls_layers = doc_data["pawls_file_content"]
+
+        # Lock doc so nothing picks it up until its annotations are in
+        doc_obj = Document(
+            title=doc_data["title"],
+            description=f"Imported document with filename {doc_name}",
+            backend_lock=True,
+            creator_id=user_id,
+            page_count=len(pawls_layers),
+        )
+
+        # Write the files to storage now - bulk_create only inserts rows
+        with import_zip.open(doc_name) as pdf_stream:
+            doc_obj.pdf_file.save(doc_name, File(pdf_stream, doc_name), save=False)
+        doc_obj.pawls_parse_file.save(
+            "pawls_tokens.json",
+            ContentFile(json.dumps(pawls_layers).encode("utf-8")),
+            save=False,
+        )
+        save_pawls_binary(doc_obj, pawls_layers, save=False)
+        doc_obj.pdf_file_hash = calculate_file_hash(doc_obj.pdf_file)
+
+        return doc_obj
+
+    except Exception as e:
+        logger.error(
+            f"_stage_document() - Error trying to load contract file {doc_name}: {e}"
+        )
+        return None
+
+
+def _insert_doc_batch(
+    staged_docs: list[tuple[str, OpenContractsDocAnnotations, Document]],
+    corpus: Corpus,
+    user_id: int | str,
+    text_label_lookup: dict[str, AnnotationLabel],
+    doc_label_lookup: dict[str, AnnotationLabel],
+) -> tuple[int, list[int]]:
+
+    with transaction.atomic():
+
+        doc_objs = Document.objects.bulk_create(
+            [doc_obj for _, _, doc_obj in staged_docs]
+        )
+        doc_ids = [doc_obj.id for doc_obj in doc_objs]
+
+        corpus.documents.add(*doc_objs)
+        set_permissions_for_objs_to_user(
+            user_id, Document, doc_ids, [PermissionTypes.ALL], replace=False
+        )
+
+        annotations = []
+        for doc_name, doc_annotations, doc_obj in staged_docs:
+            annotations.extend(
+                _build_doc_annotations(
+                    doc_name,
+                    doc_annotations,
+                    doc_obj,
+                    corpus,
+                    user_id,
+                    text_label_lookup,
+                    doc_label_lookup,
+                )
+            )
+
+        annotations = Annotation.objects.bulk_create(
+            annotations, batch_size=BULK_CREATE_BATCH_SIZE
+        )
+        annotation_ids = [annotation.id for annotation in annotations]
+        set_permissions_for_objs_to_user(
+            user_id, Annotation, annotation_ids, [PermissionTypes.ALL], replace=False
+        )
+
+        # bulk_create skips post_save, so queue the embeddings and invalidate the page cache ourselves
+        annotation_embedding_queue.enqueue_many(annotation_ids)
+        invalidate_page_annotations(doc_ids)
+
+        Document.objects.filter(id__in=doc_ids).update(backend_lock=False)
+
+    return len(doc_ids), annotation_ids
+
+
+def bulk_import_annotated_docs(
+    import_zip: ZipFile,
+    annotated_docs: Iterable[tuple[str, OpenContractDocExport]],
+    corpus: Corpus,
+    user_id: int | str,
+    text_label_lookup: dict[str, AnnotationLabel],
+    doc_label_lookup: dict[str, AnnotationLabel],
+    batch_size: Optional[int] = None,
+) -> OpenContractsImportStatsPythonType:
+    """
+    Import the annotated docs of an OpenContracts export into corpus, batch_size documents at a time (default
+    settings.CORPUS_IMPORT_BATCH_SIZE). Each batch is one transaction: the documents, their annotations and the
+    importing user's permissions on both are bulk inserted, so the query count grows with the number of batches
+    rather than the number of annotations.
+
+    annotated_docs can be any iterable of (filename, doc export) pairs - e.g. ExportDataJsonReader.iter_annotated_docs
+    - and is consumed one document at a time.
+
+    bulk_create doesn't send post_save, so each batch's annotations go to the annotation embedding queue, which sends
+    them to calculate_embeddings_for_annotation_batch in EMBEDDINGS_BATCH_SIZE chunks once the batch commits.
+    """
+
+    if batch_size is None:
+        batch_size = settings.CORPUS_IMPORT_BATCH_SIZE
+
+    start = time.perf_counter()
+    doc_count = 0
+    annotation_ids: list[int] = []
+
+    staged_docs: list[tuple[str, OpenContractsDocAnnotations, Document]] = []
+    for doc_name, doc_data in annotated_docs:
+
+        doc_obj = _stage_document(import_zip, doc_name, doc_data, user_id)
+        if doc_obj is None:
+            continue
+
+        staged_docs.append(
+            (
+                doc_name,
+                {
+                    "doc_labels": doc_data["doc_labels"],
+                    "labelled_text": doc_data["labelled_text"],
+                },
+                doc_obj,
+            )
+        )
+
+        if len(staged_docs) >= batch_size:
+            batch_doc_count, batch_annotation_ids = _insert_doc_batch(
+                staged_docs, corpus, user_id, text_label_lookup, doc_label_lookup
+            )
+            doc_count += batch_doc_count
+            annotation_ids.extend(batch_annotation_ids)
+            staged_docs = []
+
+    if staged_docs:
+        batch_doc_count, batch_annotation_ids = _insert_doc_batch(
+            staged_docs, corpus, user_id, text_label_lookup, doc_label_lookup
+        )
+        doc_count += batch_doc_count
+        annotation_ids.extend(batch_annotation_ids)
+
+    seconds = time.perf_counter() - start
+    stats: OpenContractsImportStatsPythonType = {
+        "documents": doc_count,
+        "annotations": len(annotation_ids),
+        "labels": len(text_label_lookup) + len(doc_label_lookup),
+        "seconds": seconds,
+        "docs_per_second": doc_count / seconds if seconds else 0.0,
+        "annotations_per_second": len(annotation_ids) / seconds if seconds else 0.0,
+    }
+    logger.info(
+        f"bulk_import_annotated_docs() - imported {doc_count} docs and {len(annotation_ids)} annotations in "
+        f"{seconds:.2f}s ({stats['docs_per_second']:.1f} docs/s, "
+        f"{stats['annotations_per_second']:.1f} annotations/s)"
+    )
+
+    return stats
@@ -0,0 +1,182 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+from celery.signals import worker_process_init
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """
+    Process-wide cache for the ML models our tasks use (embedders, rerankers, spaCy pipelines, GLiNER). Each model is
+    loaded at most once per process and then shared by every task that process runs, instead of being loaded again
+    for every datacell / document.
+
+    Models are registered with a loader and an approximate resident size in MB. When loading a model would push the
+    total over memory_budget_mb, the least recently used models are evicted first. Per-model hit / load counts and
+    load times are available from get_stats().
+    """
+
+    def __init__(self, memory_budget_mb: int | None = None):
+        self.memory_budget_mb = memory_budget_mb
+        self._loaders: dict[str, tuple[Callable[[], Any], int]] = {}
+        self._models: OrderedDict[str, Any] = OrderedDict()
+        self._stats: dict[str, dict[str, int | float]] = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, loader: Callable[[], Any], size_mb: int = 0):
+        with self._lock:
+            self._loaders[name] = (loader, size_mb)
+            self._stats.setdefault(
+                name, {"hits": 0, "loads": 0, "evictions": 0, "load_seconds": 0.0}
+            )
+
+    @property
+    def _budget(self) -> int:
+        if self.memory_budget_mb is not None:
+            return self.memory_budget_mb
+        return settings.MODEL_REGISTRY_MEMORY_BUDGET_MB
+
+    def _loaded_size_mb(self) -> int:
+        return sum(self._loaders[name][1] for name in self._models)
+
+    def get(self, name: str) -> Any:
+
+        if name not in self._loaders:
+            raise KeyError(f"No model registered under name {name}")
+
+        with self._lock:
+
+            if name in self._models:
+                self._models.move_to_end(name)
+                self._stats[name]["hits"] += 1
+                return self._models[name]
+
+            loader, size_mb = self._loaders[name]
+
+            while self._models and self._loaded_size_mb() + size_mb > self._budget:
+                self.evict(next(iter(self._models)))
+
+            start = time.perf_counter()
+            model = loader()
+            load_seconds = time.perf_counter() - start
+
+            self._models[name] = model
+            self._stats[name]["loads"] += 1
+            self._stats[name]["load_seconds"] += load_seconds
+            logger.info(f"ModelRegistry - loaded {name} in {load_seconds:.2f}s")
+
+            return model
+
+    def evict(self, name: str):
+        with self._lock:
+            if self._models.pop(name, None) is not None:
+                self._stats[name]["evictions"] += 1
+                logger.info(f"ModelRegistry - evicted {name}")
+
+    def clear(self):
+        with self._lock:
+            for name in list(self._models):
+                self.evict(name)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def warm_up(self, names: list[str]):
+        for name in names:
+            try:
+                self.get(name)
+            except Exception as e:
+                logger.error(f"ModelRegistry.warm_up() - failed to load {name}: {e}")
+
+    def get_stats(self) -> dict[str, dict[str, int | float | bool]]:
+        with self._lock:
+            return {
+                name: {**stats, "loaded": name in self._models}
+                for name, stats in self._stats.items()
+            }
+
+
+# Loaders import their libraries lazily so processes that never use a model (e.g. the web workers) don't pay for
+# importing torch / spaCy.
+
+
+def _load_huggingface_embedder():
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+    # Using our pre-load cache path where the model was stored on container build
+    return HuggingFaceEmbedding(
+        model_name="multi-qa-MiniLM-L6-cos-v1", cache_folder="/models"
+    )
+
+
+def _load_sentence_transformer():
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(
+        settings.EMBEDDINGS_IN_PROCESS_MODEL, cache_folder="/models"
+    )
+
+
+def _load_reranker():
+    from llama_index.core.postprocessor import SentenceTransformerRerank
+
+    return SentenceTransformerRerank(
+        model="cross-encoder/ms-marco-MiniLM-L-2-v2", top_n=5
+    )
+
+
+def _load_spacy_lg():
+    import spacy
+
+    return spacy.load("en_core_web_lg")
+
+
+def _load_spacy_sm():
+    import spacy
+
+    return spacy.load("en_core_web_sm")
+
+
+def _load_gliner():
+    from gliner import GLiNER
+
+    model = GLiNER.from_pretrained("urchade/gliner_base")
+    model.set_sampling_params(
+        max_types=25,  # maximum number of entity types during training
+        shuffle_types=True,  # if shuffle or not entity types
+        random_drop=True,  # randomly drop entity types
+        max_neg_type_ratio=1,  # ratio of positive/negative types, 1 mean 50%/50%, 2 mean 33%/66%, 3 mean 25%/75% ...
+        max_len=2500,  # maximum sentence length
+    )
+    return model
+
+
+HUGGINGFACE_EMBEDDER = "huggingface_embedder"
+SENTENCE_TRANSFORMER = "sentence_transformer"
+RERANKER = "reranker"
+SPACY_LG = "spacy_lg"
+SPACY_SM = "spacy_sm"
+GLINER = "gliner"
+
+model_registry = ModelRegistry()
+# Sizes are rough resident-memory estimates used only for the eviction budget.
+model_registry.register(HUGGINGFACE_EMBEDDER, _load_huggingface_embedder, size_mb=350)
+model_registry.register(SENTENCE_TRANSFORMER, _load_sentence_transformer, size_mb=350)
+model_registry.register(RERANKER, _load_reranker, size_mb=150)
+model_registry.register(SPACY_LG, _load_spacy_lg, size_mb=800)
+model_registry.register(SPACY_SM, _load_spacy_sm, size_mb=50)
+model_registry.register(GLINER, _load_gliner, size_mb=1200)
+
+
+@worker_process_init.connect(weak=False)
+def warm_up_model_registry(*args, **kwargs):
+    if settings.MODEL_REGISTRY_WARMUP:
+        logger.info(
+            f"warm_up_model_registry() - loading {settings.MODEL_REGISTRY_WARMUP}"
+        )
+        model_registry.warm_up(settings.MODEL_REGISTRY_WARMUP)
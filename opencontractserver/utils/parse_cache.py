@@ -0,0 +1,75 @@
+import hashlib
+import logging
+from typing import Optional
+
+from django.core.cache import cache
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+PARSE_CACHE_HITS_KEY = "parse_cache:hits"
+PARSE_CACHE_MISSES_KEY = "parse_cache:misses"
+
+
+def calculate_bytes_hash(file_bytes: bytes) -> str:
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+def calculate_file_hash(file_field, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Stream a FieldFile (or any Django File) through sha256 without loading it into memory at once.
+    """
+
+    sha256 = hashlib.sha256()
+    with file_field.open("rb") as file_obj:
+        for chunk in iter(lambda: file_obj.read(chunk_size), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _increment_counter(key: str):
+    # cache.incr raises if the key is missing, so seed it first. add() is a no-op if it already exists.
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def record_parse_cache_hit():
+    _increment_counter(PARSE_CACHE_HITS_KEY)
+
+
+def record_parse_cache_miss():
+    _increment_counter(PARSE_CACHE_MISSES_KEY)
+
+
+def get_parse_cache_stats() -> dict[str, int]:
+    return {
+        "hits": cache.get(PARSE_CACHE_HITS_KEY, 0),
+        "misses": cache.get(PARSE_CACHE_MISSES_KEY, 0),
+    }
+
+
+def find_cached_parse_source(document) -> Optional["Document"]:  # noqa: F821
+    """
+    Given a document with a pdf_file_hash, find an already-processed document with the exact same pdf bytes
+    whose parse artifacts (PAWLS layer and text layer) can be reused instead of parsing the pdf again.
+    Documents that are still being processed (backend_lock) are ignored.
+    """
+
+    from opencontractserver.documents.models import Document
+
+    if not document.pdf_file_hash:
+        return None
+
+    return (
+        Document.objects.filter(
+            pdf_file_hash=document.pdf_file_hash, backend_lock=False
+        )
+        .exclude(id=document.id)
+        .exclude(Q(pawls_parse_file="") | Q(pawls_parse_file__isnull=True))
+        .exclude(Q(txt_extract_file="") | Q(txt_extract_file__isnull=True))
+        .order_by("-created")
+        .first()
+    )
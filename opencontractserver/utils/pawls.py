@@ -0,0 +1,592 @@
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import logging
+import mmap
+import shutil
+import struct
+import tempfile
+import uuid
+from collections.abc import Iterable, Iterator
+from typing import BinaryIO, Optional
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import File
+
+from opencontractserver.types.dicts import (
+    FunsdTokenType,
+    OpenContractsAnnotationPythonType,
+    OpenContractsSinglePageAnnotationType,
+    PawlsPagePythonType,
+    SpanAnnotation,
+    TextSpan,
+)
+from opencontractserver.utils.text import (
+    __consolidate_common_equivalent_chars as consolidate_common_equivalent_chars,
+)
+
+logger = logging.getLogger(__name__)
+
+PAWLS_TOKEN_INDEX_CACHE_KEY_PREFIX = "pawls_token_index"
+
+# Binary PAWLS layout (all little-endian):
+#
+#   header      magic (8s), version (H), reserved (H), page count (I)
+#   page table  per page: block offset (Q), block length (I), page width (f), page height (f), page index (i)
+#   page blocks per page: token count (I), then float32 x[n], y[n], width[n], height[n], then uint32 text
+#               offsets[n + 1] into the page's utf-8 text blob, then the blob
+#
+# Pages are independent blocks, so a reader can fetch any one of them with two small reads of the header and
+# page table plus one read of the block.
+PAWLS_BINARY_MAGIC = b"PAWLSBIN"
+PAWLS_BINARY_VERSION = 1
+PAWLS_BINARY_HEADER = struct.Struct("<8sHHI")
+PAWLS_BINARY_PAGE_ENTRY = struct.Struct("<QIffi")
+PAWLS_BINARY_TOKEN_COUNT = struct.Struct("<I")
+PAWLS_BINARY_COORDINATE_DECIMALS = 4
+
+
+def join_token_texts(texts: list[str]) -> str:
+    """
+    Join token texts with single spaces the way our text layers always have: tokens before the first non-empty one
+    add no whitespace, every token after it adds a space (even if it's empty itself).
+    """
+    for first_text_index, text in enumerate(texts):
+        if text:
+            return " ".join(texts[first_text_index:])
+    return ""
+
+
+class PawlsTokenIndex:
+    """
+    Array-backed view of a document's PAWLS layer for mapping text spans to tokens. Token positions and their char
+    offsets into the document text are held in NumPy arrays in document order, so finding the tokens for a span is a
+    pair of binary searches and the bounding box of a span is a min / max over a slice.
+
+    Builds the same text layer as plasmapdf's makePdfTranslationLayerFromPawlsTokens (which we've always used to
+    create the txt_extract_file), and create_opencontract_annotation_from_span returns the same annotations as its
+    PdfDataLayer, so the two can be used interchangeably.
+    """
+
+    def __init__(self, pawls_pages: list[PawlsPagePythonType]):
+
+        page_tokens = [page["tokens"] for page in pawls_pages]
+        tokens = [token for tokens in page_tokens for token in tokens]
+        token_counts = np.fromiter(
+            (len(tokens) for tokens in page_tokens), dtype=np.int64
+        )
+
+        self.page_count = len(pawls_pages)
+        self.texts: list[str] = [token["text"] for token in tokens]
+
+        # Global token index of each page's first token
+        self.page_token_offsets = np.concatenate(([0], np.cumsum(token_counts)[:-1]))
+        self.pages = np.repeat(np.arange(self.page_count), token_counts)
+        self.token_indices = np.arange(len(tokens)) - np.repeat(
+            self.page_token_offsets, token_counts
+        )
+
+        self.x = np.fromiter((token["x"] for token in tokens), dtype=np.float64)
+        self.y = np.fromiter((token["y"] for token in tokens), dtype=np.float64)
+        self.width = np.fromiter((token["width"] for token in tokens), dtype=np.float64)
+        self.height = np.fromiter(
+            (token["height"] for token in tokens), dtype=np.float64
+        )
+
+        consolidated_texts = [
+            consolidate_common_equivalent_chars(text) for text in self.texts
+        ]
+        self.doc_text = join_token_texts(consolidated_texts)
+
+        # Every token after the first non-empty one is preceded by a space. Like the plasmapdf layer, a token's
+        # char_start is one past the end of the text before it (even for the very first token) and its char_end is
+        # the end of its own text.
+        text_lengths = np.fromiter(
+            (len(text) for text in consolidated_texts), dtype=np.int64
+        )
+        separators = np.cumsum(text_lengths > 0) > 0
+        separators = np.concatenate(([False], separators[:-1])).astype(np.int64)
+        self.char_ends = np.cumsum(separators + text_lengths)
+        self.char_starts = self.char_ends - separators - text_lengths + 1
+
+        # Pages own the text from the previous page's end through their own end
+        self.page_char_ends = np.concatenate(([0], self.char_ends))[
+            np.cumsum(token_counts)
+        ]
+
+    def token_positions_in_span(self, start: int, end: int) -> np.ndarray:
+        """
+        Global indices, in document order, of the tokens that start or end within [start, end] (both inclusive).
+        """
+        return np.union1d(
+            np.arange(
+                np.searchsorted(self.char_starts, start, side="left"),
+                np.searchsorted(self.char_starts, end, side="right"),
+            ),
+            np.arange(
+                np.searchsorted(self.char_ends, start, side="left"),
+                np.searchsorted(self.char_ends, end, side="right"),
+            ),
+        )
+
+    def token_positions(self, page_indices, token_indices) -> np.ndarray:
+        """
+        Global indices of tokens given as (page index, index of token on its page) pairs.
+        """
+        return self.page_token_offsets[np.asarray(page_indices, dtype=np.int64)] + (
+            np.asarray(token_indices, dtype=np.int64)
+        )
+
+    def page_for_span(self, span: TextSpan) -> int:
+        """
+        The first page whose text overlaps the span.
+        """
+        page = int(np.searchsorted(self.page_char_ends, span["start"], side="left"))
+        if page >= self.page_count:
+            raise IndexError(f"Span {span['id']} starts past the end of the document")
+        return page
+
+    def _bounds(self, positions: np.ndarray) -> tuple[float, float, float, float]:
+        if not len(positions):
+            return -1, -1, -1, -1
+        return (
+            float(self.y[positions].min()),
+            float((self.y[positions] + self.height[positions]).max()),
+            float(self.x[positions].min()),
+            float((self.x[positions] + self.width[positions]).max()),
+        )
+
+    def convert_doc_span_to_opencontract_annotation_json(
+        self,
+        span: TextSpan,
+        padding: float = 0.1,
+        max_bbox_vertical_margin: float = 1,
+        max_bbox_horizontal_margin: float = 5,
+    ) -> dict[int, OpenContractsSinglePageAnnotationType]:
+        """
+        Map a span onto its PAWLS tokens, split across pages. For each page this gives the tokens' references, their
+        text and the (padded) union of their bounding boxes.
+        """
+
+        positions = self.token_positions_in_span(span["start"], span["end"])
+        if not len(positions):
+            return {
+                -1: {
+                    "bounds": {
+                        "top": -1.0,
+                        "bottom": -1.0,
+                        "left": -1.0,
+                        "right": -1.0,
+                    },
+                    "rawText": "",
+                    "tokensJsons": [],
+                }
+            }
+
+        span_pages = self.pages[positions]
+        page_starts = np.flatnonzero(np.diff(span_pages)) + 1
+        segment_starts = np.concatenate(([0], page_starts))
+        segment_ends = np.concatenate((page_starts, [len(positions)]))
+
+        annotation_json: dict[int, OpenContractsSinglePageAnnotationType] = {}
+        for segment, (segment_start, segment_end) in enumerate(
+            zip(segment_starts, segment_ends)
+        ):
+
+            is_last_page = segment_end == len(positions)
+
+            # For parity with the plasmapdf layer, a page's bounds also take in the first token of the page after it,
+            # and leave out the page's own first token unless it's the first page of the span.
+            bounds_positions = positions[
+                segment_start
+                + (1 if segment else 0) : segment_end
+                + (0 if is_last_page else 1)
+            ]
+            top, bottom, left, right = self._bounds(bounds_positions)
+            height, width = bottom - top, right - left
+
+            if is_last_page:
+                vertical_margin = min(padding * height / 2, max_bbox_vertical_margin)
+                horizontal_margin = min(padding * width / 2, max_bbox_horizontal_margin)
+            else:
+                vertical_margin = padding * height
+                horizontal_margin = padding * width
+
+            page_positions = positions[segment_start:segment_end]
+            page = int(span_pages[segment_start])
+            annotation_json[page] = {
+                "bounds": {
+                    "top": top - vertical_margin,
+                    "bottom": bottom + vertical_margin,
+                    "left": left - horizontal_margin,
+                    "right": right + horizontal_margin,
+                },
+                "rawText": join_token_texts(
+                    [self.texts[position] for position in page_positions]
+                ),
+                "tokensJsons": [
+                    {"pageIndex": page, "tokenIndex": token_index}
+                    for token_index in self.token_indices[page_positions].tolist()
+                ],
+            }
+
+        return annotation_json
+
+    def create_opencontract_annotation_from_span(
+        self, span_annotation: SpanAnnotation
+    ) -> OpenContractsAnnotationPythonType:
+
+        span = span_annotation["span"]
+
+        return {
+            "id": str(uuid.uuid4()),
+            "annotationLabel": span_annotation["annotation_label"],
+            "rawText": self.doc_text[span["start"] : span["end"]],
+            "page": self.page_for_span(span),
+            "annotation_json": self.convert_doc_span_to_opencontract_annotation_json(
+                span
+            ),
+        }
+
+    def funsd_tokens(self, positions: np.ndarray) -> list[FunsdTokenType]:
+        """
+        FUNSD word entries for the tokens at the given global positions.
+        """
+        # Boxes are (x, x + width, y + height, y), matching what our FUNSD exports have always contained
+        boxes = np.stack(
+            (
+                self.x[positions],
+                self.x[positions] + self.width[positions],
+                self.y[positions] + self.height[positions],
+                self.y[positions],
+            ),
+            axis=1,
+        ).tolist()
+        return [
+            {"text": self.texts[position], "box": tuple(box)}
+            for position, box in zip(positions.tolist(), boxes)
+        ]
+
+
+def _pawls_token_index_cache_key(document) -> str:
+    # Stored files are never overwritten, so a given storage key always holds the same PAWLS layer
+    return (
+        f"{PAWLS_TOKEN_INDEX_CACHE_KEY_PREFIX}:"
+        f"{hashlib.sha256(document.pawls_parse_file.name.encode('utf-8')).hexdigest()}"
+    )
+
+
+def cache_pawls_token_index(document, token_index: PawlsTokenIndex):
+    if document.pawls_parse_file:
+        cache.set(
+            _pawls_token_index_cache_key(document),
+            token_index,
+            timeout=settings.PAWLS_TOKEN_INDEX_CACHE_TIMEOUT,
+        )
+
+
+def get_pawls_token_index(
+    document, pawls_pages: Optional[list[PawlsPagePythonType]] = None
+) -> PawlsTokenIndex:
+    """
+    Get the PawlsTokenIndex for a document's current PAWLS layer, building and caching it if no one has yet. Pass
+    pawls_pages if you've already loaded the layer to save reading it from storage again on a cache miss.
+    """
+
+    if not document.pawls_parse_file:
+        return PawlsTokenIndex(pawls_pages)
+
+    cache_key = _pawls_token_index_cache_key(document)
+    token_index = cache.get(cache_key)
+
+    if token_index is None:
+        if pawls_pages is None:
+            pawls_pages = load_pawls_pages(document)
+        token_index = PawlsTokenIndex(pawls_pages)
+        cache_pawls_token_index(document, token_index)
+
+    return token_index
+
+
+def _float32_values(values: np.ndarray) -> list[float]:
+    # Round off float32's trailing noise (72.12300109863281 for 72.123). PAWLS coordinates are in points, so 1e-4 is
+    # well below anything that matters.
+    return np.round(
+        values.astype(np.float64), PAWLS_BINARY_COORDINATE_DECIMALS
+    ).tolist()
+
+
+def encode_pawls_page(pawls_page: PawlsPagePythonType) -> bytes:
+
+    tokens = pawls_page["tokens"]
+    token_count = len(tokens)
+
+    coordinates = np.array(
+        [[token[key] for token in tokens] for key in ("x", "y", "width", "height")],
+        dtype="<f4",
+    ).reshape(4, token_count)
+
+    encoded_texts = [token["text"].encode("utf-8") for token in tokens]
+    text_offsets = np.zeros(token_count + 1, dtype="<u4")
+    text_offsets[1:] = np.cumsum([len(text) for text in encoded_texts])
+
+    return b"".join(
+        (
+            PAWLS_BINARY_TOKEN_COUNT.pack(token_count),
+            coordinates.tobytes(),
+            text_offsets.tobytes(),
+            *encoded_texts,
+        )
+    )
+
+
+def decode_pawls_page(
+    block: bytes, width: float, height: float, index: int
+) -> PawlsPagePythonType:
+
+    (token_count,) = PAWLS_BINARY_TOKEN_COUNT.unpack_from(block)
+    offset = PAWLS_BINARY_TOKEN_COUNT.size
+
+    coordinates = np.frombuffer(
+        block, dtype="<f4", count=4 * token_count, offset=offset
+    ).reshape(4, token_count)
+    offset += coordinates.nbytes
+
+    text_offsets = np.frombuffer(
+        block, dtype="<u4", count=token_count + 1, offset=offset
+    ).tolist()
+    offset += 4 * (token_count + 1)
+    texts = block[offset:].decode("utf-8")
+    # Offsets are byte offsets, so slice the bytes before decoding unless the page is plain ASCII
+    if len(texts) == len(block) - offset:
+        token_texts = [
+            texts[start:end] for start, end in zip(text_offsets, text_offsets[1:])
+        ]
+    else:
+        text_bytes = block[offset:]
+        token_texts = [
+            text_bytes[start:end].decode("utf-8")
+            for start, end in zip(text_offsets, text_offsets[1:])
+        ]
+
+    xs, ys, widths, heights = (_float32_values(values) for values in coordinates)
+
+    return {
+        "page": {
+            "width": _float32_values(np.array([width], dtype="<f4"))[0],
+            "height": _float32_values(np.array([height], dtype="<f4"))[0],
+            "index": index,
+        },
+        "tokens": [
+            {"x": x, "y": y, "width": w, "height": h, "text": text}
+            for x, y, w, h, text in zip(xs, ys, widths, heights, token_texts)
+        ],
+    }
+
+
+class PawlsBinaryWriter:
+    """
+    Build a binary PAWLS file one page at a time. Page blocks are spooled to a temp file until finish() writes the
+    header and page table (which need every block's size) followed by the blocks to file_obj.
+    """
+
+    def __init__(self):
+        self._blocks = tempfile.TemporaryFile()
+        self._page_entries: list[tuple[int, float, float, int]] = []
+
+    def add_page(self, pawls_page: PawlsPagePythonType):
+        block = encode_pawls_page(pawls_page)
+        self._blocks.write(block)
+        self._page_entries.append(
+            (
+                len(block),
+                pawls_page["page"]["width"],
+                pawls_page["page"]["height"],
+                pawls_page["page"]["index"],
+            )
+        )
+
+    def finish(self, file_obj: BinaryIO):
+
+        file_obj.write(
+            PAWLS_BINARY_HEADER.pack(
+                PAWLS_BINARY_MAGIC, PAWLS_BINARY_VERSION, 0, len(self._page_entries)
+            )
+        )
+
+        block_offset = (
+            PAWLS_BINARY_HEADER.size
+            + len(self._page_entries) * PAWLS_BINARY_PAGE_ENTRY.size
+        )
+        for block_length, width, height, index in self._page_entries:
+            file_obj.write(
+                PAWLS_BINARY_PAGE_ENTRY.pack(
+                    block_offset, block_length, width, height, index
+                )
+            )
+            block_offset += block_length
+
+        self._blocks.seek(0)
+        shutil.copyfileobj(self._blocks, file_obj)
+        self._blocks.close()
+
+
+def write_pawls_binary(pawls_pages: Iterable[PawlsPagePythonType], file_obj: BinaryIO):
+    writer = PawlsBinaryWriter()
+    for pawls_page in pawls_pages:
+        writer.add_page(pawls_page)
+    writer.finish(file_obj)
+
+
+class PawlsBinaryReader:
+    """
+    Random access to the pages of a binary PAWLS file. file_obj just needs read() and seek(), so it can be a local
+    file, an mmap or a file that range-requests each read from object storage (see open_pawls_binary).
+    """
+
+    def __init__(self, file_obj: BinaryIO):
+
+        self.file_obj = file_obj
+
+        file_obj.seek(0)
+        magic, version, _, page_count = PAWLS_BINARY_HEADER.unpack(
+            file_obj.read(PAWLS_BINARY_HEADER.size)
+        )
+        if magic != PAWLS_BINARY_MAGIC:
+            raise ValueError("Not a binary PAWLS file")
+        if version != PAWLS_BINARY_VERSION:
+            raise ValueError(f"Unsupported binary PAWLS version {version}")
+
+        page_table = file_obj.read(page_count * PAWLS_BINARY_PAGE_ENTRY.size)
+        self.page_entries = list(PAWLS_BINARY_PAGE_ENTRY.iter_unpack(page_table))
+
+    @property
+    def page_count(self) -> int:
+        return len(self.page_entries)
+
+    def read_page(self, page_index: int) -> PawlsPagePythonType:
+        block_offset, block_length, width, height, index = self.page_entries[page_index]
+        self.file_obj.seek(block_offset)
+        return decode_pawls_page(self.file_obj.read(block_length), width, height, index)
+
+    def read_pages(
+        self, page_indices: Optional[Iterable[int]] = None
+    ) -> Iterator[PawlsPagePythonType]:
+        for page_index in (
+            range(self.page_count) if page_indices is None else page_indices
+        ):
+            yield self.read_page(page_index)
+
+
+class _S3RangeFile:
+    """
+    Minimal read-only file over an S3 object that fetches each read() with a ranged GET, so reading one page of a
+    binary PAWLS file doesn't download the rest of it.
+    """
+
+    def __init__(self, s3_object):
+        self.s3_object = s3_object
+        self.position = 0
+
+    def seek(self, position: int):
+        self.position = position
+
+    def read(self, size: int) -> bytes:
+        if size <= 0:
+            return b""
+        data = self.s3_object.get(
+            Range=f"bytes={self.position}-{self.position + size - 1}"
+        )["Body"].read()
+        self.position += len(data)
+        return data
+
+
+@contextlib.contextmanager
+def open_pawls_binary(field_file, ranged: bool = True) -> Iterator[PawlsBinaryReader]:
+    """
+    Open a binary PAWLS FieldFile for page-level reads: memory-mapped if it's on local disk, with ranged GETs if
+    it's in S3 and through the storage's own file object otherwise. Pass ranged=False when most of the file will be
+    read anyway, so an S3 file is fetched in one GET rather than one per page.
+    """
+
+    storage = field_file.storage
+
+    try:
+        path = storage.path(field_file.name)
+    except NotImplementedError:
+        path = None
+
+    if path is not None:
+        with open(path, "rb") as local_file, mmap.mmap(
+            local_file.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mapped_file:
+            yield PawlsBinaryReader(mapped_file)
+
+    elif ranged and hasattr(storage, "bucket"):
+        yield PawlsBinaryReader(
+            _S3RangeFile(
+                storage.bucket.Object(storage._normalize_name(field_file.name))
+            )
+        )
+
+    else:
+        with storage.open(field_file.name, "rb") as storage_file:
+            yield PawlsBinaryReader(storage_file)
+
+
+def load_pawls_pages(
+    document, page_indices: Optional[Iterable[int]] = None
+) -> list[PawlsPagePythonType]:
+    """
+    Load a document's PAWLS pages (all of them, or just page_indices) from its binary PAWLS file if it has one,
+    falling back to the JSON pawls_parse_file.
+    """
+
+    if document.pawls_binary_file:
+        with open_pawls_binary(
+            document.pawls_binary_file, ranged=page_indices is not None
+        ) as reader:
+            return list(reader.read_pages(page_indices))
+
+    with document.pawls_parse_file.open("rb") as pawls_file:
+        pawls_pages = json.loads(pawls_file.read())
+
+    if page_indices is None:
+        return pawls_pages
+    return [pawls_pages[page_index] for page_index in page_indices]
+
+
+def save_pawls_binary(
+    document,
+    pawls_pages: Iterable[PawlsPagePythonType],
+    save: bool = True,
+    force: bool = False,
+):
+    """
+    Write the binary copy of a document's PAWLS layer to document.pawls_binary_file. Only writes one when
+    settings.PAWLS_BINARY_FORMAT is on, unless force is passed (e.g. to convert existing documents). The JSON
+    pawls_parse_file is left alone - it's still what the API and frontend serve.
+
+    Call this whenever the JSON layer is (re)written. With the binary format off, a binary copy left over from
+    an earlier parse no longer matches the JSON, so it's cleared and load_pawls_pages falls back to the JSON.
+    """
+
+    if not (force or settings.PAWLS_BINARY_FORMAT):
+        if document.pawls_binary_file:
+            document.pawls_binary_file = None
+            if save:
+                document.save()
+        return
+
+    with tempfile.TemporaryFile() as binary_file:
+        write_pawls_binary(pawls_pages, binary_file)
+        binary_file.seek(0)
+        document.pawls_binary_file.save(
+            f"doc_{document.id}.pawlsb" if document.id else "pawls_tokens.pawlsb",
+            File(binary_file),
+            save=save,
+        )
@@ -1,5 +1,6 @@
 import base64
 import logging
+import mmap
 import pathlib
 import typing
 import uuid
@@ -16,7 +17,7 @@ from PyPDF2.generic import (
     TextStringObject,
 )
 
-from opencontractserver.types.dicts import PawlsPagePythonType
+from opencontractserver.types.dicts import PawlsPagePythonType, PawlsTokenPythonType
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -97,12 +98,23 @@ def add_highlight_to_page(highlight: DictionaryObject, page):
         page[NameObject("/Annots")] = ArrayObject([highlight_ref])
 
 
-def extract_pawls_from_pdfs_bytes(
-    pdf_bytes: bytes,
+def extract_pawls_from_pdf_path(
+    pdf_path: str,
 ) -> list[PawlsPagePythonType]:
+    """
+    Run tesseract over a pdf that's already on local disk, without copying it anywhere first.
+    """
 
     from pdfpreprocessor.preprocessors.tesseract import process_tesseract
 
+    annotations: list = process_tesseract(pdf_path)
+    return annotations
+
+
+def extract_pawls_from_pdfs_bytes(
+    pdf_bytes: bytes,
+) -> list[PawlsPagePythonType]:
+
     pdf_fragment_folder_path = pathlib.Path("/tmp/user_0/pdf_fragments")
     pdf_fragment_folder_path.mkdir(parents=True, exist_ok=True)
     pdf_fragment_path = pdf_fragment_folder_path / f"{uuid.uuid4()}.pdf"
@@ -110,13 +122,48 @@ def extract_pawls_from_pdfs_bytes(
         f.write(pdf_bytes)
 
     page_path = pdf_fragment_path.resolve().__str__()
-    annotations: list = process_tesseract(page_path)
+    annotations = extract_pawls_from_pdf_path(page_path)
 
     pdf_fragment_path.unlink()
 
     return annotations
 
 
+def extract_pawls_from_pdf_page_range(
+    pdf_path: str, first_page: int, last_page: int
+) -> list[PawlsPagePythonType]:
+    """
+    Run tesseract over pages first_page through last_page (zero-indexed, inclusive) of a pdf on a
+    local (or shared) filesystem. The source pdf is memory-mapped, so workers processing different
+    ranges of the same document share the OS page cache rather than each reading their own copy.
+    Tesseract only takes a whole file, so the range is still written to a temporary pdf, which is
+    removed once it has been processed.
+    """
+
+    from PyPDF2 import PdfWriter
+
+    pdf_fragment_folder_path = pathlib.Path("/tmp/user_0/pdf_fragments")
+    pdf_fragment_folder_path.mkdir(parents=True, exist_ok=True)
+    pdf_fragment_path = pdf_fragment_folder_path / f"{uuid.uuid4()}.pdf"
+
+    with open(pdf_path, "rb") as source_file, mmap.mmap(
+        source_file.fileno(), 0, access=mmap.ACCESS_READ
+    ) as source_map:
+        pdf_reader = PdfReader(source_map)
+        pdf_writer = PdfWriter()
+        for page_index in range(first_page, last_page + 1):
+            pdf_writer.add_page(pdf_reader.pages[page_index])
+        with pdf_fragment_path.open("wb") as f:
+            pdf_writer.write(f)
+
+    try:
+        annotations = extract_pawls_from_pdf_path(str(pdf_fragment_path.resolve()))
+    finally:
+        pdf_fragment_path.unlink()
+
+    return annotations
+
+
 def split_pdf_into_images(
     pdf_bytes: bytes,
     storage_path: str,
@@ -195,13 +242,115 @@ def split_pdf_into_images(
 
 def check_if_pdf_needs_ocr(file_object, threshold=10):
     pdf_reader = PdfReader(file_object)
-    total_text = ""
+    total_text_length = 0
 
+    # Stop as soon as we've seen enough text rather than extracting every page of the document
     for page in pdf_reader.pages:
-        total_text += page.extract_text()
+        total_text_length += len(page.extract_text().strip())
+        if total_text_length >= threshold:
+            break
 
     # Reset file pointer to the beginning for subsequent use
     file_object.seek(0)
 
     # If the total extracted text is less than the threshold, it likely needs OCR
-    return len(total_text.strip()) < threshold
+    return total_text_length < threshold
+
+
+def page_has_text_layer(page, threshold: int = 10) -> bool:
+    """
+    Given a pdfplumber page, decide whether it has an embedded text layer we can pull tokens from directly or
+    whether it's image-only and needs OCR.
+    """
+    return len("".join(char["text"] for char in page.chars).strip()) >= threshold
+
+
+def extract_pawls_page_from_text_layer(page, page_index: int) -> PawlsPagePythonType:
+    """
+    Build a PAWLS page for a pdfplumber page from its embedded text layer. This is orders of magnitude faster
+    than rendering the page and running tesseract over it. pdfplumber uses pdf points with a top-left origin,
+    which is the same coordinate system our tesseract-derived PAWLS tokens use (pages are rendered at 72 dpi).
+    """
+
+    tokens: list[PawlsTokenPythonType] = [
+        {
+            "x": float(word["x0"]),
+            "y": float(word["top"]),
+            "width": float(word["x1"] - word["x0"]),
+            "height": float(word["bottom"] - word["top"]),
+            "text": word["text"],
+        }
+        for word in page.extract_words()
+    ]
+
+    return {
+        "page": {
+            "width": float(page.width),
+            "height": float(page.height),
+            "index": page_index,
+        },
+        "tokens": tokens,
+    }
+
+
+def extract_pawls_from_pdf_page_range_by_text_layer(
+    pdf_path: str, first_page: int, last_page: int, threshold: int = 10
+) -> tuple[list[PawlsPagePythonType], list[str]]:
+    """
+    Per-page routing for PAWLS extraction over pages first_page through last_page (zero-indexed, inclusive)
+    of a pdf on local disk. Pages with an embedded text layer are tokenized natively; only image-only pages
+    are sent to tesseract (in a single batch). Returns the PAWLS pages in page order along with the route
+    ("text" or "ocr") taken for each page.
+    """
+
+    import pdfplumber
+
+    pawls_pages: dict[int, PawlsPagePythonType] = {}
+    routes: dict[int, str] = {}
+    ocr_page_indices: list[int] = []
+
+    with pdfplumber.open(pdf_path) as pdf:
+        for page_index in range(first_page, last_page + 1):
+            page = pdf.pages[page_index]
+            if page_has_text_layer(page, threshold=threshold):
+                pawls_pages[page_index] = extract_pawls_page_from_text_layer(
+                    page, page_index
+                )
+                routes[page_index] = "text"
+            else:
+                ocr_page_indices.append(page_index)
+                routes[page_index] = "ocr"
+            # pdfplumber caches parsed layout objects on each page... release them as we go
+            page.flush_cache()
+
+    if ocr_page_indices:
+
+        from PyPDF2 import PdfWriter
+
+        pdf_fragment_folder_path = pathlib.Path("/tmp/user_0/pdf_fragments")
+        pdf_fragment_folder_path.mkdir(parents=True, exist_ok=True)
+        pdf_fragment_path = pdf_fragment_folder_path / f"{uuid.uuid4()}.pdf"
+
+        with open(pdf_path, "rb") as source_file, mmap.mmap(
+            source_file.fileno(), 0, access=mmap.ACCESS_READ
+        ) as source_map:
+            pdf_reader = PdfReader(source_map)
+            pdf_writer = PdfWriter()
+            for page_index in ocr_page_indices:
+                pdf_writer.add_page(pdf_reader.pages[page_index])
+            with pdf_fragment_path.open("wb") as f:
+                pdf_writer.write(f)
+
+        try:
+            ocr_pages = extract_pawls_from_pdf_path(str(pdf_fragment_path.resolve()))
+        finally:
+            pdf_fragment_path.unlink()
+
+        for page_index, ocr_page in zip(ocr_page_indices, ocr_pages):
+            ocr_page["page"]["index"] = page_index
+            pawls_pages[page_index] = ocr_page
+
+    page_order = range(first_page, last_page + 1)
+    return [pawls_pages[index] for index in page_order], [
+        routes[index] for index in page_order
+    ]
@@ -139,6 +139,88 @@ def set_permissions_for_obj_to_user(
             assign_perm(f"{app_name}.publish_{model_name}", user, instance)
 
 
+def get_permission_codenames(
+    model_name: str, permissions: list[PermissionTypes]
+) -> list[str]:
+    """
+    Map PermissionTypes onto the codenames declared in our models' Meta.permissions, using the same expansion rules
+    as set_permissions_for_obj_to_user (CRUD -> create/read/update/remove, ALL -> everything).
+    """
+
+    requested_permission_set = set(permissions)
+    codenames = []
+
+    for action, implied_by in (
+        ("create", {PermissionTypes.CREATE, PermissionTypes.CRUD}),
+        ("read", {PermissionTypes.READ, PermissionTypes.CRUD}),
+        ("update", {PermissionTypes.UPDATE, PermissionTypes.CRUD}),
+        ("remove", {PermissionTypes.DELETE, PermissionTypes.CRUD}),
+        ("permission", {PermissionTypes.PERMISSION}),
+        ("publish", {PermissionTypes.PUBLISH}),
+    ):
+        if requested_permission_set.intersection(implied_by | {PermissionTypes.ALL}):
+            codenames.append(f"{action}_{model_name}")
+
+    return codenames
+
+
+def set_permissions_for_objs_to_user(
+    user_val: int | str | User,
+    model: type[django.db.models.Model],
+    object_ids: list[int | str],
+    permissions: list[PermissionTypes],
+    replace: bool = True,
+) -> NoReturn:
+
+    """
+    Bulk counterpart to set_permissions_for_obj_to_user for many objects of the same model. Instead of a delete plus
+    up to six assign_perm calls per object, this does one delete (when replace is True) and one bulk_create per
+    permission type into the model's *UserObjectPermission table, regardless of how many objects there are.
+
+    With replace=True, the user's existing object permissions on these objects are replaced. Use replace=False for
+    freshly created objects that can't have any permissions yet to skip the delete.
+    """
+
+    if isinstance(user_val, str) or isinstance(user_val, int):
+        user_id = int(user_val)
+    else:
+        user_id = user_val.id
+
+    object_ids = list(object_ids)
+    if not object_ids:
+        return
+
+    model_name = model._meta.model_name
+    permission_model = getattr(
+        model, f"{model_name}userobjectpermission_set"
+    ).rel.related_model
+
+    permission_ids = Permission.objects.filter(
+        content_type=ContentType.objects.get_for_model(model),
+        codename__in=get_permission_codenames(model_name, permissions),
+    ).values_list("id", flat=True)
+
+    with transaction.atomic():
+        if replace:
+            permission_model.objects.filter(
+                content_object_id__in=object_ids, user_id=user_id
+            ).delete()
+
+        for permission_id in permission_ids:
+            permission_model.objects.bulk_create(
+                [
+                    permission_model(
+                        user_id=user_id,
+                        permission_id=permission_id,
+                        content_object_id=object_id,
+                    )
+                    for object_id in object_ids
+                ],
+                batch_size=1000,
+                ignore_conflicts=True,
+            )
+
+
 def get_users_group_ids(user_instance=User) -> list[str | int]:
 
     """
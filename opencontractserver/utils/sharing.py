@@ -13,6 +13,10 @@ from opencontractserver.annotations.models import (
     AnnotationLabel,
     Relationship,
 )
+from opencontractserver.annotations.page_cache import (
+    invalidate_page_annotation_labels,
+    invalidate_page_annotations,
+)
 from opencontractserver.corpuses.models import Corpus, CorpusQuery
 from opencontractserver.documents.models import Document, DocumentAnalysisRow
 from opencontractserver.extracts.models import Datacell, Extract, Fieldset
@@ -66,6 +70,12 @@ def make_analysis_public(analysis_id: int | str) -> MakePublicReturnType:
             analyzer_annotations, ["is_public"], batch_size=100
         )
 
+        # bulk_update() doesn't send signals, so drop the cached page annotations (which carry is_public) ourselves
+        invalidate_page_annotations(
+            annotation.document_id for annotation in analyzer_annotations
+        )
+        invalidate_page_annotation_labels()
+
         with transaction.atomic():
             analysis.backend_lock = False
             analysis.save()
@@ -122,6 +132,10 @@ def make_corpus_public(corpus_id: int | str) -> MakePublicReturnType:
         )
         logger.info(f"Made {updated_annotations} human annotations public")
 
+        # QuerySet.update() doesn't send signals, so drop the cached page annotations (which carry is_public) ourselves
+        invalidate_page_annotations(docs.values_list("id", flat=True))
+        invalidate_page_annotation_labels()
+
         # Make extracts public
         updated_extracts = Extract.objects.filter(corpus=corpus).update(is_public=True)
         logger.info(f"Made {updated_extracts} extracts public")
@@ -0,0 +1,168 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from django.db import connection, transaction
+from django.db.models import QuerySet
+from pgvector.django import CosineDistance, HnswIndex, IvfflatIndex
+
+logger = logging.getLogger(__name__)
+
+# Build parameters for the HNSW indexes on our 384-dim embeddings. These are pgvector's defaults, spelled out so
+# the migration state is explicit.
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 64
+
+# HNSW landed in pgvector 0.5.0. Older extensions get an IVFFlat index instead.
+HNSW_MIN_PGVECTOR_VERSION = (0, 5, 0)
+
+
+def get_pgvector_version(schema_editor_or_connection) -> Optional[tuple[int, ...]]:
+
+    conn = getattr(
+        schema_editor_or_connection, "connection", schema_editor_or_connection
+    )
+
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+        row = cursor.fetchone()
+
+    if row is None:
+        return None
+
+    return tuple(int(part) for part in row[0].split(".") if part.isdigit())
+
+
+def pgvector_supports_hnsw(schema_editor_or_connection) -> bool:
+    version = get_pgvector_version(schema_editor_or_connection)
+    return version is not None and version >= HNSW_MIN_PGVECTOR_VERSION
+
+
+def calculate_ivfflat_lists(row_count: int) -> int:
+    """
+    pgvector's recommendation: rows / 1000 lists up to 1M rows, sqrt(rows) after that. IVFFlat clusters are
+    fixed at build time, so the index should be rebuilt once the table has grown substantially.
+    """
+    if row_count > 1_000_000:
+        return int(row_count**0.5)
+    return max(1, row_count // 1000)
+
+
+def create_embedding_ann_index(
+    schema_editor, model, index_name: str, field_name: str = "embedding"
+):
+    """
+    Create a cosine-distance ANN index on a model's VectorField. Uses HNSW where the installed pgvector supports
+    it and falls back to IVFFlat otherwise. Meant to be called from a RunPython migration operation.
+    """
+
+    if pgvector_supports_hnsw(schema_editor):
+        index = HnswIndex(
+            name=index_name,
+            fields=[field_name],
+            m=HNSW_M,
+            ef_construction=HNSW_EF_CONSTRUCTION,
+            opclasses=["vector_cosine_ops"],
+        )
+    else:
+        lists = calculate_ivfflat_lists(
+            model.objects.filter(**{f"{field_name}__isnull": False}).count()
+        )
+        logger.warning(
+            f"create_embedding_ann_index() - pgvector < 0.5.0, building IVFFlat index {index_name} with "
+            f"{lists} lists instead of HNSW"
+        )
+        index = IvfflatIndex(
+            name=index_name,
+            fields=[field_name],
+            lists=lists,
+            opclasses=["vector_cosine_ops"],
+        )
+
+    schema_editor.add_index(model, index)
+
+
+def drop_embedding_ann_index(schema_editor, model, index_name: str):
+    schema_editor.execute(
+        f"DROP INDEX IF EXISTS {schema_editor.quote_name(index_name)}"
+    )
+
+
+@contextmanager
+def ann_search_settings(ef_search: Optional[int] = None, probes: Optional[int] = None):
+    """
+    Apply per-query ANN tuning knobs. hnsw.ef_search (default 40) and ivfflat.probes (default 1) trade latency
+    for recall. The settings are SET LOCAL inside a transaction so they never leak onto a pooled connection.
+    """
+
+    with transaction.atomic():
+        if ef_search is not None or probes is not None:
+            with connection.cursor() as cursor:
+                if ef_search is not None:
+                    cursor.execute(f"SET LOCAL hnsw.ef_search = {int(ef_search)}")
+                if probes is not None:
+                    cursor.execute(f"SET LOCAL ivfflat.probes = {int(probes)}")
+        yield
+
+
+@contextmanager
+def exact_search_settings():
+    """
+    Force an exact (sequential scan) nearest-neighbor search by disabling index scans for the transaction.
+    """
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_indexscan = off")
+            cursor.execute("SET LOCAL enable_bitmapscan = off")
+        yield
+
+
+def benchmark_ann_recall(
+    queryset: QuerySet,
+    query_embeddings: list[list[float]],
+    k: int = 10,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    field_name: str = "embedding",
+) -> dict:
+    """
+    Compare ANN results against exact search for a set of query vectors. Returns mean recall@k along with the
+    mean latency (ms) of the ANN and exact queries so ef_search / probes can be tuned for a given corpus size.
+    """
+
+    queryset = queryset.filter(**{f"{field_name}__isnull": False})
+
+    recalls = []
+    ann_latencies = []
+    exact_latencies = []
+
+    for query_embedding in query_embeddings:
+
+        ordered = queryset.order_by(CosineDistance(field_name, query_embedding))
+
+        start = time.perf_counter()
+        with ann_search_settings(ef_search=ef_search, probes=probes):
+            ann_ids = list(ordered.values_list("id", flat=True)[:k])
+        ann_latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        with exact_search_settings():
+            exact_ids = list(ordered.values_list("id", flat=True)[:k])
+        exact_latencies.append((time.perf_counter() - start) * 1000)
+
+        if exact_ids:
+            recalls.append(len(set(ann_ids) & set(exact_ids)) / len(exact_ids))
+
+    num_queries = max(1, len(query_embeddings))
+
+    return {
+        "k": k,
+        "ef_search": ef_search,
+        "probes": probes,
+        "queries": len(query_embeddings),
+        "recall": sum(recalls) / len(recalls) if recalls else 1.0,
+        "ann_latency_ms": sum(ann_latencies) / num_queries,
+        "exact_latency_ms": sum(exact_latencies) / num_queries,
+    }